@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of bootstrap confidence intervals.
+
+Simulates many small samples from a skewed distribution (lognormal, similar
+to across-subject distributions of signal change), and calculates percentile,
+BCa, and studentized bootstrap confidence intervals of the mean for different
+numbers of bootstrap iterations. For each type of interval and number of
+iterations, the coverage (proportion of intervals that include the true
+mean), the deviation of the interval bounds from those obtained with a large
+number of iterations (Monte Carlo error), and the run time are reported.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from py_depthsampling.boot.boot_ci import boot_ci
+from py_depthsampling.boot.boot_ci import stat_mean
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Number of simulated experiments:
+varNumExp = 1000
+
+# Number of subjects per experiment:
+varNumSub = 10
+
+# Number of variables (e.g. depth levels) per subject:
+varNumVar = 10
+
+# Numbers of bootstrap iterations to compare:
+lstNumIt = [500, 1000, 2000, 5000]
+
+# Number of bootstrap iterations for reference interval:
+varNumItRef = 50000
+
+# Types of confidence interval:
+lstCi = ['percentile', 'bca', 'student']
+
+# Confidence interval:
+varConLw = 2.5
+varConUp = 97.5
+
+# Number of simulated experiments used for Monte Carlo error (reference
+# interval is expensive):
+varNumExpRef = 20
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Simulate data
+
+np.random.seed(0)
+
+# Lognormal data, shape aryDat[experiment, subject, variable]:
+varSgm = 1.0
+aryDat = np.random.lognormal(mean=0.0, sigma=varSgm,
+                             size=(varNumExp, varNumSub, varNumVar))
+
+# True mean of lognormal distribution:
+varTrue = np.exp(0.5 * varSgm ** 2)
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Coverage
+
+print(('-Coverage of ' + str(varConUp - varConLw) + '% interval of the mean, '
+       + str(varNumExp) + ' experiments, ' + str(varNumSub) + ' subjects'))
+
+for strCi in lstCi:
+    for varNumIt in lstNumIt:
+
+        vecCov = np.zeros(varNumExp)
+        varTme01 = time.time()
+        for idxExp in range(varNumExp):
+            aryCnf = boot_ci(aryDat[idxExp, :, :], funcStat=stat_mean,
+                             varNumIt=varNumIt, varConLw=varConLw,
+                             varConUp=varConUp, strCi=strCi)[0]
+            vecCov[idxExp] = np.mean(np.logical_and(
+                np.less_equal(aryCnf[0, :], varTrue),
+                np.greater_equal(aryCnf[1, :], varTrue)))
+        varTme02 = time.time()
+
+        print(('---' + strCi + ', ' + str(varNumIt) + ' iterations: coverage '
+               + str(np.around(np.mean(vecCov), 3)) + ', time per interval '
+               + str(np.around(((varTme02 - varTme01) / varNumExp * 1000.0),
+                               2))
+               + ' ms'))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Monte Carlo error
+
+print(('-Deviation of interval bounds from reference ('
+       + str(varNumItRef) + ' iterations), relative to interval width'))
+
+for strCi in lstCi:
+
+    # Reference intervals:
+    lstRef = []
+    for idxExp in range(varNumExpRef):
+        lstRef.append(boot_ci(aryDat[idxExp, :, :], funcStat=stat_mean,
+                              varNumIt=varNumItRef, varConLw=varConLw,
+                              varConUp=varConUp, strCi=strCi,
+                              varNumChnk=5000)[0])
+
+    for varNumIt in lstNumIt:
+        lstDev = []
+        for idxExp in range(varNumExpRef):
+            aryCnf = boot_ci(aryDat[idxExp, :, :], funcStat=stat_mean,
+                             varNumIt=varNumIt, varConLw=varConLw,
+                             varConUp=varConUp, strCi=strCi)[0]
+            aryRef = lstRef[idxExp]
+            lstDev.append(np.divide(np.absolute(np.subtract(aryCnf, aryRef)),
+                                    np.subtract(aryRef[1, :], aryRef[0, :])))
+        print(('---' + strCi + ', ' + str(varNumIt) + ' iterations: median '
+               + 'deviation ' + str(np.around(np.median(lstDev), 4))))
+# -----------------------------------------------------------------------------
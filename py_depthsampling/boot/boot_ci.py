@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+Bootstrap confidence intervals for across-subject statistics.
+
+Function of the depth sampling pipeline.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import multiprocessing as mp
+import numpy as np
+from scipy.stats import norm
+from py_depthsampling.boot.utilities import get_cnt
+from py_depthsampling.boot.utilities import cnt_median
+
+
+# Data and statistic used by worker processes (set by `init_wrk`):
+dicWrk = {}
+
+
+def stat_mean(aryCnt, aryDat, vecWght=None):
+    """
+    Mean of bootstrap samples given as counts.
+
+    Parameters
+    ----------
+    aryCnt : np.array
+        How often each subject is included in each sample, shape
+        aryCnt[iteration, subject] (see `utilities.get_cnt`).
+    aryDat : np.array
+        Data, shape aryDat[subject, variable].
+    vecWght : np.array or None
+        Subject weights (e.g. number of vertices per subject) for weighted
+        averaging. If `None`, all subjects have the same weight.
+
+    Returns
+    -------
+    aryMne : np.array
+        (Weighted) mean across subjects within each sample, shape
+        aryMne[iteration, variable].
+    """
+    if vecWght is not None:
+        aryCnt = np.multiply(aryCnt, vecWght[None, :])
+    return np.divide(np.dot(aryCnt, aryDat),
+                     np.sum(aryCnt, axis=1)[:, None])
+
+
+def stat_median(aryCnt, aryDat):
+    """
+    Median of bootstrap samples given as counts.
+
+    Parameters
+    ----------
+    aryCnt : np.array
+        How often each subject is included in each sample, shape
+        aryCnt[iteration, subject]. Samples may differ in size.
+    aryDat : np.array
+        Data, shape aryDat[subject, variable].
+
+    Returns
+    -------
+    aryMed : np.array
+        Median across subjects within each sample, shape aryMed[iteration,
+        variable] (see `utilities.cnt_median`).
+    """
+    return cnt_median(aryCnt, aryDat)
+
+
+def jack_cnt(aryCnt):
+    """
+    Count matrices of the jackknife (leave-one-out) samples.
+
+    Parameters
+    ----------
+    aryCnt : np.array
+        Counts of one or several samples, shape aryCnt[sample, subject].
+
+    Returns
+    -------
+    aryCntJck : np.array
+        Counts of the jackknife samples, shape aryCntJck[sample * subject,
+        subject]. Row `idxSmp * varNumSub + idxSub` corresponds to sample
+        `idxSmp` with one draw of subject `idxSub` removed. If a subject is
+        not included in a sample, the row is a copy of the sample (it gets
+        zero weight in `jack_se`). Rows therefore differ in size (the
+        statistic has to take the size of each row into account, as
+        `stat_mean` & `stat_median` do).
+    """
+    varNumSub = aryCnt.shape[1]
+    aryCntJck = np.subtract(aryCnt[:, None, :],
+                            np.eye(varNumSub)[None, :, :])
+    aryCntJck = np.where(np.less(aryCntJck, 0.0), aryCnt[:, None, :],
+                         aryCntJck)
+    return aryCntJck.reshape(-1, varNumSub)
+
+
+def jack_se(aryCnt, aryJck):
+    """
+    Jackknife standard error from leave-one-out statistics.
+
+    Parameters
+    ----------
+    aryCnt : np.array
+        Counts of the samples, shape aryCnt[sample, subject].
+    aryJck : np.array
+        Statistic of the jackknife samples (see `jack_cnt`), shape
+        aryJck[sample, subject, variable].
+
+    Returns
+    -------
+    aryJckSe : np.array
+        Jackknife standard error, shape aryJckSe[sample, variable].
+    aryJckDev : np.array
+        Deviation of the leave-one-out statistics from their (count weighted)
+        mean, shape aryJckDev[sample, subject, variable].
+
+    Notes
+    -----
+    Removing any of the draws of a subject that is included several times in
+    a sample yields the same leave-one-out statistic, so the statistic of
+    each subject is weighted by its count. If all leave-one-out statistics
+    of a sample are equal (e.g. for the median in the presence of ties), the
+    standard error is exactly zero (and not affected by rounding errors of
+    the mean).
+    """
+    vecNumSmp = np.sum(aryCnt, axis=1)
+    aryJckMne = np.divide(np.einsum('ns,nsv->nv', aryCnt, aryJck),
+                          vecNumSmp[:, None])
+    aryJckDev = np.subtract(aryJck, aryJckMne[:, None, :])
+
+    # Samples with equal leave-one-out statistics (of the subjects included
+    # in the sample):
+    lgcInc = np.greater(aryCnt, 0.0)[:, :, None]
+    lgcCnst = np.equal(np.max(np.where(lgcInc, aryJck, -np.inf), axis=1),
+                       np.min(np.where(lgcInc, aryJck, np.inf), axis=1))
+    aryJckDev = np.where(lgcCnst[:, None, :], 0.0, aryJckDev)
+    aryJckSe = np.sqrt(np.multiply(
+        np.divide((vecNumSmp - 1.0), vecNumSmp)[:, None],
+        np.einsum('ns,nsv->nv', aryCnt, np.square(aryJckDev))))
+    return aryJckSe, aryJckDev
+
+
+def init_wrk(funcStat, aryDat, lgcStd):
+    """Set data and statistic of worker process (see `boot_ci`)."""
+    dicWrk['funcStat'] = funcStat
+    dicWrk['aryDat'] = aryDat
+    dicWrk['lgcStd'] = lgcStd
+
+
+def boot_chnk(aryCnt):
+    """
+    Statistic (and its jackknife standard error) of a chunk of samples.
+
+    Parameters
+    ----------
+    aryCnt : np.array
+        Counts of the bootstrap samples, shape aryCnt[iteration, subject].
+
+    Returns
+    -------
+    aryBoo : np.array
+        Statistic of the bootstrap samples, shape aryBoo[iteration, variable].
+    aryBooSe : np.array or None
+        Jackknife standard error of the statistic within each bootstrap
+        sample (only for studentized intervals), shape aryBooSe[iteration,
+        variable].
+    """
+    funcStat = dicWrk['funcStat']
+    aryDat = dicWrk['aryDat']
+
+    aryBoo = funcStat(aryCnt, aryDat)
+
+    if dicWrk['lgcStd']:
+        aryJck = funcStat(jack_cnt(aryCnt), aryDat)
+        aryJck = aryJck.reshape(aryCnt.shape[0], aryCnt.shape[1], -1)
+        aryBooSe = jack_se(aryCnt, aryJck)[0]
+    else:
+        aryBooSe = None
+
+    return aryBoo, aryBooSe
+
+
+def col_percentile(aryBoo, aryPrc):
+    """
+    Percentiles with a different percentage for each variable.
+
+    Parameters
+    ----------
+    aryBoo : np.array
+        Bootstrap distribution, shape aryBoo[iteration, variable].
+    aryPrc : np.array
+        Percentages (in range [0, 100]), shape aryPrc[bound, variable].
+
+    Returns
+    -------
+    aryOut : np.array
+        Percentiles, shape aryOut[bound, variable]. Same (linear)
+        interpolation as `np.percentile`.
+    """
+    varNumIt = aryBoo.shape[0]
+    arySrt = np.sort(aryBoo, axis=0)
+    aryPos = np.multiply(np.divide(aryPrc, 100.0), float(varNumIt - 1))
+    aryIdx01 = np.clip(np.floor(aryPos).astype(np.int64), 0, (varNumIt - 1))
+    aryIdx02 = np.minimum((aryIdx01 + 1), (varNumIt - 1))
+    aryFrc = np.subtract(aryPos, aryIdx01)
+    aryVal01 = np.take_along_axis(arySrt, aryIdx01, axis=0)
+    aryVal02 = np.take_along_axis(arySrt, aryIdx02, axis=0)
+    return np.add(aryVal01, np.multiply(np.subtract(aryVal02, aryVal01),
+                                        aryFrc))
+
+
+def boot_ci(aryDat, funcStat=stat_median, varNumIt=10000, varConLw=2.5,
+            varConUp=97.5, strCi='percentile', varNumChnk=1000, varPar=1):
+    """
+    Bootstrap confidence interval of an across-subject statistic.
+
+    Parameters
+    ----------
+    aryDat : np.array
+        Data, shape aryDat[subject, ...] (e.g. aryDat[subject, condition,
+        depth]). Subjects are resampled with replacement.
+    funcStat : function
+        Vectorised statistic. Called as `funcStat(aryCnt, aryDat2D)`, where
+        aryCnt contains the counts of several samples (shape [sample,
+        subject], see `utilities.get_cnt`) and aryDat2D is the data reshaped
+        to [subject, variable]. Has to return an array of shape [sample,
+        variable]. See `stat_mean` and `stat_median`. If `varPar > 1`, the
+        function has to be defined at module level (so that it can be sent to
+        the worker processes); `functools.partial` can be used to set
+        additional arguments (e.g. subject weights for `stat_mean`).
+    varNumIt : int
+        Number of bootstrap iterations.
+    varConLw : float
+        Lower bound of the confidence interval in percent (i.e. in range of
+        [0, 100]).
+    varConUp : float
+        Upper bound of the confidence interval in percent.
+    strCi : str
+        Type of confidence interval: 'percentile', 'bca' (bias-corrected and
+        accelerated), or 'student' (studentized, i.e. bootstrap-t).
+    varNumChnk : int
+        Number of bootstrap iterations that are processed at once.
+    varPar : int
+        Number of worker processes. The random draws are made in the main
+        process, so the result does not depend on the number of processes.
+
+    Returns
+    -------
+    aryCnf : np.array
+        Lower and upper bound of the confidence interval, shape aryCnf[2,
+        ...], where `...` stands for the shape of the data without the
+        subject dimension.
+    aryEmp : np.array
+        Statistic of the original sample, same shape as one bound.
+
+    Notes
+    -----
+    Bootstrap samples are represented by counts (how often each subject is
+    drawn), so the statistic of a chunk of iterations can be calculated at
+    once (e.g. the mean is one matrix product). The random draws are made
+    chunk by chunk with `np.random.randint`, which yields the same sequence as
+    one draw for all iterations (i.e. the percentile interval is identical to
+    that of the previous implementation in `boot_plot`, for the same seed).
+    Counts are only created for the chunks that are currently processed, so
+    that apart from the bootstrap distribution of the statistic (of size
+    `varNumIt * variable`), memory usage depends on the chunk size and the
+    number of processes, but not on the number of iterations.
+
+    The 'bca' interval adjusts the percentages of the percentile interval for
+    bias (proportion of bootstrap samples below the empirical value) and
+    skewness (acceleration, estimated once from the jackknife samples of the
+    original data). See Efron & Tibshirani (1993), An Introduction to the
+    Bootstrap, chapter 14. The 'student' interval uses the distribution of
+    `(theta* - theta) / se*`, where the standard error `se*` of each bootstrap
+    sample is estimated with the jackknife. It therefore requires one
+    evaluation of the statistic per subject for each bootstrap sample (i.e.
+    the run time is multiplied by the number of subjects). Because the
+    jackknife standard error of the median is unreliable, the studentized
+    interval is only recommended for smooth statistics such as the mean.
+    """
+    if strCi not in ['percentile', 'bca', 'student']:
+        strErrMsg = ('ERROR. Unknown type of confidence interval: ' + strCi)
+        raise ValueError(strErrMsg)
+
+    lgcStd = (strCi == 'student')
+
+    # Number of subjects:
+    varNumSub = aryDat.shape[0]
+
+    # Shape of the output (without subject dimension):
+    tplShp = aryDat.shape[1:]
+
+    # Data of the form aryDat[subject, variable]:
+    aryDat = aryDat.reshape(varNumSub, -1).astype(np.float64)
+    varNumVar = aryDat.shape[1]
+
+    # -------------------------------------------------------------------------
+    # *** Bootstrap
+
+    # Bootstrap distribution (and jackknife standard errors), shape
+    # aryBoo[iteration, variable]:
+    aryBoo = np.zeros((varNumIt, varNumVar))
+    if lgcStd:
+        aryBooSe = np.zeros((varNumIt, varNumVar))
+
+    # Chunks of iterations:
+    lstChnk = [(varIdx01, min((varIdx01 + varNumChnk), varNumIt))
+               for varIdx01 in range(0, varNumIt, varNumChnk)]
+
+    if varPar > 1:
+        objPool = mp.Pool(processes=varPar, initializer=init_wrk,
+                          initargs=(funcStat, aryDat, lgcStd))
+    else:
+        init_wrk(funcStat, aryDat, lgcStd)
+
+    # The counts of the bootstrap samples are created for one chunk per
+    # process at a time (random draws in main process, in order to be
+    # independent of the number of processes), so that memory usage does not
+    # depend on the number of iterations:
+    for idxBtch in range(0, len(lstChnk), varPar):
+        lstBtch = lstChnk[idxBtch:(idxBtch + varPar)]
+        lstCnt = []
+        for varIdx01, varIdx02 in lstBtch:
+            aryRnd = np.random.randint(0,
+                                       high=varNumSub,
+                                       size=((varIdx02 - varIdx01),
+                                             varNumSub))
+            lstCnt.append(get_cnt(aryRnd, varNumSub))
+        if varPar > 1:
+            lstRes = objPool.map(boot_chnk, lstCnt)
+        else:
+            lstRes = [boot_chnk(aryCnt) for aryCnt in lstCnt]
+        for (varIdx01, varIdx02), objRes in zip(lstBtch, lstRes):
+            aryBoo[varIdx01:varIdx02, :] = objRes[0]
+            if lgcStd:
+                aryBooSe[varIdx01:varIdx02, :] = objRes[1]
+        del(lstCnt)
+        del(lstRes)
+
+    if varPar > 1:
+        objPool.close()
+        objPool.join()
+    else:
+        dicWrk.clear()
+
+    # -------------------------------------------------------------------------
+    # *** Confidence interval
+
+    # Statistic of the original sample:
+    aryCntEmp = np.ones((1, varNumSub))
+    vecEmp = funcStat(aryCntEmp, aryDat)[0, :]
+
+    if strCi == 'percentile':
+
+        aryCnf = np.percentile(aryBoo, (varConLw, varConUp), axis=0)
+
+    else:
+
+        # Jackknife of the original sample:
+        aryJck = funcStat(jack_cnt(aryCntEmp), aryDat)
+        vecSe, aryJckDev = jack_se(aryCntEmp,
+                                   aryJck.reshape(1, varNumSub, varNumVar))
+        vecSe = vecSe[0, :]
+        aryJckDev = aryJckDev[0, :, :]
+
+    if strCi == 'bca':
+
+        # Bias correction (bootstrap samples equal to the empirical value are
+        # counted half):
+        vecPrp = np.divide(
+            np.add(np.sum(np.less(aryBoo, vecEmp[None, :]), axis=0),
+                   np.multiply(0.5, np.sum(np.equal(aryBoo, vecEmp[None, :]),
+                                           axis=0))),
+            float(varNumIt))
+        vecPrp = np.clip(vecPrp, (0.5 / varNumIt), (1.0 - 0.5 / varNumIt))
+        vecZ0 = norm.ppf(vecPrp)
+
+        # Acceleration (from jackknife of original sample):
+        vecNum = np.sum(np.power(-aryJckDev, 3), axis=0)
+        vecDen = np.multiply(6.0, np.power(np.sum(np.square(aryJckDev),
+                                                  axis=0), 1.5))
+        vecAcc = np.zeros(varNumVar)
+        lgcDen = np.greater(vecDen, 0.0)
+        vecAcc[lgcDen] = np.divide(vecNum[lgcDen], vecDen[lgcDen])
+
+        # Adjusted percentages:
+        vecZ = norm.ppf(np.divide(np.array([varConLw, varConUp]), 100.0))
+        aryZ = np.add(vecZ0[None, :], vecZ[:, None])
+        aryPrc = np.multiply(100.0, norm.cdf(np.add(
+            vecZ0[None, :],
+            np.divide(aryZ, np.subtract(1.0,
+                                        np.multiply(vecAcc[None, :], aryZ))))))
+
+        aryCnf = col_percentile(aryBoo, aryPrc)
+
+    elif strCi == 'student':
+
+        # Bootstrap distribution of the studentized statistic (samples with
+        # zero standard error are excluded):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aryT = np.divide(np.subtract(aryBoo, vecEmp[None, :]), aryBooSe)
+        aryT[np.logical_not(np.isfinite(aryT))] = np.nan
+        aryTPrc = np.nanpercentile(aryT, (varConLw, varConUp), axis=0)
+
+        aryCnf = np.array([np.subtract(vecEmp,
+                                       np.multiply(aryTPrc[1, :], vecSe)),
+                           np.subtract(vecEmp,
+                                       np.multiply(aryTPrc[0, :], vecSe))])
+
+    aryCnf = aryCnf.reshape(((2,) + tplShp))
+    aryEmp = vecEmp.reshape(tplShp)
+
+    return aryCnf, aryEmp
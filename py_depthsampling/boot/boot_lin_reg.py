@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
 """
-Prepare bootstrapping linear regression in R.
+Bootstrapping linear regression on CRF parameters.
 
 Can be used to test for differences in depth profiles between ROIs and for
 differences across cortical depth, e.g. on depth profiles of semisaturation
 constant bwetween V1 and V2. (Or, for instance, on residual variance depth
 profiles & response at 50% contrast profiles.)
 
-The bootstrap linear regression is performed in R. Here, we only prepare an npy
-file (containing an np array) that can be read by R.
+The contrast response function is fitted for all subjects, depth levels, and
+ROIs at once in case of the power function (closed form log-linear least
+squares, followed by Gauss-Newton refinement in linear space). The
+parametric bootstrap of the linear regression (previously performed in R, see
+`boot_lin_reg.r`) is performed for all iterations and signals at once, and the
+results are saved as a csv file. The npy files that can be read by R are still
+created.
 
 Function of the depth sampling pipeline.
 """
@@ -30,7 +35,10 @@ Function of the depth sampling pipeline.
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import numpy as np
-from ds_crfFit import crf_fit
+import pandas as pd
+from py_depthsampling.crf.crf_fit import crf_fit
+from py_depthsampling.crf.crf_fit_batch import crf_fit_power_batch
+from py_depthsampling.boot.utilities import lin_reg_boot
 
 
 # ----------------------------------------------------------------------------
@@ -53,9 +61,19 @@ strPthIn = strPthIn.format(strCrct, strFunc)
 # half maximum response would need to be adjusted.
 vecEmpX = np.array([0.025, 0.061, 0.163, 0.72])
 
+# Number of Gauss-Newton steps for batched fit of power function (see
+# `crf_fit_power_batch`):
+varNumStp = 20
+
 # Output path for array to be analysed in R (bootstrap regerssion):
 strPthOt = '/home/john/PhD/ParCon_Depth_Data/Higher_Level_Analysis/R_aryEmp{}_{}_{}.npy'
 
+# Output path for results of bootstrap linear regression (csv file):
+strCsv = '/home/john/PhD/ParCon_Depth_Data/Higher_Level_Analysis/boot_lin_reg_{}_{}.csv'  #noqa
+
+# Number of iterations for bootstrap linear regression:
+varNumIt = 100000
+
 
 # ----------------------------------------------------------------------------
 # *** Load resampling
@@ -105,42 +123,72 @@ aryHlfMaxRoi02 = np.zeros((varNumSubs, varNumDpt))
 aryResRoi01 = np.zeros((varNumSubs, varNumDpt, varNumCon))
 aryResRoi02 = np.zeros((varNumSubs, varNumDpt, varNumCon))
 
-# Fit CRF for each subject & depth level:
-for idxSub in range(varNumSubs):
+if strFunc == 'power':
+
+    # Responses of both ROIs, all subjects, and all depth levels, of the form
+    # aryEmpY[(idxRoi * idxSub * idxDpt), idxCon]:
+    aryEmpY = np.array((aryDpth01, aryDpth02))
+    aryEmpY = np.moveaxis(aryEmpY, 2, 3).reshape(-1, varNumCon)
+
+    # Fit power CRF to all responses at once (log-linear fit, refined by
+    # least squares in linear space, as in `crf_fit`):
+    _, vecHlfMax, vecSemi, aryRes, _ = crf_fit_power_batch(
+        vecEmpX, aryEmpY, varNumX=aryMdlY.shape[3], varNumStp=varNumStp)
+
+    # Separate ROIs:
+    aryHlfMaxRoi01, aryHlfMaxRoi02 = vecHlfMax.reshape(2, varNumSubs,
+                                                       varNumDpt)
+    arySemiRoi01, arySemiRoi02 = vecSemi.reshape(2, varNumSubs, varNumDpt)
+    aryResRoi01, aryResRoi02 = aryRes.reshape(2, varNumSubs, varNumDpt,
+                                              varNumCon)
 
-    print(('---Subject: ' + str(idxSub)))
+else:
 
-    for idxDpt in range(varNumDpt):
+    # Fit CRF to the across-subjects mean of each depth level. The solutions
+    # are used as initial parameters for the single-subject fits (which have
+    # similar optima), instead of the default initial parameters:
+    lstPar01 = [crf_fit(vecEmpX, aryDpth01[:, :, idxDpt], strFunc=strFunc,
+                        varNumX=aryMdlY.shape[3], lgcPar=True)[4]
+                for idxDpt in range(varNumDpt)]
+    lstPar02 = [crf_fit(vecEmpX, aryDpth02[:, :, idxDpt], strFunc=strFunc,
+                        varNumX=aryMdlY.shape[3], lgcPar=True)[4]
+                for idxDpt in range(varNumDpt)]
 
-        print(('------Depth: ' + str(idxDpt)))
+    # Fit CRF for each subject & depth level:
+    for idxSub in range(varNumSubs):
 
-        # Temporary array to fit required input dimensions:
-        aryTmp = aryDpth01[idxSub, :, idxDpt].reshape(1, varNumCon)
+        print(('---Subject: ' + str(idxSub)))
 
-        # CRF fitting for current subject & depth level, ROI 1:
-        _, aryHlfMaxRoi01[idxSub, idxDpt], arySemiRoi01[idxSub, idxDpt], \
-            aryResRoi01[idxSub, idxDpt, :] = crf_fit(vecEmpX,
-                                                     aryTmp,
-                                                     strFunc=strFunc,
-                                                     varNumX=aryMdlY.shape[3])
+        for idxDpt in range(varNumDpt):
 
-        # Temporary array to fit required input dimensions:
-        aryTmp = aryDpth02[idxSub, :, idxDpt].reshape(1, varNumCon)
+            print(('------Depth: ' + str(idxDpt)))
 
-        # CRF fitting for current subject & depth level, ROI 2:
-        _, aryHlfMaxRoi02[idxSub, idxDpt], arySemiRoi02[idxSub, idxDpt], \
-            aryResRoi02[idxSub, idxDpt, :] = crf_fit(vecEmpX,
-                                                     aryTmp,
-                                                     strFunc=strFunc,
-                                                     varNumX=aryMdlY.shape[3])
+            # Temporary array to fit required input dimensions:
+            aryTmp = aryDpth01[idxSub, :, idxDpt].reshape(1, varNumCon)
+
+            # CRF fitting for current subject & depth level, ROI 1:
+            _, aryHlfMaxRoi01[idxSub, idxDpt], \
+                arySemiRoi01[idxSub, idxDpt], \
+                aryResRoi01[idxSub, idxDpt, :] = crf_fit(
+                    vecEmpX, aryTmp, strFunc=strFunc,
+                    varNumX=aryMdlY.shape[3], vecPar0=lstPar01[idxDpt])
+
+            # Temporary array to fit required input dimensions:
+            aryTmp = aryDpth02[idxSub, :, idxDpt].reshape(1, varNumCon)
+
+            # CRF fitting for current subject & depth level, ROI 2:
+            _, aryHlfMaxRoi02[idxSub, idxDpt], \
+                arySemiRoi02[idxSub, idxDpt], \
+                aryResRoi02[idxSub, idxDpt, :] = crf_fit(
+                    vecEmpX, aryTmp, strFunc=strFunc,
+                    varNumX=aryMdlY.shape[3], vecPar0=lstPar02[idxDpt])
 
 
 # ----------------------------------------------------------------------------
 # *** PREPARE BOOTSTRAPPING LINEAR REGRESSION
 
-# The bootstrap linear regression is performed in R. Here, we only prepare an
-# npy file (containing a np array) that can be read by R and used for the
-# analysis.
+# Npy files (containing np arrays) that can be read by R (`boot_lin_reg.r`)
+# are created. The same analysis is performed below.
 
 # Array to be used in R for bootstrap linear regression, of the form
 # aryR[(idxSub * idxDpt * idxRoi), 4], where the first dimension corresponds to
@@ -199,6 +247,52 @@ np.save(strPthOt.format('Resd', strCrct, strFunc),
         aryResRoiR)
 
 
+# ----------------------------------------------------------------------------
+# *** BOOTSTRAPPING LINEAR REGRESSION
+
+print('---Parametric bootstrap of linear regression')
+
+# Names of dependent variables:
+lstSig = ['HlfMax', 'Semi', 'Resd']
+
+# Names of coefficients:
+lstPe = ['Intercept', 'Depth', 'ROI', 'Subject']
+
+# Design matrix (with constant term for intercept), same model as in R
+# (Signal ~ Depth + ROI + Subject):
+aryX = np.copy(aryR)
+aryX[:, 0] = 1.0
+
+# Dependent variables, of the form aryY[observation, signal]:
+aryY = np.array([aryHlfMaxRoiR[:, 0], arySemiRoiR[:, 0], aryResRoiR[:, 0]]).T
+
+# Parameter estimates, empirical (aryPe[signal, coefficient]) and for all
+# bootstrap iterations (aryBoot[iteration, signal, coefficient]):
+aryPe, aryBoot = lin_reg_boot(aryX, aryY, varNumIt=varNumIt)
+
+# Null distribution of parameter estimates (absolute deviation from mean
+# across iterations), and ratio of iterations with a deviation greater than
+# the empirical parameter estimate (p-value):
+aryNull = np.absolute(np.subtract(aryBoot, np.mean(aryBoot, axis=0)[None]))
+aryP = np.mean(np.greater(aryNull, np.absolute(aryPe)[None]), axis=0)
+
+# Confidence interval for parameter estimates:
+aryCnf = np.percentile(aryBoot, (2.5, 97.5), axis=0)
+
+# Create data frame & save results:
+objDf = pd.DataFrame({'Signal': np.repeat(lstSig, len(lstPe)),
+                      'Coefficient': np.tile(lstPe, len(lstSig)),
+                      'Estimate': aryPe.flatten(),
+                      'p': aryP.flatten(),
+                      'Conf_lower': aryCnf[0, :, :].flatten(),
+                      'Conf_upper': aryCnf[1, :, :].flatten()},
+                     columns=['Signal', 'Coefficient', 'Estimate', 'p',
+                              'Conf_lower', 'Conf_upper'])
+objDf.to_csv(strCsv.format(strCrct, strFunc), sep=';', index=False)
+
+print(objDf)
+
+
 # ----------------------------------------------------------------------------
 
 print('-Done.')
@@ -19,12 +19,17 @@
 
 import numpy as np
 from py_depthsampling.plot.plt_dpth_prfl import plt_dpth_prfl
+from py_depthsampling.boot.boot_ci import boot_ci
+from py_depthsampling.boot.boot_ci import stat_mean
+from py_depthsampling.boot.boot_ci import stat_median
 
 
 def boot_plot(lstCon, objDpth, strPath, varNumIt=10000, varConLw=2.5,
               varConUp=97.5, strTtl='',
               strXlabel='Cortical depth level (equivolume)',
-              strYlabel='fMRI signal change [arbitrary units]', lgcLgnd=False):
+              strYlabel='fMRI signal change [arbitrary units]', lgcLgnd=False,
+              strStat='median', varNumChnk=1000, strCi='percentile',
+              varPar=1):
     """
     Plot across-subject cortical depth profiles with confidence intervals.
 
@@ -41,11 +46,11 @@ def boot_plot(lstCon, objDpth, strPath, varNumIt=10000, varConLw=2.5,
     varNumIt : int
         Number of bootstrap iterations.
     varConLw : float
-        Lower bound of the percentile bootstrap confidence interval in
-        percent (i.e. in range of [0, 100]).
+        Lower bound of the bootstrap confidence interval in percent (i.e. in
+        range of [0, 100]).
     varConUp : float
-        Upper bound of the percentile bootstrap confidence interval in
-        percent (i.e. in range of [0, 100]).
+        Upper bound of the bootstrap confidence interval in percent (i.e. in
+        range of [0, 100]).
     strTtl : str
         Plot title.
     strXlabel : str
@@ -54,6 +59,15 @@ def boot_plot(lstCon, objDpth, strPath, varNumIt=10000, varConLw=2.5,
         Label for y axis.
     lgcLgnd : bool
         Whether to show a legend.
+    strStat : str
+        Across-subject statistic, 'median' or 'mean'.
+    varNumChnk : int
+        Number of bootstrap iterations that are processed at once.
+    strCi : str
+        Type of bootstrap confidence interval, 'percentile', 'bca', or
+        'student' (see `boot_ci.boot_ci`).
+    varPar : int
+        Number of processes for bootstrapping.
 
     Returns
     -------
@@ -62,12 +76,28 @@ def boot_plot(lstCon, objDpth, strPath, varNumIt=10000, varConLw=2.5,
 
     Notes
     -----
-    Plot across-subject median cortical depth profiles with percentile
+    Plot across-subject median (or mean) cortical depth profiles with
     bootstrap confidence intervals. This function bootstraps (i.e. resamples
     with replacement) from an array of single-subject depth profiles,
-    calculates a confidence interval of the median across bootstrap iterations
-    and plots the empirical median & bootstrap confidence intervals along the
-    cortical depth.
+    calculates a confidence interval of the median (or mean) across bootstrap
+    iterations and plots the empirical median (or mean) & bootstrap
+    confidence intervals along the cortical depth.
+
+    The resampled single-subject profiles are not created explicitly. Instead,
+    each bootstrap sample is represented by how often each subject is drawn
+    (count matrix of shape [iteration, subject]). The mean of all bootstrap
+    samples in a chunk of iterations is one matrix product of the count matrix
+    with the data (of shape [subject, condition * depth]), and the median is
+    found from the cumulative counts of the sorted data (see
+    `utilities.cnt_median`). Memory requirements are therefore of the order
+    of `varNumChnk * condition * depth` for the mean, and `varNumChnk *
+    subject * condition * depth` for the median (cumulative counts in sorted
+    order), plus the bootstrap distribution of the statistic, instead of
+    `varNumIt * subject * condition * depth`. For
+    the same random draws, the percentile confidence intervals are identical
+    to those obtained from explicitly resampled profiles. The bootstrap is
+    performed by `boot_ci.boot_ci`, which also provides BCa and studentized
+    intervals.
 
     Function of the depth sampling pipeline.
     """
@@ -107,40 +137,20 @@ def boot_plot(lstCon, objDpth, strPath, varNumIt=10000, varConLw=2.5,
     # Get number of depth levels from input array:
     varNumDpth = aryDpth.shape[2]
 
-    # We will sample subjects with replacement. How many subjects to sample on
-    # each iteration:
-    varNumSmp = varNumSub
-
-    # Random array with subject indicies for bootstrapping of the form
-    # aryRnd[varNumIt, varNumSmp]. Each row includes the indicies of the
-    # subjects to the sampled on that iteration.
-    aryRnd = np.random.randint(0,
-                               high=varNumSub,
-                               size=(varNumIt, varNumSmp))
-
-    # Array for bootstrap samples, of the form
-    # aryBoo[idxIteration, idxSubject, idxCondition, idxDpth]):
-    aryBoo = np.zeros((varNumIt, varNumSub, varNumCon, varNumDpth))
+    # Across-subject statistic:
+    if strStat == 'mean':
+        funcStat = stat_mean
+    else:
+        funcStat = stat_median
 
     # ------------------------------------------------------------------------
     # *** Bootstrap
 
-    # Loop through bootstrap iterations:
-    for idxIt in range(varNumIt):
-        # Indices of current bootstrap sample:
-        vecRnd = aryRnd[idxIt, :]
-        # Put current bootstrap sample into array:
-        aryBoo[idxIt, :, :, :] = aryDpth[vecRnd, :, :]
-
-    # Median for each bootstrap sample (across subjects within the bootstrap
-    # sample):
-    aryBooMed = np.median(aryBoo, axis=1)
-
-    # Delete large bootstrap array:
-    del(aryBoo)
-
-    # Percentile bootstrap for median:
-    aryPrct = np.percentile(aryBooMed, (varConLw, varConUp), axis=0)
+    # Bootstrap confidence interval for median (or mean), shape aryPrct[2,
+    # idxCondition, idxDpth]:
+    aryPrct = boot_ci(aryDpth, funcStat=funcStat, varNumIt=varNumIt,
+                      varConLw=varConLw, varConUp=varConUp, strCi=strCi,
+                      varNumChnk=varNumChnk, varPar=varPar)[0]
 
     # ------------------------------------------------------------------------
     # *** Plot result
@@ -152,8 +162,11 @@ def boot_plot(lstCon, objDpth, strPath, varNumIt=10000, varConLw=2.5,
     strXlabel = 'Cortical depth level (equivolume)'
     strYlabel = 'fMRI signal change [arbitrary units]'
 
-    # Empirical median:
-    aryEmpMed = np.median(aryDpth, axis=0)
+    # Empirical median (or mean):
+    if strStat == 'mean':
+        aryEmpMed = np.mean(aryDpth, axis=0)
+    else:
+        aryEmpMed = np.median(aryDpth, axis=0)
 
     plt_dpth_prfl(aryEmpMed, None, varNumDpth, varNumCon, 80.0, 0.0, 2.0,
                   False, lstConLbl, strXlabel, strYlabel, strTtl, lgcLgnd,
@@ -18,9 +18,12 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+from functools import partial
 import numpy as np
-import rpy2.robjects as robjects
 from py_depthsampling.plot.plt_dpth_prfl import plt_dpth_prfl
+from py_depthsampling.boot.utilities import wght_median
+from py_depthsampling.boot.boot_ci import boot_ci
+from py_depthsampling.boot.boot_ci import stat_mean
 
 
 def boot_plot(objDpth, strPath, lstCon, lstConLbl, varNumIt=10000,  #noqa
@@ -28,7 +31,8 @@ def boot_plot(objDpth, strPath, lstCon, lstConLbl, varNumIt=10000,  #noqa
               tplPadY=(0.0, 0.0),
               strXlabel='Cortical depth level (equivolume)',
               strYlabel='fMRI signal change [arbitrary units]',
-              lgcLgnd=False, lstDiff=None, vecNumInc=None, strParam='mean'):
+              lgcLgnd=False, lstDiff=None, vecNumInc=None, strParam='mean',
+              varNumChnk=1000):
     """
     Plot across-subject cortical depth profiles with confidence intervals.
 
@@ -82,9 +86,12 @@ def boot_plot(objDpth, strPath, lstCon, lstConLbl, varNumIt=10000,  #noqa
         the data, `vecNumInc` should also be provided as an input arguments.
         Otherwise, weights are set to be equal across subjects.
     strParam : string
-        Which parameter to plot; 'mean' or 'median'. If `strParam = 'median'`,
-        an R function is imported for calculating the weighted median.
-        Dependency (in python): `rpy2`, dependency (in R): `spatstat`.
+        Which parameter to plot; 'mean' or 'median'. The weighted median is
+        calculated with `utilities.wght_median`, which reproduces the
+        `weighted.median` function from the R package `spatstat`.
+    varNumChnk : int
+        Number of bootstrap iterations that are processed at once (determines
+        memory footprint of the resampled depth profiles).
 
     Returns
     -------
@@ -153,97 +160,80 @@ def boot_plot(objDpth, strPath, lstCon, lstConLbl, varNumIt=10000,  #noqa
     # each iteration:
     varNumSmp = varNumSub
 
-    # Random array with subject indicies for bootstrapping of the form
-    # aryRnd[varNumIt, varNumSmp]. Each row includes the indicies of the
-    # subjects to the sampled on that iteration.
-    aryRnd = np.random.randint(0,
-                               high=varNumSub,
-                               size=(varNumIt, varNumSmp))
-
     if lstDiff is None:
-        # Array for bootstrap samples, of the form
-        # aryBoo[idxIteration, idxSubject, idxCondition, idxDpth]):
-        aryBoo = np.zeros((varNumIt, varNumSub, varNumCon, varNumDpth))
+        # Data to resample, of the form aryDat[idxSubject, idxCondition,
+        # idxDpth]:
+        aryDat = aryDpth
     else:
         # Set number of comparisons:
         varNumCon = len(lstDiff)
-        # Array for bootstrap samples:
-        aryBoo = np.zeros((varNumIt, varNumSub, varNumCon, varNumDpth))
-
-    # Array with number of vertices per subject for each bootstrapping sample
-    # (needed for weighted averaging), shape: aryWght[iterations, subjects]
-    aryWght = np.zeros((varNumIt, varNumSub))
+        # Difference between conditions, of the form aryDat[idxSubject,
+        # idxComparison, idxDpth]:
+        aryDat = np.zeros((varNumSub, varNumCon, varNumDpth))
+        for idxDiff in range(varNumCon):
+            aryDat[:, idxDiff, :] = \
+                np.subtract(aryDpth[:, lstDiff[idxDiff][0], :],
+                            aryDpth[:, lstDiff[idxDiff][1], :])
 
     # ------------------------------------------------------------------------
     # *** Bootstrap
 
-    # Loop through bootstrap iterations:
-    for idxIt in range(varNumIt):
-        # Indices of current bootstrap sample:
-        vecRnd = aryRnd[idxIt, :]
-        if lstDiff is None:
-            # Put current bootstrap sample into array:
-            aryBoo[idxIt, :, :, :] = aryDpth[vecRnd, :, :]
-        else:
-            # Calculate difference between conditions:
-            for idxDiff in range(varNumCon):
-                aryBoo[idxIt, :, idxDiff, :] = \
-                    np.subtract(aryDpth[vecRnd, lstDiff[idxDiff][0], :],
-                                aryDpth[vecRnd, lstDiff[idxDiff][1], :])
-
-        # Put number of vertices per subject into respective array (for
-        # weighted averaging):
-        aryWght[idxIt, :] = vecNumInc[vecRnd]
-
     if strParam == 'mean':
 
-        # Mean for each bootstrap sample (across subjects within the bootstrap
-        # sample):
+        # Percentile bootstrap of the weighted mean (weighted by number of
+        # vertices per subject), see `boot_ci.boot_ci`. Shape of the
+        # confidence interval: aryPrct[bound, idxCondition, idxDpth].
+        aryPrct = boot_ci(aryDat,
+                          funcStat=partial(stat_mean, vecWght=vecNumInc),
+                          varNumIt=varNumIt,
+                          varConLw=varConLw,
+                          varConUp=varConUp,
+                          strCi='percentile',
+                          varNumChnk=varNumChnk)[0]
 
-        # Sum of weights over subjects (i.e. total number of vertices across
-        # subjects, one value per iteration; for scaling).
-        vecSum = np.sum(aryWght, axis=1)
+    elif strParam == 'median':
 
-        # Multiply depth profiles by weights (weights are broadcasted over
-        # conditions and depth levels):
-        aryTmp = np.multiply(aryBoo, aryWght[:, :, None, None])
+        # The weighted median of a bootstrap sample depends on the order of
+        # the draws (tied values are not merged, see
+        # `utilities.wght_quantile`), so it cannot be calculated from subject
+        # counts, and the samples are resampled explicitly.
 
-        # Sum over subjects, and scale by number of vertices (sum of vertices
-        # is broadcasted over conditions and depth levels):
-        aryBooMne = np.divide(
-                              np.sum(aryTmp, axis=1),
-                              vecSum[:, None, None]
-                              )
+        # Array for median of bootstrap samples, of the form
+        # aryBooMne[idxIteration, idxCondition, idxDpth]:
+        aryBooMne = np.zeros((varNumIt, varNumCon, varNumDpth))
 
-    elif strParam == 'median':
+        # Loop through chunks of bootstrap iterations:
+        for varIdx01 in range(0, varNumIt, varNumChnk):
 
-        # Define R function for calculation of weighted median:
-        strFuncR = """
-         funcR <- function(lstData, lstWght){
-         library(spatstat)
-         varWm <- weighted.median(lstData, lstWght)
-         return(varWm)
-         }
-        """
-        objFuncR = robjects.r(strFuncR)
-
-        # Array for weighted median difference between conditions:
-        aryBooMne = np.zeros((varNumIt, varNumCon, varNumDpth))
+            varIdx02 = min((varIdx01 + varNumChnk), varNumIt)
+
+            # Random array with subject indicies for bootstrapping of the
+            # form aryRnd[idxIteration, varNumSmp]. Each row includes the
+            # indicies of the subjects to the sampled on that iteration.
+            aryRnd = np.random.randint(0,
+                                       high=varNumSub,
+                                       size=((varIdx02 - varIdx01),
+                                             varNumSmp))
+
+            # Bootstrap samples, of the form aryBoo[idxIteration,
+            # idxSubject, idxCondition, idxDpth]:
+            aryBoo = aryDat[aryRnd, :, :]
+
+            # Number of vertices per subject for each bootstrapping sample
+            # (needed for weighted median), shape: aryWght[iterations,
+            # subjects]
+            aryWght = vecNumInc[aryRnd].astype(np.float64)
 
-        # Calculate weighted median difference between conditions in R (yes
-        # this is slow):
-        for idxIt in range(varNumIt):
-            for idxCon in range(varNumCon):
-                for idxDpth in range(varNumDpth):
-                    aryBooMne[idxIt, idxCon, idxDpth] = \
-                        objFuncR(list(aryBoo[idxIt, :, idxCon, idxDpth]),
-                                 list(aryWght[idxIt, :]))[0]
+            # Weighted median for each bootstrap sample (across subjects
+            # within the bootstrap sample):
+            aryBooMne[varIdx01:varIdx02, :, :] = wght_median(
+                aryBoo, aryWght[:, :, None, None], varAxs=1)
 
-    # Delete large bootstrap array:
-    del(aryBoo)
+        # Delete bootstrap array:
+        del(aryBoo)
 
-    # Percentile bootstrap for mean:
-    aryPrct = np.percentile(aryBooMne, (varConLw, varConUp), axis=0)
+        # Percentile bootstrap for median:
+        aryPrct = np.percentile(aryBooMne, (varConLw, varConUp), axis=0)
 
     # ------------------------------------------------------------------------
     # *** Plot result
@@ -268,15 +258,9 @@ def boot_plot(objDpth, strPath, lstCon, lstConLbl, varNumIt=10000,  #noqa
 
         elif strParam == 'median':
 
-            # Array for weighted median difference between conditions:
-            aryEmpMne = np.zeros((varNumCon, varNumDpth))
-
-            # Calculate weighted median in R (yes this is slow):
-            for idxCon in range(varNumCon):
-                for idxDpth in range(varNumDpth):
-                    aryEmpMne[idxCon, idxDpth] = \
-                        objFuncR(list(aryDpth[:, idxCon, idxDpth]),
-                                 list(vecNumInc))[0]
+            # Weighted median across subjects:
+            aryEmpMne = wght_median(aryDpth, vecNumInc[:, None, None],
+                                    varAxs=0)
 
     else:
 
@@ -321,18 +305,10 @@ def boot_plot(objDpth, strPath, lstCon, lstConLbl, varNumIt=10000,  #noqa
 
             elif strParam == 'median':
 
-                # Calculate weighted median difference between conditions in R
-                # (yes this is slow):
-                for idxDiff in range(varNumCon):
-
-                    # Difference in cortical depth profiles between conditions:
-                    aryDiff = np.subtract(aryDpth[:, lstDiff[idxDiff][0], :],
-                                          aryDpth[:, lstDiff[idxDiff][1], :])
-
-                    for idxDpth in range(varNumDpth):
-                        aryEmpMne[idxDiff, idxDpth] = \
-                            objFuncR(list(aryDiff[:, idxDpth]),
-                                     list(vecNumInc))[0]
+                # Weighted median difference between conditions:
+                aryEmpMne[idxDiff, :] = wght_median(aryDat[:, idxDiff, :],
+                                                    vecNumInc[:, None],
+                                                    varAxs=0)
 
         # Create condition labels for differences:
         lstDiffLbl = [None] * varNumCon
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""Utility functions for bootstrapping."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+
+def get_cnt(aryRnd, varNumSub):
+    """
+    Convert bootstrap indices into count matrix.
+
+    Parameters
+    ----------
+    aryRnd : np.array
+        Array with subject indices for bootstrapping, shape aryRnd[iteration,
+        sample]. Each row includes the indices of the subjects sampled on that
+        iteration.
+    varNumSub : int
+        Number of subjects.
+
+    Returns
+    -------
+    aryCnt : np.array
+        How often each subject is included in each bootstrap sample, shape
+        aryCnt[iteration, subject].
+    """
+    varNumIt = aryRnd.shape[0]
+    vecIdx = np.add(aryRnd,
+                    np.multiply(np.arange(varNumIt)[:, None], varNumSub))
+    aryCnt = np.bincount(vecIdx.ravel(), minlength=(varNumIt * varNumSub))
+    return aryCnt.reshape(varNumIt, varNumSub).astype(np.float64)
+
+
+def cnt_median(aryCnt, aryDat):
+    """
+    Median of bootstrap samples given as counts.
+
+    Parameters
+    ----------
+    aryCnt : np.array
+        How often each subject is included in each bootstrap sample, shape
+        aryCnt[iteration, subject] (see `get_cnt`).
+    aryDat : np.array
+        Data, shape aryDat[subject, variable] (e.g. variable = condition *
+        depth level).
+
+    Returns
+    -------
+    aryMed : np.array
+        Median across subjects within each bootstrap sample, shape
+        aryMed[iteration, variable].
+
+    Notes
+    -----
+    The result is identical to `np.median(aryDat[aryRnd, :], axis=1)`, where
+    aryRnd contains the subject indices from which the counts were created,
+    but the resampled data array is never created. The data are sorted once,
+    and the middle order statistic(s) of each bootstrap sample are found from
+    the cumulative counts in sorted order. The samples may differ in size
+    (e.g. jackknife samples, see `boot_ci.jack_cnt`).
+    """
+    varNumSub = aryDat.shape[0]
+
+    # Sample size (separately for each iteration):
+    vecNumSmp = np.around(np.sum(aryCnt, axis=1)).astype(np.int64)
+
+    # Sort data once, separately for each variable:
+    aryIdxSrt = np.argsort(aryDat, axis=0, kind='stable')
+    arySrt = np.take_along_axis(aryDat, aryIdxSrt, axis=0)
+
+    # Cumulative counts in sorted order, shape aryCum[iteration, subject,
+    # variable]:
+    aryCum = np.cumsum(aryCnt[:, aryIdxSrt], axis=1)
+
+    # Rank (zero based) of the lower and upper middle order statistic (equal
+    # for odd sample size), of the form vecRnk[iteration]:
+    vecRnkLw = (vecNumSmp - 1) // 2
+    vecRnkUp = vecNumSmp // 2
+
+    # Position (in sorted order) of the order statistics: first subject for
+    # which the cumulative count exceeds the rank.
+    aryPosLw = np.minimum(np.sum(np.less_equal(aryCum,
+                                               vecRnkLw[:, None, None]),
+                                 axis=1),
+                          (varNumSub - 1))
+    aryPosUp = np.minimum(np.sum(np.less_equal(aryCum,
+                                               vecRnkUp[:, None, None]),
+                                 axis=1),
+                          (varNumSub - 1))
+
+    vecIdxVar = np.arange(aryDat.shape[1])[None, :]
+    aryMed = arySrt[aryPosLw, vecIdxVar]
+    lgcEvn = np.not_equal(vecRnkLw, vecRnkUp)
+    if np.any(lgcEvn):
+        aryMed = np.where(lgcEvn[:, None],
+                          np.divide(np.add(aryMed,
+                                           arySrt[aryPosUp, vecIdxVar]),
+                                    2.0),
+                          aryMed)
+
+    return aryMed
+
+
+def wght_quantile(aryDat, aryWght, vecPrb, varAxs=-1):
+    """
+    Weighted quantiles along one axis of an array.
+
+    Parameters
+    ----------
+    aryDat : np.array
+        Data. Quantiles are calculated along axis `varAxs`.
+    aryWght : np.array
+        Non-negative weights, with the same shape as `aryDat`, or a shape that
+        can be broadcast to it (e.g. a 1D array with the same length as the
+        axis `varAxs`, if `varAxs` is the last axis).
+    vecPrb : float or np.array
+        Probability or probabilities (in range [0, 1]) of the quantiles.
+    varAxs : int
+        Axis along which quantiles are calculated.
+
+    Returns
+    -------
+    aryQnt : np.array
+        Weighted quantiles. The axis `varAxs` of the input is removed. If
+        several probabilities are provided, they are stacked along an
+        additional first axis, i.e. aryQnt[probability, ...].
+
+    Notes
+    -----
+    Reproduces `weighted.quantile` from the R package `spatstat` (version 1),
+    which was used for the weighted median before. The data are sorted
+    (stable with respect to ties, like R's `order`), and the weighted
+    empirical cumulative distribution function, Fx, is calculated. The
+    quantile for probability p is the largest data value with Fx <= p (or the
+    smallest data value if there is none). If Fx < p at that value, the
+    quantile is linearly interpolated between that value and the next one.
+    Tied data values are not merged, i.e. they enter the cumulative
+    distribution one after the other, in their original order.
+    """
+    lgcScl = np.ndim(vecPrb) == 0
+    vecPrb = np.atleast_1d(np.asarray(vecPrb, dtype=np.float64))
+
+    aryDat = np.asarray(aryDat, dtype=np.float64)
+    aryWght = np.broadcast_to(np.asarray(aryWght, dtype=np.float64),
+                              aryDat.shape)
+
+    # Move axis along which to calculate quantiles to the end:
+    aryDat = np.moveaxis(aryDat, varAxs, -1)
+    aryWght = np.moveaxis(aryWght, varAxs, -1)
+    varNumSmp = aryDat.shape[-1]
+
+    # Sort data and weights:
+    aryIdxSrt = np.argsort(aryDat, axis=-1, kind='stable')
+    arySrt = np.take_along_axis(aryDat, aryIdxSrt, axis=-1)
+    aryWght = np.take_along_axis(aryWght, aryIdxSrt, axis=-1)
+
+    # Weighted cumulative distribution function:
+    aryFx = np.cumsum(aryWght, axis=-1)
+    aryFx = np.divide(aryFx, aryFx[..., -1:])
+
+    aryQnt = np.zeros(((vecPrb.shape[0],) + arySrt.shape[:-1]))
+
+    for idxPrb in range(vecPrb.shape[0]):
+
+        varPrb = vecPrb[idxPrb]
+
+        # Index of the largest value with Fx <= p (Fx is non-decreasing, so
+        # these values are at the beginning):
+        aryLft = np.sum(np.less_equal(aryFx, varPrb), axis=-1) - 1
+
+        # If there is no value with Fx <= p, the smallest value is used:
+        lgcNone = np.less(aryLft, 0)
+        aryLft = np.maximum(aryLft, 0)
+        aryRgt = np.minimum((aryLft + 1), (varNumSmp - 1))
+
+        varX0 = np.take_along_axis(arySrt, aryLft[..., None], axis=-1)[..., 0]
+        varX1 = np.take_along_axis(arySrt, aryRgt[..., None], axis=-1)[..., 0]
+        varF0 = np.take_along_axis(aryFx, aryLft[..., None], axis=-1)[..., 0]
+        varF1 = np.take_along_axis(aryFx, aryRgt[..., None], axis=-1)[..., 0]
+
+        # Linear interpolation between the value with Fx <= p and the next
+        # value:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aryItp = np.add(varX0,
+                            np.multiply(np.subtract(varX1, varX0),
+                                        np.divide(np.subtract(varPrb, varF0),
+                                                  np.subtract(varF1, varF0))))
+        lgcItp = np.logical_and.reduce((np.logical_not(lgcNone),
+                                        np.less(varF0, varPrb),
+                                        np.less(aryLft, (varNumSmp - 1)),
+                                        np.isfinite(aryItp)))
+
+        aryQnt[idxPrb, ...] = np.where(lgcItp, aryItp, varX0)
+
+    if lgcScl:
+        aryQnt = aryQnt[0, ...]
+
+    return aryQnt
+
+
+def wght_median(aryDat, aryWght, varAxs=-1):
+    """
+    Weighted median along one axis of an array.
+
+    Parameters
+    ----------
+    aryDat : np.array
+        Data. The median is calculated along axis `varAxs`.
+    aryWght : np.array
+        Non-negative weights, with the same shape as `aryDat`, or a shape that
+        can be broadcast to it.
+    varAxs : int
+        Axis along which the median is calculated.
+
+    Returns
+    -------
+    aryMed : np.array
+        Weighted median, the axis `varAxs` of the input is removed.
+
+    Notes
+    -----
+    Weighted quantile with probability 0.5 (see `wght_quantile`), same as
+    `weighted.median` from the R package `spatstat` (version 1).
+    """
+    return wght_quantile(aryDat, aryWght, 0.5, varAxs=varAxs)
+
+
+def lin_reg_boot(aryX, aryY, varNumIt=100000, varNumChnk=10000):
+    """
+    Parametric bootstrap of linear regression.
+
+    Parameters
+    ----------
+    aryX : np.array
+        Design matrix, shape aryX[observation, predictor]. Should include a
+        constant column for the intercept.
+    aryY : np.array
+        Dependent variable(s), shape aryY[observation] or aryY[observation,
+        signal]. Several signals (with the same design) are processed at once.
+    varNumIt : int
+        Number of bootstrap iterations.
+    varNumChnk : int
+        Number of bootstrap iterations that are processed at once.
+
+    Returns
+    -------
+    aryPe : np.array
+        Parameter estimates on the empirical data, shape aryPe[signal,
+        predictor] (or aryPe[predictor] if aryY is 1D).
+    aryBoot : np.array
+        Parameter estimates of bootstrap iterations, shape aryBoot[iteration,
+        signal, predictor] (or aryBoot[iteration, predictor]).
+
+    Notes
+    -----
+    Same procedure as `simulate()` in R (used in `boot_lin_reg.r` before):
+    new data are simulated from the fitted model (fitted values plus Gaussian
+    noise with the residual standard deviation), and the model is fitted to
+    the simulated data. The design matrix is the same in all iterations, so
+    the least squares solution is a fixed linear operator (pseudoinverse of
+    the design matrix), which is applied to all simulated data of a chunk of
+    iterations with one matrix product.
+    """
+    lgcVec = (aryY.ndim == 1)
+    if lgcVec:
+        aryY = aryY[:, None]
+
+    varNumObs, varNumPrd = aryX.shape
+    varNumSig = aryY.shape[1]
+
+    # Least squares operator, shape aryPinv[predictor, observation]:
+    aryPinv = np.linalg.pinv(aryX)
+
+    # Empirical parameter estimates, fitted values, and residual standard
+    # deviation (with n - p degrees of freedom, as in R's `sigma()`):
+    aryPe = np.dot(aryPinv, aryY)
+    aryFit = np.dot(aryX, aryPe)
+    vecSd = np.sqrt(np.divide(np.sum(np.square(np.subtract(aryY, aryFit)),
+                                     axis=0),
+                              float(varNumObs - np.linalg.matrix_rank(aryX))))
+
+    aryBoot = np.zeros((varNumIt, varNumSig, varNumPrd))
+
+    for varIdx01 in range(0, varNumIt, varNumChnk):
+
+        varIdx02 = min((varIdx01 + varNumChnk), varNumIt)
+
+        # Simulated data, shape arySim[iteration, observation, signal]:
+        arySim = np.add(aryFit[None, :, :],
+                        np.multiply(vecSd[None, None, :],
+                                    np.random.randn((varIdx02 - varIdx01),
+                                                    varNumObs, varNumSig)))
+
+        # Parameter estimates for all iterations & signals:
+        aryBoot[varIdx01:varIdx02, :, :] = np.einsum('po,ios->isp', aryPinv,
+                                                     arySim)
+
+    aryPe = aryPe.T
+    if lgcVec:
+        aryPe = aryPe[0, :]
+        aryBoot = aryBoot[:, 0, :]
+
+    return aryPe, aryBoot
@@ -18,9 +18,15 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
+from functools import lru_cache
 import numpy as np
-from scipy.interpolate import griddata
 from py_depthsampling.drain_model.drain_model_decon_01 import deconv_01
+from py_depthsampling.drain_model.drain_model_decon_02 import deconv_02
+from py_depthsampling.drain_model.drain_model_decon_03 import deconv_03
+from py_depthsampling.drain_model.drain_model_decon_06 import deconv_06
+from py_depthsampling.drain_model.drain_model_decon_07 import deconv_07
+from py_depthsampling.drain_model.drain_model_op import drain_pos
+from py_depthsampling.main.resmpl import get_resmpl_op
 
 
 def deconv(aryEmpSnSb, strRoi, varMdl=1):
@@ -33,11 +39,9 @@ def deconv(aryEmpSnSb, strRoi, varMdl=1):
         Array with single subject depth profiles, of the form
         aryEmpSnSb[subject, condition, depth].
     strRoi : string
-        Region of interest ('v1' or 'v2').
+        Region of interest ('v1', 'v2', or 'v3').
     varMdl : int
-        Which deconvolution model to use. Currently, only 'model 1', based on
-        Markuerkiaga et al. (2016) is implemented. If needed, this could easily
-        be extended to other models.
+        Which deconvolution model to use (see `get_deconv_op`).
 
     Returns
     -------
@@ -46,117 +50,115 @@ def deconv(aryEmpSnSb, strRoi, varMdl=1):
         aryDecon[subject, condition, depth].
 
     Apply spatial deconvolution (drain model) as part of a test for commutative
-    property of drain model (deconvolution).
+    property of drain model (deconvolution). The depth profiles are
+    downsampled to the five layers of the draining model, deconvolved, and
+    brought back into equi-volume space (see `deconv_batch`).
     """
-    # -------------------------------------------------------------------------
-    # *** Preparations
-    # Number of subjects:
-    varNumSub = aryEmpSnSb.shape[0]
-
-    # Number of conditions:
-    varNumCon = aryEmpSnSb.shape[1]
-
-    # Number of equi-volume depth levels in the input data:
-    varNumDpth = aryEmpSnSb.shape[2]
-
-    # -------------------------------------------------------------------------
-    # *** Subject-by-subject deconvolution
-
-    print('---Subject-by-subject deconvolution')
-
-    # Array for single-subject interpolation result (before deconvolution):
-    aryEmp5SnSb = np.zeros((varNumSub, varNumCon, 5))
-
-    # Array for single-subject deconvolution result (defined at 5 depth
-    # levels):
-    aryDecon5 = np.zeros((varNumSub, varNumCon, 5))
-    # Array for deconvolution results in equi-volume space:
-    aryDecon = np.zeros((varNumSub, varNumCon, varNumDpth))
-
-    for idxSub in range(0, varNumSub):
-
-        # ---------------------------------------------------------------------
-        # *** Interpolation (downsampling)
-
-        # The empirical depth profiles are defined at more depth levels than
-        # the draining model. We downsample the empirical depth profiles to the
-        # number of depth levels of the model.
-
-        # The relative thickness of the layers differs between V1 & V2.
-        if strRoi == 'v1':
-            print('------Interpolation - V1')
-            # Relative thickness of the layers (layer VI, 20%; layer V, 10%;
-            # layer IV, 40%; layer II/III, 20%; layer I, 10%; Markuerkiaga et
-            # al. 2016). lstThck = [0.2, 0.1, 0.4, 0.2, 0.1]
-            # From the relative thickness, we derive the relative position of
-            # the layers (we set the position of each layer to the sum of all
-            # lower layers plus half  its own thickness):
-            vecPosMdl = np.array([0.1, 0.25, 0.5, 0.8, 0.95])
-
-        elif strRoi == 'v2':
-            print('------Interpolation - V2')
-            # Relative position of the layers (accordign to Weber et al., 2008,
-            # Figure 5C, p. 2322). We start with the absolute depth:
-            vecPosMdl = np.array([160.0, 590.0, 1110.0, 1400.0, 1620.0])
-            # Divide by overall thickness (1.7 mm):
-            vecPosMdl = np.divide(vecPosMdl, 1700.0)
-
-        # Position of empirical datapoints:
-        vecPosEmp = np.linspace(np.min(vecPosMdl),
-                                np.max(vecPosMdl),
-                                num=varNumDpth,
-                                endpoint=True)
-
-        # Vector for downsampled empirical depth profiles:
-        aryEmp5 = np.zeros((varNumCon, 5))
-
-        # Loop through conditions and downsample the depth profiles:
-        for idxCon in range(0, varNumCon):
-            # Interpolation:
-            aryEmp5[idxCon] = griddata(vecPosEmp,
-                                       aryEmpSnSb[idxSub, idxCon, :],
-                                       vecPosMdl,
-                                       method='cubic')
-
-        # Put interpolation result for this subject into the array:
-        aryEmp5SnSb[idxSub, :, :] = np.copy(aryEmp5)
-
-        # ---------------------------------------------------------------------
-        # *** Subtraction of draining effect
-
-        # (1) Deconvolution based on Markuerkiaga et al. (2016).
-        if varMdl == 1:
-            aryDecon5[idxSub, :, :] = deconv_01(varNumCon,
-                                                aryEmp5SnSb[idxSub, :, :])
-
-        # ---------------------------------------------------------------------
-        # *** Interpolation
-
-        # The original depth profiles were in 'equi-volume' space, and needed
-        # to be downsampled in order to apply the deconvolution (because the
-        # deconvolution model is defined at a lower number of depth levels than
-        # the equivolume space). Here, the results of the deconvolution are
-        # brought back into equivolume space. This is advantageous for the
-        # creation of depth plots (equal spacing of data points on x-axis), and
-        # for the calculation of peak positions (no additional information
-        # about relative position of datapoints needs to be passed on).
-
-        # Sampling points for equi-volume space:
-        vecIntpEqui = np.linspace(np.min(vecPosMdl),
-                                  np.max(vecPosMdl),
-                                  num=varNumDpth,
-                                  endpoint=True)
-
-        # Loop through conditions:
-        for idxCon in range(0, varNumCon):
-
-            # Interpolation back into equi-volume space:
-            aryDecon[idxSub, idxCon, :] = griddata(vecPosMdl,
-                                                   aryDecon5[idxSub,
-                                                             idxCon,
-                                                             :],
-                                                   vecIntpEqui,
-                                                   method='cubic')
-
-    return aryDecon
-    # -------------------------------------------------------------------------
+    return deconv_batch(aryEmpSnSb, strRoi, lstVar=[varMdl])[0, ...]
+
+
+@lru_cache(maxsize=32)
+def get_deconv_op(strRoi, varNumDpth, tplVar):
+    """
+    Linear operators of deconvolution model variants.
+
+    Parameters
+    ----------
+    strRoi : string
+        Region of interest ('v1', 'v2', or 'v3').
+    varNumDpth : int
+        Number of equi-volume depth levels of the depth profiles.
+    tplVar : tuple
+        Model variants. Each variant is either the index of a deconvolution
+        model (1, 2, 3, or 7), or a tuple with model index 6 and a deep GM
+        signal scaling factor (e.g. ``(6, 0.25)``).
+
+    Returns
+    -------
+    aryOp : np.array
+        Operators, of the form aryOp[idxVariant, idxDepth, idxDepth].
+        Deconvolved depth profiles (in equi-volume space) are obtained as
+        aryOp[idxVariant] @ aryEmp. (The array is read-only, because it is
+        cached and shared between calls.)
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. Downsampling to the five layers
+    of the draining model (at the positions of `drain_pos`), deconvolution,
+    and upsampling to equi-volume depth levels are all linear. Each
+    variant's deconvolution operator is obtained by deconvolving the
+    identity matrix, and the three steps are combined into one matrix. The
+    operators are cached, so they are only created once for each
+    combination of region of interest, number of depth levels, and model
+    variants.
+    """
+    # Relative position of the layers:
+    vecPosMdl = drain_pos(strRoi=strRoi)
+
+    # Position of empirical datapoints:
+    vecPosEmp = np.linspace(np.min(vecPosMdl),
+                            np.max(vecPosMdl),
+                            num=varNumDpth,
+                            endpoint=True)
+
+    # Downsampling & upsampling operators:
+    aryDwn = get_resmpl_op(tuple(vecPosEmp.tolist()),
+                           tuple(vecPosMdl.tolist()))
+    aryUp = get_resmpl_op(tuple(vecPosMdl.tolist()),
+                          tuple(vecPosEmp.tolist()))
+
+    aryOp = np.zeros((len(tplVar), varNumDpth, varNumDpth))
+
+    for idxVar, objVar in enumerate(tplVar):
+
+        # Deconvolution of the unit impulses (rows of the identity matrix);
+        # row k of the result is column k of the operator:
+        if objVar == 1:
+            aryOp5 = deconv_01(5, np.eye(5))
+        elif objVar == 2:
+            aryOp5 = deconv_02(5, np.eye(5))
+        elif objVar == 3:
+            aryOp5 = deconv_03(5, np.eye(5), strRoi=strRoi)
+        elif objVar == 7:
+            aryOp5 = deconv_07(5, np.eye(5))
+        elif (type(objVar) == tuple) and (objVar[0] == 6):
+            aryOp5 = deconv_06(5, np.eye(5), [objVar[1]])[0, :, :]
+        else:
+            raise ValueError('Unknown model variant: ' + str(objVar))
+
+        aryOp[idxVar, :, :] = np.dot(aryUp, np.dot(aryOp5.T, aryDwn))
+
+    aryOp.flags.writeable = False
+
+    return aryOp
+
+
+def deconv_batch(aryEmpSnSb, strRoi, lstVar=[1]):
+    """
+    Apply spatial deconvolution (drain model) for several model variants.
+
+    Parameters
+    ----------
+    aryEmpSnSb : np.array
+        Array with single subject depth profiles, of the form
+        aryEmpSnSb[subject, condition, depth].
+    strRoi : string
+        Region of interest ('v1', 'v2', or 'v3').
+    lstVar : list
+        Model variants (see `get_deconv_op`), e.g. ``[1, 2, (6, 0.25)]``.
+
+    Returns
+    -------
+    aryDecon : np.array
+        Array with deconvolution results, of the form
+        aryDecon[variant, subject, condition, depth].
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. The operator of each variant
+    is only created once (see `get_deconv_op`), and all variants, subjects,
+    and conditions are deconvolved with one matrix product.
+    """
+    aryOp = get_deconv_op(strRoi, aryEmpSnSb.shape[2], tuple(lstVar))
+    return np.einsum('vij,scj->vsci', aryOp, aryEmpSnSb)
+
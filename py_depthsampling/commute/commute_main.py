@@ -44,14 +44,15 @@ conjunction with (bootrapped?) confidence intervals.
 
 
 import numpy as np
-from py_depthsampling.commute.commute_deconv import deconv
+from py_depthsampling.commute.commute_deconv import deconv_batch
 from py_depthsampling.plot.plt_dpth_prfl import plt_dpth_prfl
 
 
 # -----------------------------------------------------------------------------
 # *** Define parameters
 
-# Which draining model to use (1, 2, 3, 4, 5, or 6 - see above for details):
+# Which draining model to use (1, 2, 3, 7, or a tuple with model index 6 and
+# a deep GM scaling factor, e.g. (6, 0.25); see `get_deconv_op`):
 lstMdl = [1]
 
 # Meta-condition (within or outside of retinotopic stimulus area):
@@ -172,15 +173,17 @@ for idxMtaCn in range(len(lstMetaCon)):  #noqa
                         aryMneA = np.zeros((varNumDiff, varNumDpth))
                         aryStdA = np.zeros((varNumDiff, varNumDpth))
 
-                    # Reshape to aryDpth[subject, 1, depth] (dummy condition
-                    # dimension for compatibility):
-                    aryDpth01 = aryDpth01.reshape((varNumSub, 1, varNumDpth))
-                    aryDpth02 = aryDpth02.reshape((varNumSub, 1, varNumDpth))
+                    # Stack both conditions, aryDpth[subject, condition,
+                    # depth]:
+                    aryDpth = np.stack((aryDpth01, aryDpth02), axis=1)
 
-                    # (1) Apply deconvolution (separately for each subject and
-                    #     condition).
-                    aryDpth01 = deconv(aryDpth01, lstRoi[idxRoi], varMdl=1)
-                    aryDpth02 = deconv(aryDpth02, lstRoi[idxRoi], varMdl=1)
+                    # (1) Apply deconvolution (all subjects and both
+                    #     conditions at once; the result has the form
+                    #     aryDpth[variant, subject, condition, depth]).
+                    aryDpth = deconv_batch(aryDpth, lstRoi[idxRoi],
+                                           lstVar=[lstMdl[idxMdl]])
+                    aryDpth01 = aryDpth[0, :, 0:1, :]
+                    aryDpth02 = aryDpth[0, :, 1:2, :]
 
                     # (2) Calculate difference between conditions (within
                     #     subjects).
@@ -279,9 +282,10 @@ for idxMtaCn in range(len(lstMetaCon)):  #noqa
                     #     subject).
                     aryDiff = np.subtract(aryDpth01, aryDpth02)
 
-                    # (2) Apply deconvolution (on differences, separately for
-                    #     each subject).
-                    aryDiff = deconv(aryDiff, lstRoi[idxRoi], varMdl=1)
+                    # (2) Apply deconvolution (on differences, all subjects
+                    #     at once).
+                    aryDiff = deconv_batch(aryDiff, lstRoi[idxRoi],
+                                           lstVar=[lstMdl[idxMdl]])[0, ...]
 
                     # (3) Take mean across subjects.
                     aryMneB[idxDiff, :] = np.mean(aryDiff, axis=0)
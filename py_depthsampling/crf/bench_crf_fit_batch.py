@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of batched power function CRF fitting.
+
+Compares `crf_fit` (one `curve_fit` call per response) with
+`crf_fit_power_batch` (log-linear least squares for all responses at once,
+optionally refined by Gauss-Newton steps in linear space), on synthetic
+noisy responses (including non-positive responses). Reports run time and the
+deviation of the response at 50% contrast and of the semisaturation
+contrast.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from py_depthsampling.crf.crf_fit import crf_fit
+from py_depthsampling.crf.crf_fit_batch import crf_fit_power_batch
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Number of responses to fit:
+varNumFit = 1000
+
+# Stimulus contrast levels:
+vecEmpX = np.array([0.025, 0.061, 0.163, 0.72])
+
+# Noise level:
+varNse = 0.15
+
+# Numbers of Gauss-Newton steps to compare:
+lstNumStp = [0, 5, 10, 20]
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Simulate responses
+
+np.random.seed(0)
+
+vecA = np.random.uniform(0.2, 2.0, varNumFit)
+vecB = np.random.uniform(0.1, 0.9, varNumFit)
+aryEmpY = np.add(np.multiply(vecA[:, None],
+                             np.power(vecEmpX[None, :], vecB[:, None])),
+                 np.multiply(varNse, np.random.randn(varNumFit,
+                                                     vecEmpX.shape[0])))
+
+print(('-Number of fits: ' + str(varNumFit) + ', with non-positive responses: '
+       + str(np.sum(np.any(np.less_equal(aryEmpY, 0.0), axis=1)))))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Benchmark
+
+varTme01 = time.time()
+lstRef = [crf_fit(vecEmpX, aryEmpY[idxFit:(idxFit + 1), :], varNumX=100)
+          for idxFit in range(varNumFit)]
+varTme02 = time.time()
+varTmeRef = varTme02 - varTme01
+
+vecHlfMaxRef = np.array([objRef[1] for objRef in lstRef])
+vecSemiRef = np.array([objRef[2] for objRef in lstRef])
+
+print(('---crf_fit: ' + str(np.around(varTmeRef, 3)) + ' s'))
+
+for varNumStp in lstNumStp:
+
+    varTme01 = time.time()
+    _, vecHlfMax, vecSemi, _, _ = crf_fit_power_batch(vecEmpX, aryEmpY,
+                                                      varNumX=100,
+                                                      varNumStp=varNumStp)
+    varTme02 = time.time()
+
+    vecDevHlf = np.absolute(np.subtract(vecHlfMax, vecHlfMaxRef))
+    vecDevSemi = np.absolute(np.subtract(vecSemi, vecSemiRef))
+
+    print(('---crf_fit_power_batch, ' + str(varNumStp) + ' steps: '
+           + str(np.around((varTme02 - varTme01), 4)) + ' s, speedup '
+           + str(int(np.around(varTmeRef / (varTme02 - varTme01))))))
+    print(('------Response at 50% contrast, median deviation: '
+           + str(np.median(vecDevHlf)) + ', max. deviation: '
+           + str(np.max(vecDevHlf))))
+    print(('------Semisaturation contrast, median deviation: '
+           + str(np.median(vecDevSemi)) + ', max. deviation: '
+           + str(np.max(vecDevSemi))))
+# -----------------------------------------------------------------------------
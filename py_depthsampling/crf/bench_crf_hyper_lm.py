@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of batched hyperbolic ratio CRF fitting.
+
+Compares one `curve_fit` call per response (as in `crf_fit`) with the batched
+Levenberg-Marquardt solver (`crf_hyper_lm`) on synthetic noisy responses
+generated from hyperbolic ratio functions. Reports run time, the proportion
+of converged fits, and the agreement with `curve_fit` (sum of squared
+residuals & parameters).
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from scipy.optimize import curve_fit
+from py_depthsampling.crf.crf_func import crf_hyper
+from py_depthsampling.crf.crf_fit_batch import crf_hyper_lm
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Number of responses to fit:
+varNumFit = 5000
+
+# Stimulus contrast levels:
+vecEmpX = np.array([0.025, 0.061, 0.163, 0.72])
+
+# Noise level:
+varNse = 0.03
+
+# Relative tolerance for agreement of sum of squared residuals:
+varTol = 1e-6
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Simulate responses
+
+np.random.seed(0)
+
+aryParTrue = np.array([np.random.uniform(0.5, 2.0, varNumFit),
+                       np.random.uniform(0.03, 0.3, varNumFit),
+                       np.random.uniform(0.8, 3.0, varNumFit)]).T
+
+aryEmpY = np.add(crf_hyper(vecEmpX[None, :],
+                           aryParTrue[:, 0][:, None],
+                           aryParTrue[:, 1][:, None],
+                           aryParTrue[:, 2][:, None]),
+                 np.multiply(varNse, np.random.randn(varNumFit,
+                                                     vecEmpX.shape[0])))
+
+
+def get_loss(aryPar):
+    """Sum of squared residuals."""
+    aryPrd = crf_hyper(vecEmpX[None, :], aryPar[:, 0][:, None],
+                       aryPar[:, 1][:, None], aryPar[:, 2][:, None])
+    return np.sum(np.square(np.subtract(aryPrd, aryEmpY)), axis=1)
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Benchmark
+
+print(('-Number of fits: ' + str(varNumFit)))
+
+# One fit at a time (same settings as in `crf_fit`):
+varTme01 = time.time()
+aryParRef = np.zeros((varNumFit, 3))
+for idxFit in range(varNumFit):
+    aryParRef[idxFit, :] = curve_fit(crf_hyper,
+                                     vecEmpX,
+                                     aryEmpY[idxFit, :],
+                                     maxfev=100000,
+                                     bounds=(np.array([0.0, 0.0, 0.0]),
+                                             np.array([np.inf, np.inf,
+                                                       np.inf])),
+                                     p0=(0.01, 0.01, 0.5))[0]
+varTme02 = time.time()
+
+# Batched fit:
+aryPar, vecCnv = crf_hyper_lm(vecEmpX, aryEmpY)
+varTme03 = time.time()
+
+vecLssRef = get_loss(aryParRef)
+vecLss = get_loss(aryPar)
+
+print(('---curve_fit:    ' + str(np.around((varTme02 - varTme01), 3)) + ' s'))
+print(('---crf_hyper_lm: ' + str(np.around((varTme03 - varTme02), 3)) + ' s'))
+print(('---Speedup: '
+       + str(np.around(((varTme02 - varTme01) / (varTme03 - varTme02)), 1))))
+print(('---Converged: ' + str(np.around(np.mean(vecCnv), 4))))
+print(('---Sum of squares not greater than curve_fit (relative tolerance '
+       + str(varTol) + '): '
+       + str(np.around(np.mean(np.less_equal(
+           vecLss, np.multiply(vecLssRef, (1.0 + varTol)) + 1e-14)), 4))))
+print(('---Parameters within 0.1% of curve_fit: '
+       + str(np.around(np.mean(np.all(np.less_equal(
+           np.absolute(np.subtract(aryPar, aryParRef)),
+           np.multiply(1e-3, np.maximum(1.0, np.absolute(aryParRef)))),
+           axis=1)), 4))))
+# -----------------------------------------------------------------------------
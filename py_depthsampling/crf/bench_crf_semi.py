@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of semisaturation contrast calculation.
+
+Compares the incremental search for the semisaturation contrast (previously
+used in `crf_fit`, steps of 1e-6) with the closed form solution (`crf_semi`)
+and the bracketed root finding (`semi_bracket`), for power and hyperbolic
+ratio functions with random parameters. Reports the maximum absolute
+deviation from the incremental search, and the run time per fit.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from py_depthsampling.crf.crf_func import crf_power
+from py_depthsampling.crf.crf_func import crf_hyper
+from py_depthsampling.crf.crf_fit import crf_semi
+from py_depthsampling.crf.crf_fit import semi_bracket
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Number of fits for incremental search (slow):
+varNumRef = 20
+
+# Number of fits for closed form solution & bracketed root finding
+# (bootstrap-sized batch):
+varNumFit = 100000
+# -----------------------------------------------------------------------------
+
+
+def semi_loop(vecMdlPar, strFunc):
+    """Incremental search for semisaturation contrast (as in `crf_fit`)."""
+    if strFunc == 'power':
+        varResp50 = crf_power(1.0, *vecMdlPar)
+    elif strFunc == 'hyper':
+        varResp50 = crf_hyper(1.0, *vecMdlPar)
+    varResp50 = np.multiply(varResp50, 0.5)
+    varSemi = 0.0
+    if np.greater(vecMdlPar[0], 0.0001):
+        varRespTmp = 0.0
+        while np.less(varRespTmp, varResp50):
+            varSemi += 0.000001
+            if strFunc == 'power':
+                varRespTmp = crf_power(varSemi, *vecMdlPar)
+            elif strFunc == 'hyper':
+                varRespTmp = crf_hyper(varSemi, *vecMdlPar)
+    return varSemi
+
+
+np.random.seed(0)
+
+for strFunc in ['power', 'hyper']:
+
+    # Random parameters within plausible range:
+    if strFunc == 'power':
+        aryPar = np.array([np.random.uniform(0.0, 2.0, varNumFit),
+                           np.random.uniform(0.1, 1.0, varNumFit)]).T
+        funcCrf = crf_power
+    else:
+        aryPar = np.array([np.random.uniform(0.0, 2.0, varNumFit),
+                           np.random.uniform(0.01, 0.5, varNumFit),
+                           np.random.uniform(0.3, 3.0, varNumFit)]).T
+        funcCrf = crf_hyper
+
+    varTme01 = time.time()
+    vecRef = np.array([semi_loop(aryPar[idxFit, :], strFunc)
+                       for idxFit in range(varNumRef)])
+    varTme02 = time.time()
+    vecSemi = crf_semi(aryPar, strFunc=strFunc)
+    varTme03 = time.time()
+    vecBrkt = semi_bracket(funcCrf, aryPar)
+    varTme04 = time.time()
+
+    varTmeRef = (varTme02 - varTme01) / varNumRef
+    varTmeSemi = (varTme03 - varTme02) / varNumFit
+    varTmeBrkt = (varTme04 - varTme03) / varNumFit
+
+    print(('-' + strFunc))
+    print(('---Incremental search: ' + str(np.around(varTmeRef * 1e3, 3))
+           + ' ms per fit'))
+    print(('---Closed form:        ' + str(np.around(varTmeSemi * 1e6, 4))
+           + ' us per fit, max. deviation '
+           + str(np.max(np.absolute(np.subtract(vecSemi[:varNumRef],
+                                                vecRef))))
+           + ', speedup ' + str(int(np.around(varTmeRef / varTmeSemi)))))
+    print(('---Bracketed:          ' + str(np.around(varTmeBrkt * 1e6, 4))
+           + ' us per fit, max. deviation '
+           + str(np.max(np.absolute(np.subtract(vecBrkt[:varNumRef],
+                                                vecRef))))
+           + ', speedup ' + str(int(np.around(varTmeRef / varTmeBrkt)))))
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of warm-started CRF fits.
+
+Simulates depth profiles of contrast responses, and fits contrast response
+functions to bootstrap samples (as in `crf_par_boot_01`), starting each fit
+(1) from the default initial parameters, (2) from the solution at the
+previous depth level, and (3) from the solution of the fit to the full
+sample. The number of function evaluations of the least squares fits, the
+run time, and the deviation of the results from the fits with default
+initial parameters are reported.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+import py_depthsampling.crf.crf_fit as crf_fit_mod
+from py_depthsampling.crf.crf_func import crf_power
+from py_depthsampling.crf.crf_func import crf_hyper
+from py_depthsampling.crf.crf_par_boot_02 import crf_par_02
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Number of subjects, depth levels, and bootstrap iterations:
+varNumSub = 10
+varNumDpt = 11
+varNumIt = 50
+
+# Stimulus contrast levels:
+vecEmpX = np.array([0.025, 0.061, 0.163, 0.72])
+
+# Noise level (across subjects):
+varNse = 0.2
+
+# Number of x-values of modelled response:
+varNumX = 1000
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Simulate depth profiles
+
+np.random.seed(0)
+
+# Response amplitude increases towards the cortical surface:
+vecDpt = np.linspace(0.0, 1.0, num=varNumDpt)
+vecMax = np.add(1.0, np.multiply(1.5, vecDpt))
+
+# Responses of the form aryDpth[idxRoi, idxSub, idxCon, idxDpt]:
+aryDpth = np.multiply(vecMax[None, None, :],
+                      crf_hyper(vecEmpX[None, :, None], 1.0, 0.1, 1.5))
+aryDpth = np.add(aryDpth[None, :, :, :],
+                 np.multiply(varNse, np.random.randn(1, varNumSub,
+                                                     vecEmpX.shape[0],
+                                                     varNumDpt)))
+
+aryRnd = np.random.randint(0, high=varNumSub, size=(varNumIt, varNumSub))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Count function evaluations
+
+# Number of evaluations of the contrast response function at the empirical
+# contrast levels (i.e. by the least squares fit):
+dicCnt = {'varCnt': 0}
+
+
+def get_cnt(funcCrf):
+    """Wrap contrast response function to count evaluations."""
+    def funcCnt(vecX, *lstPar):
+        if np.shape(vecX) == vecEmpX.shape:
+            dicCnt['varCnt'] += 1
+        return funcCrf(vecX, *lstPar)
+    return funcCnt
+
+
+crf_fit_mod.crf_power = get_cnt(crf_power)
+crf_fit_mod.crf_hyper = get_cnt(crf_hyper)
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Benchmark
+
+print(('-Number of fits: ' + str(varNumIt * varNumDpt)))
+
+for strFunc in ['power', 'hyper']:
+
+    print(('--' + strFunc))
+
+    # Fit to full sample (initial parameters for bootstrap samples):
+    aryPar0 = crf_par_02(1, aryDpth, vecEmpX, strFunc,
+                         np.arange(varNumSub)[None, :], varNumX)[5][:, 0, :, :]
+
+    lstLbl = ['default start  ', 'previous depth ', 'full sample    ']
+    lstArg = [{'lgcWrm': False}, {'lgcWrm': True}, {'aryPar0': aryPar0}]
+
+    for idxCnd in range(len(lstLbl)):
+
+        dicCnt['varCnt'] = 0
+        varTme01 = time.time()
+        lstOut = crf_par_02(1, aryDpth, vecEmpX, strFunc, aryRnd, varNumX,
+                            **lstArg[idxCnd])
+        varTme02 = time.time()
+
+        if idxCnd == 0:
+            varCntRef = dicCnt['varCnt']
+            varTmeRef = varTme02 - varTme01
+            aryHlfMaxRef = lstOut[2]
+            arySemiRef = lstOut[3]
+
+        print(('---' + lstLbl[idxCnd] + ': '
+               + str(np.around((dicCnt['varCnt'] / (varNumIt * varNumDpt)),
+                               1))
+               + ' function evaluations per fit ('
+               + str(np.around((100.0 * dicCnt['varCnt'] / varCntRef), 1))
+               + ' %), ' + str(np.around((varTme02 - varTme01), 2)) + ' s ('
+               + str(np.around((100.0 * (varTme02 - varTme01) / varTmeRef),
+                               1))
+               + ' %), maximum deviation of response at 50% contrast: '
+               + str(np.around(np.max(np.absolute(np.subtract(
+                   lstOut[2], aryHlfMaxRef))), 6))
+               + ', semisaturation contrast: '
+               + str(np.around(np.max(np.absolute(np.subtract(
+                   lstOut[3], arySemiRef))), 6))))
+# -----------------------------------------------------------------------------
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Function of the depth sampling pipeline."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import numpy as np
+from py_depthsampling.boot.utilities import get_cnt
+from py_depthsampling.crf.crf_fit_batch import crf_fit_power_batch
+from py_depthsampling.crf.crf_fit_batch import crf_fit_hyper_batch
+from py_depthsampling.main.chkpnt import chk_init
+from py_depthsampling.main.chkpnt import chk_load
+from py_depthsampling.main.chkpnt import chk_save
+from py_depthsampling.main.chkpnt import rng_get
+
+
+def crf_boot_batch(aryDpth, vecEmpX, strFunc='power', varNumIt=1000,
+                   varNumChnk=1000, varNumStp=None, strPthRun=None):
+    """
+    Batched bootstrapping of contrast response function.
+
+    Parameters
+    ----------
+    aryDpth : np.array
+        Array with empirical response data, of the form
+        aryDpth[idxRoi, idxSub, idxCon, idxDpt].
+    vecEmpX : np.array
+        Empirical x-values at which model will be fitted (e.g. stimulus
+        contrast levels at which stimuli were presented), of the form
+        vecEmpX[idxCon].
+    strFunc : str
+        Which contrast response function to fit. 'power' for power function, or
+        'hyper' for hyperbolic ratio function.
+    varNumIt : int
+        Number of bootstrapping iterations (i.e. how many times to sample).
+    varNumChnk : int
+        Number of bootstrapping iterations that are processed at once.
+    varNumStp : int or None
+        Number of optimisation steps; Gauss-Newton steps for the power
+        function (default 20), maximum number of Levenberg-Marquardt
+        iterations for the hyperbolic ratio function (default 500).
+    strPthRun : str or None
+        Run directory for checkpoints (see `crf_par_01`). If `None`, no
+        checkpoints are saved.
+
+    Returns
+    -------
+    aryPar : np.array
+        Fitted parameters of the contrast response function, of the form
+        aryPar[idxRoi, idxIteration, idxDpt, idxParameter]. The modelled
+        response can be obtained from the parameters (see `crf_mdl`).
+    aryHlfMax : np.array
+        Predicted response at 50 percent contrast based on CRF model. Array of
+        the form aryHlfMax[idxRoi, idxIteration, idxDpt].
+    arySemi : np.array
+        Semisaturation contrast (predicted contrast needed to elicit 50 percent
+        of the response amplitude that would be expected with a 100 percent
+        contrast stimulus). Array of the form
+        arySemi[idxRoi, idxIteration, idxDpt].
+    aryRes : np.array
+        Residual variance at empirical contrast levels. Array of the form
+        aryRes[idxRoi, idxIteration, idxCondition, idxDpt].
+
+    Notes
+    -----
+    Same outputs as `crf_par_01`, but instead of one `curve_fit` call per
+    ROI, iteration and depth level, all CRFs of a chunk of iterations are
+    fitted at once (see `crf_fit_batch`). The across-subject mean of each
+    bootstrap sample is obtained from the count matrix of the sample (one
+    matrix product per chunk). The random draws are the same as in
+    `crf_par_01` (for the same seed). Replaces the previous Theano
+    implementation (which was limited to the power function). If a run
+    directory is provided, the results of each chunk are saved as a
+    checkpoint, and an interrupted run can be resumed (as in `crf_par_01`).
+
+    Function of the depth sampling pipeline.
+    """
+    print('---Batched CRF bootstrapping')
+
+    # Check time:
+    varTme01 = time.time()
+
+    # Number of ROIs, subjects, conditions, and depth levels:
+    varNumIn, varNumSubs, varNumCon, varNumDpt = aryDpth.shape
+
+    # Number of optimisation steps:
+    if varNumStp is None:
+        if strFunc == 'power':
+            varNumStp = 20
+        elif strFunc == 'hyper':
+            varNumStp = 500
+
+    # Start or resume checkpointed run:
+    if strPthRun is not None:
+        chk_init(strPthRun, aryDpth=aryDpth, vecEmpX=vecEmpX, strFunc=strFunc,
+                 varNumIt=varNumIt, varNumChnk=varNumChnk,
+                 varNumStp=varNumStp)
+
+    # Data of the form aryDat[idxSub, idxRoi * idxCon * idxDpt]:
+    aryDat = np.moveaxis(aryDpth, 1, 0).reshape(varNumSubs, -1)
+
+    # Number of parameters:
+    if strFunc == 'power':
+        varNumPar = 2
+    elif strFunc == 'hyper':
+        varNumPar = 3
+
+    # Output arrays:
+    aryPar = np.zeros((varNumIn, varNumIt, varNumDpt, varNumPar))
+    aryHlfMax = np.zeros((varNumIn, varNumIt, varNumDpt))
+    arySemi = np.zeros((varNumIn, varNumIt, varNumDpt))
+    aryRes = np.zeros((varNumIn, varNumIt, varNumCon, varNumDpt))
+
+    for idxChnk, varIdx01 in enumerate(range(0, varNumIt, varNumChnk)):
+
+        varIdx02 = min((varIdx01 + varNumChnk), varNumIt)
+        varNumTmp = varIdx02 - varIdx01
+
+        # State of random number generator before the random draws of the
+        # chunk (for checkpoint):
+        dicRng = rng_get()
+
+        # Random array with subject indicies for bootstrapping of the form
+        # aryRnd[idxIteration, idxSample]:
+        aryRnd = np.random.randint(0,
+                                   high=varNumSubs,
+                                   size=(varNumTmp, varNumSubs))
+
+        # Load results of chunk that was completed in an interrupted run:
+        if strPthRun is not None:
+            dicChk = chk_load(strPthRun, idxChnk)
+            if dicChk is not None:
+                if not np.array_equal(dicChk['aryRnd'], aryRnd):
+                    raise ValueError(('Checkpoint of chunk ' + str(idxChnk)
+                                      + ' does not match randomisation of '
+                                      + 'run.'))
+                aryPar[:, varIdx01:varIdx02, :, :] = dicChk['aryPar']
+                aryHlfMax[:, varIdx01:varIdx02, :] = dicChk['aryHlfMax']
+                arySemi[:, varIdx01:varIdx02, :] = dicChk['arySemi']
+                aryRes[:, varIdx01:varIdx02, :, :] = dicChk['aryRes']
+                continue
+
+        # Across-subject mean of bootstrap samples, of the form
+        # aryEmpY[idxIteration, idxRoi, idxCon, idxDpt]:
+        aryEmpY = np.divide(np.dot(get_cnt(aryRnd, varNumSubs), aryDat),
+                            float(varNumSubs))
+        aryEmpY = aryEmpY.reshape(varNumTmp, varNumIn, varNumCon, varNumDpt)
+
+        # One response per row, of the form aryEmpY[(idxRoi * idxIteration *
+        # idxDpt), idxCon]:
+        aryEmpY = np.moveaxis(aryEmpY, (1, 0, 3, 2), (0, 1, 2, 3))
+        aryEmpY = aryEmpY.reshape(-1, varNumCon)
+
+        # Fit CRF (modelled responses are not kept, therefore the functions
+        # are only evaluated at one x-value):
+        if strFunc == 'power':
+            lstOut = crf_fit_power_batch(vecEmpX, aryEmpY, varNumX=1,
+                                         varNumStp=varNumStp)
+        elif strFunc == 'hyper':
+            lstOut = crf_fit_hyper_batch(vecEmpX, aryEmpY, varNumX=1,
+                                         varNumStp=varNumStp)
+
+        tplShp = (varNumIn, varNumTmp, varNumDpt)
+        aryPar[:, varIdx01:varIdx02, :, :] = lstOut[4].reshape(
+            (tplShp + (varNumPar,)))
+        aryHlfMax[:, varIdx01:varIdx02, :] = lstOut[1].reshape(tplShp)
+        arySemi[:, varIdx01:varIdx02, :] = lstOut[2].reshape(tplShp)
+        aryRes[:, varIdx01:varIdx02, :, :] = np.swapaxes(
+            lstOut[3].reshape((tplShp + (varNumCon,))), 2, 3)
+
+        # Save checkpoint:
+        if strPthRun is not None:
+            chk_save(strPthRun, idxChnk, dicRng, aryRnd=aryRnd,
+                     aryPar=aryPar[:, varIdx01:varIdx02, :, :],
+                     aryHlfMax=aryHlfMax[:, varIdx01:varIdx02, :],
+                     arySemi=arySemi[:, varIdx01:varIdx02, :],
+                     aryRes=aryRes[:, varIdx01:varIdx02, :, :])
+
+    # Check time:
+    varTme02 = time.time()
+
+    # Report time:
+    varTme03 = np.around((varTme02 - varTme01), decimals=3)
+    print(('---Elapsed time: ' + str(varTme03) + ' s for '
+           + str(varNumIn * varNumIt * varNumDpt) + ' fits.'))
+
+    return aryPar, aryHlfMax, arySemi, aryRes
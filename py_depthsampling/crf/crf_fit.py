@@ -19,12 +19,12 @@
 
 import numpy as np
 from scipy.optimize import curve_fit
-from ds_crfFunc import crf_power
-from ds_crfFunc import crf_hyper
+from py_depthsampling.crf.crf_func import crf_power
+from py_depthsampling.crf.crf_func import crf_hyper
 
 
 def crf_fit(vecEmpX, aryEmpY, strFunc='power', varNumX=1000, varXmin=0.0,
-            varXmax=1.0, strAvr='mean'):
+            varXmax=1.0, strAvr='mean', vecPar0=None, lgcPar=False):
     """
     Fit contrast response function.
 
@@ -49,6 +49,12 @@ def crf_fit(vecEmpX, aryEmpY, strFunc='power', varNumX=1000, varXmin=0.0,
         Maximum x-value for which function will be fitted.
     strAvr : str
         How to calculate the average of the y-values; 'mean' or 'median'.
+    vecPar0 : np.array or None
+        Initial parameters of the fit (e.g. the solution of a fit to similar
+        data, see notes). If `None`, or if the fit fails, the default initial
+        parameters are used.
+    lgcPar : bool
+        Whether to also return the fitted parameters.
 
     Returns
     -------
@@ -64,9 +70,16 @@ def crf_fit(vecEmpX, aryEmpY, strFunc='power', varNumX=1000, varXmin=0.0,
     vecRes : np.array
         Residual variance at empirical contrast levels (of the form
         vecRes[varNumCon]).
+    vecMdlPar : np.array
+        Fitted parameters (only returned if `lgcPar` is `True`).
 
     Notes
     -----
+    Bootstrap resamples of the same data, or depth profiles at neighbouring
+    depth levels, have very similar optima. If the solution of such a fit is
+    passed as initial parameters (`vecPar0`), the least squares fit converges
+    after fewer function evaluations than from the fixed default start.
+
     Function of the depth sampling pipeline.
     """
     # *** Average across subjects
@@ -101,12 +114,9 @@ def crf_fit(vecEmpX, aryEmpY, strFunc='power', varNumX=1000, varXmin=0.0,
         # Upper limits for parameters (factor, exponent) - for power function:
         vecLimPowUp = np.array([10.0, 1.0])
 
-        vecMdlPar, vecMdlCov = curve_fit(crf_power,
-                                         vecEmpX,
-                                         vecEmpYMne,
-                                         maxfev=100000,
-                                         bounds=(vecLimPowLw, vecLimPowUp),
-                                         p0=(0.5, 0.5))
+        vecMdlPar = crf_lsq(crf_power, vecEmpX, vecEmpYMne,
+                            (vecLimPowLw, vecLimPowUp), (0.5, 0.5),
+                            vecPar0=vecPar0)
 
     elif strFunc == 'hyper':
 
@@ -118,12 +128,9 @@ def crf_fit(vecEmpX, aryEmpY, strFunc='power', varNumX=1000, varXmin=0.0,
         # contrast, and exponent) - for hyperbolic function:
         vecLimHypUp = np.array([np.inf, np.inf, np.inf])
 
-        vecMdlPar, vecMdlCov = curve_fit(crf_hyper,
-                                         vecEmpX,
-                                         vecEmpYMne,
-                                         maxfev=100000,
-                                         bounds=(vecLimHypLw, vecLimHypUp),
-                                         p0=(0.01, 0.01, 0.5))
+        vecMdlPar = crf_lsq(crf_hyper, vecEmpX, vecEmpYMne,
+                            (vecLimHypLw, vecLimHypUp), (0.01, 0.01, 0.5),
+                            vecPar0=vecPar0)
 
     # *** Apply reponse function
 
@@ -154,54 +161,11 @@ def crf_fit(vecEmpX, aryEmpY, strFunc='power', varNumX=1000, varXmin=0.0,
 
     # *** Calculate semisaturation contrast
 
-    # The maximum response (defined as the response at 100% luminance
-    # contrast):
-    if strFunc == 'power':
-        varResp50 = crf_power(1.0,
-                              vecMdlPar[0],
-                              vecMdlPar[1])
-    elif strFunc == 'hyper':
-        varResp50 = crf_hyper(1.0,
-                              vecMdlPar[0],
-                              vecMdlPar[1],
-                              vecMdlPar[2])
-
-    # 50% of response at full contrast:
-    varResp50 = np.multiply(varResp50, 0.5)
-
-    # Search for the luminance contrast level at half maximum response. A
-    # while loop is more practical than an analytic solution - it is easy
-    # to implement and reliable because of the constrained nature of the
-    # problem. The problem is constrained because the luminance contrast has
-    # to be between zero and one.
-
-    # Initial value for the semisaturation contrast (will be incremented until
-    # the half maximum response is reached).
-    varSemi = 0.0
-
-    # If the overall stimulus-induced response is very small (close to zero),
-    # possibly due to a low or noisy signal, the semisaturation algorithm may
-    # converge on an artefactual solution. If the response is very low (i.e.
-    # very close to zero), the semisaturation contrast is likewise kept at
-    # zero.
-    if np.greater(vecMdlPar[0], 0.0001):
-
-        # Initial value for the response.
-        varRespTmp = 0.0
-
-        # Increment the contrast level until the half maximum response is
-        # reached:
-        while np.less(varRespTmp, varResp50):
-            varSemi += 0.000001
-            if strFunc == 'power':
-                varRespTmp = crf_power(varSemi,
-                                       vecMdlPar[0],
-                                       vecMdlPar[1])
-            elif strFunc == 'hyper':
-                varRespTmp = crf_hyper(varSemi,
-                                       vecMdlPar[0],
-                                       vecMdlPar[1],
-                                       vecMdlPar[2])
+    # Search for the luminance contrast level at half maximum response
+    # (closed form solution, see `crf_semi`). If the overall stimulus-induced
+    # response is very small (close to zero), possibly due to a low or noisy
+    # signal, the semisaturation contrast is set to zero.
+    varSemi = crf_semi(np.array(vecMdlPar)[None, :], strFunc=strFunc)[0]
 
     # *** Calculate residual variance
 
@@ -228,4 +192,199 @@ def crf_fit(vecEmpX, aryEmpY, strFunc='power', varNumX=1000, varXmin=0.0,
         #            measurement
         vecRes[idxCon] = np.absolute(np.subtract(vecEmpYMne[idxCon], vecTmp))
 
-    return vecMdlY, varHlfMax, varSemi, vecRes
+    if lgcPar:
+        return vecMdlY, varHlfMax, varSemi, vecRes, vecMdlPar
+    else:
+        return vecMdlY, varHlfMax, varSemi, vecRes
+
+
+def crf_lsq(funcCrf, vecEmpX, vecEmpY, tplLim, tplPar0, vecPar0=None):
+    """
+    Least squares fit of contrast response function, with initial parameters.
+
+    Parameters
+    ----------
+    funcCrf : function
+        Contrast response function (see `crf_func`).
+    vecEmpX : np.array
+        Empirical x-values, of the form vecEmpX[idxCon].
+    vecEmpY : np.array
+        Empirical y-values (average across subjects), of the form
+        vecEmpY[idxCon].
+    tplLim : tuple
+        Lower and upper limits of the parameters.
+    tplPar0 : tuple
+        Default initial parameters.
+    vecPar0 : np.array or None
+        Initial parameters for this fit (e.g. solution of a fit to similar
+        data). Clipped to the limits. If `None`, not finite, or if the fit
+        fails, the default initial parameters are used.
+
+    Returns
+    -------
+    vecMdlPar : np.array
+        Fitted parameters.
+    """
+    if vecPar0 is not None:
+        vecPar0 = np.clip(np.asarray(vecPar0, dtype=np.float64),
+                          tplLim[0], tplLim[1])
+        if np.all(np.isfinite(vecPar0)):
+            try:
+                vecMdlPar, _ = curve_fit(funcCrf,
+                                         vecEmpX,
+                                         vecEmpY,
+                                         maxfev=100000,
+                                         bounds=tplLim,
+                                         p0=vecPar0)
+                return vecMdlPar
+            except (RuntimeError, ValueError):
+                # Fall back to default initial parameters:
+                pass
+
+    vecMdlPar, _ = curve_fit(funcCrf,
+                             vecEmpX,
+                             vecEmpY,
+                             maxfev=100000,
+                             bounds=tplLim,
+                             p0=tplPar0)
+
+    return vecMdlPar
+
+
+def crf_semi(aryPar, strFunc='power', varThr=0.0001):
+    """
+    Semisaturation contrast of contrast response functions.
+
+    Parameters
+    ----------
+    aryPar : np.array
+        Parameters of the contrast response function, of the form
+        aryPar[idxFit, idxParameter]; (factor, exponent) for the power
+        function, and (maximum response, semisaturation constant, exponent)
+        for the hyperbolic ratio function (see `crf_func`).
+    strFunc : str
+        Which function ('power' for power function, 'hyper' for hyperbolic
+        ratio).
+    varThr : float
+        If the first parameter (factor or maximum response) is not greater
+        than this threshold, the semisaturation contrast is set to zero (as
+        in `crf_fit`).
+
+    Returns
+    -------
+    vecSemi : np.array
+        Semisaturation contrast (contrast needed to elicit 50 percent of the
+        response at 100 percent contrast), of the form vecSemi[idxFit].
+
+    Notes
+    -----
+    Previously, the contrast was incremented in steps of 1e-6 until the half
+    maximum response was reached (up to a million function evaluations per
+    fit). Both functions can be inverted analytically:
+
+    - Power function, a * c^b = 0.5 * a, hence c = 0.5^(1 / b).
+    - Hyperbolic ratio function, with s = c50^n and the target ratio h = 0.5 /
+      (1 + s) (half of the response at full contrast, relative to the
+      maximum response): c^n / (c^n + s) = h, hence c = (h * s / (1 - h))^(1
+      / n).
+
+    The result differs from the incremental search by less than the step
+    size (1e-6), because the search stopped at the first step at or above
+    the solution. As in the incremental search, the smallest possible value
+    (for a flat response, e.g. an exponent of zero) is 1e-6. For other
+    functions, see `semi_bracket`.
+    """
+    aryPar = np.asarray(aryPar, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+
+        if strFunc == 'power':
+            vecSemi = np.power(0.5, np.divide(1.0, aryPar[:, 1]))
+
+        elif strFunc == 'hyper':
+            vecS = np.power(aryPar[:, 1], aryPar[:, 2])
+            vecH = np.divide(0.5, np.add(1.0, vecS))
+            vecSemi = np.power(np.divide(np.multiply(vecH, vecS),
+                                         np.subtract(1.0, vecH)),
+                               np.divide(1.0, aryPar[:, 2]))
+
+    # Flat responses (solution at zero or undefined):
+    vecSemi[np.logical_not(np.isfinite(vecSemi))] = 0.0
+    vecSemi = np.maximum(vecSemi, 0.000001)
+
+    # Very small response:
+    vecSemi[np.logical_not(np.greater(aryPar[:, 0], varThr))] = 0.0
+
+    return vecSemi
+
+
+def semi_bracket(funcCrf, aryPar, varTol=1e-9, varThr=0.0001):
+    """
+    Semisaturation contrast by bracketed root finding.
+
+    Parameters
+    ----------
+    funcCrf : function
+        Contrast response function, called as `funcCrf(vecC, *lstPar)`, with
+        one parameter vector per fit (see `crf_func`). Has to be
+        non-decreasing in the contrast.
+    aryPar : np.array
+        Parameters, of the form aryPar[idxFit, idxParameter].
+    varTol : float
+        Tolerance (width of final bracket).
+    varThr : float
+        If the first parameter is not greater than this threshold, the
+        semisaturation contrast is set to zero (as in `crf_semi`).
+
+    Returns
+    -------
+    vecSemi : np.array
+        Semisaturation contrast, of the form vecSemi[idxFit]. NaN for fits
+        for which the solution is not bracketed (see Notes).
+
+    Notes
+    -----
+    The contrast at which the response reaches half of the response at full
+    contrast is bracketed by zero and one. The bracket is halved for all fits
+    at once until its width is below the tolerance (i.e. about 30 vectorised
+    function evaluations for a tolerance of 1e-9, independent of the
+    solution). Can be used for contrast response functions without an
+    analytic inverse. The bracket fails if the response at full contrast is
+    not finite or negative (i.e. below half of itself), or if the response
+    is not finite at one of the contrasts within the bracket; the
+    semisaturation contrast of these fits is NaN (unless the first parameter
+    is below the threshold). If the response is already at or above the
+    target at the smallest contrasts (e.g. a flat response), the result is
+    the smallest possible value, 1e-6 (as in `crf_semi`).
+    """
+    aryPar = np.asarray(aryPar, dtype=np.float64)
+    lstPar = [aryPar[:, idxPar] for idxPar in range(aryPar.shape[1])]
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+
+        # Response at full contrast, and target response (half of it):
+        vecResp100 = funcCrf(np.ones(aryPar.shape[0]), *lstPar)
+        vecResp50 = np.multiply(0.5, vecResp100)
+
+        # The solution is bracketed if the response at full contrast is
+        # finite and at or above the target:
+        lgcBrkt = np.logical_and(np.isfinite(vecResp100),
+                                 np.greater_equal(vecResp100, vecResp50))
+
+        vecLw = np.zeros(aryPar.shape[0])
+        vecUp = np.ones(aryPar.shape[0])
+
+        varNumStp = int(np.ceil(np.log2(1.0 / varTol)))
+        for idxStp in range(varNumStp):
+            vecMid = np.multiply(0.5, np.add(vecLw, vecUp))
+            vecResp = funcCrf(vecMid, *lstPar)
+            lgcBrkt = np.logical_and(lgcBrkt, np.isfinite(vecResp))
+            lgcGe = np.greater_equal(vecResp, vecResp50)
+            vecUp = np.where(lgcGe, vecMid, vecUp)
+            vecLw = np.where(lgcGe, vecLw, vecMid)
+
+    vecSemi = np.maximum(vecUp, 0.000001)
+    vecSemi[np.logical_not(lgcBrkt)] = np.nan
+    vecSemi[np.logical_not(np.greater(aryPar[:, 0], varThr))] = 0.0
+
+    return vecSemi
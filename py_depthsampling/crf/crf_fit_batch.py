@@ -0,0 +1,576 @@
+# -*- coding: utf-8 -*-
+"""Batched fitting of contrast response functions."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+from py_depthsampling.crf.crf_func import crf_power
+from py_depthsampling.crf.crf_func import crf_hyper
+from py_depthsampling.crf.crf_fit import crf_semi
+
+
+def crf_power_loglin(vecEmpX, aryEmpY, vecLimLw=(0.0, 0.0),
+                     vecLimUp=(10.0, 1.0)):
+    """
+    Fit power contrast response function to many responses at once.
+
+    Parameters
+    ----------
+    vecEmpX : np.array
+        Empirical x-values (stimulus contrast levels, greater than zero), of
+        the form vecEmpX[idxCon].
+    aryEmpY : np.array
+        Empirical y-values to fit, of the form aryEmpY[idxFit, idxCon]. Each
+        row is fitted separately.
+    vecLimLw : tuple
+        Lower limits for parameters (factor, exponent), as in `crf_fit`.
+    vecLimUp : tuple
+        Upper limits for parameters (factor, exponent), as in `crf_fit`.
+
+    Returns
+    -------
+    vecA : np.array
+        Factor of the power function, vecA[idxFit].
+    vecB : np.array
+        Exponent of the power function, vecB[idxFit].
+    vecLgc : np.array
+        Boolean array, vecLgc[idxFit]; False if the row contains non-positive
+        responses.
+
+    Notes
+    -----
+    The power function y = a * x^b is linear in log-log space, i.e. log(y) =
+    log(a) + b * log(x). The least squares solution of the linear model is
+    calculated in closed form for all rows at once. If the exponent lies
+    outside of the limits, it is set to the closest limit, and the factor is
+    re-estimated for the fixed exponent (which is the constrained least
+    squares solution in log space). Note that the loss is defined on the
+    logarithm of the response, so that the estimates differ somewhat from
+    those of `crf_fit` (least squares in linear space, see
+    `crf_fit_power_batch` for refinement in linear space).
+
+    The logarithm is not defined for non-positive responses. These are
+    excluded from the fit of the respective row (i.e. the row is fitted to
+    its positive responses only). If less than two responses of a row are
+    positive, the parameters cannot be estimated, and the initial values of
+    `crf_fit` (0.5, 0.5) are returned for that row.
+    """
+    aryEmpY = np.asarray(aryEmpY, dtype=np.float64)
+    vecEmpX = np.asarray(vecEmpX, dtype=np.float64)
+
+    # Mask for positive responses (weight of one for positive responses, and
+    # zero otherwise):
+    aryMsk = np.greater(aryEmpY, 0.0)
+    vecLgc = np.all(aryMsk, axis=1)
+    aryMsk = aryMsk.astype(np.float64)
+
+    # Log-transformed data (non-positive values are replaced, they have zero
+    # weight):
+    vecLogX = np.log(vecEmpX)
+    aryLogY = np.log(np.where(np.greater(aryMsk, 0.0), aryEmpY, 1.0))
+
+    # Number of positive responses, and mean of log-x over positive responses
+    # (separately for each row):
+    vecNum = np.sum(aryMsk, axis=1)
+    vecOk = np.greater_equal(vecNum, 2.0)
+    vecNum = np.maximum(vecNum, 1.0)
+    vecLogXMne = np.divide(np.dot(aryMsk, vecLogX), vecNum)
+
+    # Centred predictor:
+    aryLogXDev = np.multiply(aryMsk, np.subtract(vecLogX[None, :],
+                                                 vecLogXMne[:, None]))
+
+    # Slope (exponent) for all rows, limited to bounds:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vecB = np.divide(np.sum(np.multiply(aryLogY, aryLogXDev), axis=1),
+                         np.sum(np.square(aryLogXDev), axis=1))
+    vecB = np.clip(vecB, vecLimLw[1], vecLimUp[1])
+
+    # Intercept (log of factor) for given exponent:
+    vecLogA = np.divide(
+        np.sum(np.multiply(aryMsk,
+                           np.subtract(aryLogY,
+                                       np.multiply(vecB[:, None],
+                                                   vecLogX[None, :]))),
+               axis=1),
+        vecNum)
+    vecA = np.clip(np.exp(vecLogA), vecLimLw[0], vecLimUp[0])
+
+    # Rows with less than two positive responses:
+    vecA[np.logical_not(vecOk)] = 0.5
+    vecB[np.logical_not(vecOk)] = 0.5
+
+    return vecA, vecB, vecLgc
+
+
+def crf_power_gn(vecEmpX, aryEmpY, vecA, vecB, varNumStp=10,
+                 vecLimLw=(0.0, 0.0), vecLimUp=(10.0, 1.0)):
+    """
+    Refine power function parameters by least squares in linear space.
+
+    Parameters
+    ----------
+    vecEmpX : np.array
+        Empirical x-values, of the form vecEmpX[idxCon].
+    aryEmpY : np.array
+        Empirical y-values, of the form aryEmpY[idxFit, idxCon].
+    vecA : np.array
+        Initial factor, vecA[idxFit].
+    vecB : np.array
+        Initial exponent, vecB[idxFit].
+    varNumStp : int
+        Number of (damped) Gauss-Newton steps.
+    vecLimLw : tuple
+        Lower limits for parameters (factor, exponent).
+    vecLimUp : tuple
+        Upper limits for parameters (factor, exponent).
+
+    Returns
+    -------
+    vecA : np.array
+        Factor, vecA[idxFit].
+    vecB : np.array
+        Exponent, vecB[idxFit].
+
+    Notes
+    -----
+    Minimises the sum of squared residuals in linear space (the objective of
+    `curve_fit` in `crf_fit`), for all fits at once. The 2 x 2 normal
+    equations of each fit are solved in closed form. A step is only accepted
+    if it reduces the loss of the respective fit; otherwise the damping of
+    that fit is increased (Levenberg-Marquardt scheme). Parameters are kept
+    within the limits; if one parameter reaches a limit, the other one is
+    optimised for the limited value.
+    """
+    vecEmpX = np.asarray(vecEmpX, dtype=np.float64)
+    aryEmpY = np.asarray(aryEmpY, dtype=np.float64)
+    vecA = np.array(vecA, dtype=np.float64)
+    vecB = np.array(vecB, dtype=np.float64)
+    vecLogX = np.log(vecEmpX)
+
+    def get_loss(vecA, vecB):
+        """Sum of squared residuals of all fits."""
+        aryPrd = np.multiply(vecA[:, None],
+                             np.power(vecEmpX[None, :], vecB[:, None]))
+        return np.sum(np.square(np.subtract(aryPrd, aryEmpY)), axis=1)
+
+    vecLss = get_loss(vecA, vecB)
+    vecLmb = np.full(vecA.shape, 0.001)
+
+    for idxStp in range(varNumStp):
+
+        # Residuals and Jacobian (derivatives with respect to factor and
+        # exponent), of the form aryJcb[idxFit, idxCon]:
+        aryJcbA = np.power(vecEmpX[None, :], vecB[:, None])
+        aryJcbB = np.multiply(np.multiply(vecA[:, None], aryJcbA),
+                              vecLogX[None, :])
+        aryRes = np.subtract(np.multiply(vecA[:, None], aryJcbA), aryEmpY)
+
+        # Normal equations (damped):
+        vecJaa = np.sum(np.square(aryJcbA), axis=1)
+        vecJbb = np.sum(np.square(aryJcbB), axis=1)
+        vecJab = np.sum(np.multiply(aryJcbA, aryJcbB), axis=1)
+        vecGa = np.sum(np.multiply(aryJcbA, aryRes), axis=1)
+        vecGb = np.sum(np.multiply(aryJcbB, aryRes), axis=1)
+        vecHaa = np.add(vecJaa, np.multiply(vecLmb, vecJaa)) + 1e-12
+        vecHbb = np.add(vecJbb, np.multiply(vecLmb, vecJbb)) + 1e-12
+        vecDet = np.subtract(np.multiply(vecHaa, vecHbb), np.square(vecJab))
+
+        # Step (solution of 2 x 2 system):
+        vecDa = np.divide(np.subtract(np.multiply(vecJab, vecGb),
+                                      np.multiply(vecHbb, vecGa)), vecDet)
+        vecDb = np.divide(np.subtract(np.multiply(vecJab, vecGa),
+                                      np.multiply(vecHaa, vecGb)), vecDet)
+
+        # If the exponent reaches a limit, the step of the factor is
+        # recalculated for the limited step of the exponent (minimum of the
+        # quadratic model along the limit), and vice versa:
+        vecBNew = np.clip(np.add(vecB, vecDb), vecLimLw[1], vecLimUp[1])
+        lgcLim = np.not_equal(vecBNew, np.add(vecB, vecDb))
+        vecDa = np.where(lgcLim,
+                         np.divide(-np.add(vecGa,
+                                           np.multiply(vecJab,
+                                                       np.subtract(vecBNew,
+                                                                   vecB))),
+                                   vecHaa),
+                         vecDa)
+        vecANew = np.clip(np.add(vecA, vecDa), vecLimLw[0], vecLimUp[0])
+        lgcLim = np.logical_and(np.not_equal(vecANew, np.add(vecA, vecDa)),
+                                np.logical_not(lgcLim))
+        vecDb = np.where(lgcLim,
+                         np.divide(-np.add(vecGb,
+                                           np.multiply(vecJab,
+                                                       np.subtract(vecANew,
+                                                                   vecA))),
+                                   vecHbb),
+                         vecDb)
+        vecBNew = np.clip(np.add(vecB, vecDb), vecLimLw[1], vecLimUp[1])
+        vecLssNew = get_loss(vecANew, vecBNew)
+
+        # Accept steps that reduce the loss:
+        lgcAcc = np.less(vecLssNew, vecLss)
+        vecA = np.where(lgcAcc, vecANew, vecA)
+        vecB = np.where(lgcAcc, vecBNew, vecB)
+        vecLss = np.where(lgcAcc, vecLssNew, vecLss)
+        vecLmb = np.where(lgcAcc, np.multiply(vecLmb, 0.1),
+                          np.multiply(vecLmb, 10.0))
+
+    return vecA, vecB
+
+
+def crf_fit_power_batch(vecEmpX, aryEmpY, varNumX=1000, varXmin=0.0,
+                        varXmax=1.0, varNumStp=0):
+    """
+    Fit power contrast response function to many responses at once.
+
+    Parameters
+    ----------
+    vecEmpX : np.array
+        Empirical x-values at which model will be fitted (e.g. stimulus
+        contrast levels at which stimuli were presented), of the form
+        vecEmpX[idxCon].
+    aryEmpY : np.array
+        Empirical y-values to fit (e.g. measured response), of the form
+        aryEmpY[idxFit, idxCon]. In contrast to `crf_fit`, each row is
+        fitted separately (i.e. rows can be subjects, bootstrap samples,
+        depth levels, etc.; average across subjects beforehand if needed).
+    varNumX : int
+        Number of x-values for which to solve the function when calculating
+        model fit.
+    varXmin : float
+        Minimum x-value for which function will be fitted.
+    varXmax : float
+        Maximum x-value for which function will be fitted.
+    varNumStp : int
+        Number of Gauss-Newton steps in linear space, following the fit in
+        log-log space (see `crf_power_gn`). If zero, only the log-linear fit
+        is performed.
+
+    Returns
+    -------
+    aryMdlY : np.array
+        Fitted y-values (predicted response based on CRF model), of the form
+        aryMdlY[idxFit, varNumX].
+    vecHlfMax : np.array
+        Predicted response at 50 percent contrast based on CRF model, of the
+        form vecHlfMax[idxFit].
+    vecSemi : np.array
+        Semisaturation contrast, of the form vecSemi[idxFit].
+    aryRes : np.array
+        Residual variance at empirical contrast levels (of the form
+        aryRes[idxFit, varNumCon]).
+    aryPar : np.array
+        Parameters (factor, exponent) of the power function, of the form
+        aryPar[idxFit, 2].
+
+    Notes
+    -----
+    The first four outputs correspond to those of `crf_fit`, with an
+    additional first dimension. Non-positive responses are excluded from the
+    log-linear fit (see `crf_power_loglin`), but are included in the
+    refinement in linear space, so that with a sufficient number of steps,
+    the results correspond to those of `crf_fit` for all responses.
+    """
+    vecEmpX = np.asarray(vecEmpX, dtype=np.float64)
+
+    # Log-linear fit:
+    vecA, vecB, _ = crf_power_loglin(vecEmpX, aryEmpY)
+
+    # Refinement in linear space:
+    if varNumStp > 0:
+        vecA, vecB = crf_power_gn(vecEmpX, aryEmpY, vecA, vecB,
+                                  varNumStp=varNumStp)
+
+    # Vector for which the function will be fitted:
+    vecMdlX = np.linspace(varXmin, varXmax, num=varNumX, endpoint=True)
+
+    # Fitted y-values:
+    aryMdlY = crf_power(vecMdlX[None, :], vecA[:, None], vecB[:, None])
+
+    # Response at 50% contrast:
+    vecHlfMax = crf_power(0.5, vecA, vecB)
+
+    # Semisaturation contrast:
+    aryPar = np.array([vecA, vecB]).T
+    vecSemi = crf_semi(aryPar, strFunc='power')
+
+    # Residuals at empirical contrast levels:
+    aryRes = np.absolute(np.subtract(aryEmpY,
+                                     crf_power(vecEmpX[None, :],
+                                               vecA[:, None],
+                                               vecB[:, None])))
+
+    return aryMdlY, vecHlfMax, vecSemi, aryRes, aryPar
+
+
+def crf_hyper_jcb(vecEmpX, aryPar):
+    """
+    Hyperbolic ratio function and its Jacobian for many fits at once.
+
+    Parameters
+    ----------
+    vecEmpX : np.array
+        Contrast levels, of the form vecEmpX[idxCon].
+    aryPar : np.array
+        Parameters (maximum response, semisaturation constant, exponent), of
+        the form aryPar[idxFit, 3].
+
+    Returns
+    -------
+    aryPrd : np.array
+        Predicted response, of the form aryPrd[idxFit, idxCon].
+    aryJcb : np.array
+        Derivatives of the response with respect to the three parameters, of
+        the form aryJcb[idxFit, idxCon, idxParameter].
+
+    Notes
+    -----
+    With u = c^n, v = c50^n, and d = u + v, the response is r = rmax * u /
+    d, and the derivatives are dr/drmax = u / d, dr/dc50 = -rmax * n * u * v
+    / (c50 * d^2), and dr/dn = rmax * u * v * (log(c) - log(c50)) / d^2.
+    """
+    vecRmax = aryPar[:, 0][:, None]
+    vecC50 = aryPar[:, 1][:, None]
+    vecN = aryPar[:, 2][:, None]
+
+    aryU = np.power(vecEmpX[None, :], vecN)
+    aryV = np.power(vecC50, vecN)
+    aryD = np.add(aryU, aryV)
+    aryRto = np.divide(aryU, aryD)
+    aryPrd = np.multiply(vecRmax, aryRto)
+
+    # rmax * u * v / d^2:
+    aryTmp = np.multiply(aryPrd, np.divide(aryV, aryD))
+
+    aryJcb = np.empty((aryPar.shape[0], vecEmpX.shape[0], 3))
+    aryJcb[:, :, 0] = aryRto
+    aryJcb[:, :, 1] = -np.multiply(aryTmp, np.divide(vecN, vecC50))
+    aryJcb[:, :, 2] = np.multiply(aryTmp,
+                                  np.subtract(np.log(vecEmpX)[None, :],
+                                              np.log(vecC50)))
+
+    return aryPrd, aryJcb
+
+
+def crf_hyper_lm(vecEmpX, aryEmpY, aryPar0=None, varNumStp=500, varTol=1e-10,
+                 vecLimLw=(0.0, 0.0, 0.0), vecLimUp=(np.inf, np.inf, np.inf)):
+    """
+    Fit hyperbolic ratio function to many responses at once.
+
+    Parameters
+    ----------
+    vecEmpX : np.array
+        Empirical x-values (stimulus contrast levels, greater than zero), of
+        the form vecEmpX[idxCon].
+    aryEmpY : np.array
+        Empirical y-values to fit, of the form aryEmpY[idxFit, idxCon]. Each
+        row is fitted separately.
+    aryPar0 : np.array or None
+        Initial parameters (maximum response, semisaturation constant,
+        exponent), of the form aryPar0[idxFit, 3] (or a vector with one set of
+        initial parameters for all fits). If `None`, the initial parameters
+        are derived from the data (maximum response slightly above the
+        largest response, semisaturation contrast at the middle contrast
+        level, exponent of one).
+    varNumStp : int
+        Maximum number of Levenberg-Marquardt iterations.
+    varTol : float
+        Convergence tolerance. A fit has converged if an accepted step changes
+        the sum of squared residuals by less than `varTol` (relative to the
+        sum of squared residuals), or if the damping becomes very large (no
+        further improvement possible).
+    vecLimLw : tuple
+        Lower limits for parameters, as in `crf_fit`.
+    vecLimUp : tuple
+        Upper limits for parameters, as in `crf_fit`.
+
+    Returns
+    -------
+    aryPar : np.array
+        Fitted parameters, of the form aryPar[idxFit, 3].
+    vecCnv : np.array
+        Boolean array, vecCnv[idxFit]; True if the fit has converged within
+        the maximum number of iterations.
+
+    Notes
+    -----
+    Levenberg-Marquardt least squares in linear space (the objective of
+    `curve_fit` in `crf_fit`), with analytic Jacobian (see `crf_hyper_jcb`).
+    Each fit has its own damping parameter, which is decreased after
+    successful steps and increased after unsuccessful steps. The 3 x 3
+    normal equations of all active fits are solved at once. Converged fits
+    are removed from the active set, so that the cost of an iteration
+    decreases as the fits converge. Parameters are projected onto the limits
+    after each step. Because the semisaturation constant enters the model
+    through its logarithm, it is kept above a small positive value.
+    """
+    vecEmpX = np.asarray(vecEmpX, dtype=np.float64)
+    aryEmpY = np.asarray(aryEmpY, dtype=np.float64)
+    varNumFit = aryEmpY.shape[0]
+
+    vecLimLw = np.maximum(np.array(vecLimLw, dtype=np.float64),
+                          np.array([-np.inf, 1e-12, 0.0]))
+    vecLimUp = np.array(vecLimUp, dtype=np.float64)
+
+    # Initial parameters:
+    if aryPar0 is None:
+        aryPar = np.zeros((varNumFit, 3))
+        aryPar[:, 0] = np.multiply(1.2, np.max(np.absolute(aryEmpY), axis=1))
+        aryPar[:, 1] = np.median(vecEmpX)
+        aryPar[:, 2] = 1.0
+    else:
+        aryPar = np.array(np.broadcast_to(aryPar0, (varNumFit, 3)),
+                          dtype=np.float64)
+    aryPar = np.clip(aryPar, vecLimLw, vecLimUp)
+
+    def get_loss(aryPar, aryY):
+        """Sum of squared residuals."""
+        aryPrd = crf_hyper(vecEmpX[None, :], aryPar[:, 0][:, None],
+                           aryPar[:, 1][:, None], aryPar[:, 2][:, None])
+        return np.sum(np.square(np.subtract(aryPrd, aryY)), axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+
+        vecLss = get_loss(aryPar, aryEmpY)
+        vecLmb = np.full(varNumFit, 0.001)
+        vecCnv = np.zeros(varNumFit, dtype=bool)
+
+        # Indices of fits that have not converged yet:
+        vecAct = np.arange(varNumFit)
+
+        for idxStp in range(varNumStp):
+
+            if vecAct.shape[0] == 0:
+                break
+
+            aryParAct = aryPar[vecAct, :]
+            aryY = aryEmpY[vecAct, :]
+            vecLmbAct = vecLmb[vecAct]
+
+            # Residuals & Jacobian:
+            aryPrd, aryJcb = crf_hyper_jcb(vecEmpX, aryParAct)
+            aryRes = np.subtract(aryPrd, aryY)
+
+            # Damped normal equations:
+            aryJtJ = np.einsum('fcp,fcq->fpq', aryJcb, aryJcb)
+            aryGrd = np.einsum('fcp,fc->fp', aryJcb, aryRes)
+            aryDgn = np.einsum('fpp->fp', aryJtJ)
+            aryLhs = np.copy(aryJtJ)
+            aryLhs[:, np.arange(3), np.arange(3)] += np.add(
+                np.multiply(vecLmbAct[:, None], aryDgn), 1e-12)
+
+            # Step & projection onto limits:
+            aryStp = np.linalg.solve(aryLhs, -aryGrd[:, :, None])[:, :, 0]
+            aryParNew = np.clip(np.add(aryParAct, aryStp), vecLimLw,
+                                vecLimUp)
+            vecLssNew = get_loss(aryParNew, aryY)
+
+            # Accept steps that reduce the loss:
+            lgcAcc = np.less(vecLssNew, vecLss[vecAct])
+            lgcAcc[np.logical_not(np.isfinite(vecLssNew))] = False
+
+            # Convergence (small relative improvement after successful step,
+            # or no further improvement possible):
+            vecImp = np.divide(np.subtract(vecLss[vecAct], vecLssNew),
+                               np.maximum(vecLss[vecAct], 1e-300))
+            lgcCnv = np.logical_or(
+                np.logical_and(lgcAcc, np.less(vecImp, varTol)),
+                np.greater(vecLmbAct, 1e10))
+            lgcCnv = np.logical_or(lgcCnv, np.less(vecLss[vecAct], 1e-30))
+
+            vecIdxAcc = vecAct[lgcAcc]
+            aryPar[vecIdxAcc, :] = aryParNew[lgcAcc, :]
+            vecLss[vecIdxAcc] = vecLssNew[lgcAcc]
+            vecLmb[vecAct] = np.where(lgcAcc,
+                                      np.maximum(np.multiply(vecLmbAct, 0.1),
+                                                 1e-12),
+                                      np.multiply(vecLmbAct, 10.0))
+
+            vecCnv[vecAct[lgcCnv]] = True
+            vecAct = vecAct[np.logical_not(lgcCnv)]
+
+    return aryPar, vecCnv
+
+
+def crf_fit_hyper_batch(vecEmpX, aryEmpY, varNumX=1000, varXmin=0.0,
+                        varXmax=1.0, aryPar0=None, varNumStp=500):
+    """
+    Fit hyperbolic ratio contrast response function to many responses.
+
+    Parameters
+    ----------
+    vecEmpX : np.array
+        Empirical x-values at which model will be fitted, of the form
+        vecEmpX[idxCon].
+    aryEmpY : np.array
+        Empirical y-values to fit, of the form aryEmpY[idxFit, idxCon]. Each
+        row is fitted separately.
+    varNumX : int
+        Number of x-values for which to solve the function when calculating
+        model fit.
+    varXmin : float
+        Minimum x-value for which function will be fitted.
+    varXmax : float
+        Maximum x-value for which function will be fitted.
+    aryPar0 : np.array or None
+        Initial parameters (see `crf_hyper_lm`).
+    varNumStp : int
+        Maximum number of Levenberg-Marquardt iterations.
+
+    Returns
+    -------
+    aryMdlY : np.array
+        Fitted y-values, of the form aryMdlY[idxFit, varNumX].
+    vecHlfMax : np.array
+        Predicted response at 50 percent contrast, vecHlfMax[idxFit].
+    vecSemi : np.array
+        Semisaturation contrast, of the form vecSemi[idxFit].
+    aryRes : np.array
+        Residual variance at empirical contrast levels (of the form
+        aryRes[idxFit, varNumCon]).
+    aryPar : np.array
+        Parameters (maximum response, semisaturation constant, exponent), of
+        the form aryPar[idxFit, 3].
+
+    Notes
+    -----
+    Same outputs as `crf_fit_power_batch`, for the hyperbolic ratio function
+    (see `crf_hyper_lm`).
+    """
+    vecEmpX = np.asarray(vecEmpX, dtype=np.float64)
+
+    aryPar = crf_hyper_lm(vecEmpX, aryEmpY, aryPar0=aryPar0,
+                          varNumStp=varNumStp)[0]
+
+    vecRmax = aryPar[:, 0][:, None]
+    vecC50 = aryPar[:, 1][:, None]
+    vecN = aryPar[:, 2][:, None]
+
+    # Vector for which the function will be fitted:
+    vecMdlX = np.linspace(varXmin, varXmax, num=varNumX, endpoint=True)
+
+    # Fitted y-values, response at 50% contrast, and semisaturation contrast:
+    aryMdlY = crf_hyper(vecMdlX[None, :], vecRmax, vecC50, vecN)
+    vecHlfMax = crf_hyper(0.5, vecRmax, vecC50, vecN)[:, 0]
+    vecSemi = crf_semi(aryPar, strFunc='hyper')
+
+    # Residuals at empirical contrast levels:
+    aryRes = np.absolute(np.subtract(aryEmpY,
+                                     crf_hyper(vecEmpX[None, :], vecRmax,
+                                               vecC50, vecN)))
+
+    return aryMdlY, vecHlfMax, vecSemi, aryRes, aryPar
@@ -29,13 +29,14 @@ each subject individually).
 
 
 import numpy as np
-import multiprocessing as mp
 import matplotlib.pyplot as plt
-from ds_crfParBoot01 import crf_par_01
-from ds_crfParBoot02 import crf_par_02
-from ds_pltAcrDpth import funcPltAcrDpth
-from ds_crfPlot import plt_crf
-from ds_findPeak import find_peak
+from py_depthsampling.crf.crf_par_boot_01 import crf_par_01
+from py_depthsampling.crf.crf_par_boot_02 import crf_par_02
+from py_depthsampling.crf.crf_boot_batch import crf_boot_batch
+from py_depthsampling.crf.crf_mdl import crf_mdl_prct
+from py_depthsampling.plot.plt_dpth_prfl import plt_dpth_prfl
+from py_depthsampling.crf.crf_plot import plt_crf
+from py_depthsampling.main.find_peak import find_peak
 
 
 # ----------------------------------------------------------------------------
@@ -124,13 +125,19 @@ varPar = 11
 # How many iterations (i.e. how often to sample):
 varNumIt = 10000
 
-# Use GPU (currently only implemented for power function)?
-lgcGpu = False
+# Fit all CRFs of a chunk of iterations at once (batched least squares, see
+# `crf_boot_batch`), instead of one `curve_fit` call per fit in parallel
+# processes?
+lgcBatch = False
 
-if strFunc == 'hyper':
-    lgcGpu = False
-if lgcGpu:
-    from ds_crfParBoot01_gpu import crf_par_01_gpu
+# Start the CRF fits of all bootstrap samples from the solution of the fit to
+# the full sample?
+lgcWrm = True
+
+# Run directory for checkpoints of the bootstrapping (a run that was
+# interrupted is resumed from the checkpoints). If `None`, no checkpoints are
+# saved.
+strPthRun = None
 
 
 # ----------------------------------------------------------------------------
@@ -152,7 +159,13 @@ if strSwitch == 'load':
 
     # Retrieve arrays from npz object (dictionary):
     aryDpth = objNpz['aryDpth']
-    aryMdlY = objNpz['aryMdlY']
+    if 'aryPar' in objNpz.files:
+        aryPar = objNpz['aryPar']
+    else:
+        # Older bootstrapping results contain modelled responses instead of
+        # parameters:
+        aryPar = None
+        aryMdlY = objNpz['aryMdlY']
     aryHlfMax = objNpz['aryHlfMax']
     arySemi = objNpz['arySemi']
     aryRes = objNpz['aryRes']
@@ -195,30 +208,30 @@ elif strSwitch == 'create':
     # ------------------------------------------------------------------------
     # *** Parallelised CRF bootstrapping
 
-    if lgcGpu:
-        aryMdlY, aryHlfMax, arySemi, aryRes = crf_par_01_gpu(aryDpth,
-                                                             vecEmpX,
-                                                             strFunc=strFunc,
-                                                             varNumIt=varNumIt,
-                                                             varNumX=varNumX)
+    if lgcBatch:
+        aryPar, aryHlfMax, arySemi, aryRes = crf_boot_batch(
+            aryDpth, vecEmpX, strFunc=strFunc, varNumIt=varNumIt,
+            strPthRun=strPthRun)
 
     else:
-        aryMdlY, aryHlfMax, arySemi, aryRes = crf_par_01(aryDpth,
-                                                         vecEmpX,
-                                                         strFunc=strFunc,
-                                                         varNumIt=varNumIt,
-                                                         varPar=varPar,
-                                                         varNumX=varNumX)
+        aryPar, aryHlfMax, arySemi, aryRes = crf_par_01(aryDpth,
+                                                        vecEmpX,
+                                                        strFunc=strFunc,
+                                                        varNumIt=varNumIt,
+                                                        varPar=varPar,
+                                                        lgcWrm=lgcWrm,
+                                                        strPthRun=strPthRun)
 
     # ------------------------------------------------------------------------
     # *** Save results
 
     print('---Saving bootstrapping results to file')
 
-    # Save result as npz object:
+    # Save result as npz object (only the parameters of the fitted functions
+    # are saved, the modelled responses are calculated when needed):
     np.savez(strPthNpz,
              aryDpth=aryDpth,
-             aryMdlY=aryMdlY,
+             aryPar=aryPar,
              aryHlfMax=aryHlfMax,
              arySemi=arySemi,
              aryRes=aryRes)
@@ -255,15 +268,29 @@ arySemiSCnfUp = np.zeros((varNumIn, varNumDpt))
 # Loop through ROIs (i.e. V1 and V2):
 for idxIn in range(0, varNumIn):
 
-    # Median modelled y-values:
-    aryMdlYMne[idxIn, :, :] = np.median(aryMdlY[idxIn, :, :, :], axis=0)
-    # Confidence interval:
-    aryMdlYCnfLw[idxIn, :, :] = np.percentile(aryMdlY[idxIn, :, :, :],
-                                              varCnfLw,
-                                              axis=0)
-    aryMdlYCnfUp[idxIn, :, :] = np.percentile(aryMdlY[idxIn, :, :, :],
-                                              varCnfUp,
-                                              axis=0)
+    if aryPar is not None:
+        # Median modelled y-values & confidence interval. The modelled
+        # y-values are calculated from the parameters, for a chunk of
+        # x-values at a time:
+        (aryMdlYMne[idxIn, :, :],
+         aryMdlYCnfLw[idxIn, :, :],
+         aryMdlYCnfUp[idxIn, :, :]) = crf_mdl_prct(aryPar[idxIn, :, :, :],
+                                                   [varCnfLw, varCnfUp],
+                                                   strFunc=strFunc,
+                                                   varNumX=varNumX,
+                                                   varXmin=varXmin,
+                                                   varXmax=varXmax,
+                                                   lgcMed=True)
+    else:
+        # Median modelled y-values:
+        aryMdlYMne[idxIn, :, :] = np.median(aryMdlY[idxIn, :, :, :], axis=0)
+        # Confidence interval:
+        aryMdlYCnfLw[idxIn, :, :] = np.percentile(aryMdlY[idxIn, :, :, :],
+                                                  varCnfLw,
+                                                  axis=0)
+        aryMdlYCnfUp[idxIn, :, :] = np.percentile(aryMdlY[idxIn, :, :, :],
+                                                  varCnfUp,
+                                                  axis=0)
 
     # Median response at half-maximum contrast:
     aryHlfMaxMne[idxIn, :] = np.median(aryHlfMax[idxIn, :, :], axis=0)
@@ -294,26 +321,19 @@ print('---CRF fitting on full dataset')
 # We fit the CRF model on the median of the full dataset:
 aryDpthEmpMed = np.median(aryDpth, axis=1, keepdims=True)
 
-# Create a queue to put the results in:
-queOut = mp.Queue()
-
 # Pseudo-randomisation array to use the bootstrapping function to get empirical
 # CRF fit:
 # aryRnd = np.arange(0, varNumSubs, 1)
 aryRnd = np.array((0), ndmin=2)
 
 # Fit contrast response function on empirical depth profiles:
-crf_par_02(0,
-           aryDpthEmpMed,
-           vecEmpX,
-           strFunc,
-           aryRnd,
-           varNumX,
-           queOut)
-
-# Retrieve results from queue:
-lstCrf = queOut.get(True)
-_, aryEmpMdlY, aryEmpHlfMax, aryEmpSemi, aryEmpRes = lstCrf
+lstCrf = crf_par_02(0,
+                    aryDpthEmpMed,
+                    vecEmpX,
+                    strFunc,
+                    aryRnd,
+                    varNumX)
+_, aryEmpMdlY, aryEmpHlfMax, aryEmpSemi, aryEmpRes, _ = lstCrf
 
 
 # ----------------------------------------------------------------------------
@@ -709,26 +729,26 @@ for idxIn in range(0, varNumIn):
 strXlabel = 'Cortical depth level (equivolume)'
 strYlabel = 'fMRI signal change [a.u.]'
 
-#funcPltAcrDpth(aryEmpHlfMax[:, 0, :],  # aryData[Condition, Depth]
-funcPltAcrDpth(aryHlfMaxMne,       # aryData[Condition, Depth]
-               0,                  # aryError[Con., Depth]
-               varNumDpt,          # Number of depth levels (on the x-axis)
-               varNumIn,           # Number of conditions (separate lines)
-               varDpi,             # Resolution of the output figure
-               0.0,                # Minimum of Y axis
-               2.0,                # Maximum of Y axis
-               False,              # Boolean: whether to convert y axis to %
-               dicPthDpth.keys(),  # Labels for conditions (separate lines)
-               strXlabel,          # Label on x axis
-               strYlabel,          # Label on y axis
-               'Response at 50% contrast',  # Figure title
-               True,               # Boolean: whether to plot a legend
-               (strPthOt + '_' + strFunc + '_half_max_response' + strFleTyp),
-               varSizeX=2000.0,
-               varSizeY=1400.0,
-               aryCnfLw=aryHlfMaxCnfLw,
-               aryCnfUp=aryHlfMaxCnfUp,
-               lstVrt=list(vecPeakHlfMaxMed))
+#plt_dpth_prfl(aryEmpHlfMax[:, 0, :],  # aryData[Condition, Depth]
+plt_dpth_prfl(aryHlfMaxMne,       # aryData[Condition, Depth]
+              0,                  # aryError[Con., Depth]
+              varNumDpt,          # Number of depth levels (on the x-axis)
+              varNumIn,           # Number of conditions (separate lines)
+              varDpi,             # Resolution of the output figure
+              0.0,                # Minimum of Y axis
+              2.0,                # Maximum of Y axis
+              False,              # Boolean: whether to convert y axis to %
+              dicPthDpth.keys(),  # Labels for conditions (separate lines)
+              strXlabel,          # Label on x axis
+              strYlabel,          # Label on y axis
+              'Response at 50% contrast',  # Figure title
+              True,               # Boolean: whether to plot a legend
+              (strPthOt + '_' + strFunc + '_half_max_response' + strFleTyp),
+              varSizeX=2000.0,
+              varSizeY=1400.0,
+              aryCnfLw=aryHlfMaxCnfLw,
+              aryCnfUp=aryHlfMaxCnfUp,
+              lstVrt=list(vecPeakHlfMaxMed))
 
 
 # ----------------------------------------------------------------------------
@@ -743,28 +763,28 @@ aryClr = np.array([[15.0, 255.0, 135.0],
                    [15.0, 15.0, 255.0]])
 aryClr = np.divide(aryClr, 255.0)
 
-# funcPltAcrDpth(aryEmpSemi[:, 0, :],  # aryData[Condition, Depth]
-funcPltAcrDpth(arySemiMne,         # aryData[Condition, Depth]
-               0,                  # aryError[Con., Depth]
-               varNumDpt,          # Number of depth levels (on the x-axis)
-               varNumIn,           # Number of conditions (separate lines)
-               varDpi,             # Resolution of the output figure
-               0.0,                # Minimum of Y axis
-               0.25,               # Maximum of Y axis
-               True,              # Boolean: whether to convert y axis to %
-               dicPthDpth.keys(),  # Labels for conditions (separate lines)
-               strXlabel,          # Label on x axis
-               strYlabel,          # Label on y axis
-               'Semisaturation constant',  # Figure title
-               True,               # Boolean: whether to plot a legend
-               (strPthOt + '_' + strFunc + '_semisaturationcontrast'
-                + strFleTyp),
-               aryClr=aryClr,
-               varSizeX=2000.0,
-               varSizeY=1400.0,
-               varNumLblY=6,
-               aryCnfLw=arySemiSCnfLw,
-               aryCnfUp=arySemiSCnfUp)
+# plt_dpth_prfl(aryEmpSemi[:, 0, :],  # aryData[Condition, Depth]
+plt_dpth_prfl(arySemiMne,         # aryData[Condition, Depth]
+              0,                  # aryError[Con., Depth]
+              varNumDpt,          # Number of depth levels (on the x-axis)
+              varNumIn,           # Number of conditions (separate lines)
+              varDpi,             # Resolution of the output figure
+              0.0,                # Minimum of Y axis
+              0.25,               # Maximum of Y axis
+              True,              # Boolean: whether to convert y axis to %
+              dicPthDpth.keys(),  # Labels for conditions (separate lines)
+              strXlabel,          # Label on x axis
+              strYlabel,          # Label on y axis
+              'Semisaturation constant',  # Figure title
+              True,               # Boolean: whether to plot a legend
+              (strPthOt + '_' + strFunc + '_semisaturationcontrast'
+               + strFleTyp),
+              aryClr=aryClr,
+              varSizeX=2000.0,
+              varSizeY=1400.0,
+              varNumLblY=6,
+              aryCnfLw=arySemiSCnfLw,
+              aryCnfUp=arySemiSCnfUp)
 
 
 # ----------------------------------------------------------------------------
@@ -790,22 +810,22 @@ aryResMne02 = np.mean(aryResMne01, axis=1)
 strXlabel = 'Cortical depth level (equivolume)'
 strYlabel = 'Residual variance'
 
-funcPltAcrDpth(aryResMne02,        # aryData[Condition, Depth]
-               0,                  # aryError[Condition, Depth]
-               varNumDpt,          # Number of depth levels (on the x-axis)
-               varNumIn,           # Number of conditions (separate lines)
-               varDpi,             # Resolution of the output figure
-               0.0,                # Minimum of Y axis
-               0.09,               # Maximum of Y axis
-               False,              # Boolean: whether to convert y axis to %
-               dicPthDpth.keys(),  # Labels for conditions (separate lines)
-               strXlabel,          # Label on x axis
-               strYlabel,          # Label on y axis
-               'Model fit across cortical depth',  # Figure title
-               True,               # Boolean: whether to plot a legend
-               (strPthOt + '_' + strFunc + '_modelfit' + strFleTyp),
-               aryCnfLw=aryResCnfLw02,
-               aryCnfUp=aryResCnfUp02)
+plt_dpth_prfl(aryResMne02,        # aryData[Condition, Depth]
+              0,                  # aryError[Condition, Depth]
+              varNumDpt,          # Number of depth levels (on the x-axis)
+              varNumIn,           # Number of conditions (separate lines)
+              varDpi,             # Resolution of the output figure
+              0.0,                # Minimum of Y axis
+              0.09,               # Maximum of Y axis
+              False,              # Boolean: whether to convert y axis to %
+              dicPthDpth.keys(),  # Labels for conditions (separate lines)
+              strXlabel,          # Label on x axis
+              strYlabel,          # Label on y axis
+              'Model fit across cortical depth',  # Figure title
+              True,               # Boolean: whether to plot a legend
+              (strPthOt + '_' + strFunc + '_modelfit' + strFleTyp),
+              aryCnfLw=aryResCnfLw02,
+              aryCnfUp=aryResCnfUp02)
 
 
 # ----------------------------------------------------------------------------
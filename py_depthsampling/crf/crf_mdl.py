@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Evaluate fitted contrast response functions from their parameters."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+from py_depthsampling.crf.crf_func import crf_power
+from py_depthsampling.crf.crf_func import crf_hyper
+
+
+def crf_mdl(aryPar, vecMdlX, strFunc='power'):
+    """
+    Evaluate contrast response functions.
+
+    Parameters
+    ----------
+    aryPar : np.array
+        Parameters of the contrast response functions, of the form
+        aryPar[..., idxParameter] (any number of leading dimensions, e.g.
+        aryPar[idxIteration, idxDpt, idxParameter]).
+    vecMdlX : np.array
+        x-values at which to evaluate the functions (e.g. contrast levels),
+        of the form vecMdlX[idxX].
+    strFunc : str
+        Which function ('power' for power function, 'hyper' for hyperbolic
+        ratio).
+
+    Returns
+    -------
+    aryMdlY : np.array
+        Modelled y-values, of the form aryMdlY[..., idxX] (same leading
+        dimensions as `aryPar`).
+
+    Notes
+    -----
+    Same elementwise operations as in `crf_fit`, so that the modelled
+    y-values are identical to those returned by the fitting functions.
+    """
+    lstPar = [aryPar[..., idxPar, None] for idxPar in range(aryPar.shape[-1])]
+    if strFunc == 'power':
+        aryMdlY = crf_power(vecMdlX, *lstPar)
+    elif strFunc == 'hyper':
+        aryMdlY = crf_hyper(vecMdlX, *lstPar)
+    return aryMdlY
+
+
+def crf_mdl_prct(aryPar, vecPrct, strFunc='power', varNumX=1000,
+                 varXmin=0.0, varXmax=1.0, varNumChnk=50, lgcMed=False):
+    """
+    Percentiles of modelled contrast response across iterations.
+
+    Parameters
+    ----------
+    aryPar : np.array
+        Parameters of the contrast response functions, of the form
+        aryPar[idxIteration, ..., idxParameter] (e.g. bootstrap iterations &
+        depth levels of one ROI).
+    vecPrct : list or np.array
+        Percentiles to calculate (in percent, e.g. [50.0, 2.5, 97.5]).
+    strFunc : str
+        Which function ('power' for power function, 'hyper' for hyperbolic
+        ratio).
+    varNumX : int
+        Number of x-values at which the functions are evaluated.
+    varXmin : float
+        Minimum x-value.
+    varXmax : float
+        Maximum x-value.
+    varNumChnk : int
+        Number of x-values that are processed at once.
+    lgcMed : bool
+        Whether to also calculate the median (with `np.median`), which is
+        placed before the percentiles.
+
+    Returns
+    -------
+    aryPrct : np.array
+        Percentiles of modelled y-values across iterations, of the form
+        aryPrct[idxPercentile, ..., idxX] (median first, if `lgcMed` is
+        `True`).
+
+    Notes
+    -----
+    The modelled y-values of all iterations are never held in memory at
+    once. Instead, all functions are evaluated at a chunk of x-values, and
+    the percentiles across iterations are calculated for this chunk. The
+    result is identical to `np.percentile` of the full array of modelled
+    y-values (e.g. as returned by `crf_fit`), because the percentiles are
+    calculated separately for each x-value.
+    """
+    vecMdlX = np.linspace(varXmin, varXmax, num=varNumX, endpoint=True)
+
+    # Index of first percentile in output array:
+    varIdxPrct = int(lgcMed)
+
+    aryPrct = np.zeros((((len(vecPrct) + varIdxPrct),) + aryPar.shape[1:-1]
+                        + (varNumX,)))
+
+    for varIdx01 in range(0, varNumX, varNumChnk):
+
+        varIdx02 = min((varIdx01 + varNumChnk), varNumX)
+
+        aryMdlY = crf_mdl(aryPar, vecMdlX[varIdx01:varIdx02], strFunc=strFunc)
+
+        if lgcMed:
+            aryPrct[0, ..., varIdx01:varIdx02] = np.median(aryMdlY, axis=0)
+
+        aryPrct[varIdxPrct:, ..., varIdx01:varIdx02] = np.percentile(
+            aryMdlY, vecPrct, axis=0)
+
+    return aryPrct
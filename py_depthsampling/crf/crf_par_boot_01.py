@@ -19,11 +19,20 @@
 
 import numpy as np
 import multiprocessing as mp
-from ds_crfParBoot02 import crf_par_02
+from py_depthsampling.crf.crf_par_boot_02 import crf_par_02
+from py_depthsampling.crf.crf_par_boot_02 import init_shm
+from py_depthsampling.crf.crf_par_boot_02 import crf_par_shm
+from py_depthsampling.crf.crf_par_boot_02 import close_shm
+from py_depthsampling.main.shm import shm_create
+from py_depthsampling.main.shm import shm_free
+from py_depthsampling.main.chkpnt import chk_init
+from py_depthsampling.main.chkpnt import chk_load
+from py_depthsampling.main.chkpnt import chk_save
+from py_depthsampling.main.chkpnt import rng_get
 
 
 def crf_par_01(aryDpth, vecEmpX, strFunc='power', varNumIt=1000, varPar=10,
-               varNumX=1000):
+               varNumChnk=100, lgcWrm=True, strPthRun=None):
     """
     Parallelised bootstrapping of contrast response function, level 1.
 
@@ -43,17 +52,22 @@ def crf_par_01(aryDpth, vecEmpX, strFunc='power', varNumIt=1000, varPar=10,
         Number of bootstrapping iterations (i.e. how many times to sample).
     varPar : int
         Number of process to run in parallel.
-    varNumX : int
-        Number of x-values for which to solve the function when calculating
-        model fit.
+    varNumChnk : int
+        Number of bootstrapping iterations per chunk (i.e. per task of the
+        process pool).
+    lgcWrm : bool
+        Whether to start the fits of all bootstrap samples from the solution
+        of the fit to the full sample (see notes).
+    strPthRun : str or None
+        Run directory for checkpoints (see notes). If `None`, no checkpoints
+        are saved.
 
     Returns
     -------
-    aryMdlY : np.array
-        Fitted y-values (predicted response based on CRF model), of the form
-        aryMdlY[idxRoi, idxIteration, idxDpt, varNumX], where varNumX is the
-        number of data points at which the fitted function is evaluated (e.g.
-        1000).
+    aryPar : np.array
+        Fitted parameters of the contrast response function, of the form
+        aryPar[idxRoi, idxIteration, idxDpt, idxParameter]. The modelled
+        response can be obtained from the parameters (see `crf_mdl`).
     aryHlfMax : np.array
         Predicted response at 50 percent contrast based on CRF model. Array of
         the form aryHlfMax[idxRoi, idxIteration, idxDpt].
@@ -69,7 +83,28 @@ def crf_par_01(aryDpth, vecEmpX, strFunc='power', varNumIt=1000, varPar=10,
     Notes
     -----
     This function parallelises the contrast response function fitting by
-    calling a second-level function using the multiprocessing module.
+    calling a second-level function using the multiprocessing module. The
+    empirical data, the randomisation array, and the output arrays are
+    placed in shared memory once. The iterations are split into chunks, which
+    are distributed over a pool of processes. Only the chunk indices are sent
+    to the processes, which write the fitted results directly into the
+    output arrays (at the positions of the iterations of the chunk).
+    Therefore, the results do not depend on the number of processes.
+
+    If `lgcWrm` is `True`, the CRF is first fitted to the full sample (all
+    subjects, separately for each ROI and depth level), and the solution is
+    used as initial parameters for the fits to the bootstrap samples (which
+    have similar optima). Fits that fail from these initial parameters are
+    repeated from the default initial parameters.
+
+    If a run directory is provided (`strPthRun`), the results of each chunk
+    are saved to a separate file in the run directory as soon as the chunk is
+    completed (together with the randomisation array and the state of the
+    random number generator before the random draws of the chunk, see
+    `main.chkpnt`). If the run is interrupted, it can be resumed by calling
+    this function again with the same arguments and run directory. Completed
+    chunks are then loaded instead of fitted again, and the results are the
+    same as those of an uninterrupted run.
 
     Function of the depth sampling pipeline.
     """
@@ -85,115 +120,160 @@ def crf_par_01(aryDpth, vecEmpX, strFunc='power', varNumIt=1000, varPar=10,
     # each iteration:
     varNumSmp = varNumSubs
 
+    # Chunks of iterations (chunk index, first and last iteration):
+    lstChnk = [(idxChnk, varIdx01, min((varIdx01 + varNumChnk), varNumIt))
+               for idxChnk, varIdx01
+               in enumerate(range(0, varNumIt, varNumChnk))]
+
+    # Start or resume checkpointed run (if resumed, the random number
+    # generator is set to its state at the start of the interrupted run):
+    if strPthRun is not None:
+        chk_init(strPthRun, aryDpth=aryDpth, vecEmpX=vecEmpX, strFunc=strFunc,
+                 varNumIt=varNumIt, varNumChnk=varNumChnk, lgcWrm=lgcWrm)
+
     # Random array with subject indicies for bootstrapping of the form
     # aryRnd[varNumIt, varNumSmp]. Each row includes the indicies of the
-    # subjects to the sampled on that iteration.
-    aryRnd = np.random.randint(0,
-                               high=varNumSubs,
-                               size=(varNumIt, varNumSmp))
+    # subjects to the sampled on that iteration. The random draws are
+    # performed separately for each chunk (the random numbers are the same
+    # as for one draw for all iterations), and the state of the random number
+    # generator before each chunk is kept for the checkpoints.
+    aryRnd = np.zeros((varNumIt, varNumSmp), dtype=int)
+    lstRng = [None] * len(lstChnk)
+    for idxChnk, varIdx01, varIdx02 in lstChnk:
+        lstRng[idxChnk] = rng_get()
+        aryRnd[varIdx01:varIdx02, :] = np.random.randint(
+            0, high=varNumSubs, size=((varIdx02 - varIdx01), varNumSmp))
 
     # ------------------------------------------------------------------------
-    # *** Parallelised CRF fitting
+    # *** Fit to full sample
 
-    print('---Creating parallel processes')
+    if lgcWrm:
 
-    # Empty list for results:
-    lstOut = [None for i in range(varPar)]
-
-    # Empty list for processes:
-    lstPrc = [None for i in range(varPar)]
-
-    # Create a queue to put the results in:
-    queOut = mp.Queue()
-
-    # List into which the chunks of the randomisation-array for the parallel
-    # processes will be put:
-    lstRnd = [None for i in range(varPar)]
-
-    # Vector with the indicies at which the randomisation-array will be
-    # separated in order to be chunked up for the parallel processes:
-    vecIdxChnks = np.linspace(0,
-                              varNumIt,
-                              num=varPar,
-                              endpoint=False)
-    vecIdxChnks = np.hstack((vecIdxChnks, varNumIt))
-
-    # Put randomisation indicies into chunks:
-    for idxChnk in range(0, varPar):
-        # Index of first iteration to be included in current chunk:
-        varTmpChnkSrt = int(vecIdxChnks[idxChnk])
-        # Index of last iteration to be included in current chunk:
-        varTmpChnkEnd = int(vecIdxChnks[(idxChnk+1)])
-        # Put array into list:
-        lstRnd[idxChnk] = aryRnd[varTmpChnkSrt:varTmpChnkEnd, :]
-
-    # We don't need the original array with the functional data anymore:
-    del(aryRnd)
+        print('---Fitting full sample (initial parameters for bootstrapping)')
+
+        # Fit to all subjects (default initial parameters; modelled response
+        # is not needed):
+        aryPar0 = crf_par_02(1,
+                             aryDpth,
+                             vecEmpX,
+                             strFunc,
+                             np.arange(varNumSubs)[None, :],
+                             1)[5][:, 0, :, :]
 
-    # Create processes:
-    for idxPrc in range(0, varPar):
-        lstPrc[idxPrc] = mp.Process(target=crf_par_02,
-                                    args=(idxPrc,
-                                          aryDpth,
-                                          vecEmpX,
-                                          strFunc,
-                                          lstRnd[idxPrc],
-                                          varNumX,
-                                          queOut))
-        # Daemon (kills processes when exiting):
-        lstPrc[idxPrc].Daemon = True
-
-    # Start processes:
-    for idxPrc in range(0, varPar):
-        lstPrc[idxPrc].start()
-
-    # Collect results from queue:
-    for idxPrc in range(0, varPar):
-        lstOut[idxPrc] = queOut.get(True)
-
-    # Join processes:
-    for idxPrc in range(0, varPar):
-        lstPrc[idxPrc].join()
+    else:
+        aryPar0 = None
 
     # ------------------------------------------------------------------------
-    # *** Collect results
-
-    print('---Collecting results from parallel processes')
-
-    # List for results from parallel processes, in order to join the results:
-    lstMdlY = [None for i in range(varPar)]
-    lstHlfMax = [None for i in range(varPar)]
-    lstSemi = [None for i in range(varPar)]
-    lstRes = [None for i in range(varPar)]
-
-    # Put output into correct order:
-    for idxPrc in range(0, varPar):
-
-        # Index of results (first item in output list):
-        varTmpIdx = lstOut[idxPrc][0]
-
-        # Put fitting results into list, in correct order:
-        lstMdlY[varTmpIdx] = lstOut[idxPrc][1]
-        lstHlfMax[varTmpIdx] = lstOut[idxPrc][2]
-        lstSemi[varTmpIdx] = lstOut[idxPrc][3]
-        lstRes[varTmpIdx] = lstOut[idxPrc][4]
-
-    # Concatenate output vectors (into the same order as the voxels that were
-    # included in the fitting):
-
-    # Arrays for y-values of fitted function (for each iteration & depth
-    # level):
-    # aryMdlY = np.zeros((varNumIn, varNumIt, varNumDpt, varNumX))
-    # Array for responses at half maximum contrast:
-    # aryHlfMax = np.zeros((varNumIn, varNumIt, varNumDpt))
-    # List of vectors for semisaturation contrast:
-    # arySemi = np.zeros((varNumIn, varNumIt, varNumDpt))
-    # List of arrays for residual variance:
-    # aryRes = np.zeros((varNumIn, varNumIt, varNumCon, varNumDpt))
-    for idxPrc in range(0, varPar):
-        aryMdlY = np.concatenate(lstMdlY, axis=1)
-        aryHlfMax = np.concatenate(lstHlfMax, axis=1)
-        arySemi = np.concatenate(lstSemi, axis=1)
-        aryRes = np.concatenate(lstRes, axis=1)
-
-    return aryMdlY, aryHlfMax, arySemi, aryRes
+    # *** Parallelised CRF fitting
+
+    print('---Creating parallel processes')
+
+    # Number of ROIs, conditions, depth levels, and parameters:
+    varNumIn = aryDpth.shape[0]
+    varNumCon = aryDpth.shape[2]
+    varNumDpt = aryDpth.shape[3]
+    if strFunc == 'power':
+        varNumPar = 2
+    elif strFunc == 'hyper':
+        varNumPar = 3
+
+    # Input & output arrays in shared memory. Only the parameters of the
+    # fitted functions are kept (not the modelled responses):
+    dicTmp = {'aryDpth': aryDpth,
+              'aryRnd': aryRnd,
+              'aryPar': (varNumIn, varNumIt, varNumDpt, varNumPar),
+              'aryHlfMax': (varNumIn, varNumIt, varNumDpt),
+              'arySemi': (varNumIn, varNumIt, varNumDpt),
+              'aryRes': (varNumIn, varNumIt, varNumCon, varNumDpt)}
+    lstShm = []
+    dicAry = {}
+    dicSpc = {}
+    for strKey in dicTmp.keys():
+        if type(dicTmp[strKey]) == tuple:
+            objShm, dicAry[strKey], dicSpc[strKey] = shm_create(
+                tplShp=dicTmp[strKey])
+        else:
+            objShm, dicAry[strKey], dicSpc[strKey] = shm_create(
+                aryIn=dicTmp[strKey])
+        lstShm.append(objShm)
+
+    # We don't need the original array with the randomisation anymore:
+    del(aryRnd)
+    del(dicTmp)
+
+    # Output arrays (iterations along second dimension):
+    lstKeyOut = ['aryPar', 'aryHlfMax', 'arySemi', 'aryRes']
+
+    objPool = None
+
+    try:
+
+        # Load results of chunks that were completed in an interrupted run:
+        lstTodo = []
+        for idxChnk, varIdx01, varIdx02 in lstChnk:
+            if strPthRun is None:
+                dicChk = None
+            else:
+                dicChk = chk_load(strPthRun, idxChnk)
+            if dicChk is None:
+                lstTodo.append((idxChnk, varIdx01, varIdx02))
+            elif np.array_equal(dicChk['aryRnd'],
+                                dicAry['aryRnd'][varIdx01:varIdx02, :]):
+                for strKey in lstKeyOut:
+                    dicAry[strKey][:, varIdx01:varIdx02, ...] = dicChk[strKey]
+            else:
+                raise ValueError(('Checkpoint of chunk ' + str(idxChnk)
+                                  + ' does not match randomisation of run.'))
+
+        if len(lstTodo) < len(lstChnk):
+            print(('---Loaded ' + str(len(lstChnk) - len(lstTodo)) + ' of '
+                   + str(len(lstChnk)) + ' chunks from checkpoints'))
+
+        # The modelled responses are not kept, therefore the fitted functions
+        # are evaluated at a single x-value only (`varNumX = 1`):
+        if varPar > 1:
+            objPool = mp.Pool(processes=varPar, initializer=init_shm,
+                              initargs=(dicSpc, vecEmpX, strFunc, 1,
+                                        aryPar0))
+            itrChnk = objPool.imap_unordered(crf_par_shm, lstTodo)
+        else:
+            init_shm(dicSpc, vecEmpX, strFunc, 1, aryPar0=aryPar0)
+            itrChnk = map(crf_par_shm, lstTodo)
+
+        # Save checkpoint whenever a chunk is completed:
+        for idxChnk in itrChnk:
+            if strPthRun is not None:
+                varIdx01, varIdx02 = lstChnk[idxChnk][1:]
+                dicChk = {strKey: dicAry[strKey][:, varIdx01:varIdx02, ...]
+                          for strKey in lstKeyOut}
+                chk_save(strPthRun, idxChnk, lstRng[idxChnk],
+                         aryRnd=dicAry['aryRnd'][varIdx01:varIdx02, :],
+                         **dicChk)
+
+        if varPar > 1:
+            objPool.close()
+            objPool.join()
+        else:
+            close_shm()
+
+        # ---------------------------------------------------------------------
+        # *** Collect results
+
+        print('---Collecting results from parallel processes')
+
+        # Copy results out of shared memory:
+        aryPar = np.copy(dicAry['aryPar'])
+        aryHlfMax = np.copy(dicAry['aryHlfMax'])
+        arySemi = np.copy(dicAry['arySemi'])
+        aryRes = np.copy(dicAry['aryRes'])
+
+    finally:
+        # Stop worker processes & close shared memory blocks attached in this
+        # process (if the fitting failed) before the blocks are released:
+        if objPool is not None:
+            objPool.terminate()
+        close_shm()
+        del(dicAry)
+        shm_free(lstShm)
+
+    return aryPar, aryHlfMax, arySemi, aryRes
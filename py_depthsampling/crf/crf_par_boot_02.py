@@ -18,10 +18,16 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import numpy as np
-from ds_crfFit import crf_fit
+from py_depthsampling.crf.crf_fit import crf_fit
+from py_depthsampling.main.shm import shm_attach
 
 
-def crf_par_02(idxPrc, aryDpth, vecEmpX, strFunc, aryRnd, varNumX, queOut):
+# Shared memory arrays & parameters of worker process (set by `init_shm`):
+dicShm = {}
+
+
+def crf_par_02(idxPrc, aryDpth, vecEmpX, strFunc, aryRnd, varNumX,
+               queOut=None, aryPar0=None, lgcWrm=False):
     """
     Parallelised bootstrapping of contrast response function, level 2.
 
@@ -47,8 +53,19 @@ def crf_par_02(idxPrc, aryDpth, vecEmpX, strFunc, aryRnd, varNumX, queOut):
     varNumX : int
         Number of x-values for which to solve the function when calculating
         model fit.
-    queOut : multiprocessing.queues.Queue
-        Queue to put results on.
+    queOut : multiprocessing.queues.Queue or None
+        Queue to put results on. If `None`, the results are returned.
+    aryPar0 : np.array or None
+        Initial parameters for the fits, e.g. solution of the fit to the full
+        sample, of the form aryPar0[idxRoi, idxDpt, idxParameter]. The same
+        initial parameters are used for all iterations.
+    lgcWrm : bool
+        If no initial parameters are provided (`aryPar0` is `None`), whether
+        to start each fit from the solution at the previous depth level (of
+        the same ROI and iteration). Otherwise, the default initial
+        parameters are used (see `crf_fit`). Suitable for the power function;
+        for the hyperbolic ratio function, starting from the previous depth
+        level can end in a different local minimum (see notes).
 
     Returns
     -------
@@ -71,12 +88,23 @@ def crf_par_02(idxPrc, aryDpth, vecEmpX, strFunc, aryRnd, varNumX, queOut):
     aryRes : np.array
         Residual variance at empirical contrast levels. Array of the form
         aryRes[idxRoi, idxIteration, idxCondition, idxDpt].
+    aryPar : np.array
+        Fitted parameters of the contrast response function, of the form
+        aryPar[idxRoi, idxIteration, idxDpt, idxParameter].
 
     Notes
     -----
     This function is supposed to be called in parallel, using the
     multiprocessing module. This function calls a function which performs
-    the actual least squares fitting.
+    the actual least squares fitting. Fits are warm-started (from `aryPar0`,
+    or from the previous depth level), with a fallback to the default initial
+    parameters if the fit fails (see `crf_fit`). Starting from the solution
+    of the fit to the full sample reduces the number of function evaluations
+    (by about 20 to 35 percent, see `bench_crf_warm.py`) without changing the
+    results. Depth profiles of single subjects or bootstrap samples can differ
+    considerably between neighbouring depth levels, and for the hyperbolic
+    ratio function, some fits started from the previous depth level end in a
+    local minimum with a larger residual.
 
     Function of the depth sampling pipeline.
     """
@@ -108,6 +136,14 @@ def crf_par_02(idxPrc, aryDpth, vecEmpX, strFunc, aryRnd, varNumX, queOut):
     # List of arrays for residual variance:
     aryRes = np.zeros((varNumIn, varNumIt, varNumCon, varNumDpt))
 
+    # Array for fitted parameters (two for power function, three for
+    # hyperbolic ratio function):
+    if strFunc == 'power':
+        varNumPar = 2
+    elif strFunc == 'hyper':
+        varNumPar = 3
+    aryPar = np.zeros((varNumIn, varNumIt, varNumDpt, varNumPar))
+
     # Only print status messages if this is the first of several parallel
     # processes:
     if idxPrc == 0:
@@ -184,19 +220,114 @@ def crf_par_02(idxPrc, aryDpth, vecEmpX, strFunc, aryRnd, varNumX, queOut):
                 # subjects and current depth level:
                 aryEmpY = aryDpth[idxIn, vecSmpl, :, idxDpt]
 
+                # Initial parameters (full sample solution, or solution at
+                # previous depth level):
+                if aryPar0 is not None:
+                    vecPar0 = aryPar0[idxIn, idxDpt, :]
+                elif lgcWrm and (0 < idxDpt):
+                    vecPar0 = aryPar[idxIn, idxIt, (idxDpt - 1), :]
+                else:
+                    vecPar0 = None
+
                 # Fit CRF:
                 (aryMdlY[idxIn, idxIt, idxDpt, :],
                  aryHlfMax[idxIn, idxIt, idxDpt],
                  arySemi[idxIn, idxIt, idxDpt],
-                 aryRes[idxIn, idxIt, :, idxDpt]) = crf_fit(vecEmpX,
+                 aryRes[idxIn, idxIt, :, idxDpt],
+                 aryPar[idxIn, idxIt, idxDpt, :]) = crf_fit(vecEmpX,
                                                             aryEmpY,
                                                             strFunc=strFunc,
                                                             varNumX=varNumX,
                                                             varXmin=0.0,
                                                             varXmax=1.0,
-                                                            strAvr='mean')
+                                                            strAvr='mean',
+                                                            vecPar0=vecPar0,
+                                                            lgcPar=True)
 
     # Output list:
-    lstOut = [idxPrc, aryMdlY, aryHlfMax, arySemi, aryRes]
+    lstOut = [idxPrc, aryMdlY, aryHlfMax, arySemi, aryRes, aryPar]
+
+    if queOut is None:
+        return lstOut
+    else:
+        queOut.put(lstOut)
+
+
+def init_shm(dicSpc, vecEmpX, strFunc, varNumX, aryPar0=None):
+    """
+    Initialise worker process for CRF bootstrapping in shared memory.
+
+    Parameters
+    ----------
+    dicSpc : dict
+        Specifications of the arrays in shared memory (see
+        `shm.shm_create`), with keys 'aryDpth' & 'aryRnd' (input), and
+        'aryPar', 'aryHlfMax', 'arySemi' & 'aryRes' (output).
+    vecEmpX : np.array
+        Empirical x-values (see `crf_par_02`).
+    strFunc : str
+        Which contrast response function to fit (see `crf_par_02`).
+    varNumX : int
+        Number of x-values of modelled response (see `crf_par_02`).
+    aryPar0 : np.array or None
+        Initial parameters for the fits (see `crf_par_02`).
+    """
+    for strKey in dicSpc.keys():
+        dicShm[strKey] = shm_attach(dicSpc[strKey])
+    dicShm['vecEmpX'] = vecEmpX
+    dicShm['strFunc'] = strFunc
+    dicShm['varNumX'] = varNumX
+    dicShm['aryPar0'] = aryPar0
+
+
+def close_shm():
+    """Close shared memory blocks attached by `init_shm`."""
+    lstShm = [dicShm[strKey][0] for strKey in dicShm.keys()
+              if type(dicShm[strKey]) == tuple]
+    dicShm.clear()
+    for objShm in lstShm:
+        objShm.close()
+
+
+def crf_par_shm(tplChnk):
+    """
+    Bootstrapping of contrast response function for a chunk of iterations.
+
+    Parameters
+    ----------
+    tplChnk : tuple
+        Index of the chunk, and indices of the first and last (exclusive)
+        iteration of the chunk.
+
+    Returns
+    -------
+    idxChnk : int
+        Index of the chunk.
+
+    Notes
+    -----
+    Worker function for `crf_par_01` (to be called in a process pool
+    initialised with `init_shm`). The empirical data and the randomisation
+    array are read from shared memory, and the results are written into the
+    output arrays in shared memory at the positions of the iterations of the
+    chunk. Only the chunk indices are sent to the worker process.
+    """
+    idxChnk, varIdx01, varIdx02 = tplChnk
+
+    aryDpth = dicShm['aryDpth'][1]
+    aryRnd = dicShm['aryRnd'][1]
+
+    lstOut = crf_par_02(idxChnk,
+                        aryDpth,
+                        dicShm['vecEmpX'],
+                        dicShm['strFunc'],
+                        aryRnd[varIdx01:varIdx02, :],
+                        dicShm['varNumX'],
+                        aryPar0=dicShm['aryPar0'])
+
+    dicShm['aryHlfMax'][1][:, varIdx01:varIdx02, :] = lstOut[2]
+    dicShm['arySemi'][1][:, varIdx01:varIdx02, :] = lstOut[3]
+    dicShm['aryRes'][1][:, varIdx01:varIdx02, :, :] = lstOut[4]
+    dicShm['aryPar'][1][:, varIdx01:varIdx02, :, :] = lstOut[5]
 
-    queOut.put(lstOut)
+    return idxChnk
@@ -19,11 +19,18 @@
 
 import numpy as np
 import multiprocessing as mp
-from ds_crfParPerm02 import crf_par_perm_02
+from py_depthsampling.crf.crf_par_perm_02 import init_perm
+from py_depthsampling.crf.crf_par_perm_02 import crf_perm_chnk
+from py_depthsampling.crf.crf_mdl import crf_mdl
+from py_depthsampling.main.chkpnt import chk_init
+from py_depthsampling.main.chkpnt import chk_load
+from py_depthsampling.main.chkpnt import chk_save
+from py_depthsampling.main.chkpnt import rng_get
 
 
 def crf_par_perm_01(aryDpth01, aryDpth02, vecEmpX, strFunc='power',
-                    varNumIt=1000, varPar=10, varNumX=1000):
+                    varNumIt=1000, varPar=10, varNumX=1000, varNumChnk=100,
+                    strPthRun=None):
     """
     Parallelised permutation testing on contrast response function, level 1.
 
@@ -51,6 +58,11 @@ def crf_par_perm_01(aryDpth01, aryDpth02, vecEmpX, strFunc='power',
     varNumX : int
         Number of x-values for which to solve the function when calculating
         model fit.
+    varNumChnk : int
+        Number of iterations per chunk (i.e. per task of the process pool).
+    strPthRun : str or None
+        Run directory for checkpoints (see notes). If `None`, no checkpoints
+        are saved.
 
     Returns
     -------
@@ -72,7 +84,21 @@ def crf_par_perm_01(aryDpth01, aryDpth02, vecEmpX, strFunc='power',
     Notes
     -----
     This function parallelises the contrast response function fitting by
-    calling a second-level function using the multiprocessing module.
+    calling a second-level function using the multiprocessing module. The
+    iterations are split into chunks, which are distributed over a pool of
+    processes. Only the fitted parameters (and the derived responses at 50
+    percent contrast, semisaturation contrasts, and residuals) are returned
+    by the processes. The modelled responses are calculated from the
+    parameters when all chunks are completed.
+
+    If a run directory is provided (`strPthRun`), the results of each chunk
+    are saved to a separate file in the run directory as soon as the chunk is
+    completed (together with the randomisation array and the state of the
+    random number generator before the random draws of the chunk, see
+    `main.chkpnt`). If the run is interrupted, it can be resumed by calling
+    this function again with the same arguments and run directory. Completed
+    chunks are then loaded instead of fitted again, and the results are the
+    same as those of an uninterrupted run.
 
     Function of the depth sampling pipeline.
     """
@@ -84,118 +110,117 @@ def crf_par_perm_01(aryDpth01, aryDpth02, vecEmpX, strFunc='power',
     # Get number of subjects from input array:
     varNumSub = aryDpth01.shape[0]
 
+    # Chunks of iterations (chunk index, first and last iteration):
+    lstChnk = [(idxChnk, varIdx01, min((varIdx01 + varNumChnk), varNumIt))
+               for idxChnk, varIdx01
+               in enumerate(range(0, varNumIt, varNumChnk))]
+
+    # Start or resume checkpointed run (if resumed, the random number
+    # generator is set to its state at the start of the interrupted run):
+    if strPthRun is not None:
+        chk_init(strPthRun, aryDpth01=aryDpth01, aryDpth02=aryDpth02,
+                 vecEmpX=vecEmpX, strFunc=strFunc, varNumIt=varNumIt,
+                 varNumChnk=varNumChnk)
+
     # Random array that is used to permute V1 and V2 labels within subjects,
     # of the form aryRnd[idxIteration, idxSub]. For each iteration and subject,
     # there is either a zero or a one. 'Zero' means that the actual V1 value
     # gets assigned to the permuted 'V1' group and the actual V2 value gets
     # assigned to the permuted 'V2' group. 'One' means that the labels are
     # switched, i.e. the actual V1 label get assignet to the 'V2' group and
-    # vice versa.
-    aryRnd = np.random.randint(0, high=2, size=(varNumIt, varNumSub))
+    # vice versa. The random draws are performed separately for each chunk
+    # (the random numbers are the same as for one draw for all iterations),
+    # and the state of the random number generator before each chunk is kept
+    # for the checkpoints.
+    lstRnd = [None] * len(lstChnk)
+    lstRng = [None] * len(lstChnk)
+    for idxChnk, varIdx01, varIdx02 in lstChnk:
+        lstRng[idxChnk] = rng_get()
+        lstRnd[idxChnk] = np.random.randint(
+            0, high=2, size=((varIdx02 - varIdx01), varNumSub))
+
+    # ------------------------------------------------------------------------
+    # *** Load checkpoints
+
+    # List for results of chunks (fitted parameters, responses at half
+    # maximum contrast, semisaturation contrast, and residuals):
+    lstOut = [None] * len(lstChnk)
+
+    # Output arrays (iterations along second dimension):
+    lstKeyOut = ['aryPar', 'aryHlfMax', 'arySemi', 'aryRes']
+
+    # Load results of chunks that were completed in an interrupted run:
+    lstTodo = []
+    for idxChnk in range(len(lstChnk)):
+        if strPthRun is None:
+            dicChk = None
+        else:
+            dicChk = chk_load(strPthRun, idxChnk)
+        if dicChk is None:
+            lstTodo.append((idxChnk, lstRnd[idxChnk]))
+        elif np.array_equal(dicChk['aryRnd'], lstRnd[idxChnk]):
+            lstOut[idxChnk] = [dicChk[strKey] for strKey in lstKeyOut]
+        else:
+            raise ValueError(('Checkpoint of chunk ' + str(idxChnk)
+                              + ' does not match randomisation of run.'))
+
+    if len(lstTodo) < len(lstChnk):
+        print(('---Loaded ' + str(len(lstChnk) - len(lstTodo)) + ' of '
+               + str(len(lstChnk)) + ' chunks from checkpoints'))
 
     # ------------------------------------------------------------------------
     # *** Parallelised CRF fitting
 
     print('---Creating parallel processes')
 
-    # Empty list for results:
-    lstOut = [None for i in range(varPar)]
-
-    # Empty list for processes:
-    lstPrc = [None for i in range(varPar)]
-
-    # Create a queue to put the results in:
-    queOut = mp.Queue()
-
-    # List into which the chunks of the randomisation-array for the parallel
-    # processes will be put:
-    lstRnd = [None for i in range(varPar)]
-
-    # Vector with the indicies at which the randomisation-array will be
-    # separated in order to be chunked up for the parallel processes:
-    vecIdxChnks = np.linspace(0,
-                              varNumIt,
-                              num=varPar,
-                              endpoint=False)
-    vecIdxChnks = np.hstack((vecIdxChnks, varNumIt))
-
-    # Put randomisation indicies into chunks:
-    for idxChnk in range(0, varPar):
-        # Index of first iteration to be included in current chunk:
-        varTmpChnkSrt = int(vecIdxChnks[idxChnk])
-        # Index of last iteration to be included in current chunk:
-        varTmpChnkEnd = int(vecIdxChnks[(idxChnk+1)])
-        # Put array into list:
-        lstRnd[idxChnk] = aryRnd[varTmpChnkSrt:varTmpChnkEnd, :]
-
-    # We don't need the original randomisation array anymore:
-    del(aryRnd)
-
-    # Create processes:
-    for idxPrc in range(0, varPar):
-        lstPrc[idxPrc] = mp.Process(target=crf_par_perm_02,
-                                    args=(idxPrc,
-                                          aryDpth01,
-                                          aryDpth02,
-                                          vecEmpX,
-                                          strFunc,
-                                          lstRnd[idxPrc],
-                                          varNumX,
-                                          queOut))
-        # Daemon (kills processes when exiting):
-        lstPrc[idxPrc].Daemon = True
-
-    # Start processes:
-    for idxPrc in range(0, varPar):
-        lstPrc[idxPrc].start()
-
-    # Collect results from queue:
-    for idxPrc in range(0, varPar):
-        lstOut[idxPrc] = queOut.get(True)
-
-    # Join processes:
-    for idxPrc in range(0, varPar):
-        lstPrc[idxPrc].join()
+    objPool = None
+
+    try:
+
+        if varPar > 1:
+            objPool = mp.Pool(processes=varPar, initializer=init_perm,
+                              initargs=(aryDpth01, aryDpth02, vecEmpX,
+                                        strFunc))
+            itrChnk = objPool.imap_unordered(crf_perm_chnk, lstTodo)
+        else:
+            init_perm(aryDpth01, aryDpth02, vecEmpX, strFunc)
+            itrChnk = map(crf_perm_chnk, lstTodo)
+
+        # Collect results, and save checkpoint whenever a chunk is completed:
+        for lstTmp in itrChnk:
+            idxChnk = lstTmp[0]
+            lstOut[idxChnk] = lstTmp[1:]
+            if strPthRun is not None:
+                chk_save(strPthRun, idxChnk, lstRng[idxChnk],
+                         aryRnd=lstRnd[idxChnk],
+                         **dict(zip(lstKeyOut, lstOut[idxChnk])))
+
+        if varPar > 1:
+            objPool.close()
+            objPool.join()
+
+    finally:
+        # Stop worker processes (if a chunk failed or the run was
+        # interrupted):
+        if objPool is not None:
+            objPool.terminate()
 
     # ------------------------------------------------------------------------
     # *** Collect results
 
     print('---Collecting results from parallel processes')
 
-    # List for results from parallel processes, in order to join the results:
-    lstMdlY = [None for i in range(varPar)]
-    lstHlfMax = [None for i in range(varPar)]
-    lstSemi = [None for i in range(varPar)]
-    lstRes = [None for i in range(varPar)]
-
-    # Put output into correct order:
-    for idxPrc in range(0, varPar):
-
-        # Index of results (first item in output list):
-        varTmpIdx = lstOut[idxPrc][0]
-
-        # Put fitting results into list, in correct order:
-        lstMdlY[varTmpIdx] = lstOut[idxPrc][1]
-        lstHlfMax[varTmpIdx] = lstOut[idxPrc][2]
-        lstSemi[varTmpIdx] = lstOut[idxPrc][3]
-        lstRes[varTmpIdx] = lstOut[idxPrc][4]
-
-    # Concatenate output vectors (into the same order as the voxels that were
-    # included in the fitting):
-
-    # Arrays for y-values of fitted function (for each iteration & depth
-    # level):
-    # aryMdlY = np.zeros((varNumIn, varNumIt, varNumDpt, varNumX))
-    # Array for responses at half maximum contrast:
-    # aryHlfMax = np.zeros((varNumIn, varNumIt, varNumDpt))
-    # List of vectors for semisaturation contrast:
-    # arySemi = np.zeros((varNumIn, varNumIt, varNumDpt))
-    # List of arrays for residual variance:
-    # aryRes = np.zeros((varNumIn, varNumIt, varNumCon, varNumDpt))
-    for idxPrc in range(0, varPar):
-        aryMdlY = np.concatenate(lstMdlY, axis=1)
-        aryHlfMax = np.concatenate(lstHlfMax, axis=1)
-        arySemi = np.concatenate(lstSemi, axis=1)
-        aryRes = np.concatenate(lstRes, axis=1)
+    # Concatenate results of chunks (in order of iterations):
+    aryPar, aryHlfMax, arySemi, aryRes = [
+        np.concatenate([lstOut[idxChnk][idxOut]
+                        for idxChnk in range(len(lstChnk))], axis=1)
+        for idxOut in range(len(lstKeyOut))]
+
+    # Modelled responses (y-values of fitted function for each ROI, iteration
+    # & depth level), of the form aryMdlY[idxRoi, idxIteration, idxDpt,
+    # idxContrast]:
+    aryMdlY = crf_mdl(aryPar,
+                      np.linspace(0.0, 1.0, num=varNumX, endpoint=True),
+                      strFunc=strFunc)
 
     return aryMdlY, aryHlfMax, arySemi, aryRes
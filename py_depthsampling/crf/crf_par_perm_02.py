@@ -18,11 +18,15 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import numpy as np
-from ds_crfFit import crf_fit
+from py_depthsampling.crf.crf_fit import crf_fit
+
+
+# Data & parameters of worker process (set by `init_perm`):
+dicPrm = {}
 
 
 def crf_par_perm_02(idxPrc, aryDpth01, aryDpth02, vecEmpX, strFunc, aryRnd,
-                    varNumX, queOut):
+                    varNumX, queOut=None):
     """
     Parallelised permutation testing on contrast response function, level 2.
 
@@ -53,8 +57,8 @@ def crf_par_perm_02(idxPrc, aryDpth01, aryDpth02, vecEmpX, strFunc, aryRnd,
     varNumX : int
         Number of x-values for which to solve the function when calculating
         model fit.
-    queOut : multiprocessing.queues.Queue
-        Queue to put results on.
+    queOut : multiprocessing.queues.Queue or None
+        Queue to put results on. If `None`, the results are returned.
 
     Returns
     -------
@@ -77,6 +81,9 @@ def crf_par_perm_02(idxPrc, aryDpth01, aryDpth02, vecEmpX, strFunc, aryRnd,
     aryRes : np.array
         Residual variance at empirical contrast levels. Array of the form
         aryRes[idxRoi, idxIteration, idxCondition, idxDpt].
+    aryPar : np.array
+        Fitted parameters of the contrast response function, of the form
+        aryPar[idxRoi, idxIteration, idxDpt, idxParameter].
 
     Notes
     -----
@@ -122,6 +129,14 @@ def crf_par_perm_02(idxPrc, aryDpth01, aryDpth02, vecEmpX, strFunc, aryRnd,
     # List of arrays for residual variance:
     aryRes = np.zeros((varNumIn, varNumIt, varNumCon, varNumDpt))
 
+    # Array for fitted parameters (two for power function, three for
+    # hyperbolic ratio function):
+    if strFunc == 'power':
+        varNumPar = 2
+    elif strFunc == 'hyper':
+        varNumPar = 3
+    aryPar = np.zeros((varNumIn, varNumIt, varNumDpt, varNumPar))
+
     # Only print status messages if this is the first of several parallel
     # processes:
     if idxPrc == 0:
@@ -198,12 +213,14 @@ def crf_par_perm_02(idxPrc, aryDpth01, aryDpth02, vecEmpX, strFunc, aryRnd,
             (aryMdlY[0, idxIt, idxDpt, :],
              aryHlfMax[0, idxIt, idxDpt],
              arySemi[0, idxIt, idxDpt],
-             aryRes[0, idxIt, :, idxDpt]) = crf_fit(vecEmpX,
+             aryRes[0, idxIt, :, idxDpt],
+             aryPar[0, idxIt, idxDpt, :]) = crf_fit(vecEmpX,
                                                     aryDpthRnd[:, :, idxDpt],
                                                     strFunc=strFunc,
                                                     varNumX=varNumX,
                                                     varXmin=0.0,
-                                                    varXmax=1.0)
+                                                    varXmax=1.0,
+                                                    lgcPar=True)
 
         # ** Permutation group 2
 
@@ -226,14 +243,76 @@ def crf_par_perm_02(idxPrc, aryDpth01, aryDpth02, vecEmpX, strFunc, aryRnd,
             (aryMdlY[1, idxIt, idxDpt, :],
              aryHlfMax[1, idxIt, idxDpt],
              arySemi[1, idxIt, idxDpt],
-             aryRes[1, idxIt, :, idxDpt]) = crf_fit(vecEmpX,
+             aryRes[1, idxIt, :, idxDpt],
+             aryPar[1, idxIt, idxDpt, :]) = crf_fit(vecEmpX,
                                                     aryDpthRnd[:, :, idxDpt],
                                                     strFunc=strFunc,
                                                     varNumX=varNumX,
                                                     varXmin=0.0,
-                                                    varXmax=1.0)
+                                                    varXmax=1.0,
+                                                    lgcPar=True)
 
     # Output list:
-    lstOut = [idxPrc, aryMdlY, aryHlfMax, arySemi, aryRes]
+    lstOut = [idxPrc, aryMdlY, aryHlfMax, arySemi, aryRes, aryPar]
+
+    if queOut is None:
+        return lstOut
+    else:
+        queOut.put(lstOut)
+
+
+def init_perm(aryDpth01, aryDpth02, vecEmpX, strFunc):
+    """
+    Initialise worker process for CRF permutation testing.
+
+    Parameters
+    ----------
+    aryDpth01 : np.array
+        Depth profiles of first condition (see `crf_par_perm_02`).
+    aryDpth02 : np.array
+        Depth profiles of second condition (see `crf_par_perm_02`).
+    vecEmpX : np.array
+        Empirical x-values (see `crf_par_perm_02`).
+    strFunc : str
+        Which contrast response function to fit (see `crf_par_perm_02`).
+    """
+    dicPrm['aryDpth01'] = aryDpth01
+    dicPrm['aryDpth02'] = aryDpth02
+    dicPrm['vecEmpX'] = vecEmpX
+    dicPrm['strFunc'] = strFunc
+
+
+def crf_perm_chnk(tplChnk):
+    """
+    Permutation testing on contrast response function for a chunk.
+
+    Parameters
+    ----------
+    tplChnk : tuple
+        Index of the chunk, and randomisation array of the chunk (see
+        `crf_par_perm_02`).
+
+    Returns
+    -------
+    lstOut : list
+        Index of the chunk, and fitted parameters, responses at 50 percent
+        contrast, semisaturation contrasts & residuals of the chunk (see
+        `crf_par_perm_02`).
+
+    Notes
+    -----
+    Worker function for `crf_par_perm_01` (to be called in a process pool
+    initialised with `init_perm`). The modelled responses are not returned
+    (they can be calculated from the fitted parameters).
+    """
+    idxChnk, aryRnd = tplChnk
+
+    lstOut = crf_par_perm_02(idxChnk,
+                             dicPrm['aryDpth01'],
+                             dicPrm['aryDpth02'],
+                             dicPrm['vecEmpX'],
+                             dicPrm['strFunc'],
+                             aryRnd,
+                             1)
 
-    queOut.put(lstOut)
+    return [idxChnk, lstOut[5], lstOut[2], lstOut[3], lstOut[4]]
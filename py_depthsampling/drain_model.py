@@ -161,6 +161,16 @@ varCnfUp = 99.5
 varNseRndSd = 0.15
 # Extend of systematic noise (only relevant for model 5):
 varNseSys = 0.3
+# Number of random-noise iterations that are simulated at once (memory usage
+# depends on this number, not on the total number of iterations):
+varNumChnk = 1000
+# Seed for the random noise (for reproducible results; if `None`, numpy's
+# global random number generator is used):
+varSeed = None
+
+# Deconvolution at the native depth resolution of the data, without
+# interpolation to the five layers of the draining model (only models 1 & 2):
+lgcNtv = False
 
 # Parameters specific to 'model 6' (simulating underestimation of deep GM
 # signal):
@@ -223,5 +233,6 @@ for idxMtaCn in range(len(lstMetaCon)):  #noqa
                             varNseSys, lstFctr, varAcrSubsYmin01,
                             varAcrSubsYmax01, varAcrSubsYmin02,
                             varAcrSubsYmax02, tplPadY=tplPadY,
-                            varNumLblY=varNumLblY)
+                            varNumLblY=varNumLblY, varNumChnk=varNumChnk,
+                            varSeed=varSeed, lgcNtv=lgcNtv)
 # -----------------------------------------------------------------------------
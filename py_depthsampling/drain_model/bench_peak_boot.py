@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the peak position bootstrap of the draining model.
+
+Compares the vectorised bootstrap of peak positions (`boot_peak` with
+`lgcVec=True`) with the loop over iterations & conditions, as used in
+`drain_model_main` before, on synthetic single-subject depth profiles. Both
+versions use the same bootstrap samples. Run time, the number of iterations
+with a different peak position, and the percentiles of the peak positions
+are reported.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from py_depthsampling.drain_model.drain_model_peak import boot_peak
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Number of bootstrap iterations:
+varNumIt = 10000
+
+# Number of subjects, conditions, and depth levels:
+varNumSub = 10
+varNumCon = 4
+varNumDpth = 11
+
+# Noise level (SD of Gaussian noise added to single-subject profiles):
+varNse = 0.5
+
+# Percentiles of the peak positions:
+lstPrct = [2.5, 50.0, 97.5]
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Compare loop & vectorised bootstrap
+
+np.random.seed(0)
+
+# Synthetic depth profiles (Gaussian-shaped, with peaks at different depths
+# for the different conditions, plus noise):
+vecPos = np.linspace(0.0, 1.0, num=varNumDpth)
+vecPeak = np.linspace(0.4, 0.7, num=varNumCon)
+aryDpth = np.exp(np.divide(-np.square(np.subtract(vecPos[None, :],
+                                                  vecPeak[:, None])),
+                           0.1))
+aryDpth = np.add(aryDpth[None, :, :],
+                 np.multiply(np.random.randn(varNumSub, varNumCon,
+                                             varNumDpth),
+                             varNse))
+
+aryRnd = np.random.randint(0, high=varNumSub, size=(varNumIt, varNumSub))
+
+varTme01 = time.time()
+aryPks01 = boot_peak(aryDpth, aryRnd, lgcVec=False)
+varTme02 = time.time()
+aryPks02 = boot_peak(aryDpth, aryRnd, lgcVec=True)
+varTme03 = time.time()
+
+print(('-' + str(varNumIt) + ' iterations, ' + str(varNumCon)
+       + ' conditions, ' + str(varNumSub) + ' subjects'))
+print(('---Loop:       ' + str(np.around((varTme02 - varTme01), 3)) + ' s'))
+print(('---Vectorised: ' + str(np.around((varTme03 - varTme02), 3)) + ' s'))
+print(('---Speedup: '
+       + str(np.around(((varTme02 - varTme01) / (varTme03 - varTme02)), 1))))
+print(('---Iterations with different peak position: '
+       + str(np.sum(np.not_equal(aryPks01, aryPks02)))
+       + ' out of ' + str(aryPks01.size)))
+for idxCon in range(varNumCon):
+    vecPrct01 = np.percentile(aryPks01[idxCon, :], lstPrct)
+    vecPrct02 = np.percentile(aryPks02[idxCon, :], lstPrct)
+    print(('---Condition ' + str(idxCon) + ', percentiles '
+           + str(lstPrct) + ': ' + str(vecPrct02)
+           + ', identical: ' + str(np.array_equal(vecPrct01, vecPrct02))))
+# -----------------------------------------------------------------------------
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of depth profile resampling.
+
+Compares `resmpl` (cached cubic spline interpolation matrix) with
+`scipy.interpolate.griddata`, which was called separately for each depth
+profile in the draining model before. Depth profiles are downsampled from the
+empirical depth levels to the five layers of the draining model (V1 & V2
+layer positions), and upsampled back, as in `drain_model_main`. Reported
+is the run time of both methods (the results are compared in
+`tests/test_resmpl.py`).
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from scipy.interpolate import griddata
+from py_depthsampling.main.resmpl import resmpl
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Number of depth profiles (e.g. subjects * iterations * conditions):
+varNumPrf = 20000
+
+# Numbers of empirical depth levels:
+lstNumDpth = [5, 11, 50]
+
+# Layer positions of the draining model (V1, and V2 after Weber et al., 2008):
+dicPosMdl = {'v1': np.array([0.1, 0.25, 0.5, 0.8, 0.95]),
+             'v2': np.divide(np.array([160.0, 590.0, 1110.0, 1400.0, 1620.0]),
+                             1700.0)}
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Compare with griddata
+
+np.random.seed(0)
+
+for strRoi, vecPosMdl in dicPosMdl.items():
+    for varNumDpth in lstNumDpth:
+
+        print(('-' + strRoi.upper() + ', ' + str(varNumDpth)
+               + ' depth levels, ' + str(varNumPrf) + ' depth profiles'))
+
+        vecPosEmp = np.linspace(np.min(vecPosMdl), np.max(vecPosMdl),
+                                num=varNumDpth, endpoint=True)
+
+        aryDpth = np.add(np.random.randn(varNumPrf, varNumDpth),
+                         np.linspace(1.0, 3.0, num=varNumDpth)[None, :])
+
+        # Downsampling & upsampling with griddata (one call per profile):
+        varTme01 = time.time()
+        aryDwn01 = np.zeros((varNumPrf, 5))
+        aryUp01 = np.zeros((varNumPrf, varNumDpth))
+        for idxPrf in range(varNumPrf):
+            aryDwn01[idxPrf, :] = griddata(vecPosEmp, aryDpth[idxPrf, :],
+                                           vecPosMdl, method='cubic')
+            aryUp01[idxPrf, :] = griddata(vecPosMdl, aryDwn01[idxPrf, :],
+                                          vecPosEmp, method='cubic')
+        varTme02 = time.time()
+
+        # Downsampling & upsampling with cached interpolation matrices:
+        aryDwn02 = resmpl(aryDpth, vecPosEmp, vecPosMdl)
+        aryUp02 = resmpl(aryDwn02, vecPosMdl, vecPosEmp)
+        varTme03 = time.time()
+
+        print(('---griddata: ' + str(np.around((varTme02 - varTme01), 3))
+               + ' s'))
+        print(('---resmpl:   ' + str(np.around((varTme03 - varTme02), 4))
+               + ' s'))
+        print(('---Speedup: '
+               + str(np.around(((varTme02 - varTme01)
+                                / (varTme03 - varTme02)), 1))))
+# -----------------------------------------------------------------------------
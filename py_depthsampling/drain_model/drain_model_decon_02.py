@@ -19,6 +19,9 @@
 
 
 import numpy as np
+from py_depthsampling.drain_model.drain_model_op import drain_mat
+from py_depthsampling.drain_model.drain_model_op import drain_inv
+from py_depthsampling.drain_model.drain_model_op import drain_apply
 
 
 def deconv_02(varNumCon, aryEmp5):
@@ -37,6 +40,9 @@ def deconv_02(varNumCon, aryEmp5):
     aryEmp5 : np.array
         Two-dimensional array with depth profiles defined at 5 depth levels,
         separately for each condition: aryEmp5[condition, depthlevel].
+        Additional leading dimensions are possible (e.g. aryEmp5[subject,
+        condition, depthlevel]), in order to deconvolve the depth profiles
+        of several subjects at once.
 
     Returns
     -------
@@ -113,44 +119,17 @@ def deconv_02(varNumCon, aryEmp5):
 
     print('------Deconvolution - Model 2')
 
-    # Array for corrected depth profiles:
-    aryNrn = np.zeros(aryEmp5.shape)
-
-    # Subtraction of draining effect:
-    for idxCon in range(0, varNumCon):
-
-        # Layer VI:
-        aryNrn[idxCon, 0] = aryEmp5[idxCon, 0]
-
-        # Layer V:
-        aryNrn[idxCon, 1] = (aryEmp5[idxCon, 1]
-                             - (0.6 / 1.9) * aryNrn[idxCon, 0])
-
-        # Layer IV:
-        aryNrn[idxCon, 2] = (aryEmp5[idxCon, 2]
-                             - (0.3 / 1.5) * aryNrn[idxCon, 1]
-                             - (0.6 / 1.9) * aryNrn[idxCon, 0])
-
-        # Layer II/III:
-        aryNrn[idxCon, 3] = (aryEmp5[idxCon, 3]
-                             - (1.3 / 2.2) * aryNrn[idxCon, 2]
-                             - (0.3 / 1.5) * aryNrn[idxCon, 1]
-                             - (0.5 / 1.9) * aryNrn[idxCon, 0])
-
-        # Layer I:
-        aryNrn[idxCon, 4] = (aryEmp5[idxCon, 4]
-                             - (0.7 / 1.7) * aryNrn[idxCon, 3]
-                             - (1.3 / 2.2) * aryNrn[idxCon, 2]
-                             - (0.3 / 1.5) * aryNrn[idxCon, 1]
-                             - (0.5 / 1.9) * aryNrn[idxCon, 0])
-
     # Vector for layer-specific intensity correction (CBV fractions):
     vecCbv = np.array([1.9, 1.5, 2.2, 1.7, 1.6])
     # Normalise the vector to its maximum:
     # vecCbv = np.divide(vecCbv, np.max(vecCbv))
 
-    # Division (correction for different vascular density and/or haemodynamic
+    # Deconvolution operator: inverse of the draining matrix, followed by
+    # division (correction for different vascular density and/or haemodynamic
     # coupling):
-    aryNrn = np.divide(aryNrn, vecCbv[None, :])
+    aryOp = np.divide(drain_inv(drain_mat()), vecCbv[:, None])
+
+    # Deconvolution, for all depth profiles at once:
+    aryNrn = drain_apply(aryOp, aryEmp5)
 
     return aryNrn
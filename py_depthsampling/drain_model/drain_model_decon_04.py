@@ -18,7 +18,9 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-import numpy as np
+from py_depthsampling.drain_model.drain_model_op import drain_mat
+from py_depthsampling.drain_model.drain_model_op import drain_inv
+from py_depthsampling.drain_model.drain_model_op import drain_apply
 
 
 def deconv_04(varNumCon, aryEmp5, aryNseRnd):
@@ -37,6 +39,9 @@ def deconv_04(varNumCon, aryEmp5, aryNseRnd):
     aryEmp5 : np.array
         Two-dimensional array with depth profiles defined at 5 depth levels,
         separately for each condition: aryEmp5[condition, depthlevel].
+        Additional leading dimensions are possible (e.g. aryEmp5[subject,
+        condition, depthlevel]), in order to deconvolve the depth profiles
+        of several subjects at once.
 
     aryNseRnd : np.array
         Array with random noise. For example, random noise sampled from
@@ -47,7 +52,8 @@ def deconv_04(varNumCon, aryEmp5, aryNseRnd):
     -------
     aryNrnRnd : np.array
         Three-dimensional array with corrected depth profiles, of the form
-        aryNrn[idxIteration, idxCondition, idxDepth].
+        aryNrn[idxIteration, idxCondition, idxDepth] (preceded by the leading
+        dimensions of `aryEmp5`, if any).
 
     Notes
     -----
@@ -67,49 +73,15 @@ def deconv_04(varNumCon, aryEmp5, aryNseRnd):
 
     print('------Deconvolution - Model 4 (violation of model assumptions)')
 
-    # Number of random-noise iterations:
-    varNumIt = aryNseRnd.shape[0]
-
-    # Array for corrected depth profiles:
-    aryNrnRnd = np.zeros((varNumIt, aryEmp5.shape[0], aryEmp5.shape[1]))
-
-    # Layer VI:
-    aryNrnRnd[:, :, 0] = aryEmp5[None, :, 0]
-
-    # Layer V:
-    aryNrnRnd[:, :, 1] = (aryEmp5[None, :, 1]
-                          - ((0.6 / 1.9) * aryNrnRnd[:, :, 0]
-                             * aryNseRnd[:, :, 1])
-                          )
-
-    # Layer IV:
-    aryNrnRnd[:, :, 2] = (aryEmp5[None, :, 2]
-                          - ((0.3 / 1.5) * aryNrnRnd[:, :, 1]
-                             * aryNseRnd[:, :, 2])
-                          - ((0.6 / 1.9) * aryNrnRnd[:, :, 0]
-                             * aryNseRnd[:, :, 2])
-                          )
-
-    # Layer II/III:
-    aryNrnRnd[:, :, 3] = (aryEmp5[None, :, 3]
-                          - ((1.3 / 2.2) * aryNrnRnd[:, :, 2]
-                             * aryNseRnd[:, :, 3])
-                          - ((0.3 / 1.5) * aryNrnRnd[:, :, 1]
-                             * aryNseRnd[:, :, 3])
-                          - ((0.5 / 1.9) * aryNrnRnd[:, :, 0]
-                             * aryNseRnd[:, :, 3])
-                          )
-
-    # Layer I:
-    aryNrnRnd[:, :, 4] = (aryEmp5[:, 4]
-                          - ((0.7 / 1.7) * aryNrnRnd[:, :, 3]
-                             * aryNseRnd[:, :, 4])
-                          - ((1.3 / 2.2) * aryNrnRnd[:, :, 2]
-                             * aryNseRnd[:, :, 4])
-                          - ((0.3 / 1.5) * aryNrnRnd[:, :, 1]
-                             * aryNseRnd[:, :, 4])
-                          - ((0.5 / 1.9) * aryNrnRnd[:, :, 0]
-                             * aryNseRnd[:, :, 4])
-                          )
+    # Deconvolution operators with random error in the draining weights, of
+    # the form aryOp[idxIteration, idxCondition, idxDepth, idxDepth] (the
+    # draining weights into each layer are multiplied with the random noise
+    # of that layer; only the noise at the five model depth levels is
+    # used):
+    aryOp = drain_inv(drain_mat(aryNse=aryNseRnd[..., :5]))
+
+    # Deconvolution for all iterations at once (the iteration dimension is
+    # inserted before the condition dimension of the depth profiles):
+    aryNrnRnd = drain_apply(aryOp, aryEmp5[..., None, :, :])
 
     return aryNrnRnd
@@ -19,6 +19,9 @@
 
 
 import numpy as np
+from py_depthsampling.drain_model.drain_model_op import drain_mat
+from py_depthsampling.drain_model.drain_model_op import drain_inv
+from py_depthsampling.drain_model.drain_model_op import drain_apply
 
 
 def deconv_05(varNumCon, aryEmp5, aryNseRnd, varNseSys=0.2):
@@ -37,11 +40,16 @@ def deconv_05(varNumCon, aryEmp5, aryNseRnd, varNseSys=0.2):
     aryEmp5 : np.array
         Two-dimensional array with depth profiles defined at 5 depth levels,
         separately for each condition: aryEmp5[condition, depthlevel].
+        Additional leading dimensions are possible (e.g. aryEmp5[subject,
+        condition, depthlevel]), in order to deconvolve the depth profiles
+        of several subjects at once.
 
-    aryNseRnd : np.array
+    aryNseRnd : np.array or None
         Array with random noise. For example, random noise sampled from
         Gaussian distribution. Form of the array: aryNseRnd[varNumIt,
-        varNumCon, varNumDpth].
+        varNumCon, varNumDpth]. If `None`, only the deconvolution with
+        systematic noise is performed (e.g. if the random noise is simulated
+        separately, see `deconv_mc`).
 
     varNseSys : float
         Extend of systematic noise. For instance, if varNseSys = 0.2, then
@@ -49,17 +57,20 @@ def deconv_05(varNumCon, aryEmp5, aryNseRnd, varNseSys=0.2):
 
     Returns
     -------
-    aryNrnRnd : np.array
+    aryNrnRnd : np.array or None
         Three-dimensional array with depth profiles corrected after multiplying
         the weighting factor with random noise, of the form
-        aryNseNrn[idxIteration, idxCondition, idxDepth].
+        aryNseNrn[idxIteration, idxCondition, idxDepth] (preceded by the
+        leading dimensions of `aryEmp5`, if any). `None` if `aryNseRnd` is
+        `None`.
 
     aryNrnSys : np.array
         Three-dimensional array with depth profiles corrected after multiplying
         the weighting factor with systematic noise, of the form aryNseNrn[2,
         idxCondition, idxDepth]. The first dimension corresponds to using the
         negative and positive value of the noise factor, respectively (e.g.
-        -1.2 and 1.2 for a 20% systematic noise level).
+        -1.2 and 1.2 for a 20% systematic noise level). Preceded by the
+        leading dimensions of `aryEmp5`, if any.
 
     Notes
     -----
@@ -79,134 +90,32 @@ def deconv_05(varNumCon, aryEmp5, aryNseRnd, varNseSys=0.2):
 
     print('------Deconvolution - Model 5 (violation of model assumptions)')
 
-    # Number of random-noise iterations:
-    varNumIt = aryNseRnd.shape[0]
-
-    # Array for deconvolved depth profiles:
-    aryNrnRnd = np.zeros((varNumIt, aryEmp5.shape[0], aryEmp5.shape[1]))
-
-    # Layer VI:
-    aryNrnRnd[:, :, 0] = aryEmp5[None, :, 0]
-
-    # Layer V:
-    aryNrnRnd[:, :, 1] = (aryEmp5[None, :, 1]
-                          - ((0.6 / 1.9) * aryNrnRnd[:, :, 0]
-                             * aryNseRnd[:, :, 1])
-                          )
-
-    # Layer IV:
-    aryNrnRnd[:, :, 2] = (aryEmp5[None, :, 2]
-                          - ((0.3 / 1.5) * aryNrnRnd[:, :, 1]
-                             * aryNseRnd[:, :, 2])
-                          - ((0.6 / 1.9) * aryNrnRnd[:, :, 0]
-                             * aryNseRnd[:, :, 2])
-                          )
-
-    # Layer II/III:
-    aryNrnRnd[:, :, 3] = (aryEmp5[None, :, 3]
-                          - ((1.3 / 2.2) * aryNrnRnd[:, :, 2]
-                             * aryNseRnd[:, :, 3])
-                          - ((0.3 / 1.5) * aryNrnRnd[:, :, 1]
-                             * aryNseRnd[:, :, 3])
-                          - ((0.5 / 1.9) * aryNrnRnd[:, :, 0]
-                             * aryNseRnd[:, :, 3])
-                          )
-
-    # Layer I:
-    aryNrnRnd[:, :, 4] = (aryEmp5[:, 4]
-                          - ((0.7 / 1.7) * aryNrnRnd[:, :, 3]
-                             * aryNseRnd[:, :, 4])
-                          - ((1.3 / 2.2) * aryNrnRnd[:, :, 2]
-                             * aryNseRnd[:, :, 4])
-                          - ((0.3 / 1.5) * aryNrnRnd[:, :, 1]
-                             * aryNseRnd[:, :, 4])
-                          - ((0.5 / 1.9) * aryNrnRnd[:, :, 0]
-                             * aryNseRnd[:, :, 4])
-                          )
+    aryNrnRnd = None
+
+    if aryNseRnd is not None:
+
+        # Deconvolution operators with random error in the draining weights,
+        # of the form aryOp[idxIteration, idxCondition, idxDepth, idxDepth]
+        # (the draining weights into each layer are multiplied with the random
+        # noise of that layer; only the noise at the five model depth levels
+        # is used):
+        aryOp = drain_inv(drain_mat(aryNse=aryNseRnd[..., :5]))
+
+        # Deconvolution for all iterations at once (the iteration dimension is
+        # inserted before the condition dimension of the depth profiles):
+        aryNrnRnd = drain_apply(aryOp, aryEmp5[..., None, :, :])
 
     # *** Deconvolution with systematic noise
 
-    # Array for deconvolved depth profiles:
-    aryNrnSys = np.zeros((2, aryEmp5.shape[0], aryEmp5.shape[1]))
-
-    # Negative error factor:
-
-    # Layer VI:
-    aryNrnSys[0, :, 0] = aryEmp5[:, 0]
-
-    # Layer V:
-    aryNrnSys[0, :, 1] = (aryEmp5[:, 1]
-                          - ((0.6 / 1.9) * aryNrnSys[0, :, 0]
-                             * (1.0 - varNseSys))
-                          )
-    # Layer IV:
-    aryNrnSys[0, :, 2] = (aryEmp5[:, 2]
-                          - ((0.3 / 1.5) * aryNrnSys[0, :, 1]
-                             * (1.0 - varNseSys))
-                          - ((0.6 / 1.9) * aryNrnSys[0, :, 0]
-                             * (1.0 - varNseSys))
-                          )
-
-    # Layer II/III:
-    aryNrnSys[0, :, 3] = (aryEmp5[:, 3]
-                          - ((1.3 / 2.2) * aryNrnSys[0, :, 2]
-                             * (1.0 - varNseSys))
-                          - ((0.3 / 1.5) * aryNrnSys[0, :, 1]
-                             * (1.0 - varNseSys))
-                          - ((0.5 / 1.9) * aryNrnSys[0, :, 0]
-                             * (1.0 - varNseSys))
-                          )
-
-    # Layer I:
-    aryNrnSys[0, :, 4] = (aryEmp5[:, 4]
-                          - ((0.7 / 1.7) * aryNrnSys[0, :, 3]
-                             * (1.0 - varNseSys))
-                          - ((1.3 / 2.2) * aryNrnSys[0, :, 2]
-                             * (1.0 - varNseSys))
-                          - ((0.3 / 1.5) * aryNrnSys[0, :, 1]
-                             * (1.0 - varNseSys))
-                          - ((0.5 / 1.9) * aryNrnSys[0, :, 0]
-                             * (1.0 - varNseSys))
-                          )
-
-    # Positive error factor:
-
-    # Layer VI:
-    aryNrnSys[1, :, 0] = aryEmp5[:, 0]
-
-    # Layer V:
-    aryNrnSys[1, :, 1] = (aryEmp5[:, 1]
-                          - ((0.6 / 1.9) * aryNrnSys[1, :, 0]
-                             * (1.0 + varNseSys))
-                          )
-    # Layer IV:
-    aryNrnSys[1, :, 2] = (aryEmp5[:, 2]
-                          - ((0.3 / 1.5) * aryNrnSys[1, :, 1]
-                             * (1.0 + varNseSys))
-                          - ((0.6 / 1.9) * aryNrnSys[1, :, 0]
-                             * (1.0 + varNseSys))
-                          )
-
-    # Layer II/III:
-    aryNrnSys[1, :, 3] = (aryEmp5[:, 3]
-                          - ((1.3 / 2.2) * aryNrnSys[1, :, 2]
-                             * (1.0 + varNseSys))
-                          - ((0.3 / 1.5) * aryNrnSys[1, :, 1]
-                             * (1.0 + varNseSys))
-                          - ((0.5 / 1.9) * aryNrnSys[1, :, 0]
-                             * (1.0 + varNseSys))
-                          )
-
-    # Layer I:
-    aryNrnSys[1, :, 4] = (aryEmp5[:, 4]
-                          - ((0.7 / 1.7) * aryNrnSys[1, :, 3]
-                             * (1.0 + varNseSys))
-                          - ((1.3 / 2.2) * aryNrnSys[1, :, 2]
-                             * (1.0 + varNseSys))
-                          - ((0.3 / 1.5) * aryNrnSys[1, :, 1]
-                             * (1.0 + varNseSys))
-                          - ((0.5 / 1.9) * aryNrnSys[1, :, 0]
-                             * (1.0 + varNseSys))
-                          )
+    # Error factors of the negative and positive systematic error, of the
+    # form aryNseSys[2, idxDepth]:
+    aryNseSys = np.array([np.full(5, (1.0 - varNseSys)),
+                          np.full(5, (1.0 + varNseSys))])
+
+    # Deconvolution operators, of the form aryOp[2, idxDepth, idxDepth]:
+    aryOp = drain_inv(drain_mat(aryNse=aryNseSys))
+
+    # Deconvolution with both operators at once:
+    aryNrnSys = drain_apply(aryOp[:, None, :, :], aryEmp5[..., None, :, :])
 
     return aryNrnRnd, aryNrnSys
@@ -19,6 +19,9 @@
 
 
 import numpy as np
+from py_depthsampling.drain_model.drain_model_op import drain_mat
+from py_depthsampling.drain_model.drain_model_op import drain_inv
+from py_depthsampling.drain_model.drain_model_op import drain_apply
 
 
 def deconv_06(varNumCon, aryEmp5, lstFctr):
@@ -37,6 +40,9 @@ def deconv_06(varNumCon, aryEmp5, lstFctr):
     aryEmp5 : np.array
         Two-dimensional array with depth profiles defined at 5 depth levels,
         separately for each condition: aryEmp5[condition, depthlevel].
+        Additional leading dimensions are possible (e.g. aryEmp5[subject,
+        condition, depthlevel]), in order to deconvolve the depth profiles
+        of several subjects at once.
 
     lstFctr : list
         List of fractions of underestimation of empirical deep GM signal. For
@@ -53,7 +59,8 @@ def deconv_06(varNumCon, aryEmp5, lstFctr):
         idxCondition, idxDepth]. The first dimension corresponds to the
         weighting factor (for instance, if three weighting factors will be
         provided, like `lstFctr=[0.1, 0.2, 0.3]`, there will be three values
-        along this dimensions).
+        along this dimensions). Preceded by the leading dimensions of
+        `aryEmp5`, if any.
 
     Notes
     -----
@@ -81,37 +88,19 @@ def deconv_06(varNumCon, aryEmp5, lstFctr):
     # Number of scaling factors:
     varNumFct = len(lstFctr)
 
-    # Array for deconvolved depth profiles:
-    aryNrn = np.zeros((varNumFct, aryEmp5.shape[0], aryEmp5.shape[1]))
-
-    # Loop through deep-GM-signal-intensity-scaling-factors:
-    for idxFctr in range(varNumFct):
-
-        # Layer VI:
-        aryNrn[idxFctr, :, 0] = np.multiply(aryEmp5[:, 0],
-                                            (lstFctr[idxFctr] + 1.0)
-                                            )
-
-        # Layer V:
-        aryNrn[idxFctr, :, 1] = (aryEmp5[:, 1]
-                                 - (0.6 / 1.9) * aryNrn[idxFctr, :, 0])
-
-        # Layer IV:
-        aryNrn[idxFctr, :, 2] = (aryEmp5[:, 2]
-                                 - (0.3 / 1.5) * aryNrn[idxFctr, :, 1]
-                                 - (0.6 / 1.9) * aryNrn[idxFctr, :, 0])
-
-        # Layer II/III:
-        aryNrn[idxFctr, :, 3] = (aryEmp5[:, 3]
-                                 - (1.3 / 2.2) * aryNrn[idxFctr, :, 2]
-                                 - (0.3 / 1.5) * aryNrn[idxFctr, :, 1]
-                                 - (0.5 / 1.9) * aryNrn[idxFctr, :, 0])
-
-        # Layer I:
-        aryNrn[idxFctr, :, 4] = (aryEmp5[:, 4]
-                                 - (0.7 / 1.7) * aryNrn[idxFctr, :, 3]
-                                 - (1.3 / 2.2) * aryNrn[idxFctr, :, 2]
-                                 - (0.3 / 1.5) * aryNrn[idxFctr, :, 1]
-                                 - (0.5 / 1.9) * aryNrn[idxFctr, :, 0])
+    # Scaling of the empirical signal (deep GM signal multiplied by the
+    # factor, other depth levels unchanged), of the form aryScl[idxFctr,
+    # idxDepth]:
+    aryScl = np.ones((varNumFct, 5))
+    aryScl[:, 0] = np.add(lstFctr, 1.0)
+
+    # Deconvolution operators, of the form aryOp[idxFctr, idxDepth,
+    # idxDepth]. The scaling is applied before the removal of the draining
+    # effect (i.e. to the columns of the inverse draining matrix):
+    aryOp = np.multiply(drain_inv(drain_mat())[None, :, :],
+                        aryScl[:, None, :])
+
+    # Deconvolution with all factors at once:
+    aryNrn = drain_apply(aryOp[:, None, :, :], aryEmp5[..., None, :, :])
 
     return aryNrn
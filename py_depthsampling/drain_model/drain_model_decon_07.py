@@ -19,6 +19,7 @@
 
 
 import numpy as np
+from py_depthsampling.drain_model.drain_model_op import drain_apply
 
 
 def deconv_07(varNumCon, aryEmp5):
@@ -37,6 +38,9 @@ def deconv_07(varNumCon, aryEmp5):
     aryEmp5 : np.array
         Two-dimensional array with depth profiles defined at 5 depth levels,
         separately for each condition: aryEmp5[condition, depthlevel].
+        Additional leading dimensions are possible (e.g. aryEmp5[subject,
+        condition, depthlevel]), in order to deconvolve the depth profiles
+        of several subjects at once.
 
     Returns
     -------
@@ -97,21 +101,8 @@ def deconv_07(varNumCon, aryEmp5):
     # PSF from layer I:
     aryPsf[4, :] = [1.0, 1.0, 1.0, 1.0, 1.6]
 
-    # Array for deconvolved depth profiles:
-    aryNrn = np.zeros((varNumCon, 5))
-
-    # Loop through conditions and apply deconvolution:
-    for idxCon in range(varNumCon):
-
-        aryNrn[idxCon, :] = np.matmul(
-                                      np.linalg.inv(aryPsf),
-                                      aryEmp5[idxCon, :].reshape((5, 1))
-                                      ).flatten()
-
-        # varRatio = np.divide(aryEmp5[idxCon, 0], aryNrn[idxCon, 0])
-        # aryNrn[idxCon, :] = np.multiply(aryNrn[idxCon, :], varRatio)
-        
-        # varDiff = np.subtract(aryEmp5[idxCon, 0], aryNrn[idxCon, 0])
-        # aryNrn[idxCon, :] = np.add(aryNrn[idxCon, :], varDiff)
+    # Deconvolution operator (inverse of the PSF matrix), applied to all
+    # depth profiles at once:
+    aryNrn = drain_apply(np.linalg.inv(aryPsf), aryEmp5)
 
     return aryNrn
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Deconvolution of depth profiles at their native number of depth levels."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+from py_depthsampling.drain_model.drain_model_op import drain_prm
+from py_depthsampling.drain_model.drain_model_op import drain_fwd
+from py_depthsampling.drain_model.drain_model_op import drain_inv
+from py_depthsampling.drain_model.drain_model_op import drain_apply
+
+
+def deconv_ntv(aryEmp, varMdl=1, strRoi='v1', vecEdgDpth=None, vecLcl=None,
+               aryDrn=None):
+    """
+    Deconvolution of GE fMRI depth profiles at native depth resolution.
+
+    Parameters
+    ----------
+    aryEmp : np.array
+        Depth profiles, of the form aryEmp[..., idxDepth] (any number of
+        leading dimensions, e.g. aryEmp[idxSubject, idxCondition, idxDepth]).
+    varMdl : int
+        Draining model, 1 (removal of draining effect, local signal as in
+        `deconv_01`) or 2 (additional division by the local signal, as in
+        `deconv_02`).
+    strRoi : str
+        Region of interest ('v1', 'v2', or 'v3'), determines the layer
+        boundaries (see `drain_prm`).
+    vecEdgDpth : np.array or None
+        Relative depth of the boundaries of the depth levels (N + 1 values
+        for N depth levels, e.g. derived from the positions of the depth
+        levels with `drain_edg`). If `None`, the depth profiles are assumed
+        to be sampled at N equi-volume depth levels that cover the entire
+        cortical depth.
+    vecLcl : np.array or None
+        Local signal of each layer, of the form vecLcl[..., idxLayer]. If
+        `None`, the values of Markuerkiaga et al. (2016) are used.
+    aryDrn : np.array or None
+        Draining weights, of the form aryDrn[..., idxTargetLayer,
+        idxSourceLayer]. If `None`, the values of Markuerkiaga et al. (2016)
+        are used.
+
+    Returns
+    -------
+    aryNrn : np.array
+        Deconvolved depth profiles, of the form aryNrn[..., idxDepth]. If a
+        stack of parameters is given (leading dimensions of `vecLcl` or
+        `aryDrn`), these are broadcast against the leading dimensions of
+        `aryEmp` (e.g. aryEmp[idxSubject, None, idxCondition, idxDepth] &
+        vecLcl[idxParameter, None, idxLayer]).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. The draining model is derived
+    directly for the depth levels of the data (see `drain_fwd`), so that the
+    depth profiles do not need to be downsampled to the five layers of the
+    model, and upsampled again after deconvolution. If the depth levels
+    coincide with the layers (`vecEdgDpth` equal to the layer boundaries),
+    the results are the same as those of `deconv_01` & `deconv_02`.
+    """
+    if (varMdl != 1) and (varMdl != 2):
+        raise ValueError(('Deconvolution at native depth resolution is only '
+                          + 'implemented for models 1 & 2.'))
+
+    print(('------Deconvolution - Model ' + str(varMdl)
+           + ' (native depth resolution)'))
+
+    vecEdgLyr, vecLclDef, aryDrnDef = drain_prm(strRoi=strRoi)
+    if vecLcl is None:
+        vecLcl = vecLclDef
+    if aryDrn is None:
+        aryDrn = aryDrnDef
+
+    if vecEdgDpth is None:
+        vecEdgDpth = np.linspace(0.0, 1.0, num=(aryEmp.shape[-1] + 1),
+                                 endpoint=True)
+
+    # Forward model, and local signal at each depth level:
+    aryFwd = drain_fwd(vecEdgDpth, vecEdgLyr, vecLcl, aryDrn)
+    aryLcl = np.diagonal(aryFwd, axis1=-2, axis2=-1)
+
+    # Deconvolution operator (inverse of the unit lower triangular draining
+    # matrix, as for the five-layer model):
+    aryOp = drain_inv(np.divide(aryFwd, aryLcl[..., None, :]))
+
+    # Division by the local signal (model 2):
+    if varMdl == 2:
+        aryOp = np.divide(aryOp, aryLcl[..., :, None])
+
+    # Deconvolution, for all depth profiles at once:
+    aryNrn = drain_apply(aryOp, aryEmp)
+
+    return aryNrn
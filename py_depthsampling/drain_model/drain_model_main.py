@@ -19,25 +19,55 @@
 
 
 import numpy as np
-from scipy.interpolate import griddata
 from py_depthsampling.plot.plt_dpth_prfl import plt_dpth_prfl
 from py_depthsampling.plot.plt_dpth_prfl_acr_subs import plt_dpth_prfl_acr_subs
 from py_depthsampling.drain_model.drain_model_decon_01 import deconv_01
 from py_depthsampling.drain_model.drain_model_decon_02 import deconv_02
 from py_depthsampling.drain_model.drain_model_decon_03 import deconv_03
-from py_depthsampling.drain_model.drain_model_decon_04 import deconv_04
 from py_depthsampling.drain_model.drain_model_decon_05 import deconv_05
 from py_depthsampling.drain_model.drain_model_decon_06 import deconv_06
 from py_depthsampling.drain_model.drain_model_decon_07 import deconv_07
-from py_depthsampling.main.find_peak import find_peak
+from py_depthsampling.drain_model.drain_model_decon_ntv import deconv_ntv
+from py_depthsampling.drain_model.drain_model_mc import deconv_mc
+from py_depthsampling.drain_model.drain_model_op import drain_edg
+from py_depthsampling.drain_model.drain_model_op import drain_pos
+from py_depthsampling.drain_model.drain_model_peak import boot_peak
+from py_depthsampling.main.resmpl import resmpl
 
 
 def drain_model(varMdl, strRoi, strHmsph, strPthPrf, strPthPrfOt, strPthPltOt,  #noqa
                 strFlTp, varDpi, strXlabel, strYlabel, lstCon, lstConLbl,
                 varNumIt, varCnfLw, varCnfUp, varNseRndSd, varNseSys, lstFctr,
                 varAcrSubsYmin01, varAcrSubsYmax01, varAcrSubsYmin02,
-                varAcrSubsYmax02, tplPadY=(0.4, 0.1), varNumLblY=5):
-    """Model-based correction of draining effect."""
+                varAcrSubsYmax02, tplPadY=(0.4, 0.1), varNumLblY=5,
+                varNumChnk=1000, varSeed=None, lgcNtv=False,
+                lgcBooVec=True):
+    """
+    Model-based correction of draining effect.
+
+    Notes
+    -----
+    For models 4 & 5, the random-noise iterations are simulated in chunks of
+    `varNumChnk` iterations, and only the mean & percentiles across
+    iterations are kept (see `deconv_mc`), so that memory usage does not
+    depend on `varNumIt`. If `varSeed` is not `None`, the random noise is
+    drawn from a random number generator with this seed (reproducible runs).
+
+    If `lgcNtv` is `True` (only models 1 & 2; ignored otherwise), the
+    draining model is derived for the equi-volume depth levels of the data
+    (at the same positions as for the five-layer model, see `deconv_ntv` &
+    `drain_edg`), instead of downsampling the depth profiles to the
+    five layers of the model and upsampling the deconvolution results.
+
+    If `lgcBooVec` is `True`, the peak positions in the bootstrapped
+    across-subjects mean depth profiles are identified for all iterations &
+    conditions at once (see `boot_peak`).
+    """
+    if lgcNtv and (varMdl != 1) and (varMdl != 2):
+        print(('---Deconvolution at native depth resolution is only '
+               + 'implemented for models 1 & 2, using five-layer model.'))
+        lgcNtv = False
+
     # -------------------------------------------------------------------------
     # *** Load depth profile from disk
 
@@ -121,228 +151,142 @@ def drain_model(varMdl, strRoi, strHmsph, strPthPrf, strPthPrfOt, strPthPltOt,
     # varNumDpth = aryEmpSnSb.shape[2]
 
     # -------------------------------------------------------------------------
-    # *** Subject-by-subject deconvolution
-
-    print('---Subject-by-subject deconvolution')
-
-    # Array for single-subject interpolation result (before deconvolution):
-    aryEmp5SnSb = np.zeros((varNumSub, varNumCon, 5))
-
-    if (varMdl != 4) and (varMdl != 5) and (varMdl != 6):
-        # Array for single-subject deconvolution result (defined at 5 depth
-        # levels):
-        aryDecon5 = np.zeros((varNumSub, varNumCon, 5))
-        # Array for deconvolution results in equi-volume space:
-        aryDecon = np.zeros((varNumSub, varNumCon, varNumDpth))
-
-    elif (varMdl == 4) or (varMdl == 5):
-        # The array for single-subject deconvolution result has an additional
-        # dimension in case of model 4 (number of iterations):
-        aryDecon5 = np.zeros((varNumSub, varNumIt, varNumCon, 5))
-        # Array for deconvolution results in equi-volume space:
-        aryDecon = np.zeros((varNumSub, varNumIt, varNumCon, varNumDpth))
-        # Generate random noise for model 4:
-        aryNseRnd = np.random.randn(varNumIt, varNumCon, varNumDpth)
-        # Scale variance:
-        aryNseRnd = np.multiply(aryNseRnd, varNseRndSd)
-        # Centre at one:
-        aryNseRnd = np.add(aryNseRnd, 1.0)
-
-    if varMdl == 5:
-        # Additional array for deconvolution results with systematic error,
-        # defined at 5 depth levels:
-        arySys5 = np.zeros((varNumSub, 2, varNumCon, 5))
-        # Array for deconvolutino results with systematic error, defined at
-        # empirical depth levels:
-        arySys = np.zeros((varNumSub, 2, varNumCon, varNumDpth))
-
-    if varMdl == 6:
-        # Array for single-subject deconvolution result (defined at 5 depth
-        # levels):
-        aryDecon5 = np.zeros((varNumSub, len(lstFctr), varNumCon, 5))
-        # Array for deconvolution results in equi-volume space:
-        aryDecon = np.zeros((varNumSub, len(lstFctr), varNumCon, varNumDpth))
-
-    for idxSub in range(0, varNumSub):
-
-        # ---------------------------------------------------------------------
-        # *** Interpolation (downsampling)
-
-        # The empirical depth profiles are defined at more depth levels than
-        # the draining model. We downsample the empirical depth profiles to the
-        # number of depth levels of the model.
-
-        # The relative thickness of the layers differs between V1 & V2.
-        if strRoi == 'v1':
-            print('------Interpolation - V1')
-            # Relative thickness of the layers (layer VI, 20%; layer V, 10%;
-            # layer IV, 40%; layer II/III, 20%; layer I, 10%; Markuerkiaga et
-            # al. 2016). lstThck = [0.2, 0.1, 0.4, 0.2, 0.1]
-            # From the relative thickness, we derive the relative position of
-            # the layers (we set the position of each layer to the sum of all
-            # lower layers plus half  its own thickness):
-            vecPosMdl = np.array([0.1, 0.25, 0.5, 0.8, 0.95])
-
-        elif (strRoi == 'v2') or ((strRoi == 'v3')):
-            print('------Interpolation - V2/V3')
-            # Relative position of the layers, accordign to Weber et al., 2008,
-            # Figure 5C, p. 2322. Their data is on 'extrastriate cortex', from
-            # V2 to V5. We start with the absolute depth:
-            vecPosMdl = np.array([160.0, 590.0, 1110.0, 1400.0, 1620.0])
-            # Divide by overall thickness (1.7 mm):
-            vecPosMdl = np.divide(vecPosMdl, 1700.0)
-
-        # Position of empirical datapoints:
-        vecPosEmp = np.linspace(np.min(vecPosMdl),
-                                np.max(vecPosMdl),
-                                num=varNumDpth,
-                                endpoint=True)
-
-        # Vector for downsampled empirical depth profiles:
-        aryEmp5 = np.zeros((varNumCon, 5))
-
-        # Loop through conditions and downsample the depth profiles:
-        for idxCon in range(0, varNumCon):
-            # Interpolation:
-            aryEmp5[idxCon] = griddata(vecPosEmp,
-                                       aryEmpSnSb[idxSub, idxCon, :],
-                                       vecPosMdl,
-                                       method='cubic')
-
-        # Put interpolation result for this subject into the array:
-        aryEmp5SnSb[idxSub, :, :] = np.copy(aryEmp5)
-
-        # ---------------------------------------------------------------------
-        # *** Subtraction of draining effect
-
-        # (1) Deconvolution based on Markuerkiaga et al. (2016).
-        if varMdl == 1:
-            aryDecon5[idxSub, :, :] = deconv_01(varNumCon,
-                                                aryEmp5SnSb[idxSub, :, :])
-
-        # (2) Deconvolution based on Markuerkiaga et al. (2016) & scaling based
-        #     on Markuerkiaga et al. (2016).
-        elif varMdl == 2:
-            aryDecon5[idxSub, :, :] = deconv_02(varNumCon,
-                                                aryEmp5SnSb[idxSub, :, :])
-
-        # (3) Deconvolution based on Markuerkiaga et al. (2016) & scaling based
-        #     on Weber et al. (2008).
-        elif varMdl == 3:
-            aryDecon5[idxSub, :, :] = deconv_03(varNumCon,
-                                                aryEmp5SnSb[idxSub, :, :],
-                                                strRoi=strRoi)
-
-        # (4) Deconvolution based on Markuerkiaga et al. (2016), with random
-        #     error.
-        elif varMdl == 4:
-                aryDecon5[idxSub, :, :, :] = deconv_04(varNumCon,
-                                                       aryEmp5,
-                                                       aryNseRnd)
-
-        # (5) Deconvolution based on Markuerkiaga et al. (2016), with random
-        #     and systematic error.
-        elif varMdl == 5:
-                aryDecon5[idxSub, :, :, :], arySys5[idxSub, :, :, :] = \
-                    deconv_05(varNumCon, aryEmp5, aryNseRnd, varNseSys)
-
-        # (6) Deconvolution based on Markuerkiaga et al. (2016), with deep GM
-        #     signal scaling factor.
-        elif varMdl == 6:
-                aryDecon5[idxSub, :, :, :] = \
-                    deconv_06(varNumCon, aryEmp5, lstFctr)
-
-        # (7) Deconvolution based on Markuerkiaga et al. (2016); same as (1),
-        #     but using matrix inversion instead of iterative subtraction.
-        if varMdl == 7:
-            aryDecon5[idxSub, :, :] = deconv_07(varNumCon,
-                                                aryEmp5SnSb[idxSub, :, :])
-
-        # ---------------------------------------------------------------------
-        # *** Interpolation
-
-        # The original depth profiles were in 'equi-volume' space, and needed
-        # to be downsampled in order to apply the deconvolution (because the
-        # deconvolution model is defined at a lower number of depth levels than
-        # the equivolume space). Here, the results of the deconvolution are
-        # brought back into equivolume space. This is advantageous for the
-        # creation of depth plots (equal spacing of data points on x-axis), and
-        # for the calculation of peak positions (no additional information
-        # about relative position of datapoints needs to be passed on).
-
-        # Sampling points for equi-volume space:
-        vecIntpEqui = np.linspace(np.min(vecPosMdl),
-                                  np.max(vecPosMdl),
-                                  num=varNumDpth,
-                                  endpoint=True)
-
-        if (varMdl != 4) and (varMdl != 5) and (varMdl != 6):
-
-            # Loop through conditions:
-            for idxCon in range(0, varNumCon):
+    # *** Interpolation (downsampling)
 
-                # Interpolation back into equi-volume space:
-                aryDecon[idxSub, idxCon, :] = griddata(vecPosMdl,
-                                                       aryDecon5[idxSub,
-                                                                 idxCon,
-                                                                 :],
-                                                       vecIntpEqui,
-                                                       method='cubic')
+    print('---Interpolation (all subjects)')
 
-        elif (varMdl == 4) or (varMdl == 5):
+    # The empirical depth profiles are defined at more depth levels than the
+    # draining model. We downsample the empirical depth profiles to the number
+    # of depth levels of the model.
 
-            # Loop through iterations:
-            for idxIt in range(0, varNumIt):
+    # Relative position of the layers (the relative thickness of the layers
+    # differs between V1 & V2/V3, see `drain_pos`):
+    vecPosMdl = drain_pos(strRoi=strRoi)
 
-                # Loop through conditions:
-                for idxCon in range(0, varNumCon):
+    # Position of empirical datapoints:
+    vecPosEmp = np.linspace(np.min(vecPosMdl),
+                            np.max(vecPosMdl),
+                            num=varNumDpth,
+                            endpoint=True)
 
-                    # Interpolation back into equi-volume space:
-                    aryDecon[idxSub, idxIt, idxCon, :] = \
-                        griddata(vecPosMdl,
-                                 aryDecon5[idxSub, idxIt, idxCon, :],
-                                 vecIntpEqui,
-                                 method='cubic')
+    # Downsample the depth profiles of all subjects and conditions at once
+    # (cubic spline interpolation, with a cached interpolation matrix), array
+    # of the form aryEmp5SnSb[idxSub, idxCon, idxDpth]. Not needed if the
+    # deconvolution is performed at the native depth resolution.
+    if not lgcNtv:
+        aryEmp5SnSb = resmpl(aryEmpSnSb, vecPosEmp, vecPosMdl)
 
-        # For model 5, also resample systematic error term:
-        if varMdl == 5:
-
-            # Loop through conditions:
-            for idxCon in range(0, varNumCon):
-
-                # Interpolation for lower limit of systematic error term:
-                arySys[idxSub, 0, idxCon, :] = \
-                    griddata(vecPosMdl,
-                             arySys5[idxSub, 0, idxCon, :],
-                             vecIntpEqui,
-                             method='cubic')
-
-                # Interpolation for upper limit of systematic error term:
-                arySys[idxSub, 1, idxCon, :] = \
-                    griddata(vecPosMdl,
-                             arySys5[idxSub, 1, idxCon, :],
-                             vecIntpEqui,
-                             method='cubic')
-
-        # For model 6, loop through deep-GM-signal-intensity-scaling-factors:
-        if varMdl == 6:
+    # -------------------------------------------------------------------------
+    # *** Subtraction of draining effect
+
+    # The deconvolution models are linear operators, which are applied to the
+    # depth profiles of all subjects at once. Form of the deconvolution
+    # results (defined at 5 depth levels):
+    # - Models 1, 2, 3, 7: aryDecon5[idxSub, idxCon, idxDpth]
+    # - Model 6: aryDecon5[idxSub, idxFctr, idxCon, idxDpth]
+    # The random error of models 4 & 5 is simulated separately (see below).
+
+    print('---Deconvolution (all subjects)')
+
+    # (1) & (2) at native depth resolution, the deconvolution results are
+    #     defined at the empirical depth levels (aryDecon[idxSub, idxCon,
+    #     idxDpth]). As for the five-layer model, the empirical depth levels
+    #     are placed at `vecPosEmp` (from the centre of the deepest to the
+    #     centre of the most superficial layer), and the boundaries between
+    #     them half way between these positions.
+    if lgcNtv:
+        aryDecon = deconv_ntv(aryEmpSnSb, varMdl=varMdl, strRoi=strRoi,
+                              vecEdgDpth=drain_edg(vecPosEmp))
+
+    # (1) Deconvolution based on Markuerkiaga et al. (2016).
+    elif varMdl == 1:
+        aryDecon5 = deconv_01(varNumCon, aryEmp5SnSb)
+
+    # (2) Deconvolution based on Markuerkiaga et al. (2016) & scaling based on
+    #     Markuerkiaga et al. (2016).
+    elif varMdl == 2:
+        aryDecon5 = deconv_02(varNumCon, aryEmp5SnSb)
+
+    # (3) Deconvolution based on Markuerkiaga et al. (2016) & scaling based on
+    #     Weber et al. (2008).
+    elif varMdl == 3:
+        aryDecon5 = deconv_03(varNumCon, aryEmp5SnSb, strRoi=strRoi)
+
+    # (5) Deconvolution based on Markuerkiaga et al. (2016), with random and
+    #     systematic error. Here, only the systematic error term is
+    #     calculated, of the form arySys5[idxSub, 2, idxCon, idxDpth].
+    elif varMdl == 5:
+        _, arySys5 = deconv_05(varNumCon, aryEmp5SnSb, None, varNseSys)
 
-            # The array now has the form: aryDecon[idxSub, idxFctr, idxCon,
-            # idxDepth], where idxFctr corresponds to the
-            # deep-GM-signal-intensity-scaling-factors.
+    # (6) Deconvolution based on Markuerkiaga et al. (2016), with deep GM
+    #     signal scaling factor.
+    elif varMdl == 6:
+        aryDecon5 = deconv_06(varNumCon, aryEmp5SnSb, lstFctr)
 
-            # Loop through factors:
-            for idxFctr in range(len(lstFctr)):
+    # (7) Deconvolution based on Markuerkiaga et al. (2016); same as (1), but
+    #     using matrix inversion instead of iterative subtraction.
+    elif varMdl == 7:
+        aryDecon5 = deconv_07(varNumCon, aryEmp5SnSb)
 
-                # Loop through conditions:
-                for idxCon in range(varNumCon):
+    # -------------------------------------------------------------------------
+    # *** Interpolation
+
+    # The original depth profiles were in 'equi-volume' space, and needed to be
+    # downsampled in order to apply the deconvolution (because the
+    # deconvolution model is defined at a lower number of depth levels than
+    # the equivolume space). Here, the results of the deconvolution are
+    # brought back into equivolume space. This is advantageous for the
+    # creation of depth plots (equal spacing of data points on x-axis), and
+    # for the calculation of peak positions (no additional information about
+    # relative position of datapoints needs to be passed on).
+
+    # Sampling points for equi-volume space:
+    vecIntpEqui = np.linspace(np.min(vecPosMdl),
+                              np.max(vecPosMdl),
+                              num=varNumDpth,
+                              endpoint=True)
+
+    # Interpolation back into equi-volume space, for all depth profiles at
+    # once (i.e. subjects, conditions, and - for model 6 - scaling factors).
+    # The deconvolution results in equi-volume space have the same form as
+    # the deconvolution results, but are defined at the empirical depth
+    # levels.
+    if (varMdl != 4) and (varMdl != 5) and (not lgcNtv):
+        aryDecon = resmpl(aryDecon5, vecPosMdl, vecIntpEqui)
+
+    # For model 5, also resample systematic error term, of the form
+    # arySys[idxSub, 2, idxCon, idxDpth]:
+    if varMdl == 5:
+        arySys = resmpl(arySys5, vecPosMdl, vecIntpEqui)
 
-                    # Interpolation back into equi-volume space:
-                    aryDecon[idxSub, idxFctr, idxCon, :] = \
-                        griddata(vecPosMdl,
-                                 aryDecon5[idxSub, idxFctr, idxCon, :],
-                                 vecIntpEqui,
-                                 method='cubic')
+    # -------------------------------------------------------------------------
+    # *** Random error (models 4 & 5)
+
+    if (varMdl == 4) or (varMdl == 5):
+
+        print(('------Deconvolution - Model ' + str(varMdl)
+               + ' (violation of model assumptions), '
+               + str(varNumIt) + ' random-noise iterations'))
+
+        # For models 4 & 5, we are interested in the variance across
+        # random-noise iterations, not across subjects. Because the same
+        # random noise is used for all subjects, and because deconvolution &
+        # interpolation are linear, we can simulate the random error on the
+        # across-subjects mean. The iterations are simulated in chunks, and
+        # only the mean & percentiles across iterations are kept, of the form
+        # aryRndMne[idxCon, idxDpth] & aryRndPrct[idxPrct, idxCon, idxDpth].
+        if varMdl == 4:
+            vecPrct = [2.5, 97.5]
+        else:
+            vecPrct = [varCnfLw, varCnfUp]
+        aryRndMne, aryRndPrct = deconv_mc(np.mean(aryEmp5SnSb, axis=0),
+                                          vecPosMdl,
+                                          vecIntpEqui,
+                                          varNumIt,
+                                          varNseRndSd,
+                                          vecPrct,
+                                          varNumChnk=varNumChnk,
+                                          varSeed=varSeed)
 
     # -------------------------------------------------------------------------
     # *** Save corrected depth profiles
@@ -393,53 +337,26 @@ def drain_model(varMdl, strRoi, strHmsph, strPthPrf, strPthPrfOt, strPthPltOt,
 
             if idxDec == 0:
                 print('------UNCORRECTED')
+                aryTmp = aryEmpSnSb
 
             if idxDec == 1:
                 print('------CORRECTED')
+                aryTmp = aryDecon
 
-            # Array for peak positins before deconvolution, of the form
-            # aryPks01[idxCondition, idxIteration]
-            aryPks01 = np.zeros((2, varNumCon, varNumIt))
-
-            # Array for actual bootstrap samples:
-            aryBoo = np.zeros((varNumIt, varNumDpth))
+            # Peak positions in the bootstrap samples, for all conditions, of
+            # the form aryPks01[idxCondition, idxIteration]:
+            aryPks01 = boot_peak(aryTmp, aryRnd, varNumIntp=100, varSd=0.05,
+                                 lgcVec=lgcBooVec)
 
             # Loop through conditions:
             for idxCon in range(0, varNumCon):
 
-                # Create array with bootstrap samples:
-                for idxIt in range(0, varNumIt):
-
-                    # Before deconvolution:
-                    if idxDec == 0:
-                        # Take mean across subjects in bootstrap samples:
-                        aryBoo[idxIt, :] = np.mean(aryEmpSnSb[aryRnd[idxIt, :],
-                                                              idxCon,
-                                                              :],
-                                                   axis=0)
-
-                    # After deconvolution:
-                    if idxDec == 1:
-                        # Take mean across subjects in bootstrap samples:
-                        aryBoo[idxIt, :] = np.mean(aryDecon[aryRnd[idxIt, :],
-                                                            idxCon,
-                                                            :],
-                                                   axis=0)
-
-                # Find peaks:
-                aryPks01[idxDec, idxCon, :] = find_peak(aryBoo,
-                                                        varNumIntp=100,
-                                                        varSd=0.05,
-                                                        lgcStat=False)
-
                 # Median peak position:
-                varTmpMed = np.median(aryPks01[idxDec, idxCon, :])
+                varTmpMed = np.median(aryPks01[idxCon, :])
 
                 # Confidence interval (percentile bootstrap):
-                varTmpCnfLw = np.percentile(aryPks01[idxDec, idxCon, :],
-                                            varCnfLw)
-                varTmpCnfUp = np.percentile(aryPks01[idxDec, idxCon, :],
-                                            varCnfUp)
+                varTmpCnfLw = np.percentile(aryPks01[idxCon, :], varCnfLw)
+                varTmpCnfUp = np.percentile(aryPks01[idxCon, :], varCnfUp)
 
                 # Print result:
                 strTmp = ('---------Median peak position: '
@@ -511,14 +428,14 @@ def drain_model(varMdl, strRoi, strHmsph, strPthPrf, strPthPrfOt, strPthPltOt,
 
         # For 'model 4', i.e. the random noise model, we are interested in the
         # variance across random-noise iterations. We are *not* interested in
-        # the variance across subjects in this case. Because we used the same
-        # random noise across subjects, we can average over subjects.
-        aryDecon = np.mean(aryDecon, axis=0)
+        # the variance across subjects in this case. The mean & percentiles
+        # across iterations (of the across-subjects mean) have been calculated
+        # above.
 
         # Across-subjects mean after deconvolution:
         strTmpTtl = '{} after deconvolution'.format(strRoi.upper())
         strTmpPth = (strPthPltOt + 'after_')
-        plt_dpth_prfl_acr_subs(aryDecon,
+        plt_dpth_prfl_acr_subs(aryRndMne[None, :, :],
                                varNumSub,
                                varNumDpth,
                                varNumCon,
@@ -532,23 +449,22 @@ def drain_model(varMdl, strRoi, strHmsph, strPthPrf, strPthPrfOt, strPthPltOt,
                                strTmpPth,
                                strFlTp,
                                strErr='prct95',
-                               vecX=vecIntpEqui)
+                               vecX=vecIntpEqui,
+                               aryCnfLw=aryRndPrct[0, :, :],
+                               aryCnfUp=aryRndPrct[1, :, :])
 
     elif varMdl == 5:
 
         # For 'model 5', i.e. the random & systematic noise model, we are
         # interested in the variance across random-noise iterations. We are
-        # *not* interested in the variance across subjects in this case.
-        # Because we used the same random noise across subjects, we can average
-        # over subjects.
-        aryDecon = np.mean(aryDecon, axis=0)
+        # *not* interested in the variance across subjects in this case. The
+        # mean & percentiles across iterations (of the across-subjects mean)
+        # have been calculated above.
 
-        # Random noise - mean across iteratins:
-        aryRndMne = np.mean(aryDecon, axis=0)
         # Random noise -  lower percentile:
-        aryRndConfLw = np.percentile(aryDecon, varCnfLw, axis=0)
+        aryRndConfLw = aryRndPrct[0, :, :]
         # Random noise - upper percentile:
-        aryRndConfUp = np.percentile(aryDecon, varCnfUp, axis=0)
+        aryRndConfUp = aryRndPrct[1, :, :]
 
         # For model 5, we only plot one stimulus condition (condition 4):
         varTmpCon = 3
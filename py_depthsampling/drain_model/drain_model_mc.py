@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""Monte Carlo propagation of random error in the draining model."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+from py_depthsampling.drain_model.drain_model_op import drain_mat
+from py_depthsampling.drain_model.drain_model_op import drain_inv
+from py_depthsampling.drain_model.drain_model_op import drain_apply
+from py_depthsampling.main.resmpl import resmpl
+from py_depthsampling.main.stat_stream import stream_stats
+
+
+def deconv_mc(aryEmp5, vecPosMdl, vecPosEqui, varNumIt, varNseRndSd, vecPrct,
+              varNumChnk=1000, varSeed=None, varNumBin=1000):
+    """
+    Deconvolution with random error in the draining weights (models 4 & 5).
+
+    Parameters
+    ----------
+    aryEmp5 : np.array
+        Depth profiles defined at 5 depth levels, of the form
+        aryEmp5[idxCondition, idxDepth] (e.g. across-subjects mean).
+    vecPosMdl : np.array
+        Relative position of the 5 depth levels of the draining model.
+    vecPosEqui : np.array
+        Positions of the equi-volume depth levels, at which the deconvolved
+        depth profiles are resampled.
+    varNumIt : int
+        Number of random-noise iterations.
+    varNseRndSd : float
+        Standard deviation of the random noise (the draining weights are
+        multiplied with Gaussian noise centred at one).
+    vecPrct : list or np.array
+        Percentiles across iterations to calculate (in percent).
+    varNumChnk : int
+        Number of iterations that are simulated at once.
+    varSeed : int or None
+        Seed for the random number generator. If `None`, numpy's global
+        random number generator is used (and is advanced as if all random
+        numbers had been drawn at once).
+    varNumBin : int
+        Number of histogram bins for the percentiles (see `stream_stats`).
+
+    Returns
+    -------
+    aryMne : np.array
+        Mean of the deconvolved depth profiles across iterations, of the form
+        aryMne[idxCondition, idxDepth] (at equi-volume depth levels).
+    aryPrct : np.array
+        Percentiles across iterations, of the form aryPrct[idxPercentile,
+        idxCondition, idxDepth].
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. Same as `deconv_04` (and the
+    random error part of `deconv_05`), followed by resampling to equi-volume
+    depth levels, but the iterations are simulated in chunks and reduced to
+    mean & percentiles on the fly (see `stream_stats`). Memory usage does not
+    depend on the number of iterations. The random noise is drawn in chunks
+    from the same stream as `np.random.randn(varNumIt, varNumCon,
+    varNumDpth)`, so that the results are the same as when all iterations
+    are simulated at once. Because all steps are linear, deconvolution of
+    the across-subjects mean is the same as the across-subjects mean of the
+    deconvolved single-subject profiles.
+    """
+    varNumCon = aryEmp5.shape[0]
+    varNumDpth = vecPosEqui.shape[0]
+
+    # State of the random number generator at the start of the simulation:
+    if varSeed is None:
+        tplRng = np.random.get_state()
+    else:
+        tplRng = np.random.RandomState(varSeed).get_state()
+
+    # State after the simulation (to advance the global random number
+    # generator):
+    lstRngEnd = [None]
+
+    def funcGen():
+        """Simulate chunks of iterations."""
+        objRng = np.random.RandomState()
+        objRng.set_state(tplRng)
+
+        for varIdx01 in range(0, varNumIt, varNumChnk):
+
+            varIdx02 = min((varIdx01 + varNumChnk), varNumIt)
+
+            # Random noise, centred at one (only the noise at the five model
+            # depth levels is used):
+            aryNseRnd = objRng.randn((varIdx02 - varIdx01), varNumCon,
+                                     varNumDpth)
+            aryNseRnd = np.add(np.multiply(aryNseRnd, varNseRndSd), 1.0)
+
+            # Deconvolution of all iterations of the chunk at once:
+            aryOp = drain_inv(drain_mat(aryNse=aryNseRnd[..., :5]))
+            aryDecon5 = drain_apply(aryOp, aryEmp5[None, :, :])
+
+            # Resampling to equi-volume depth levels:
+            yield resmpl(aryDecon5, vecPosMdl, vecPosEqui)
+
+        lstRngEnd[0] = objRng.get_state()
+
+    aryMne, aryPrct = stream_stats(funcGen, vecPrct, varNumBin=varNumBin)
+
+    if varSeed is None:
+        np.random.set_state(lstRngEnd[0])
+
+    return aryMne, aryPrct
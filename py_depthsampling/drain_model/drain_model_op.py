@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""Linear operators of the draining models (deconvolution in batch)."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+
+def drain_prm(strRoi='v1'):
+    """
+    Physiological parameters of the draining model (Markuerkiaga et al.).
+
+    Parameters
+    ----------
+    strRoi : str
+        Region of interest ('v1', 'v2', or 'v3'). Only the layer boundaries
+        differ between regions.
+
+    Returns
+    -------
+    vecEdgLyr : np.array
+        Relative depth of the layer boundaries (six values from 0, i.e.
+        white matter, to 1, i.e. pial surface; layers VI, V, IV, II/III, I).
+    vecLcl : np.array
+        Local signal of each layer (microvascular contribution), of the form
+        vecLcl[idxLayer].
+    aryDrn : np.array
+        Draining weights, of the form aryDrn[idxTargetLayer, idxSourceLayer]
+        (signal in the target layer caused by unit activity in the source
+        layer, through the ascending veins). Only elements below the
+        diagonal are non-zero (blood drains towards the pial surface).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. The local & draining signal
+    contributions are those of Markuerkiaga et al. (2016), as also used in
+    `deconv_07`. For V1, the layer boundaries follow from the relative
+    thickness of the layers (layer VI, 20%; layer V, 10%; layer IV, 40%;
+    layer II/III, 20%; layer I, 10%). For V2/V3, the boundaries are placed
+    half way between the layer positions (see `drain_pos`).
+    """
+    if strRoi == 'v1':
+        vecEdgLyr = np.array([0.0, 0.2, 0.3, 0.7, 0.9, 1.0])
+    elif (strRoi == 'v2') or (strRoi == 'v3'):
+        vecEdgLyr = drain_edg(drain_pos(strRoi=strRoi))
+    else:
+        raise ValueError('Unknown region of interest: ' + str(strRoi))
+
+    # Local signal (layer VI, V, IV, II/III, I):
+    vecLcl = np.array([1.9, 1.5, 2.2, 1.7, 1.6])
+
+    aryDrn = np.zeros((5, 5))
+
+    # Draining from layer VI:
+    aryDrn[1:, 0] = [0.6, 0.6, 0.5, 0.5]
+
+    # Draining from layer V:
+    aryDrn[2:, 1] = [0.3, 0.3, 0.3]
+
+    # Draining from layer IV:
+    aryDrn[3:, 2] = [1.3, 1.3]
+
+    # Draining from layer II/III:
+    aryDrn[4:, 3] = [0.7]
+
+    return vecEdgLyr, vecLcl, aryDrn
+
+
+def drain_pos(strRoi='v1'):
+    """
+    Relative position of the layers of the draining model.
+
+    Parameters
+    ----------
+    strRoi : str
+        Region of interest ('v1', 'v2', or 'v3').
+
+    Returns
+    -------
+    vecPosMdl : np.array
+        Relative depth of the layers (five values from white matter to pial
+        surface; layers VI, V, IV, II/III, I).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. The empirical depth profiles
+    are interpolated to these positions before the deconvolution (and the
+    results back to equi-volume depth levels between the deepest and the
+    most superficial layer). For V1, the position of each layer is the sum
+    of the thickness of all lower layers plus half its own thickness (i.e.
+    the centre of the layer, see `drain_prm`). For V2/V3, the positions are
+    those of Weber et al. (2008), Figure 5C, p. 2322 (data on extrastriate
+    cortex, from V2 to V5; absolute depth divided by the overall thickness
+    of 1.7 mm).
+    """
+    if strRoi == 'v1':
+        vecEdgLyr = drain_prm(strRoi=strRoi)[0]
+        vecPosMdl = np.multiply(0.5, np.add(vecEdgLyr[1:], vecEdgLyr[:-1]))
+    elif (strRoi == 'v2') or (strRoi == 'v3'):
+        vecPosMdl = np.divide(
+            np.array([160.0, 590.0, 1110.0, 1400.0, 1620.0]), 1700.0)
+    else:
+        raise ValueError('Unknown region of interest: ' + str(strRoi))
+
+    return vecPosMdl
+
+
+def drain_fwd(vecEdgDpth, vecEdgLyr, vecLcl, aryDrn):
+    """
+    Forward model of the draining effect at arbitrary depth levels.
+
+    Parameters
+    ----------
+    vecEdgDpth : np.array
+        Relative depth of the boundaries of the depth levels (N + 1 values
+        for N depth levels, ascending from white matter to pial surface,
+        e.g. `np.linspace(0.0, 1.0, num=(N + 1))` for N equi-volume depth
+        levels).
+    vecEdgLyr : np.array
+        Relative depth of the layer boundaries (see `drain_prm`).
+    vecLcl : np.array
+        Local signal of each layer, of the form vecLcl[..., idxLayer] (any
+        number of leading dimensions, e.g. for a set of parameter values).
+    aryDrn : np.array
+        Draining weights, of the form aryDrn[..., idxTargetLayer,
+        idxSourceLayer] (see `drain_prm`). Elements on & above the diagonal
+        are ignored.
+
+    Returns
+    -------
+    aryFwd : np.array
+        Lower triangular matrix, of the form aryFwd[..., idxDepth, idxDepth]
+        (leading dimensions of `vecLcl` & `aryDrn` broadcast against each
+        other). Row i contains the contributions of the neuronal activity at
+        all depth levels to the fMRI signal at depth level i (i.e.
+        aryEmp = aryFwd @ aryNrn).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. The physiological parameters
+    are defined per layer, and are mapped onto the depth levels according
+    to their overlap. The local signal of a depth level is the average of
+    the local signal of the layers it overlaps with (weighted by overlap).
+    The draining signal from layer j into layer i is caused by the activity
+    of the entire source layer; each depth level contributes in proportion
+    to the fraction of the source layer that it covers, and receives the
+    draining signal of the target layer(s) it overlaps with. Draining
+    between depth levels within the same layer is not modelled (as in the
+    original model, where it is part of the local signal). If the depth
+    levels coincide with the layers, the original five-layer model is
+    obtained (see `drain_mat`).
+    """
+    vecEdgDpth = np.asarray(vecEdgDpth, dtype=np.float64)
+    vecEdgLyr = np.asarray(vecEdgLyr, dtype=np.float64)
+
+    # Overlap between depth levels & layers, of the form aryOvl[idxDepth,
+    # idxLayer]:
+    aryOvl = np.maximum(
+        np.subtract(np.minimum(vecEdgDpth[1:, None], vecEdgLyr[None, 1:]),
+                    np.maximum(vecEdgDpth[:-1, None], vecEdgLyr[None, :-1])),
+        0.0)
+
+    # Fraction of each depth level that is covered by each layer, and
+    # fraction of each layer that is covered by each depth level:
+    aryFrcDpth = np.divide(aryOvl, np.diff(vecEdgDpth)[:, None])
+    aryFrcLyr = np.divide(aryOvl, np.diff(vecEdgLyr)[None, :])
+
+    # Draining signal (from lower into higher layers only):
+    aryFwd = np.einsum('ki,...ij,mj->...km', aryFrcDpth,
+                       np.tril(aryDrn, k=-1), aryFrcLyr)
+
+    # Local signal (on the diagonal):
+    aryLcl = np.einsum('kj,...j->...k', aryFrcDpth, vecLcl)
+    aryFwd = np.add(aryFwd, np.multiply(aryLcl[..., :, None],
+                                        np.eye(vecEdgDpth.shape[0] - 1)))
+
+    return aryFwd
+
+
+def drain_edg(vecPosDpth):
+    """
+    Boundaries of depth levels from their positions.
+
+    Parameters
+    ----------
+    vecPosDpth : np.array
+        Relative depth of the depth levels (N values, ascending from white
+        matter to pial surface).
+
+    Returns
+    -------
+    vecEdgDpth : np.array
+        Relative depth of the boundaries of the depth levels (N + 1 values,
+        see `drain_fwd`).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. The boundary between two depth
+    levels is placed half way between their positions. The deepest and the
+    most superficial depth level extend to the white matter (0) and to the
+    pial surface (1), respectively, so that the depth levels cover the
+    entire cortical depth (i.e. the draining signal of the entire deepest
+    layer is accounted for, see `drain_fwd`).
+    """
+    vecPosDpth = np.asarray(vecPosDpth, dtype=np.float64)
+    return np.concatenate(([0.0],
+                           np.multiply(0.5, np.add(vecPosDpth[1:],
+                                                   vecPosDpth[:-1])),
+                           [1.0]))
+
+
+def drain_mat(aryNse=None):
+    """
+    Draining matrix of the model by Markuerkiaga et al. (2016).
+
+    Parameters
+    ----------
+    aryNse : np.array or None
+        Multiplicative error of the draining weights, of the form
+        aryNse[..., idxDepth] (any number of leading dimensions, e.g.
+        aryNse[idxIteration, idxCondition, idxDepth]). The draining weights
+        into each layer (i.e. the off-diagonal elements of the corresponding
+        row) are multiplied by the error factor of that layer. If `None`, the
+        draining weights are used without error.
+
+    Returns
+    -------
+    aryMat : np.array
+        Unit lower triangular matrix, of the form aryMat[..., idxDepth,
+        idxDepth] (same leading dimensions as `aryNse`). Row i contains the
+        contributions of the signal at the lower depth levels to the
+        empirical signal at depth level i (i.e. aryEmp5 = aryMat @ aryNrn).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. Depth levels are ordered from
+    deep to superficial (layer VI, V, IV, II/III, I). The recurrences in
+    `deconv_01` to `deconv_06` are forward substitution with this matrix.
+    The matrix is the forward model at the five layers (see `drain_fwd`),
+    with each column divided by the local signal of the respective layer
+    (e.g. 0.6 / 1.9 for the draining from layer VI into layer V).
+    """
+    vecEdgLyr, vecLcl, aryDrn = drain_prm()
+
+    # Forward model with depth levels equal to the layers:
+    aryFwd = drain_fwd(vecEdgLyr, vecEdgLyr, vecLcl, aryDrn)
+    aryMat = np.divide(aryFwd, np.diagonal(aryFwd)[None, :])
+
+    if aryNse is not None:
+        # Scale the off-diagonal elements row by row (the diagonal stays one):
+        aryNse = np.asarray(aryNse, dtype=np.float64)
+        aryMat = np.add(np.eye(5),
+                        np.multiply((aryMat - np.eye(5)),
+                                    aryNse[..., :, None]))
+
+    return aryMat
+
+
+def drain_inv(aryMat):
+    """
+    Inverse of draining matrices.
+
+    Parameters
+    ----------
+    aryMat : np.array
+        Unit lower triangular matrices, of the form aryMat[..., idxDepth,
+        idxDepth] (see `drain_mat`).
+
+    Returns
+    -------
+    aryOp : np.array
+        Deconvolution operators (inverse matrices), same shape as `aryMat`.
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. The inverse is obtained by
+    forward substitution, row by row, for all matrices at once. Each row of
+    the inverse only depends on the rows above it, like in the recurrences
+    of the draining models.
+    """
+    varNumDpth = aryMat.shape[-1]
+
+    aryOp = np.zeros(aryMat.shape)
+    aryOp[..., :, :] = np.eye(varNumDpth)
+
+    for idxDpth in range(1, varNumDpth):
+        aryOp[..., idxDpth, :] = np.subtract(
+            aryOp[..., idxDpth, :],
+            np.einsum('...j,...jk->...k',
+                      aryMat[..., idxDpth, :idxDpth],
+                      aryOp[..., :idxDpth, :]))
+
+    return aryOp
+
+
+def drain_apply(aryOp, aryEmp):
+    """
+    Apply deconvolution operator to stacked depth profiles.
+
+    Parameters
+    ----------
+    aryOp : np.array
+        Deconvolution operator, of the form aryOp[idxDepth, idxDepth], or
+        stack of operators, aryOp[..., idxDepth, idxDepth].
+    aryEmp : np.array
+        Depth profiles, of the form aryEmp[..., idxDepth] (e.g.
+        aryEmp[idxSubject, idxCondition, idxDepth]). Leading dimensions are
+        broadcast against those of `aryOp`.
+
+    Returns
+    -------
+    aryNrn : np.array
+        Deconvolved depth profiles, of the form aryNrn[..., idxDepth].
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. All profiles are deconvolved
+    with one matrix product.
+    """
+    if aryOp.ndim == 2:
+        return np.dot(aryEmp, aryOp.T)
+    return np.einsum('...ij,...j->...i', aryOp, aryEmp)
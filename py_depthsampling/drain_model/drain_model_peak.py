@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Bootstrap of peak positions in depth profiles."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy as np
+from py_depthsampling.boot.utilities import get_cnt
+from py_depthsampling.main.find_peak import find_peak_batch
+
+
+def boot_peak(aryDpth, aryRnd, varNumIntp=100, varSd=0.05, lgcVec=True):
+    """
+    Peak positions in bootstrapped across-subjects mean depth profiles.
+
+    Parameters
+    ----------
+    aryDpth : np.array
+        Single-subject depth profiles, of the form aryDpth[idxSubject,
+        idxCondition, idxDepth].
+    aryRnd : np.array
+        Subject indices for bootstrapping, of the form aryRnd[idxIteration,
+        idxSample]. Each row includes the indices of the subjects sampled on
+        that iteration.
+    varNumIntp : int
+        Number of points at which to interpolate depth profiles before
+        searching for a peak (see `find_peak_batch`).
+    varSd : float
+        Standard deviation of the Gaussian kernel used for smoothing, relative
+        to cortical thickness (see `find_peak_batch`).
+    lgcVec : bool
+        If `True`, all iterations & conditions are processed at once (see
+        notes). If `False`, the bootstrap samples are created one at a time,
+        separately for each condition.
+
+    Returns
+    -------
+    aryPks : np.array
+        Relative peak positions, of the form aryPks[idxCondition,
+        idxIteration].
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. In the vectorised version, the
+    bootstrap samples are converted into a count matrix (how often each
+    subject is included in each sample, see `get_cnt`), and the
+    across-subjects means of all iterations & conditions are obtained with
+    one matrix product. The means are upsampled & smoothed with the cached
+    operator from `get_smth_op`, and local & global maxima are identified
+    with array operations (see `sel_peak`). The means and smoothed profiles
+    differ from those of the loop by floating point rounding only, so that
+    the same peak positions are identified (except for numerically tied
+    maxima, see `bench_peak_boot.py`).
+    """
+    varNumSub, varNumCon, varNumDpth = aryDpth.shape
+    varNumIt = aryRnd.shape[0]
+    varNumSmp = aryRnd.shape[1]
+
+    if lgcVec:
+
+        # Bootstrapped across-subjects means, of the form
+        # aryBoo[idxIteration, idxCondition * idxDepth]:
+        aryCnt = get_cnt(aryRnd, varNumSub)
+        aryBoo = np.divide(np.dot(aryCnt,
+                                  aryDpth.reshape(varNumSub,
+                                                  (varNumCon * varNumDpth))),
+                           np.float64(varNumSmp))
+
+        # Depth profiles of all conditions & iterations, of the form
+        # aryBoo[idxCondition * idxIteration, idxDepth]:
+        aryBoo = np.swapaxes(aryBoo.reshape(varNumIt, varNumCon, varNumDpth),
+                             0, 1).reshape((varNumCon * varNumIt), varNumDpth)
+
+        aryPks = find_peak_batch(aryBoo,
+                                 varNumIntp=varNumIntp,
+                                 varSd=varSd,
+                                 lgcStat=False,
+                                 lgcOp=True)
+
+        return aryPks.reshape(varNumCon, varNumIt)
+
+    aryPks = np.zeros((varNumCon, varNumIt))
+
+    # Array for actual bootstrap samples:
+    aryBoo = np.zeros((varNumIt, varNumDpth))
+
+    for idxCon in range(varNumCon):
+
+        # Take mean across subjects in bootstrap samples:
+        for idxIt in range(varNumIt):
+            aryBoo[idxIt, :] = np.mean(aryDpth[aryRnd[idxIt, :], idxCon, :],
+                                       axis=0)
+
+        # Find peaks:
+        aryPks[idxCon, :] = find_peak_batch(aryBoo,
+                                            varNumIntp=varNumIntp,
+                                            varSd=varSd,
+                                            lgcStat=False)
+
+    return aryPks
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of peak finding functions.
+
+Compares run time of `find_peak` and `find_peak_batch` on synthetic depth
+profiles, and checks that the identified peak positions are identical. The
+batched version is timed with and without the precomputed upsampling &
+smoothing operator. Moreover, the sub-sample peak localisation modes are
+compared with a dense search (in terms of run time and deviation of the peak
+positions).
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from py_depthsampling.main.find_peak import find_peak
+from py_depthsampling.main.find_peak import find_peak_batch
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Number of depth profiles:
+varNumIt = 100000
+
+# Number of depth levels:
+varNumDpth = 11
+
+# Noise level (SD of Gaussian noise added to profiles):
+varNse = 0.5
+
+# Peak finding parameters:
+varNumIntp = 100
+varSd = 0.05
+varThr = 0.05
+
+# Number of interpolation points for the dense reference search (comparison
+# with sub-sample peak localisation):
+varNumIntpRef = 1000
+
+# Number of depth profiles for comparison with sub-sample peak localisation:
+varNumItRef = 10000
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Create synthetic depth profiles
+
+np.random.seed(0)
+
+vecPos = np.linspace(0.0, 1.0, num=varNumDpth)
+
+# Gaussian-shaped profiles with random peak position, plus noise:
+aryDpth = np.exp(np.divide(
+    -np.square(np.subtract(vecPos[None, :],
+                           np.random.rand(varNumIt, 1))),
+    0.05))
+aryDpth = np.add(aryDpth, np.multiply(varNse,
+                                      np.random.randn(varNumIt, varNumDpth)))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Benchmark
+
+varTme01 = time.time()
+vecPeak01, vecLgc01 = find_peak(aryDpth, varNumIntp=varNumIntp, varSd=varSd,
+                                lgcStat=False, varThr=varThr)
+varTme02 = time.time()
+vecPeak02, vecLgc02 = find_peak_batch(aryDpth, varNumIntp=varNumIntp,
+                                      varSd=varSd, lgcStat=False,
+                                      varThr=varThr)
+varTme03 = time.time()
+vecPeak03, vecLgc03 = find_peak_batch(aryDpth, varNumIntp=varNumIntp,
+                                      varSd=varSd, lgcStat=False,
+                                      varThr=varThr, lgcOp=True)
+varTme04 = time.time()
+
+print(('-Number of depth profiles: ' + str(varNumIt)))
+print(('---find_peak:       ' + str(np.around((varTme02 - varTme01), 3))
+       + ' s'))
+print(('---find_peak_batch: ' + str(np.around((varTme03 - varTme02), 3))
+       + ' s'))
+print(('---Speedup: '
+       + str(np.around(((varTme02 - varTme01) / (varTme03 - varTme02)), 1))))
+print(('---Identical output: '
+       + str(np.array_equal(vecPeak01, vecPeak02)
+             and np.array_equal(vecLgc01, vecLgc02))))
+print(('---find_peak_batch with operator: '
+       + str(np.around((varTme04 - varTme03), 3)) + ' s'))
+print(('---Speedup: '
+       + str(np.around(((varTme02 - varTme01) / (varTme04 - varTme03)), 1))))
+print(('---Number of deviating peak positions: '
+       + str(np.sum(np.not_equal(vecPeak01, vecPeak03)))))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Sub-sample peak localisation
+
+aryDpthRef = aryDpth[:varNumItRef, :]
+
+varTme01 = time.time()
+vecPeakRef = find_peak_batch(aryDpthRef, varNumIntp=varNumIntpRef,
+                             varSd=varSd, lgcStat=False)
+varTme02 = time.time()
+
+print(('-Dense search with ' + str(varNumIntpRef) + ' points, '
+       + str(varNumItRef) + ' depth profiles: '
+       + str(np.around((varTme02 - varTme01), 3)) + ' s'))
+
+for strPeak in ['parabolic', 'spline']:
+
+    varTme01 = time.time()
+    vecPeakTmp = find_peak_batch(aryDpthRef, varNumIntp=varNumIntpRef,
+                                 varSd=varSd, lgcStat=False, strPeak=strPeak)
+    varTme02 = time.time()
+
+    vecDev = np.absolute(np.subtract(vecPeakTmp, vecPeakRef))
+
+    print(('---' + strPeak + ': '
+           + str(np.around((varTme02 - varTme01), 3)) + ' s'))
+    print(('------Deviation from dense search, median: '
+           + str(np.around(np.median(vecDev), 4))
+           + ', 95th percentile: '
+           + str(np.around(np.percentile(vecDev, 95.0), 4))
+           + ', proportion > 0.05: '
+           + str(np.around(np.mean(np.greater(vecDev, 0.05)), 4))))
+# -----------------------------------------------------------------------------
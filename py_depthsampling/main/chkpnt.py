@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Checkpoints for long resampling runs (bootstrap, permutation)."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import numpy as np
+
+
+def chk_save_npz(strPth, **dicAry):
+    """
+    Save arrays to npz file atomically.
+
+    Parameters
+    ----------
+    strPth : str
+        Path of npz file.
+    dicAry : dict
+        Arrays to save (keyword arguments, as for `np.savez`).
+
+    Notes
+    -----
+    The arrays are first written to a temporary file in the same directory,
+    which is then renamed. Therefore, if the process is killed while writing,
+    there is either no file or the complete file at `strPth`, but never an
+    incomplete file.
+    """
+    strPthTmp = strPth + '.tmp'
+    with open(strPthTmp, 'wb') as objFle:
+        np.savez(objFle, **dicAry)
+        objFle.flush()
+        os.fsync(objFle.fileno())
+    os.replace(strPthTmp, strPth)
+
+
+def rng_get():
+    """
+    Get state of numpy's global random number generator.
+
+    Returns
+    -------
+    dicRng : dict
+        State of the random number generator (see `np.random.get_state`), as
+        a dictionary of arrays (to be saved in an npz file).
+    """
+    tplRng = np.random.get_state()
+    dicRng = {'strRng': np.array(tplRng[0]),
+              'vecRngKey': tplRng[1],
+              'varRngPos': np.array(tplRng[2]),
+              'varRngGss': np.array(tplRng[3]),
+              'varRngCch': np.array(tplRng[4])}
+    return dicRng
+
+
+def rng_set(dicRng):
+    """
+    Set state of numpy's global random number generator.
+
+    Parameters
+    ----------
+    dicRng : dict
+        State of the random number generator (see `rng_get`).
+    """
+    np.random.set_state((str(dicRng['strRng']),
+                         dicRng['vecRngKey'],
+                         int(dicRng['varRngPos']),
+                         int(dicRng['varRngGss']),
+                         float(dicRng['varRngCch'])))
+
+
+def chk_init(strPthRun, **dicPrm):
+    """
+    Start or resume a checkpointed run.
+
+    Parameters
+    ----------
+    strPthRun : str
+        Run directory. Created if it does not exist.
+    dicPrm : dict
+        Input data and settings of the run (keyword arguments, e.g. data
+        arrays, number of iterations, chunk size), which determine the
+        results.
+
+    Raises
+    ------
+    ValueError
+        If the settings differ from those of the run in the run directory.
+
+    Notes
+    -----
+    On the first call for a run directory, the settings and the state of
+    numpy's random number generator are saved in the run directory. If the
+    run directory already contains a run (i.e. the run is resumed), the
+    settings are compared with those of the saved run, and the random number
+    generator is set to its state at the start of the saved run. Hence, the
+    random draws of the resumed run are the same as those of the interrupted
+    run, and the random number generator has the same state after the run
+    as after an uninterrupted run.
+    """
+    if not os.path.isdir(strPthRun):
+        os.makedirs(strPthRun)
+
+    strPthPrm = os.path.join(strPthRun, 'run.npz')
+
+    if os.path.isfile(strPthPrm):
+
+        print(('---Resuming run from ' + strPthRun))
+
+        with np.load(strPthPrm) as objNpz:
+
+            for strKey in dicPrm.keys():
+                if ((strKey not in objNpz.files)
+                        or (not np.array_equal(objNpz[strKey],
+                                               np.asarray(dicPrm[strKey])))):
+                    raise ValueError(('Run directory ' + strPthRun
+                                      + ' contains a run with different '
+                                      + 'settings (' + strKey + ').'))
+
+            rng_set({strKey: objNpz[strKey] for strKey in rng_get().keys()})
+
+    else:
+
+        dicTmp = rng_get()
+        dicTmp.update(dicPrm)
+        chk_save_npz(strPthPrm, **dicTmp)
+
+
+def chk_path(strPthRun, idxChnk):
+    """Path of checkpoint file of a chunk."""
+    return os.path.join(strPthRun, 'chunk_{:06d}.npz'.format(idxChnk))
+
+
+def chk_save(strPthRun, idxChnk, dicRng, **dicAry):
+    """
+    Save results of a chunk.
+
+    Parameters
+    ----------
+    strPthRun : str
+        Run directory (see `chk_init`).
+    idxChnk : int
+        Index of chunk.
+    dicRng : dict
+        State of the random number generator before the random draws of the
+        chunk (see `rng_get`).
+    dicAry : dict
+        Arrays to save (e.g. randomisation array & fitted parameters of the
+        chunk).
+    """
+    dicAry.update(dicRng)
+    chk_save_npz(chk_path(strPthRun, idxChnk), **dicAry)
+
+
+def chk_load(strPthRun, idxChnk):
+    """
+    Load results of a chunk.
+
+    Parameters
+    ----------
+    strPthRun : str
+        Run directory (see `chk_init`).
+    idxChnk : int
+        Index of chunk.
+
+    Returns
+    -------
+    dicAry : dict or None
+        Arrays saved with `chk_save`, or `None` if the chunk has not been
+        completed.
+    """
+    strPth = chk_path(strPthRun, idxChnk)
+    if not os.path.isfile(strPth):
+        return None
+    with np.load(strPth) as objNpz:
+        dicAry = {strKey: objNpz[strKey] for strKey in objNpz.files}
+    return dicAry
@@ -17,12 +17,75 @@
 # You should have received a copy of the GNU General Public License along with
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from functools import lru_cache
 import numpy as np
 from scipy.interpolate import interp1d
+from scipy.interpolate import CubicSpline
 from scipy.ndimage.filters import gaussian_filter1d
 from scipy.signal import argrelextrema
 
 
+@lru_cache(maxsize=32)
+def get_smth_op(varNumDpth, varNumIntp=100, varSd=0.1):
+    """
+    Linear operator for upsampling and smoothing of depth profiles.
+
+    Parameters
+    ----------
+    varNumDpth : int
+        Number of depth levels of the original depth profiles.
+    varNumIntp : int
+        Number of points at which to interpolate depth profiles.
+    varSd : float
+        Standard deviation of the Gaussian kernel used for smoothing, relative
+        to cortical thickness.
+
+    Returns
+    -------
+    aryOp : np.array
+        Operator of shape aryOp[varNumIntp, varNumDpth]. Upsampled and smoothed
+        depth profiles are obtained as `np.dot(aryDpth, aryOp.T)`, where
+        aryDpth has shape aryDpth[profile, depth]. (The array is read-only,
+        because it is cached and shared between calls.)
+
+    Notes
+    -----
+    Linear interpolation and Gaussian smoothing (as in `find_peak`) are both
+    linear and only depend on the number of depth levels, the number of
+    interpolation points, and the kernel width. Their composition is obtained
+    by applying them to the identity matrix. The operator is cached, so it is
+    only created once for each combination of parameters. The result is equal
+    to that of `find_peak`'s interpolation and smoothing up to floating point
+    rounding.
+    """
+    # Position of original datapoints (before interpolation):
+    vecPosOrig = np.linspace(0, 1.0, num=varNumDpth, endpoint=True)
+
+    # Positions at which to sample (interpolate) depth profiles:
+    vecPosIntp = np.linspace(0, 1.0, num=varNumIntp, endpoint=True)
+
+    # Interpolate the unit impulses (rows of the identity matrix):
+    func_interp = interp1d(vecPosOrig,
+                           np.eye(varNumDpth),
+                           kind='linear',
+                           axis=1,
+                           fill_value='extrapolate')
+    aryOp = func_interp(vecPosIntp)
+
+    # Smooth the interpolated impulses:
+    aryOp = gaussian_filter1d(aryOp,
+                              (np.float64(varNumIntp) * varSd),
+                              axis=1,
+                              order=0,
+                              mode='nearest')
+
+    # Operator of shape aryOp[varNumIntp, varNumDpth]:
+    aryOp = np.ascontiguousarray(aryOp.T)
+    aryOp.flags.writeable = False
+
+    return aryOp
+
+
 def find_peak(aryDpth, varNumIntp=100, varSd=0.1, lgcStat=True, varThr=None):
     """
     Find peak in cortical depth profile.
@@ -240,3 +303,416 @@ def find_peak(aryDpth, varNumIntp=100, varSd=0.1, lgcStat=True, varThr=None):
         vecLgc = np.greater(vecThr, varThr)
 
         return vecPeak2, vecLgc
+
+
+def sel_peak(aryDpthSmth, varNumOrd):
+    """
+    Select peak in smoothed depth profiles.
+
+    Parameters
+    ----------
+    aryDpthSmth : np.array
+        Smoothed depth profiles, shape aryDpthSmth[profile, depth].
+    varNumOrd : int
+        Order of the search for local maxima (how many points on each side
+        are considered for the comparison).
+
+    Returns
+    -------
+    vecPeak : np.array
+        Index of the peak along the depth dimension, for each profile.
+    vecAmp : np.array
+        Amplitude of the peak, for each profile.
+    varNumPeaks : int
+        Number of profiles for which a local maximum was found.
+
+    Notes
+    -----
+    Like in `find_peak`, if there is more than one local maximum in a depth
+    profile, candidate peaks are compared in order of cortical depth, and a
+    candidate replaces the selected peak if its amplitude is greater than that
+    of the preceding candidate. If there is no local maximum, the global
+    maximum is used.
+    """
+    varNumPrf, varNumPos = aryDpthSmth.shape
+
+    # Local maxima: points that are greater than all neighbours within the
+    # search order (neighbours beyond the edges are clipped to the edge, as in
+    # `argrelextrema` with `mode='clip'`).
+    aryLgcMax = np.ones(aryDpthSmth.shape, dtype=bool)
+    for idxOrd in range(1, min((varNumOrd + 1), varNumPos)):
+        varTmp = varNumPos - idxOrd
+        aryLgcMax[:, :varTmp] &= np.greater(aryDpthSmth[:, :varTmp],
+                                            aryDpthSmth[:, idxOrd:])
+        aryLgcMax[:, varTmp:] &= np.greater(aryDpthSmth[:, varTmp:],
+                                            aryDpthSmth[:, -1:])
+        aryLgcMax[:, idxOrd:] &= np.greater(aryDpthSmth[:, idxOrd:],
+                                            aryDpthSmth[:, :varTmp])
+        aryLgcMax[:, :idxOrd] &= np.greater(aryDpthSmth[:, :idxOrd],
+                                            aryDpthSmth[:, :1])
+
+    # Indices of profiles and positions of local maxima (sorted by profile,
+    # and by depth within profile):
+    vecIdx, vecPos = np.nonzero(aryLgcMax)
+    vecAmpPos = aryDpthSmth[vecIdx, vecPos]
+
+    # A candidate is selected if it is the first one in its profile, or if its
+    # amplitude is greater than that of the preceding candidate. The last
+    # selected candidate of each profile is the peak.
+    lgcSel = np.ones(vecIdx.shape, dtype=bool)
+    lgcSel[1:] = np.logical_or(np.not_equal(vecIdx[1:], vecIdx[:-1]),
+                               np.greater(vecAmpPos[1:], vecAmpPos[:-1]))
+    vecSel = np.flatnonzero(lgcSel)
+    lgcLast = np.ones(vecSel.shape, dtype=bool)
+    lgcLast[:-1] = np.not_equal(vecIdx[vecSel[1:]], vecIdx[vecSel[:-1]])
+    vecSel = vecSel[lgcLast]
+
+    vecPeak = np.zeros((varNumPrf), dtype=np.int64)
+    vecAmp = np.zeros((varNumPrf))
+    vecPeak[vecIdx[vecSel]] = vecPos[vecSel]
+    vecAmp[vecIdx[vecSel]] = vecAmpPos[vecSel]
+
+    # Cases for which no local maximum has been identified (depth profiles
+    # with monotonic increase). In this case, the global maximum is defined as
+    # the peak.
+    vecPosMono = np.equal(vecPeak, 0)
+    vecPeak[vecPosMono] = np.argmax(aryDpthSmth, axis=1)[vecPosMono]
+    vecAmp[vecPosMono] = np.max(aryDpthSmth, axis=1)[vecPosMono]
+
+    return vecPeak, vecAmp, vecSel.shape[0]
+
+
+def refine_peak(aryDpthSmth, vecPeak, strPeak='parabolic'):
+    """
+    Refine discrete peak positions by sub-sample vertex interpolation.
+
+    Parameters
+    ----------
+    aryDpthSmth : np.array
+        Smoothed depth profiles, shape aryDpthSmth[profile, depth].
+    vecPeak : np.array
+        Index of the discrete peak along the depth dimension, for each profile.
+    strPeak : str
+        'parabolic' for the vertex of the parabola through the peak and its
+        two neighbours, or 'spline' for the maximum of a cubic spline through
+        the depth profile, in the interval around the peak.
+
+    Returns
+    -------
+    vecPos : np.array
+        Refined peak position, in units of depth levels (i.e. fractional
+        index), for each profile.
+    vecAmp : np.array
+        Interpolated peak amplitude, for each profile.
+
+    Notes
+    -----
+    Peaks at the first or last depth level (i.e. global maxima of monotonic
+    profiles) are not refined.
+    """
+    varNumPrf, varNumPos = aryDpthSmth.shape
+    vecIdxPrf = np.arange(varNumPrf)
+
+    vecPos = vecPeak.astype(np.float64)
+    vecAmp = aryDpthSmth[vecIdxPrf, vecPeak]
+
+    # Only peaks with a neighbour on each side can be refined:
+    lgcIn = np.logical_and(np.greater(vecPeak, 0),
+                           np.less(vecPeak, (varNumPos - 1)))
+    vecIdxIn = vecIdxPrf[lgcIn]
+    vecPeakIn = vecPeak[lgcIn]
+
+    if strPeak == 'parabolic':
+
+        # Peak and neighbouring values:
+        vecY0 = aryDpthSmth[vecIdxIn, (vecPeakIn - 1)]
+        vecY1 = aryDpthSmth[vecIdxIn, vecPeakIn]
+        vecY2 = aryDpthSmth[vecIdxIn, (vecPeakIn + 1)]
+
+        # Curvature of the parabola (negative for a maximum):
+        vecCrv = vecY0 - 2.0 * vecY1 + vecY2
+
+        # Offset of the vertex relative to the discrete peak (limited to half
+        # a sample, i.e. the vertex stays in the vicinity of the peak):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vecOff = np.where(np.less(vecCrv, 0.0),
+                              np.divide((0.5 * (vecY0 - vecY2)), vecCrv),
+                              0.0)
+        vecOff = np.clip(vecOff, -0.5, 0.5)
+
+        vecPos[lgcIn] = vecPeakIn + vecOff
+        vecAmp[lgcIn] = vecY1 - 0.25 * (vecY0 - vecY2) * vecOff
+
+    elif strPeak == 'spline':
+
+        # Cubic spline through all profiles at once. Coefficients have shape
+        # aryC[power, interval, profile], for the polynomial in (x - x_k) on
+        # interval k.
+        aryC = CubicSpline(np.arange(varNumPos, dtype=np.float64),
+                           aryDpthSmth, axis=1).c
+
+        # Slope of the spline at the discrete peak decides whether the maximum
+        # lies in the interval to the left or to the right of the peak:
+        vecSlp = aryC[2, vecPeakIn, vecIdxIn]
+        vecItv = np.where(np.greater(vecSlp, 0.0), vecPeakIn,
+                          (vecPeakIn - 1))
+
+        # Roots of the derivative (3a * t^2 + 2b * t + c) within the interval:
+        vecA = 3.0 * aryC[0, vecItv, vecIdxIn]
+        vecB = 2.0 * aryC[1, vecItv, vecIdxIn]
+        vecC = aryC[2, vecItv, vecIdxIn]
+        vecDsc = np.sqrt(np.maximum((vecB * vecB - 4.0 * vecA * vecC), 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Numerically stable form of the quadratic formula; the root at
+            # which the derivative changes from positive to negative is
+            # selected. For a vanishing quadratic term, the derivative is
+            # linear.
+            vecQ = -0.5 * (vecB + np.copysign(vecDsc, vecB))
+            vecRt01 = np.divide(vecQ, vecA)
+            vecRt02 = np.divide(vecC, vecQ)
+            vecLin = np.divide(-vecC, vecB)
+        vecSlpRt01 = 2.0 * vecA * vecRt01 + vecB
+        vecT = np.where(np.less(vecSlpRt01, 0.0), vecRt01, vecRt02)
+        vecT = np.where(np.less(np.absolute(vecA), 1e-12), vecLin, vecT)
+        vecT = np.clip(np.nan_to_num(vecT, nan=0.0), 0.0, 1.0)
+
+        vecPos[lgcIn] = vecItv + vecT
+        vecAmp[lgcIn] = (((aryC[0, vecItv, vecIdxIn] * vecT
+                           + aryC[1, vecItv, vecIdxIn]) * vecT
+                          + aryC[2, vecItv, vecIdxIn]) * vecT
+                         + aryC[3, vecItv, vecIdxIn])
+
+    else:
+
+        strErrMsg = ('ERROR. Unknown peak refinement: ' + str(strPeak))
+        raise ValueError(strErrMsg)
+
+    return vecPos, vecAmp
+
+
+def find_peak_batch(aryDpth, varNumIntp=100, varSd=0.1, lgcStat=True,
+                    varThr=None, varNumChnk=10000, lgcOp=False,
+                    strPeak='dense'):
+    """
+    Find peak in cortical depth profiles, vectorised over depth profiles.
+
+    Parameters
+    ----------
+    aryDpth : np.array
+        Cortical depth profiles, shape aryDpth[profile, depth] (e.g.
+        bootstrapped versions of the depth profile).
+    varNumIntp : int
+        Number of points at which to interpolate depth profiles before
+        searching for a peak.
+    varSd : float
+        Standard deviation of the Gaussian kernel used for smoothing, relative
+        to cortical thickness.
+    lgcStat : bool, optional
+        Whether to print status messages.
+    varThr : float or None, optional
+        Amplitude threshold for peak identification (see `find_peak`).
+    varNumChnk : int, optional
+        Number of depth profiles that are processed at once (determines memory
+        footprint of the upsampled profiles).
+    lgcOp : bool, optional
+        If `True`, depth profiles are upsampled and smoothed with one matrix
+        product, using the cached operator from `get_smth_op`. This is faster,
+        but the smoothed profiles differ from those of `find_peak` by floating
+        point rounding (which may change the identified peak in case of
+        numerically tied maxima). If `False`, the result is identical to that
+        of `find_peak`.
+    strPeak : str, optional
+        Peak localisation. 'dense' (default) searches for the peak on the
+        upsampled profiles (as `find_peak`). 'parabolic' or 'spline' smooth
+        the profiles on the original depth grid, search for the discrete peak
+        there, and refine its position by the vertex of a parabola through the
+        peak and its neighbours, or by the maximum of a cubic spline,
+        respectively (see `refine_peak`). In these modes, `varNumIntp` and
+        `lgcOp` are only used to express the position on the same scale as
+        for the dense search.
+
+    Returns
+    -------
+    vecMin : np.array
+        Relative position of the peak (between 0.0 and 1.0) for each depth
+        profile.
+    vecLgc : np.array, optional
+        Peak amplitude threshold check. Only returned if a peak amplitude
+        threshold is provided.
+
+    Notes
+    -----
+    With `strPeak='dense'`, this is the same procedure and output as
+    `find_peak`, but the local maxima are identified and selected with array
+    operations (see `sel_peak`), without a loop over candidate peaks.
+
+    The sub-sample modes avoid the upsampled array (memory and time scale with
+    the number of depth levels instead of `varNumIntp`). The peak position is
+    returned as `varPos * (varNumIntp - 1) / varNumIntp`, where `varPos` is
+    the relative position between 0.0 and 1.0, so that it is on the same
+    scale as the index-based output of the dense search. Because smoothing
+    is applied to the samples instead of the linearly interpolated profile,
+    positions deviate slightly from those of the dense search. Deviations
+    from the dense search with `varNumIntp=1000`, on synthetic Gaussian-shaped
+    profiles with 11 depth levels and `varSd=0.05` (see `bench_find_peak.py`),
+    in units of cortical thickness:
+    - Noise-free profiles: maximum deviation 0.002 ('parabolic') and 0.003
+      ('spline').
+    - Noisy profiles (noise SD of 10 to 30 percent of the peak amplitude):
+      median deviation below 0.003 ('parabolic') and 0.008 ('spline'), 95th
+      percentile below 0.012 and 0.035, respectively. In 0.5 to 3 percent of
+      the profiles, a different local maximum of similar amplitude is
+      selected (about 8 percent for a noise SD of 50 percent, as in
+      `bench_find_peak.py`).
+    The parabolic refinement is therefore the more accurate approximation of
+    the dense search.
+
+    Function of the depth sampling pipeline.
+    """
+    # Number of depth profiles (e.g. resampling iterations):
+    varNumIt = aryDpth.shape[0]
+
+    # Identify number of depth levels:
+    varNumDpth = aryDpth.shape[1]
+
+    if strPeak == 'dense':
+
+        # Position of original datapoints (before interpolation):
+        vecPosOrig = np.linspace(0, 1.0, num=varNumDpth, endpoint=True)
+
+        # Positions at which to sample (interpolate) depth profiles:
+        vecPosIntp = np.linspace(0, 1.0, num=varNumIntp, endpoint=True)
+
+        # Indices of the original datapoints enclosing each interpolation
+        # point, and corresponding scaling factors (same arithmetic as linear
+        # `interp1d`, so that the interpolated values are identical):
+        vecIdxHi = np.clip(np.searchsorted(vecPosOrig, vecPosIntp), 1,
+                           (varNumDpth - 1)).astype(int)
+        vecIdxLo = vecIdxHi - 1
+        vecDst = np.subtract(vecPosOrig[vecIdxHi], vecPosOrig[vecIdxLo])
+        vecOff = np.subtract(vecPosIntp, vecPosOrig[vecIdxLo])
+
+        # Scale the standard deviation of the Gaussian kernel:
+        varSdSc = np.float64(varNumIntp) * varSd
+
+        # Operator for upsampling and smoothing in one step:
+        if lgcOp:
+            aryOp = get_smth_op(varNumDpth, varNumIntp=varNumIntp,
+                                varSd=varSd)
+
+        # Order of the search for the local maximum: how many points on each
+        # side for the comparison to consider.
+        varNumOrd = int(np.around((np.float64(varNumIntp) * 0.05),
+                                  decimals=0))
+
+    else:
+
+        # Standard deviation of the Gaussian kernel in units of the original
+        # depth levels:
+        varSdSc = np.float64(varNumDpth - 1) * varSd
+
+        # Order of the search for the local maximum (same relative extent as
+        # for the dense search, but at least one point on each side):
+        varNumOrd = max(1, int(np.around((np.float64(varNumDpth - 1) * 0.05),
+                                         decimals=0)))
+
+    # Peak position (relative position for the sub-sample modes, index for
+    # the dense search), and peak amplitude, for each depth profile:
+    vecPeak2 = np.zeros((varNumIt))
+    vecAmp = np.zeros((varNumIt))
+
+    # Number of cases for which a local maximum was found:
+    varNumPeaks = 0
+
+    for varIdx01 in range(0, varNumIt, varNumChnk):
+
+        varIdx02 = min((varIdx01 + varNumChnk), varNumIt)
+
+        aryChnk = aryDpth[varIdx01:varIdx02, :]
+
+        if strPeak != 'dense':
+
+            # Smooth depth profiles on original depth grid:
+            aryDpthSmth = gaussian_filter1d(aryChnk.astype(np.float64),
+                                            varSdSc,
+                                            axis=1,
+                                            order=0,
+                                            mode='nearest')
+
+        elif lgcOp:
+
+            # Upsample and smooth with precomputed operator:
+            aryDpthSmth = np.dot(aryChnk, aryOp.T)
+
+        else:
+
+            # Linear interpolation:
+            arySlp = np.divide(np.subtract(aryChnk[:, vecIdxHi],
+                                           aryChnk[:, vecIdxLo]),
+                               vecDst[None, :])
+            aryDpthIntp = np.add(np.multiply(arySlp, vecOff[None, :]),
+                                 aryChnk[:, vecIdxLo])
+
+            # Smooth interpolated depth profiles:
+            aryDpthSmth = gaussian_filter1d(aryDpthIntp,
+                                            varSdSc,
+                                            axis=1,
+                                            order=0,
+                                            mode='nearest')
+
+        # Discrete peak:
+        vecPeakChnk, vecAmpChnk, varTmp = sel_peak(aryDpthSmth, varNumOrd)
+        varNumPeaks += varTmp
+
+        if strPeak != 'dense':
+
+            # Sub-sample refinement, and conversion to relative position:
+            vecPeakChnk, vecAmpChnk = refine_peak(aryDpthSmth, vecPeakChnk,
+                                                  strPeak=strPeak)
+            vecPeakChnk = np.divide(vecPeakChnk, np.float64(varNumDpth - 1))
+
+        vecPeak2[varIdx01:varIdx02] = vecPeakChnk
+        vecAmp[varIdx01:varIdx02] = vecAmpChnk
+
+    if lgcStat:
+        print(('------Identified local maxima in '
+               + str(varNumPeaks)
+               + ' out of '
+               + str(varNumIt)
+               + ' cases.'))
+        print(('------Identified local or global maxima in '
+               + str(varNumIt)
+               + ' out of '
+               + str(varNumIt)
+               + ' cases.'))
+
+    if strPeak == 'dense':
+
+        # Convert the indicies of peak value into relative position (i.e.
+        # relative cortical depth):
+        vecPeak2 = np.divide(vecPeak2, np.float64(varNumIntp))
+
+    else:
+
+        # Express relative position on the same scale as the dense search:
+        vecPeak2 = np.multiply(vecPeak2, (np.float64(varNumIntp - 1)
+                                          / np.float64(varNumIntp)))
+
+    # If no peak threshold is given, just return the vector with relative peak
+    # positions.
+    if varThr is None:
+
+        return vecPeak2
+
+    else:
+
+        # Mean along depth dimension (separately for each depth profile):
+        vecMne = np.mean(aryDpth, axis=1)
+
+        # Add peak-threshold to mean:
+        vecThr = np.absolute(np.subtract(vecAmp, vecMne))
+
+        # Is the absolute amplitude greater than threshold?
+        vecLgc = np.greater(vecThr, varThr)
+
+        return vecPeak2, vecLgc
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Resampling of depth profiles with precomputed interpolation operators."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from functools import lru_cache
+import numpy as np
+from scipy.interpolate import interp1d
+
+
+@lru_cache(maxsize=32)
+def get_resmpl_op(tplPosSrc, tplPosTrg, strKind='cubic'):
+    """
+    Linear operator for resampling of depth profiles.
+
+    Parameters
+    ----------
+    tplPosSrc : tuple
+        Positions of the depth levels of the original depth profiles (tuple
+        of floats, so that the operator can be cached).
+    tplPosTrg : tuple
+        Positions at which to resample the depth profiles.
+    strKind : str
+        Kind of interpolation (see `scipy.interpolate.interp1d`).
+
+    Returns
+    -------
+    aryOp : np.array
+        Operator of shape aryOp[target, source]. Resampled depth profiles are
+        obtained as `np.dot(aryDpth, aryOp.T)`, where aryDpth has shape
+        aryDpth[..., source]. Rows of target positions outside of the range
+        of the source positions are NaN. (The array is read-only, because it
+        is cached and shared between calls.)
+
+    Notes
+    -----
+    For one-dimensional data, `scipy.interpolate.griddata` (as used for the
+    resampling before) sorts the data points and interpolates with
+    `interp1d` (not-a-knot cubic spline for `method='cubic'`, NaN outside of
+    the data range). The spline coefficients are linear in the data, so the
+    interpolation can be expressed as a matrix, which is obtained by
+    interpolating the identity matrix. The operator is cached, so it is only
+    created once for each pair of grids.
+    """
+    vecPosSrc = np.array(tplPosSrc, dtype=np.float64)
+    vecPosTrg = np.array(tplPosTrg, dtype=np.float64)
+
+    # Sort source positions (as `griddata`):
+    vecIdxSrt = np.argsort(vecPosSrc)
+    aryEye = np.eye(vecPosSrc.shape[0])[vecIdxSrt, :]
+
+    objIntp = interp1d(vecPosSrc[vecIdxSrt], aryEye, kind=strKind, axis=0,
+                       bounds_error=False, fill_value=np.nan)
+
+    aryOp = objIntp(vecPosTrg)
+    aryOp.flags.writeable = False
+
+    return aryOp
+
+
+def resmpl(aryDpth, vecPosSrc, vecPosTrg, strKind='cubic'):
+    """
+    Resample depth profiles.
+
+    Parameters
+    ----------
+    aryDpth : np.array
+        Depth profiles, of the form aryDpth[..., idxDepth] (any number of
+        leading dimensions, e.g. aryDpth[idxSubject, idxCondition, idxDepth]).
+    vecPosSrc : np.array
+        Positions of the depth levels of `aryDpth`.
+    vecPosTrg : np.array
+        Positions at which to resample the depth profiles.
+    strKind : str
+        Kind of interpolation (see `scipy.interpolate.interp1d`).
+
+    Returns
+    -------
+    aryRes : np.array
+        Resampled depth profiles, of the form aryRes[..., idxPosition] (same
+        leading dimensions as `aryDpth`).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. Equivalent to calling
+    `griddata(vecPosSrc, aryDpth[idx], vecPosTrg, method='cubic')` for each
+    depth profile, but all depth profiles are resampled with one matrix
+    product (see `get_resmpl_op`).
+    """
+    aryOp = get_resmpl_op(tuple(np.ravel(vecPosSrc).tolist()),
+                          tuple(np.ravel(vecPosTrg).tolist()),
+                          strKind=strKind)
+    return np.dot(aryDpth, aryOp.T)
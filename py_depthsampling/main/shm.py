@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Numpy arrays in shared memory for parallel processes."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+from multiprocessing import shared_memory
+
+
+def shm_create(aryIn=None, tplShp=None, strDtype='float64'):
+    """
+    Create numpy array in shared memory.
+
+    Parameters
+    ----------
+    aryIn : np.array or None
+        Array to copy into shared memory. If `None`, a new array of shape
+        `tplShp` is created (filled with zeros).
+    tplShp : tuple or None
+        Shape of new array (only used if `aryIn` is `None`).
+    strDtype : str
+        Data type of new array (only used if `aryIn` is `None`).
+
+    Returns
+    -------
+    objShm : multiprocessing.shared_memory.SharedMemory
+        Shared memory block. Has to be closed & unlinked by the creating
+        process when the array is not needed anymore (see `shm_free`).
+    aryShm : np.array
+        Array in shared memory.
+    tplSpc : tuple
+        Specification of the array (name of shared memory block, shape, data
+        type), which can be sent to other processes in order to access the
+        array (see `shm_attach`).
+    """
+    if aryIn is not None:
+        tplShp = aryIn.shape
+        strDtype = aryIn.dtype.str
+    varNumByt = max(int(np.prod(tplShp)) * np.dtype(strDtype).itemsize, 1)
+    objShm = shared_memory.SharedMemory(create=True, size=varNumByt)
+    aryShm = np.ndarray(tplShp, dtype=strDtype, buffer=objShm.buf)
+    if aryIn is not None:
+        aryShm[...] = aryIn
+    else:
+        aryShm[...] = 0
+    tplSpc = (objShm.name, tplShp, strDtype)
+    return objShm, aryShm, tplSpc
+
+
+def shm_attach(tplSpc):
+    """
+    Access numpy array in shared memory from another process.
+
+    Parameters
+    ----------
+    tplSpc : tuple
+        Specification of the array, as returned by `shm_create`.
+
+    Returns
+    -------
+    objShm : multiprocessing.shared_memory.SharedMemory
+        Shared memory block. Needs to be referenced as long as the array is
+        used.
+    aryShm : np.array
+        Array in shared memory.
+    """
+    strName, tplShp, strDtype = tplSpc
+    objShm = shared_memory.SharedMemory(name=strName)
+    aryShm = np.ndarray(tplShp, dtype=strDtype, buffer=objShm.buf)
+    return objShm, aryShm
+
+
+def shm_free(lstShm):
+    """
+    Release shared memory blocks.
+
+    Parameters
+    ----------
+    lstShm : list
+        List of shared memory blocks (created with `shm_create`). Arrays in
+        these blocks must not be used afterwards (copy them first).
+    """
+    for objShm in lstShm:
+        objShm.close()
+        objShm.unlink()
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Mean & percentiles of simulations that are generated chunk by chunk."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+
+
+def stream_stats(funcGen, vecPrct, varNumBin=1000, varNumMax=1000):
+    """
+    Mean & percentiles across iterations, without storing all iterations.
+
+    Parameters
+    ----------
+    funcGen : function
+        Function without arguments that returns an iterator over chunks of
+        iterations, of the form aryChnk[idxIteration, ...] (same trailing
+        dimensions for all chunks). The function is called several times
+        (at least three times), and has to yield exactly the same chunks each
+        time (e.g. by starting from the same state of the random number
+        generator).
+    vecPrct : list or np.array
+        Percentiles to calculate (in percent, e.g. [2.5, 97.5]).
+    varNumBin : int
+        Number of histogram bins used to locate the order statistics (at
+        least two).
+    varNumMax : int
+        Maximum number of values per element & order statistic that are kept
+        in memory in the last pass.
+
+    Returns
+    -------
+    aryMne : np.array
+        Mean across iterations, of the form aryMne[...].
+    aryPrct : np.array
+        Percentiles across iterations, of the form aryPrct[idxPercentile,
+        ...]. Same as `np.percentile(aryAll, vecPrct, axis=0)`, where aryAll
+        would contain all iterations (for elements with finite values only,
+        see notes).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. Memory usage depends on the
+    chunk size, `varNumBin`, and `varNumMax`, but not on the total number of
+    iterations. The percentiles are obtained from the order statistics
+    between which `np.percentile` interpolates linearly. These are located by
+    successive histograms: the first histogram spans the range of all values
+    (separately for each element); the bin that contains the order statistic
+    is selected, and - if it contains more than `varNumMax` values - the
+    values in that bin are histogrammed again (after a pass that finds their
+    range). Once the selected bins are small enough, their values are kept in
+    a last pass, and the order statistics are selected from them. Because
+    the bins are always assigned with the same arithmetic, the selection is
+    exact (not an approximation). Elements that are not finite (NaN or
+    infinite) in any iteration are excluded from the histograms, and their
+    mean & percentiles are NaN (as for NaN in `np.percentile`).
+    """
+    if varNumBin < 2:
+        raise ValueError('At least two histogram bins are needed.')
+
+    vecPrct = np.atleast_1d(np.asarray(vecPrct, dtype=np.float64))
+
+    # -------------------------------------------------------------------------
+    # *** Sum, minimum, maximum
+
+    varNumIt = 0
+    for aryChnk in funcGen():
+        if varNumIt == 0:
+            tplShp = aryChnk.shape[1:]
+            arySum = np.zeros(tplShp)
+            aryMin = np.full(tplShp, np.inf)
+            aryMax = np.full(tplShp, -np.inf)
+            lgcNonFin = np.zeros(tplShp, dtype=bool)
+        varNumIt += aryChnk.shape[0]
+        # Elements with non-finite values (set to zero, the results for these
+        # elements are replaced by NaN at the end):
+        lgcNonFin = np.logical_or(
+            lgcNonFin, np.any(np.logical_not(np.isfinite(aryChnk)), axis=0))
+        aryChnk = np.where(np.isfinite(aryChnk), aryChnk, 0.0)
+        arySum = np.add(arySum, np.sum(aryChnk, axis=0))
+        aryMin = np.minimum(aryMin, np.min(aryChnk, axis=0))
+        aryMax = np.maximum(aryMax, np.max(aryChnk, axis=0))
+
+    aryMne = np.divide(arySum, float(varNumIt))
+
+    # Elements are processed as a flat vector:
+    varNumEl = int(np.prod(tplShp))
+
+    # Ranks (zero based) of the order statistics between which to interpolate
+    # (as in `np.percentile`):
+    vecH = np.multiply((varNumIt - 1), np.divide(vecPrct, 100.0))
+    vecLw = np.floor(vecH).astype(np.int64)
+    vecUp = np.minimum(np.ceil(vecH).astype(np.int64), (varNumIt - 1))
+    vecRnk = np.unique(np.concatenate((vecLw, vecUp)))
+    varNumRnk = vecRnk.shape[0]
+
+    # -------------------------------------------------------------------------
+    # *** Locate order statistics
+
+    # Each order statistic (of each element) is located in a nested sequence
+    # of histogram bins. For each level of nesting, the lower edge & scaling
+    # of the histogram, and the selected bin (-1 if no histogram on this
+    # level), of the form aryLvl[idxEl, idxRnk]:
+    lstLo = []
+    lstScl = []
+    lstBin = []
+
+    # Range & number of values in the currently selected bin, number of
+    # values below the selected bin, and whether further refinement is needed:
+    aryMinRnk = np.repeat(aryMin.reshape(varNumEl, 1), varNumRnk, axis=1)
+    aryMaxRnk = np.repeat(aryMax.reshape(varNumEl, 1), varNumRnk, axis=1)
+    aryNum = np.full((varNumEl, varNumRnk), varNumIt, dtype=np.int64)
+    aryNumBlw = np.zeros((varNumEl, varNumRnk), dtype=np.int64)
+    lgcAct = np.ones((varNumEl, varNumRnk), dtype=bool)
+
+    def get_mem(aryChnk, idxRnk):
+        """Which values of a chunk are in the selected bins."""
+        lgcMem = np.ones(aryChnk.shape, dtype=bool)
+        for idxLvl in range(len(lstLo)):
+            aryBin = get_bin(aryChnk, lstLo[idxLvl][:, idxRnk],
+                             lstScl[idxLvl][:, idxRnk])
+            lgcMem = np.logical_and(
+                lgcMem,
+                np.logical_or(np.equal(aryBin,
+                                       lstBin[idxLvl][None, :, idxRnk]),
+                              np.less(lstBin[idxLvl][None, :, idxRnk], 0)))
+        return lgcMem
+
+    def get_bin(aryChnk, vecLo, vecScl):
+        """Histogram bin of each value of a chunk."""
+        aryBin = np.floor(np.multiply(np.subtract(aryChnk, vecLo[None, :]),
+                                      vecScl[None, :]))
+        return np.clip(aryBin, 0, (varNumBin - 1)).astype(np.int64)
+
+    def get_chnk(aryChnk):
+        """Chunk as two-dimensional array (non-finite values set to zero)."""
+        aryChnk = aryChnk.reshape(aryChnk.shape[0], varNumEl)
+        return np.where(np.isfinite(aryChnk), aryChnk, 0.0)
+
+    vecOff = np.multiply(np.arange(varNumEl), varNumBin)
+
+    while True:
+
+        # Histogram of the values in the selected bins:
+        aryLo = np.copy(aryMinRnk)
+        aryRng = np.subtract(aryMaxRnk, aryMinRnk)
+        aryScl = np.divide(float(varNumBin),
+                           np.where((aryRng > 0.0), aryRng, 1.0))
+
+        aryCnt = np.zeros((varNumEl, varNumRnk, varNumBin), dtype=np.int64)
+        for aryChnk in funcGen():
+            aryChnk = get_chnk(aryChnk)
+            for idxRnk in range(varNumRnk):
+                lgcMem = np.logical_and(get_mem(aryChnk, idxRnk),
+                                        lgcAct[None, :, idxRnk])
+                aryBin = get_bin(aryChnk, aryLo[:, idxRnk], aryScl[:, idxRnk])
+                aryCnt[:, idxRnk, :] += np.bincount(
+                    np.add(aryBin, vecOff[None, :])[lgcMem],
+                    minlength=(varNumEl * varNumBin)
+                    ).reshape(varNumEl, varNumBin)
+
+        # Select the bin that contains the order statistic (first bin in
+        # which the cumulative count exceeds the rank):
+        aryCum = np.cumsum(aryCnt, axis=2)
+        aryRnk = np.subtract(vecRnk[None, :], aryNumBlw)
+        aryBin = np.sum(np.less_equal(aryCum, aryRnk[:, :, None]), axis=2)
+        aryBin = np.minimum(aryBin, (varNumBin - 1))
+        aryCum = np.concatenate((np.zeros((varNumEl, varNumRnk, 1),
+                                          dtype=np.int64), aryCum), axis=2)
+
+        aryNumBlw = np.where(lgcAct,
+                             np.add(aryNumBlw,
+                                    np.take_along_axis(
+                                        aryCum, aryBin[:, :, None],
+                                        axis=2)[:, :, 0]),
+                             aryNumBlw)
+        aryNum = np.where(lgcAct,
+                          np.take_along_axis(aryCnt, aryBin[:, :, None],
+                                             axis=2)[:, :, 0],
+                          aryNum)
+
+        lstLo.append(aryLo)
+        lstScl.append(aryScl)
+        lstBin.append(np.where(lgcAct, aryBin, -1))
+
+        # Further refinement is needed if the selected bin contains too many
+        # values (unless all values in the bin that was histogrammed are
+        # equal):
+        lgcAct = np.logical_and(np.greater(aryNum, varNumMax),
+                                np.less(aryMinRnk, aryMaxRnk))
+        if not np.any(lgcAct):
+            break
+
+        # Range of the values in the selected bins:
+        aryMinRnk = np.full((varNumEl, varNumRnk), np.inf)
+        aryMaxRnk = np.full((varNumEl, varNumRnk), -np.inf)
+        for aryChnk in funcGen():
+            aryChnk = get_chnk(aryChnk)
+            for idxRnk in range(varNumRnk):
+                lgcMem = get_mem(aryChnk, idxRnk)
+                aryMinRnk[:, idxRnk] = np.minimum(
+                    aryMinRnk[:, idxRnk],
+                    np.min(np.where(lgcMem, aryChnk, np.inf), axis=0))
+                aryMaxRnk[:, idxRnk] = np.maximum(
+                    aryMaxRnk[:, idxRnk],
+                    np.max(np.where(lgcMem, aryChnk, -np.inf), axis=0))
+
+        # If all values in a bin are equal (ties), the order statistic is
+        # known:
+        lgcAct = np.logical_and(lgcAct, np.less(aryMinRnk, aryMaxRnk))
+        if not np.any(lgcAct):
+            break
+
+    # Order statistics that are known because of ties, of the form
+    # aryOrd[idxEl, idxRnk]:
+    lgcTie = np.greater(aryNum, varNumMax)
+    aryOrd = np.where(lgcTie, aryMinRnk, 0.0)
+
+    # -------------------------------------------------------------------------
+    # *** Values in the selected bins
+
+    lstEl = [[] for idxRnk in range(varNumRnk)]
+    lstVal = [[] for idxRnk in range(varNumRnk)]
+    for aryChnk in funcGen():
+        aryChnk = get_chnk(aryChnk)
+        for idxRnk in range(varNumRnk):
+            lgcMem = np.logical_and(get_mem(aryChnk, idxRnk),
+                                    np.logical_not(lgcTie[None, :, idxRnk]))
+            vecIdxIt, vecIdxEl = np.nonzero(lgcMem)
+            lstEl[idxRnk].append(vecIdxEl)
+            lstVal[idxRnk].append(aryChnk[vecIdxIt, vecIdxEl])
+
+    for idxRnk in range(varNumRnk):
+        vecEl = np.concatenate(lstEl[idxRnk])
+        vecVal = np.concatenate(lstVal[idxRnk])
+        # Sort by element, and by value within element:
+        vecIdxSrt = np.lexsort((vecVal, vecEl))
+        vecEl = vecEl[vecIdxSrt]
+        vecVal = vecVal[vecIdxSrt]
+        # Position of the order statistic within the values of its bin:
+        vecIdxEl = np.nonzero(np.logical_not(lgcTie[:, idxRnk]))[0]
+        vecPos = np.add(np.searchsorted(vecEl, vecIdxEl),
+                        np.subtract(vecRnk[idxRnk],
+                                    aryNumBlw[vecIdxEl, idxRnk]))
+        aryOrd[vecIdxEl, idxRnk] = vecVal[vecPos]
+
+    # -------------------------------------------------------------------------
+    # *** Percentiles
+
+    # Linear interpolation between order statistics (same formula as
+    # `np.percentile`):
+    aryPrct = np.zeros((vecPrct.shape[0], varNumEl))
+    for idxPrct in range(vecPrct.shape[0]):
+        vecA = aryOrd[:, np.searchsorted(vecRnk, vecLw[idxPrct])]
+        vecB = aryOrd[:, np.searchsorted(vecRnk, vecUp[idxPrct])]
+        varT = vecH[idxPrct] - vecLw[idxPrct]
+        vecDff = np.subtract(vecB, vecA)
+        if varT >= 0.5:
+            aryPrct[idxPrct, :] = np.subtract(
+                vecB, np.multiply(vecDff, (1.0 - varT)))
+        else:
+            aryPrct[idxPrct, :] = np.add(vecA, np.multiply(vecDff, varT))
+
+    aryPrct = aryPrct.reshape(((vecPrct.shape[0],) + tplShp))
+
+    # Elements with non-finite values:
+    aryMne[lgcNonFin] = np.nan
+    aryPrct[:, lgcNonFin] = np.nan
+
+    return aryMne, aryPrct
@@ -6,6 +6,10 @@ Compares cortical depth profiles from two different conditions (e.g. PacMan
 dynamic vs. PacMan static). Tests whether the difference between the two
 conditions is significant *separately at each* cortical depth.
 
+All comparisons of a ROI are tested at once with the same resampling (see
+`perm_batch.permute_batch`), so that family-wise p-values (corrected over
+comparisons and cortical depth) are obtained alongside the uncorrected ones.
+
 Creates plots of empirical condition differences and permutation null
 distribution over cortical depth.
 
@@ -30,7 +34,7 @@ Inputs are *.npz files containing depth profiles for each subject.
 
 
 import numpy as np
-from py_depthsampling.permutation.perm_main import permute
+from py_depthsampling.permutation.perm_batch import permute_batch
 from py_depthsampling.plot.plt_dpth_prfl import plt_dpth_prfl
 
 
@@ -101,156 +105,165 @@ varNumDiff = len(lstDiff)
 # -----------------------------------------------------------------------------
 # *** Permutation test
 
-# Loop through models, ROIs, hemispheres, and conditions to create plots:
+# Loop through models, ROIs, and hemispheres. All condition comparisons of a
+# ROI & hemisphere are tested at once (sharing the same resampling), and
+# plots are created for each comparison.
 for idxMtaCn in range(len(lstMetaCon)):  #noqa
     for idxMdl in range(len(lstMdl)):  #noqa
         for idxRoi in range(len(lstRoi)):
             for idxHmsph in range(len(lstHmsph)):
-                for idxDiff in range(len(lstDiff)):
 
-                    # Condition names:
-                    strTmpCon01 = lstCon[lstDiff[idxDiff][0]]
-                    strTmpCon02 = lstCon[lstDiff[idxDiff][1]]
-
-                    # Only create plots for stimulus-sustained and
-                    # perihpery-transient:
-                    lgcPass = (
-                               (
-                                ('stimulus' in lstMetaCon[idxMtaCn])
-                                and
-                                ('sst' in strTmpCon01)
-                               )
-                               or
-                               (
-                                ('periphery' in lstMetaCon[idxMtaCn])
-                                and
-                                ('trn' in strTmpCon01)
-                                )
+                # Only create plots for stimulus-sustained and
+                # perihpery-transient:
+                lstDiffTmp = [x for x in lstDiff if (
+                              (
+                               ('stimulus' in lstMetaCon[idxMtaCn])
+                               and
+                               ('sst' in lstCon[x[0]])
+                              )
+                              or
+                              (
+                               ('periphery' in lstMetaCon[idxMtaCn])
+                               and
+                               ('trn' in lstCon[x[0]])
                                )
-                    if lgcPass:
-
-                        # Plot title:
-                        strTtle = ((strTmpCon01 + ' minus ' + strTmpCon02))
-
-                        # Condition name for output file path:
-                        strPthCon = ((strTmpCon01 + '_min_' + strTmpCon02))
-
-                        # Path of first depth profile:
-                        strTmpPth01 = strPthPrf.format(
-                            lstMetaCon[idxMtaCn], lstRoi[idxRoi],
-                            lstHmsph[idxHmsph], strTmpCon01, lstMdl[idxMdl])
-
-                        # Path of second depth profile:
-                        strTmpPth02 = strPthPrf.format(
-                            lstMetaCon[idxMtaCn], lstRoi[idxRoi],
-                            lstHmsph[idxHmsph], strTmpCon02, lstMdl[idxMdl])
-
-                        # Load single subject depth profiles (shape
-                        # aryDpth[subject, depth]):
-                        objNpz01 = np.load(strTmpPth01)
-                        aryDpth01 = objNpz01['arySubDpthMns']
-                        objNpz02 = np.load(strTmpPth02)
-                        aryDpth02 = objNpz02['arySubDpthMns']
-
-                        # Array with number of vertices (for weighted averaging
-                        # across subjects), shape: vecNumInc[subjects].
-                        vecNumInc01 = objNpz01['vecNumInc']
-                        vecNumInc02 = objNpz02['vecNumInc']
-
-                        # Number of vertices are assumed to be the same for the
-                        # two conditions (since the data is sampled from the
-                        # same ROI). If not, raise an error.
-                        if np.all(np.equal(vecNumInc01, vecNumInc02)):
-                            vecNumInc = vecNumInc01
-                        else:
-                            strErrMsg = ('ERROR. Number of vertices within ROI'
-                                         + ' is not consistent across'
-                                         + ' conditions.')
-                            raise ValueError(strErrMsg)
-
-                        # Number of depth levels:
-                        varNumDpt = aryDpth01.shape[1]
-
-                        # Run permutation test:
-                        aryNull, vecP, aryEmpDiffMdn = permute(
-                            aryDpth01, aryDpth02, vecNumInc=vecNumInc,
-                            varNumIt=varNumIt, varLow=varLow, varUp=varUp)
-
-                        # Data array to be passed into plotting function,
-                        # containing the empirical condition difference and the
-                        # permutation difference:
-                        aryPlot01 = np.zeros((2, varNumDpt))
-                        aryPlot01[0, :] = aryEmpDiffMdn.flatten()
-                        aryPlot01[1, :] = aryNull[1, :].flatten()
-
-                        # Data array to be passed into plotting function,
-                        # containing the error shading (dummy array for
-                        # empirical data, because we do not plot the empirical
-                        # variance for better visibility, and the lower and
-                        # upper bounds of the permutation distribution:
-                        aryPlotErrLw = np.zeros((2, varNumDpt))
-                        aryPlotErrLw[1, :] = aryNull[0, :].flatten()
-                        aryPlotErrUp = np.zeros((2, varNumDpt))
-                        aryPlotErrUp[1, :] = aryNull[2, :].flatten()
-
-                        # Plot empirical condition difference and permutation
-                        # null distribution:
-                        plt_dpth_prfl(aryPlot01,
-                                      None,
+                              )]
+
+                if len(lstDiffTmp) == 0:
+                    continue
+
+                # Load single subject depth profiles of all conditions (shape
+                # aryDpth[condition, subject, depth]), and number of vertices
+                # per subject (for weighted averaging across subjects), shape
+                # vecNumInc[subjects].
+                lstDpth = [None] * len(lstCon)
+                vecNumInc = None
+                for idxCon in range(len(lstCon)):
+
+                    # Path of depth profile:
+                    strTmpPth = strPthPrf.format(
+                        lstMetaCon[idxMtaCn], lstRoi[idxRoi],
+                        lstHmsph[idxHmsph], lstCon[idxCon], lstMdl[idxMdl])
+
+                    objNpz = np.load(strTmpPth)
+                    lstDpth[idxCon] = objNpz['arySubDpthMns']
+
+                    # Number of vertices are assumed to be the same for all
+                    # conditions (since the data is sampled from the same
+                    # ROI). If not, raise an error.
+                    if vecNumInc is None:
+                        vecNumInc = objNpz['vecNumInc']
+                    elif not np.all(np.equal(vecNumInc, objNpz['vecNumInc'])):
+                        strErrMsg = ('ERROR. Number of vertices within ROI'
+                                     + ' is not consistent across'
+                                     + ' conditions.')
+                        raise ValueError(strErrMsg)
+
+                aryDpth = np.array(lstDpth)
+
+                # Number of depth levels:
+                varNumDpt = aryDpth.shape[2]
+
+                # Run permutation test for all comparisons:
+                aryNull, aryP, vecPMax, aryPFwe, aryEmpDiff = permute_batch(
+                    aryDpth, lstDiffTmp, vecNumInc=vecNumInc,
+                    varNumIt=varNumIt, varLow=varLow, varUp=varUp)
+
+                for idxDiff in range(len(lstDiffTmp)):
+
+                    # Condition names:
+                    strTmpCon01 = lstCon[lstDiffTmp[idxDiff][0]]
+                    strTmpCon02 = lstCon[lstDiffTmp[idxDiff][1]]
+
+                    # Plot title:
+                    strTtle = ((strTmpCon01 + ' minus ' + strTmpCon02))
+
+                    # Condition name for output file path:
+                    strPthCon = ((strTmpCon01 + '_min_' + strTmpCon02))
+
+                    print(('---' + lstRoi[idxRoi].upper() + ' '
+                           + lstHmsph[idxHmsph].upper() + ' ' + strTtle
+                           + ' - p-value of maximum difference: '
+                           + str(np.around(vecPMax[idxDiff], decimals=4))
+                           + ', minimum family-wise p-value: '
+                           + str(np.around(np.min(aryPFwe[idxDiff, :]),
+                                           decimals=4))))
+
+                    # Data array to be passed into plotting function,
+                    # containing the empirical condition difference and the
+                    # permutation difference:
+                    aryPlot01 = np.zeros((2, varNumDpt))
+                    aryPlot01[0, :] = aryEmpDiff[idxDiff, :]
+                    aryPlot01[1, :] = aryNull[idxDiff, 1, :]
+
+                    # Data array to be passed into plotting function,
+                    # containing the error shading (dummy array for empirical
+                    # data, because we do not plot the empirical variance for
+                    # better visibility, and the lower and upper bounds of the
+                    # permutation distribution:
+                    aryPlotErrLw = np.zeros((2, varNumDpt))
+                    aryPlotErrLw[1, :] = aryNull[idxDiff, 0, :]
+                    aryPlotErrUp = np.zeros((2, varNumDpt))
+                    aryPlotErrUp[1, :] = aryNull[idxDiff, 2, :]
+
+                    # Plot empirical condition difference and permutation null
+                    # distribution:
+                    plt_dpth_prfl(aryPlot01,
+                                  None,
+                                  varNumDpt,
+                                  2,
+                                  varDpi,
+                                  varYmin,
+                                  varYmax,
+                                  False,
+                                  ['Empirical condition difference',
+                                   'Permutation null distribution'],
+                                  'Cortical depth level',
+                                  'fMRI signal change [%]',
+                                  (lstRoi[idxRoi].upper()
+                                   + ' '
+                                   + lstHmsph[idxHmsph].upper()
+                                   + ' '
+                                   + strTtle),
+                                  True,
+                                  (strPthPltOt.format(lstMetaCon[idxMtaCn],
+                                                      lstRoi[idxRoi],
+                                                      lstHmsph[idxHmsph],
+                                                      strPthCon,
+                                                      lstMdl[idxMdl])
+                                   + strFlTp),
+                                  aryCnfLw=aryPlotErrLw,
+                                  aryCnfUp=aryPlotErrUp)
+
+                    # Reshape p-values for plot:
+                    vecP = aryP[idxDiff, :].reshape((1, varNumDpt))
+
+                    if False:
+
+                        # Plot p-value:
+                        plt_dpth_prfl(vecP,
+                                      np.zeros(vecP.shape),
                                       varNumDpt,
-                                      2,
+                                      1,
                                       varDpi,
-                                      varYmin,
-                                      varYmax,
+                                      0.0,
+                                      0.5,
                                       False,
-                                      ['Empirical condition difference',
-                                       'Permutation null distribution'],
-                                      'Cortical depth level',
-                                      'fMRI signal change [%]',
+                                      ['p-value'],
+                                      'Cortical depth level (equivolume)',
+                                      'p-value',
                                       (lstRoi[idxRoi].upper()
                                        + ' '
                                        + lstHmsph[idxHmsph].upper()
                                        + ' '
                                        + strTtle),
-                                      True,
-                                      (strPthPltOt.format(lstMetaCon[idxMtaCn],
-                                                          lstRoi[idxRoi],
-                                                          lstHmsph[idxHmsph],
-                                                          strPthCon,
-                                                          lstMdl[idxMdl])
+                                      False,
+                                      (strPthPltOt.format(
+                                           lstMetaCon[idxMtaCn],
+                                           lstRoi[idxRoi],
+                                           lstHmsph[idxHmsph],
+                                           strPthCon, lstMdl[idxMdl])
+                                       + 'pval'
                                        + strFlTp),
-                                      aryCnfLw=aryPlotErrLw,
-                                      aryCnfUp=aryPlotErrUp)
-
-                        # Reshape p-values for plot:
-                        vecP = vecP.reshape((1, varNumDpt))
-
-                        if False:
-
-                            # Plot p-value:
-                            plt_dpth_prfl(vecP,
-                                          np.zeros(vecP.shape),
-                                          varNumDpt,
-                                          1,
-                                          varDpi,
-                                          0.0,
-                                          0.5,
-                                          False,
-                                          ['p-value'],
-                                          'Cortical depth level (equivolume)',
-                                          'p-value',
-                                          (lstRoi[idxRoi].upper()
-                                           + ' '
-                                           + lstHmsph[idxHmsph].upper()
-                                           + ' '
-                                           + strTtle),
-                                          False,
-                                          (strPthPltOt.format(
-                                               lstMetaCon[idxMtaCn],
-                                               lstRoi[idxRoi],
-                                               lstHmsph[idxHmsph],
-                                               strPthCon, lstMdl[idxMdl])
-                                           + 'pval'
-                                           + strFlTp),
-                                          varNumLblY=6)
+                                      varNumLblY=6)
 # -----------------------------------------------------------------------------
@@ -9,6 +9,11 @@ Dynamic).
 After having found no siginificant difference between the two control
 conditions, we can compare the experimental condition against the combined
 control conditions. Here, the respective `*.npz` files are prepared.
+
+Alternatively, the combination can be tested directly, without creating
+additional `*.npz` files, by passing a vector of contrast weights (e.g. `(1.0,
+-0.5, -0.5)`) to `perm_batch.permute_batch`, together with the other
+comparisons.
 """
 
 # Part of py_depthsampling library
@@ -46,7 +46,7 @@ Function of the depth sampling pipeline.
 
 import itertools
 import numpy as np
-from py_depthsampling.main.find_peak import find_peak
+from py_depthsampling.main.find_peak import find_peak, find_peak_batch
 
 
 # ----------------------------------------------------------------------------
@@ -249,10 +249,10 @@ aryPermPeaks02 = np.zeros((varNumCon, varNumIt))
 
 # Loop through conditions and find peaks:
 for idxCon in range(0, varNumCon):
-    aryPermPeaks01[idxCon, :] = find_peak(aryDpthRnd01[:, idxCon, :],
-                                          lgcStat=False)
-    aryPermPeaks02[idxCon, :] = find_peak(aryDpthRnd02[:, idxCon, :],
-                                          lgcStat=False)
+    aryPermPeaks01[idxCon, :] = find_peak_batch(aryDpthRnd01[:, idxCon, :],
+                                                lgcStat=False)
+    aryPermPeaks02[idxCon, :] = find_peak_batch(aryDpthRnd02[:, idxCon, :],
+                                                lgcStat=False)
 
 
 # ----------------------------------------------------------------------------
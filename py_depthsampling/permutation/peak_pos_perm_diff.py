@@ -21,7 +21,7 @@
 
 import itertools
 import numpy as np
-from py_depthsampling.main.find_peak import find_peak
+from py_depthsampling.main.find_peak import find_peak, find_peak_batch
 
 
 def peak_diff(strPthData, lstDiff, lstCon, varNumIt=1000, varThr=0.05):
@@ -247,8 +247,8 @@ def peak_diff(strPthData, lstDiff, lstCon, varNumIt=1000, varThr=0.05):
     aryDpthRndB = np.absolute(aryDpthRndB)
 
     # Find peaks:
-    vecPermPeaksA, vecLgcA = find_peak(aryDpthRndA, varThr=varThr)
-    vecPermPeaksB, vecLgcB = find_peak(aryDpthRndB, varThr=varThr)
+    vecPermPeaksA, vecLgcA = find_peak_batch(aryDpthRndA, varThr=varThr)
+    vecPermPeaksB, vecLgcB = find_peak_batch(aryDpthRndB, varThr=varThr)
 
     # Ratio of iterations with peak:
     varRatioPeak = (float(np.sum(vecLgcA) + np.sum(vecLgcB))
@@ -48,7 +48,7 @@ Function of the depth sampling pipeline.
 
 import itertools
 import numpy as np
-from py_depthsampling.main.find_peak import find_peak
+from py_depthsampling.main.find_peak import find_peak, find_peak_batch
 
 
 # ----------------------------------------------------------------------------
@@ -275,16 +275,16 @@ aryDpthRnd02 = np.average(aryDpthRnd02, axis=1, weights=aryNumIncRnd02)
 print('---Find peaks in permutation samples')
 
 # Find peaks, permutation group 1:
-vecPermPeaks01, vecLgc01 = find_peak(aryDpthRnd01,
-                                     varSd=varSd,
-                                     varThr=varThr,
-                                     lgcStat=False)
+vecPermPeaks01, vecLgc01 = find_peak_batch(aryDpthRnd01,
+                                           varSd=varSd,
+                                           varThr=varThr,
+                                           lgcStat=False)
 
 # Find peaks, permutation group 2:
-vecPermPeaks02, vecLgc02 = find_peak(aryDpthRnd02,
-                                     varSd=varSd,
-                                     varThr=varThr,
-                                     lgcStat=False)
+vecPermPeaks02, vecLgc02 = find_peak_batch(aryDpthRnd02,
+                                           varSd=varSd,
+                                           varThr=varThr,
+                                           lgcStat=False)
 
 # Ratio of iterations with peak:
 varRatioPeak = (float(np.sum(vecLgc01) + np.sum(vecLgc02))
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Batched permutation test for several condition contrasts at once.
+
+Function of the depth sampling pipeline.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import itertools
+import numpy as np
+from py_depthsampling.permutation.perm_main import get_rsv
+
+
+def get_cntr(lstDiff, varNumCon):
+    """
+    Convert list of condition comparisons into contrast weights.
+
+    Parameters
+    ----------
+    lstDiff : list
+        List of comparisons. Each element is either a tuple of two condition
+        indices, e.g. `(0, 1)` for 'condition 0 minus condition 1', or a
+        sequence of contrast weights (floats) with one weight per condition,
+        e.g. `(1.0, -0.5, -0.5)` for 'condition 0 minus the mean of conditions
+        1 and 2'.
+    varNumCon : int
+        Number of conditions.
+
+    Returns
+    -------
+    aryCntr : np.array
+        Contrast weights, shape aryCntr[comparison, condition].
+    """
+    aryCntr = np.zeros((len(lstDiff), varNumCon))
+    for idxDiff in range(len(lstDiff)):
+        lgcPair = ((len(lstDiff[idxDiff]) == 2)
+                   and all([isinstance(varTmp, (int, np.integer))
+                            for varTmp in lstDiff[idxDiff]]))
+        if lgcPair:
+            # Pair of condition indices:
+            aryCntr[idxDiff, lstDiff[idxDiff][0]] = 1.0
+            aryCntr[idxDiff, lstDiff[idxDiff][1]] = -1.0
+        elif len(lstDiff[idxDiff]) == varNumCon:
+            # Explicit contrast weights:
+            aryCntr[idxDiff, :] = np.array(lstDiff[idxDiff], dtype=np.float64)
+        else:
+            strErrMsg = ('ERROR. Comparison ' + str(lstDiff[idxDiff])
+                         + ' is neither a pair of condition indices nor a'
+                         + ' vector of contrast weights.')
+            raise ValueError(strErrMsg)
+    return aryCntr
+
+
+def permute_batch(aryDpth, lstDiff, vecNumInc=None, varNumIt=10000,
+                  varLow=2.5, varUp=97.5, varNumChnk=10000, varNumRsv=None):
+    """
+    Permutation test for several condition contrasts in depth profiles.
+
+    Parameters
+    ----------
+    aryDpth : np.array
+        Array with depth profiles from all experimental conditions, shape:
+        aryDpth[condition, subject, depth]. (A list of arrays of shape
+        [subject, depth], one per condition, is accepted as well.)
+    lstDiff : list
+        Which conditions to compare. List of tuples with condition indices,
+        e.g. `[(0, 1), (0, 2)]`, or of contrast weight vectors (see
+        `get_cntr`).
+    vecNumInc : np.array
+        1D array with number of vertices per subject, used for weighted
+        averaging across subjects. If `None`, number of vertices is assumed to
+        be equal across subjects.
+    varNumIt : int or None
+        Number of resampling iterations. Set to `None` in case of small enough
+        sample size for exact test (i.e. all possible resamples), otherwise
+        Monte Carlo resampling is performed.
+    varLow : float
+        Lower bound of null distribution.
+    varUp : float
+        Upper bound of null distribution.
+    varNumChnk : int
+        Number of resampling iterations that are processed at once (determines
+        memory footprint of the randomisation array).
+    varNumRsv : int or None
+        Number of null samples kept in memory for the calculation of the
+        bounds of the null distribution. If `None`, all null samples are kept.
+        Otherwise, memory requirements do not depend on the number of
+        iterations (streaming mode, see `permute`). The p-values are the same
+        in both cases.
+
+    Returns
+    -------
+    aryNull : np.array
+        Array with parameters of permutation null distribution, shape
+        aryNull[comparison, 3, depth]. Second dimension corresponds to lower
+        bound, mean, and upper bound of the permutation null distribution (as
+        in `permute`).
+    aryP : np.array
+        Array with one p-value for each comparison and depth level (shape
+        aryP[comparison, depth]), pertaining to the probability of obtaining a
+        difference between conditions as equal to or greater than the
+        empirically observed condition difference (as in `permute`).
+    vecPMax : np.array
+        One p-value per comparison, based on the maximum absolute difference
+        across cortical depth (as in `permute_max`), shape vecPMax[comparison].
+    aryPFwe : np.array
+        Family-wise p-values, shape aryPFwe[comparison, depth]. The null
+        distribution is the maximum absolute difference across all
+        comparisons and depth levels, so these p-values are corrected for
+        multiple comparisons over comparisons and cortical depth.
+    aryEmpDiff : np.array
+        Empirical difference between conditions (weighted mean across
+        subjects), shape aryEmpDiff[comparison, depth].
+
+    Notes
+    -----
+    Swapping the condition labels within a subject is equivalent to flipping
+    the sign of that subject's condition difference. The within-subject
+    differences of all comparisons are stacked into one matrix of shape
+    [subject, comparison * depth], and all comparisons are resampled with the
+    same sign matrix of shape [iteration, subject]. The null distribution of
+    all comparisons is therefore obtained with one matrix product per chunk
+    of iterations, instead of one separate permutation test per comparison.
+    Because all comparisons share the same resampling, the maximum statistic
+    across comparisons yields a valid family-wise error correction.
+
+    Function of the depth sampling pipeline.
+    """
+    # -------------------------------------------------------------------------
+    # *** Preparations
+    print('-Batched permutation test')
+
+    aryDpth = np.asarray(aryDpth, dtype=np.float64)
+
+    # Number of conditions, subjects, and depth levels:
+    varNumCon, varNumSubs, varNumDpt = aryDpth.shape
+
+    # Contrast weights, shape aryCntr[comparison, condition]:
+    aryCntr = get_cntr(lstDiff, varNumCon)
+
+    # Number of comparisons:
+    varNumDiff = aryCntr.shape[0]
+
+    # If number of vertices per subject is not provided, assume it to be the
+    # same across subjects (for weighted averaging):
+    if vecNumInc is None:
+        vecNumInc = np.ones((varNumSubs))
+
+    # Normalised subject weights:
+    vecWght = np.divide(np.asarray(vecNumInc, dtype=np.float64),
+                        np.sum(vecNumInc, dtype=np.float64))
+
+    # Weighted within-subject differences for all comparisons, shape
+    # aryDiff[subject, comparison * depth]:
+    aryDiff = np.einsum('ck,ksd->scd', aryCntr, aryDpth)
+    aryDiff = np.multiply(
+        aryDiff.reshape(varNumSubs, (varNumDiff * varNumDpt)),
+        vecWght[:, None])
+
+    # -------------------------------------------------------------------------
+    # *** Calculate empirical difference
+
+    print('---Calculate empirical difference')
+
+    # Weighted mean difference across subjects (the same matrix product as
+    # for the resampled data, with all signs positive):
+    vecEmpDiff = np.dot(np.ones((1, varNumSubs)), aryDiff)[0, :]
+
+    # Maximum absolute difference per comparison, and across all comparisons:
+    vecEmpMax = np.max(np.absolute(vecEmpDiff.reshape(varNumDiff, varNumDpt)),
+                       axis=1)
+
+    # Tolerance for the comparison of resampled and empirical values, so that
+    # the identity permutation is counted despite of rounding differences
+    # between matrix products of different shape:
+    vecTol = np.multiply(np.sum(np.absolute(aryDiff), axis=0), 1e-12)
+
+    # -------------------------------------------------------------------------
+    # *** Create null distribution
+
+    print('---Create null distribution')
+
+    # Sign matrix for all iterations, of the form aryRnd[idxIteration,
+    # idxSub]. As in `permute`, one means that the original condition labels
+    # are kept, and zero means that they are switched.
+    if not(varNumIt is None):
+        # Monte Carlo resampling:
+        aryRnd = None
+    else:
+        # In case of tractable number of permutations, create a list of all
+        # possible permutations (Bernoulli sequence).
+        aryRnd = np.array(list(itertools.product([0, 1], repeat=varNumSubs)))
+        # Number of resampling cases:
+        varNumIt = aryRnd.shape[0]
+
+    # Null distribution of mean differences (all iterations, or selected
+    # iterations in streaming mode), shape aryPerm[iteration, comparison *
+    # depth]:
+    if varNumRsv is None:
+        vecIdxRsv = np.arange(varNumIt)
+    else:
+        vecIdxRsv = get_rsv(varNumIt, varNumRsv, (aryRnd is not None))
+    aryPerm = np.zeros((vecIdxRsv.shape[0], (varNumDiff * varNumDpt)))
+
+    # Running sum for mean of null distribution:
+    vecPermSum = np.zeros((varNumDiff * varNumDpt))
+
+    # Counters for p-values:
+    vecCnt = np.zeros((varNumDiff * varNumDpt))
+    vecCntMax = np.zeros((varNumDiff))
+    vecCntFwe = np.zeros((varNumDiff * varNumDpt))
+
+    for varIdx01 in range(0, varNumIt, varNumChnk):
+
+        varIdx02 = min((varIdx01 + varNumChnk), varNumIt)
+
+        if aryRnd is None:
+            aryRndChnk = np.random.randint(0, high=2,
+                                           size=((varIdx02 - varIdx01),
+                                                 varNumSubs))
+        else:
+            aryRndChnk = aryRnd[varIdx01:varIdx02, :]
+
+        # Convert randomisation array into signs (one for original labels,
+        # minus one for switched labels):
+        arySgn = np.subtract(np.multiply(2.0, aryRndChnk), 1.0)
+
+        # Mean difference between randomised groups for all comparisons at
+        # once, shape [chunk, comparison * depth]:
+        aryPermChnk = np.dot(arySgn, aryDiff)
+        vecPermSum += np.sum(aryPermChnk, axis=0)
+
+        # Keep selected null samples:
+        lgcRsv = np.logical_and(np.greater_equal(vecIdxRsv, varIdx01),
+                                np.less(vecIdxRsv, varIdx02))
+        aryPerm[lgcRsv, :] = aryPermChnk[(vecIdxRsv[lgcRsv] - varIdx01), :]
+
+        # Count resampling cases with a condition difference greater or equal
+        # to the empirical difference:
+        vecCnt += np.sum(np.greater_equal(aryPermChnk,
+                                          np.subtract(vecEmpDiff, vecTol)),
+                         axis=0)
+
+        # Maximum absolute difference across depth, per comparison:
+        aryPermAbs = np.absolute(aryPermChnk).reshape(-1, varNumDiff,
+                                                      varNumDpt)
+        aryPermMax = np.max(aryPermAbs, axis=2)
+        vecCntMax += np.sum(np.greater_equal(aryPermMax,
+                                             np.subtract(vecEmpMax,
+                                                         np.max(vecTol))),
+                            axis=0)
+
+        # Maximum absolute difference across comparisons and depth:
+        vecPermMaxFwe = np.max(aryPermMax, axis=1)
+        vecCntFwe += np.sum(
+            np.greater_equal(vecPermMaxFwe[:, None],
+                             np.subtract(np.absolute(vecEmpDiff),
+                                         np.max(vecTol))[None, :]),
+            axis=0)
+
+    # -------------------------------------------------------------------------
+    # *** Summarise null distribution
+
+    # Mean and percentile bounds of permutation distribution:
+    vecPermMne = np.divide(vecPermSum, float(varNumIt))
+    aryPermPrcnt = np.percentile(aryPerm, (varLow, varUp), axis=0)
+    del(aryPerm)
+
+    # Output array of shape aryNull[comparison, 3, depth]:
+    aryNull = np.array([aryPermPrcnt[0, :],
+                        vecPermMne,
+                        aryPermPrcnt[1, :]])
+    aryNull = np.swapaxes(aryNull.reshape(3, varNumDiff, varNumDpt), 0, 1)
+
+    # -------------------------------------------------------------------------
+    # *** Calculate p-values
+
+    print('---Calculate p-values')
+
+    aryP = np.divide(vecCnt, float(varNumIt)).reshape(varNumDiff, varNumDpt)
+    vecPMax = np.divide(vecCntMax, float(varNumIt))
+    aryPFwe = np.divide(vecCntFwe, float(varNumIt)).reshape(varNumDiff,
+                                                            varNumDpt)
+    aryEmpDiff = vecEmpDiff.reshape(varNumDiff, varNumDpt)
+
+    return aryNull, aryP, vecPMax, aryPFwe, aryEmpDiff
+    # -------------------------------------------------------------------------
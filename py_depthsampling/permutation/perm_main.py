@@ -26,8 +26,160 @@ import itertools
 import numpy as np
 
 
+def perm_diff(aryDpth01, aryDpth02, aryRnd, vecNumInc):
+    """
+    Mean difference between randomly permuted conditions.
+
+    Parameters
+    ----------
+    aryDpth01 : np.array
+        Array with depth profiles from first experimental condition, shape:
+        aryDpth01[subject, depth].
+    aryDpth02 : np.array
+        Array with depth profiles from second experimental condition, shape:
+        aryDpth02[subject, depth].
+    aryRnd : np.array
+        Randomisation array, shape aryRnd[iteration, subject]. One means that
+        the original condition labels are kept, zero means that they are
+        switched.
+    vecNumInc : np.array
+        1D array with number of vertices per subject, used for weighted
+        averaging across subjects.
+
+    Returns
+    -------
+    aryPermDiff : np.array
+        Weighted mean difference between the randomised groups across
+        subjects, shape aryPermDiff[iteration, depth].
+
+    Notes
+    -----
+    The result for each iteration does not depend on the other rows of the
+    randomisation array, so the null distribution can be created in chunks of
+    iterations with identical results.
+    """
+    # Number of iterations, subjects, and depth levels:
+    varNumIt = aryRnd.shape[0]
+    varNumSubs = aryDpth01.shape[0]
+    varNumDpt = aryDpth01.shape[1]
+
+    # We need two versions of the randomisation array, one for sampling from
+    # the first input array (e.g. 'PacMan Dynamic'), and a second version to
+    # sample from the second input array (e.g. 'PacMan Static'). (I.e. the
+    # second version is the opposite of the first version.)
+    aryRnd01 = np.equal(aryRnd, 1)
+    aryRnd02 = np.equal(aryRnd, 0)
+
+    # Arrays for permuted depth profiles for the two randomised groups:
+    aryDpthRnd01 = np.zeros((varNumIt, varNumSubs, varNumDpt))
+    aryDpthRnd02 = np.zeros((varNumIt, varNumSubs, varNumDpt))
+
+    # Loop through iterations:
+    for idxIt in range(0, varNumIt):
+
+        # Assign values from original group 1 to permutation group 1:
+        aryDpthRnd01[idxIt, aryRnd01[idxIt, :], :] = \
+            aryDpth01[aryRnd01[idxIt, :], :]
+
+        # Assign values from original group 2 to permutation group 1:
+        aryDpthRnd01[idxIt, aryRnd02[idxIt, :], :] = \
+            aryDpth02[aryRnd02[idxIt, :], :]
+
+        # Assign values from original group 1 to permutation group 2:
+        aryDpthRnd02[idxIt, aryRnd02[idxIt, :], :] = \
+            aryDpth01[aryRnd02[idxIt, :], :]
+
+        # Assign values from original group 2 to permutation group 2:
+        aryDpthRnd02[idxIt, aryRnd01[idxIt, :], :] = \
+            aryDpth02[aryRnd01[idxIt, :], :]
+
+    # Within-subject difference between conditions (separately for each
+    # iteration, subject, and depth level):
+    aryPermDiff = np.subtract(aryDpthRnd01, aryDpthRnd02)
+
+    # Mean condition difference across subjects (separately for each
+    # iteration and depth level):
+    aryPermDiff = np.average(aryPermDiff, weights=vecNumInc, axis=1)
+
+    return aryPermDiff
+
+
+def get_rnd(varNumIt, varNumSubs):
+    """
+    Create randomisation array for permutation test.
+
+    Parameters
+    ----------
+    varNumIt : int or None
+        Number of resampling iterations. If `None`, all possible permutations
+        are returned (exact test).
+    varNumSubs : int
+        Number of subjects.
+
+    Returns
+    -------
+    aryRnd : np.array or None
+        Randomisation array, shape aryRnd[iteration, subject]. `None` in case
+        of Monte Carlo resampling, in which case the randomisation array
+        should be created in chunks, with `np.random.randint(0, high=2,
+        size=(varNumChnk, varNumSubs))`. (The sequence of random numbers is
+        the same as when drawing all iterations at once.)
+    varNumIt : int
+        Number of resampling iterations.
+    """
+    if not(varNumIt is None):
+        # Monte Carlo resampling:
+        aryRnd = None
+    else:
+        # In case of tractable number of permutations, create a list of all
+        # possible permutations (Bernoulli sequence).
+        lstBnl = list(itertools.product([0, 1], repeat=varNumSubs))
+        aryRnd = np.array(lstBnl)
+        # Number of resampling cases:
+        varNumIt = len(lstBnl)
+    return aryRnd, varNumIt
+
+
+def get_rsv(varNumIt, varNumRsv, lgcExct):
+    """
+    Select resampling iterations to keep in memory in streaming mode.
+
+    Parameters
+    ----------
+    varNumIt : int
+        Number of resampling iterations.
+    varNumRsv : int
+        Number of iterations to keep (size of reservoir).
+    lgcExct : bool
+        Whether the iterations are all possible permutations (exact test), as
+        opposed to Monte Carlo resampling.
+
+    Returns
+    -------
+    vecIdxRsv : np.array
+        Sorted indices of iterations to keep.
+
+    Notes
+    -----
+    Monte Carlo iterations are independent and identically distributed, so
+    the first iterations are a random sample of the null distribution. The
+    permutations of the exact test are ordered, so a random subset is drawn
+    instead. A separate random number generator is used for this, so that the
+    resampling itself is not affected.
+    """
+    if varNumRsv >= varNumIt:
+        vecIdxRsv = np.arange(varNumIt)
+    elif not lgcExct:
+        vecIdxRsv = np.arange(varNumRsv)
+    else:
+        objRng = np.random.RandomState(0)
+        vecIdxRsv = np.sort(objRng.choice(varNumIt, size=varNumRsv,
+                                          replace=False))
+    return vecIdxRsv
+
+
 def permute(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000, varLow=2.5,
-            varUp=97.5):
+            varUp=97.5, lgcStrm=False, varNumChnk=10000, varNumRsv=10000):
     """
     Permutation test for difference between conditions in depth profiles.
 
@@ -51,6 +203,19 @@ def permute(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000, varLow=2.5,
         Lower bound of null distribution.
     varUp : float
         Upper bound of null distribution.
+    lgcStrm : bool
+        Streaming mode. If `True`, the null distribution is created in chunks
+        of iterations, and only running counts (for the p-values), running
+        sums (for the mean of the null distribution), and a fixed number of
+        null samples (for the bounds of the null distribution) are kept in
+        memory.
+    varNumChnk : int
+        Number of iterations per chunk (streaming mode only).
+    varNumRsv : int
+        Number of null samples kept for the calculation of the bounds of the
+        null distribution (streaming mode only). If this is not smaller than
+        the number of iterations, the bounds are identical to those of the
+        non-streaming mode.
 
     Returns
     -------
@@ -90,6 +255,14 @@ def permute(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000, varLow=2.5,
     - The empirical difference between conditions can be compared agains this
       null distribution.
 
+    In streaming mode, memory requirements are of the order of `varNumChnk *
+    depth` (plus `varNumRsv * depth` for the null samples), irrespective of
+    the number of iterations. For the same state of the random number
+    generator, the p-values are identical to those of the non-streaming mode
+    (each chunk consumes the same sequence of random numbers as the
+    respective rows of the full randomisation array). The mean of the null
+    distribution is identical up to floating point rounding.
+
     """
     # -------------------------------------------------------------------------
     # *** Preparations
@@ -107,9 +280,21 @@ def permute(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000, varLow=2.5,
         vecNumInc = np.ones((varNumSubs))
 
     # -------------------------------------------------------------------------
-    # *** Create null distribution
+    # *** Calculate empirical difference
+
+    print('---Calculate empirical difference')
+
+    # Empirical difference between conditions. First, calculate within-subject
+    # difference:
+    aryEmpDiff = np.subtract(aryDpth01, aryDpth02)
+
+    # Mean difference across subjects:
+    aryEmpDiffMdn = np.average(aryEmpDiff, weights=vecNumInc, axis=0)
+
+    # -------------------------------------------------------------------------
+    # *** Create null distribution & calculate p-value
 
-    print('---Create null distribution')
+    print('---Create null distribution & calculate p-value')
 
     # Random array that is used to permute condition labels within subjects, of
     # the form aryRnd[idxIteration, idxSub]. For each iteration and subject,
@@ -120,107 +305,86 @@ def permute(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000, varLow=2.5,
     # permuted 'PacMan Static' group. 'One' means that the labels are switched,
     # i.e. the actual 'PacMan Dynamic' value get assignet to the 'PacMan
     # Static' group, and vice versa.
-    if not(varNumIt is None):
-        # Monte Carlo resampling:
-        aryRnd = np.random.randint(0, high=2, size=(varNumIt, varNumSubs))
-    else:
-        # In case of tractable number of permutations, create a list of all
-        # possible permutations (Bernoulli sequence).
-        lstBnl = list(itertools.product([0, 1], repeat=varNumSubs))
-        aryRnd = np.array(lstBnl)
-        # Number of resampling cases:
-        varNumIt = len(lstBnl)
+    aryRnd, varNumIt = get_rnd(varNumIt, varNumSubs)
 
-    # We need two versions of the randomisation array, one for sampling from
-    # the first input array (e.g. 'PacMan Dynamic'), and a second version to
-    # sample from the second input array (e.g. 'PacMan Static'). (I.e. the
-    # second version is the opposite of the first version.)
-    aryRnd01 = np.equal(aryRnd, 1)
-    aryRnd02 = np.equal(aryRnd, 0)
-    del(aryRnd)
+    if not lgcStrm:
 
-    # Arrays for permuted depth profiles for the two randomised groups:
-    aryDpthRnd01 = np.zeros((varNumIt, varNumSubs, varNumDpt))
-    aryDpthRnd02 = np.zeros((varNumIt, varNumSubs, varNumDpt))
+        if aryRnd is None:
+            # Monte Carlo resampling:
+            aryRnd = np.random.randint(0, high=2, size=(varNumIt, varNumSubs))
 
-    # Loop through iterations:
-    for idxIt in range(0, varNumIt):
+        # Mean condition difference across subjects (separately for each
+        # iteration and depth level):
+        aryPermDiff = perm_diff(aryDpth01, aryDpth02, aryRnd, vecNumInc)
+        del(aryRnd)
 
-        # Assign values from original group 1 to permutation group 1:
-        aryDpthRnd01[idxIt, aryRnd01[idxIt, :], :] = \
-            aryDpth01[aryRnd01[idxIt, :], :]
+        # Mean of permutation distribution - i.e. the mean difference between
+        # randomly permuted conditions - the mean difference expected by
+        # chance.
+        aryPermDiffMne = np.mean(aryPermDiff, axis=0)
 
-        # Assign values from original group 2 to permutation group 1:
-        aryDpthRnd01[idxIt, aryRnd02[idxIt, :], :] = \
-            aryDpth02[aryRnd02[idxIt, :], :]
-
-        # Assign values from original group 1 to permutation group 2:
-        aryDpthRnd02[idxIt, aryRnd02[idxIt, :], :] = \
-            aryDpth01[aryRnd02[idxIt, :], :]
+        # Lower and upper bound of the permutation null distribution. For
+        # instance, if `varLow = 2.5` and `varUp = 97.5`, this corresponds to
+        # the bounds of the 95% confidence interval of the null distribution.
+        aryPermDiffPrcnt = np.percentile(aryPermDiff, (varLow, varUp),
+                                         axis=0).T
 
-        # Assign values from original group 2 to permutation group 2:
-        aryDpthRnd02[idxIt, aryRnd01[idxIt, :], :] = \
-            aryDpth02[aryRnd01[idxIt, :], :]
-
-    # Within-subject difference between conditions (separately for each
-    # iteration, subject, and depth level):
-    aryPermDiff = np.subtract(aryDpthRnd01, aryDpthRnd02)
-
-    # Mean condition difference across subjects (separately for each
-    # iteration and depth level):
-    # aryPermDiff = np.mean(aryPermDiff, axis=1)
-    aryPermDiff = np.average(aryPermDiff, weights=vecNumInc, axis=1)
-
-    # Mean of permutation distribution - i.e. the mean difference between
-    # randomly permuted conditions - the mean difference expected by chance.
-    aryPermDiffMne = np.mean(aryPermDiff, axis=0)
+        # Number of resampling cases with a condition difference greater or
+        # equal to the 'actual', empricial difference between conditions (at
+        # each depth level):
+        vecP = np.sum(np.greater_equal(aryPermDiff, aryEmpDiffMdn[None, :]),
+                      axis=0).astype(np.float64)
 
-    # Lower and upper bound of the permutation null distribution. For instance,
-    # if `varLow = 2.5` and `varUp = 97.5`, this corresponds to the bounds of
-    # the 95% confidence interval of the null distribution.
-    aryPermDiffPrcnt = np.percentile(aryPermDiff, (varLow, varUp), axis=0).T
+    else:
 
-    # Create output array of shape aryNull[3, varNumDpth]. First dimension
-    # corresponds to lower bound, mean, and upper bound of the permutation
-    # null distribution.
-    aryNull = np.array([aryPermDiffPrcnt[:, 0],
-                        aryPermDiffMne,
-                        aryPermDiffPrcnt[:, 1]])
+        # Iterations kept for the bounds of the null distribution:
+        vecIdxRsv = get_rsv(varNumIt, varNumRsv, (aryRnd is not None))
+        aryRsv = np.zeros((vecIdxRsv.shape[0], varNumDpt))
 
-    # -------------------------------------------------------------------------
-    # *** Calculate empirical difference
+        # Running sum (for mean of null distribution) and running count of
+        # resampling cases with a condition difference greater or equal to
+        # the empirical difference (for p-value):
+        vecPermDiffSum = np.zeros((varNumDpt))
+        vecP = np.zeros((varNumDpt))
 
-    print('---Calculate empirical difference')
+        for varIdx01 in range(0, varNumIt, varNumChnk):
 
-    # Empirical difference between conditions. First, calculate within-subject
-    # difference:
-    aryEmpDiff = np.subtract(aryDpth01, aryDpth02)
+            varIdx02 = min((varIdx01 + varNumChnk), varNumIt)
 
-    # Mean difference across subjects:
-    aryEmpDiffMdn = np.average(aryEmpDiff, weights=vecNumInc, axis=0)
+            if aryRnd is None:
+                # Monte Carlo resampling:
+                aryRndChnk = np.random.randint(
+                    0, high=2, size=((varIdx02 - varIdx01), varNumSubs))
+            else:
+                aryRndChnk = aryRnd[varIdx01:varIdx02, :]
 
-    # -------------------------------------------------------------------------
-    # *** Calculate p-value
+            # Mean condition difference across subjects for current chunk:
+            aryPermDiff = perm_diff(aryDpth01, aryDpth02, aryRndChnk,
+                                    vecNumInc)
 
-    print('---Calculate p-value')
+            vecPermDiffSum += np.sum(aryPermDiff, axis=0)
+            vecP += np.sum(np.greater_equal(aryPermDiff,
+                                            aryEmpDiffMdn[None, :]),
+                           axis=0)
 
-    # Array for p-value at each depth level:
-    vecP = np.zeros((varNumDpt))
+            # Keep selected null samples:
+            lgcRsv = np.logical_and(np.greater_equal(vecIdxRsv, varIdx01),
+                                    np.less(vecIdxRsv, varIdx02))
+            aryRsv[lgcRsv, :] = aryPermDiff[(vecIdxRsv[lgcRsv] - varIdx01), :]
 
-    # Take absolute difference?
-    # aryPermDiff = np.absolute(aryPermDiff)
-    # aryEmpDiffMne = np.absolute(aryEmpDiffMne)
+        # Mean of permutation distribution:
+        aryPermDiffMne = np.divide(vecPermDiffSum, float(varNumIt))
 
-    for idxDpt in range(varNumDpt):
+        # Lower and upper bound of the permutation null distribution (based on
+        # the selected null samples):
+        aryPermDiffPrcnt = np.percentile(aryRsv, (varLow, varUp), axis=0).T
 
-        # Number of resampling cases with a condition difference greater or
-        # equal to the 'actual', empricial difference between conditions:
-        vecP[idxDpt] = np.sum(
-                              np.greater_equal(
-                                               aryPermDiff[:, idxDpt],
-                                               aryEmpDiffMdn[idxDpt]
-                                               )
-                              ).astype(np.float64)
+    # Create output array of shape aryNull[3, varNumDpth]. First dimension
+    # corresponds to lower bound, mean, and upper bound of the permutation
+    # null distribution.
+    aryNull = np.array([aryPermDiffPrcnt[:, 0],
+                        aryPermDiffMne,
+                        aryPermDiffPrcnt[:, 1]])
 
     # Convert count of cases into p-value:
     vecP = np.divide(vecP, float(varNumIt))
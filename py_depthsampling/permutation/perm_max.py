@@ -22,11 +22,13 @@ Function of the depth sampling pipeline.
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 
 
-import itertools
 import numpy as np
+from py_depthsampling.permutation.perm_main import get_rnd
+from py_depthsampling.permutation.perm_main import perm_diff
 
 
-def permute_max(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000):
+def permute_max(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000,
+                lgcStrm=False, varNumChnk=10000):
     """
     Permutation test for difference between conditions in depth profiles.
 
@@ -46,6 +48,14 @@ def permute_max(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000):
         Number of resampling iterations. Set to `None` in case of small enough
         sample size for exact test (i.e. all possible resamples), otherwise
         Monte Carlo resampling is performed.
+    lgcStrm : bool
+        Streaming mode. If `True`, the null distribution is created in chunks
+        of iterations, and only a running count of null samples that exceed
+        the empirical maximum is kept in memory. For the same state of the
+        random number generator, the p-value is identical to that of the
+        non-streaming mode.
+    varNumChnk : int
+        Number of iterations per chunk (streaming mode only).
 
     Returns
     -------
@@ -86,82 +96,11 @@ def permute_max(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000):
     # Number of subject:
     varNumSubs = aryDpth01.shape[0]
 
-    # Number of depth levels:
-    varNumDpt = aryDpth01.shape[1]
-
     # If number of vertices per subject is not provided, assume it to be the
     # same across subjects (for weighted averaging):
     if vecNumInc is None:
         vecNumInc = np.ones((varNumSubs))
 
-    # -------------------------------------------------------------------------
-    # *** Create null distribution
-
-    print('---Create null distribution')
-
-    # Random array that is used to permute condition labels within subjects, of
-    # the form aryRnd[idxIteration, idxSub]. For each iteration and subject,
-    # there is either a zero or a one. For instance, assume that conditions are
-    # 'PacMan Dynamic' and 'PacMan Static'. 'Zero' means that the actual
-    # condition value 'PacMan Dynamic' gets assigned to the permuted 'PacMan
-    # Dynamic' group, and the actual 'PacMan Static' value gets assigned to the
-    # permuted 'PacMan Static' group. 'One' means that the labels are switched,
-    # i.e. the actual 'PacMan Dynamic' value get assignet to the 'PacMan
-    # Static' group, and vice versa.
-    if not(varNumIt is None):
-        # Monte Carlo resampling:
-        aryRnd = np.random.randint(0, high=2, size=(varNumIt, varNumSubs))
-    else:
-        # In case of tractable number of permutations, create a list of all
-        # possible permutations (Bernoulli sequence).
-        lstBnl = list(itertools.product([0, 1], repeat=varNumSubs))
-        aryRnd = np.array(lstBnl)
-        # Number of resampling cases:
-        varNumIt = len(lstBnl)
-
-    # We need two versions of the randomisation array, one for sampling from
-    # the first input array (e.g. 'PacMan Dynamic'), and a second version to
-    # sample from the second input array (e.g. 'PacMan Static'). (I.e. the
-    # second version is the opposite of the first version.)
-    aryRnd01 = np.equal(aryRnd, 1)
-    aryRnd02 = np.equal(aryRnd, 0)
-    del(aryRnd)
-
-    # Arrays for permuted depth profiles for the two randomised groups:
-    aryDpthRnd01 = np.zeros((varNumIt, varNumSubs, varNumDpt))
-    aryDpthRnd02 = np.zeros((varNumIt, varNumSubs, varNumDpt))
-
-    # Loop through iterations:
-    for idxIt in range(0, varNumIt):
-
-        # Assign values from original group 1 to permutation group 1:
-        aryDpthRnd01[idxIt, aryRnd01[idxIt, :], :] = \
-            aryDpth01[aryRnd01[idxIt, :], :]
-
-        # Assign values from original group 2 to permutation group 1:
-        aryDpthRnd01[idxIt, aryRnd02[idxIt, :], :] = \
-            aryDpth02[aryRnd02[idxIt, :], :]
-
-        # Assign values from original group 1 to permutation group 2:
-        aryDpthRnd02[idxIt, aryRnd02[idxIt, :], :] = \
-            aryDpth01[aryRnd02[idxIt, :], :]
-
-        # Assign values from original group 2 to permutation group 2:
-        aryDpthRnd02[idxIt, aryRnd01[idxIt, :], :] = \
-            aryDpth02[aryRnd01[idxIt, :], :]
-
-    # Within-subject difference between conditions (separately for each
-    # iteration, subject, and depth level):
-    aryPermDiff = np.subtract(aryDpthRnd01, aryDpthRnd02)
-
-    # Mean condition difference across subjects (separately for each
-    # iteration and depth level):
-    # aryPermDiff = np.mean(aryPermDiff, axis=1)
-    aryPermDiff = np.average(aryPermDiff, weights=vecNumInc, axis=1)
-
-    # Maximum difference across cortical depth:
-    vecPermDiffMax = np.max(np.absolute(aryPermDiff), axis=1)
-
     # -------------------------------------------------------------------------
     # *** Calculate empirical difference
 
@@ -179,18 +118,47 @@ def permute_max(aryDpth01, aryDpth02, vecNumInc=None, varNumIt=10000):
     varEmpDiffMneMax = np.max(np.absolute(aryEmpDiffMne))
 
     # -------------------------------------------------------------------------
-    # *** Calculate p-value
-
-    print('---Calculate p-value')
-
-    # Number of resampling cases with a condition difference greater or
-    # equal to the 'actual', empricial difference between conditions:
-    varP = np.sum(
-                  np.greater_equal(
-                                   vecPermDiffMax,
-                                   varEmpDiffMneMax
-                                   )
-                  ).astype(np.float64)
+    # *** Create null distribution & calculate p-value
+
+    print('---Create null distribution & calculate p-value')
+
+    # Random array that is used to permute condition labels within subjects, of
+    # the form aryRnd[idxIteration, idxSub] (see `permute`). In case of Monte
+    # Carlo resampling, the array is created chunk by chunk.
+    aryRnd, varNumIt = get_rnd(varNumIt, varNumSubs)
+
+    # In non-streaming mode, all iterations are processed at once:
+    if not lgcStrm:
+        varNumChnk = varNumIt
+
+    # Number of resampling cases with a condition difference greater or equal
+    # to the 'actual', empricial difference between conditions:
+    varP = 0.0
+
+    for varIdx01 in range(0, varNumIt, varNumChnk):
+
+        varIdx02 = min((varIdx01 + varNumChnk), varNumIt)
+
+        if aryRnd is None:
+            # Monte Carlo resampling:
+            aryRndChnk = np.random.randint(
+                0, high=2, size=((varIdx02 - varIdx01), varNumSubs))
+        else:
+            aryRndChnk = aryRnd[varIdx01:varIdx02, :]
+
+        # Mean condition difference across subjects (separately for each
+        # iteration and depth level):
+        aryPermDiff = perm_diff(aryDpth01, aryDpth02, aryRndChnk, vecNumInc)
+
+        # Maximum difference across cortical depth:
+        vecPermDiffMax = np.max(np.absolute(aryPermDiff), axis=1)
+
+        varP += np.sum(
+                       np.greater_equal(
+                                        vecPermDiffMax,
+                                        varEmpDiffMneMax
+                                        )
+                       ).astype(np.float64)
 
     # Convert count of cases into p-value:
     varP = np.divide(varP, float(varNumIt))
@@ -42,7 +42,9 @@ def plt_dpth_prfl_acr_subs(arySubDpthMns,
                            vecX=None,
                            vecWghts=None,
                            varNumLblY=5,
-                           tplPadY=(0.0, 0.0)):
+                           tplPadY=(0.0, 0.0),
+                           aryCnfLw=None,
+                           aryCnfUp=None):
     """
     Calculate & plot across-subjects mean depth profiles.
 
@@ -108,6 +110,14 @@ def plt_dpth_prfl_acr_subs(arySubDpthMns,
         Number of labels on y-axis.
     tplPadY : tuple
         Padding around labelled values on y.
+    aryCnfLw : np.array or None
+        Precomputed lower limit of the error shading, of the form
+        aryCnfLw[Condition, Depth] (e.g. percentile across iterations that was
+        calculated without storing all iterations). If provided (together
+        with `aryCnfUp`), `strErr` is ignored, and `arySubDpthMns` only needs
+        to contain the mean, i.e. arySubDpthMns[1, Condition, Depth].
+    aryCnfUp : np.array or None
+        Precomputed upper limit of the error shading (see `aryCnfLw`).
     """
     # Across-subjects mean:
     if vecWghts is None:
@@ -120,7 +130,12 @@ def plt_dpth_prfl_acr_subs(arySubDpthMns,
     if vecWghts is None:
         vecWghts = np.ones((varNumSubs))
 
-    if strErr == 'conf95':
+    if (aryCnfLw is not None) and (aryCnfUp is not None):
+        # Precomputed error shading:
+        aryArcSubDpthConfLw = aryCnfLw
+        aryArcSubDpthConfUp = aryCnfUp
+
+    elif strErr == 'conf95':
         # Weighted variance:
         aryAcrSubDpthVar = np.average(
                                       np.power(
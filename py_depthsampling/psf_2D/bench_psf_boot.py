@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the PSF bootstrap.
+
+Compares `psf_boot` (group level visual field projections formed chunk by
+chunk from subject counts, fitted in a process pool) with the bootstrap as
+implemented in `estm_psf` before (all resampled single subject visual field
+projections in memory, fits one after another), on synthetic visual field
+projections (200 x 200 elements, as in `psf_2D_main`). Reported are the
+deviation of the fitted parameters (should be zero), run time, and peak
+memory of the resampling, for two numbers of iterations.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import tracemalloc
+import numpy as np
+from scipy.optimize import minimize
+from py_depthsampling.psf_2D.utilities import psf
+from py_depthsampling.psf_2D.utilities import psf_diff
+from py_depthsampling.psf_2D.psf_2D_boot import psf_boot
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Size of visual field projections & number of subjects:
+varSzeVsm = 200
+varNumSub = 9
+
+# Numbers of bootstrap iterations:
+lstNumIt = [10, 40]
+
+# Number of processes & iterations per chunk:
+varPar = 2
+varNumChnk = 5
+
+# Scaling factor from degrees of visual angle to array dimensions, initial
+# values & bounds (as in `psf_2D_main`):
+varScl = (float(varSzeVsm) / (2.0 * 5.19))
+vecInit = np.array([(1.0 * varScl), 5.0])
+lstBnds = [(0.0, (2.0 * varScl)), (0.0, 10.0)]
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Synthetic visual field projections
+
+np.random.seed(0)
+
+# Smooth random pattern (reference depth level), blurred & scaled for the
+# target depth level, with subject specific noise:
+aryPtrn = psf(np.random.randn(varSzeVsm, varSzeVsm), 6.0, 5.0)
+aryDeep = np.add(aryPtrn[None, :, :],
+                 np.random.randn(varNumSub, varSzeVsm, varSzeVsm))
+aryTrgt = np.add(psf(aryPtrn, 8.0, 1.5)[None, :, :],
+                 np.random.randn(varNumSub, varSzeVsm, varSzeVsm))
+aryDeepNorm = np.add(np.random.rand(varNumSub, varSzeVsm, varSzeVsm), 0.5)
+aryTrgtNorm = np.add(np.random.rand(varNumSub, varSzeVsm, varSzeVsm), 0.5)
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Compare with previous implementation
+
+for varNumIt in lstNumIt:
+
+    print('-' + str(varNumIt) + ' iterations, ' + str(varNumSub)
+          + ' subjects')
+
+    aryRnd = np.random.randint(0, high=varNumSub, size=(varNumIt, varNumSub))
+
+    # Previous implementation (resampling of all iterations at once):
+    varTme01 = time.time()
+    tracemalloc.start()
+    aryBooDeep = np.zeros((varNumIt, varNumSub, varSzeVsm, varSzeVsm))
+    aryBooDeepNorm = np.zeros((varNumIt, varNumSub, varSzeVsm, varSzeVsm))
+    aryBooTrgt = np.zeros((varNumIt, varNumSub, varSzeVsm, varSzeVsm))
+    aryBooTrgtNorm = np.zeros((varNumIt, varNumSub, varSzeVsm, varSzeVsm))
+    for idxIt in range(varNumIt):
+        vecRnd = aryRnd[idxIt, :]
+        aryBooDeep[idxIt, :, :, :] = aryDeep[vecRnd, :, :]
+        aryBooDeepNorm[idxIt, :, :, :] = aryDeepNorm[vecRnd, :, :]
+        aryBooTrgt[idxIt, :, :, :] = aryTrgt[vecRnd, :, :]
+        aryBooTrgtNorm[idxIt, :, :, :] = aryTrgtNorm[vecRnd, :, :]
+    aryBooDeep = np.median(aryBooDeep, axis=1)
+    aryBooDeepNorm = np.median(aryBooDeepNorm, axis=1)
+    aryBooTrgt = np.median(aryBooTrgt, axis=1)
+    aryBooTrgtNorm = np.median(aryBooTrgtNorm, axis=1)
+    aryBooDeep = np.divide(aryBooDeep, aryBooDeepNorm)
+    aryBooTrgt = np.divide(aryBooTrgt, aryBooTrgtNorm)
+    varMem01 = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    aryPrm01 = np.zeros((varNumIt, 2))
+    for idxIt in range(varNumIt):
+        dicOptm = minimize(psf_diff,
+                           vecInit,
+                           args=(aryBooDeep[idxIt, :, :],
+                                 aryBooTrgt[idxIt, :, :]),
+                           bounds=lstBnds)
+        aryPrm01[idxIt, :] = dicOptm.x
+    del(aryBooDeep, aryBooDeepNorm, aryBooTrgt, aryBooTrgtNorm)
+    varTme02 = time.time()
+
+    # Chunked & parallel implementation (peak memory of the main process,
+    # sequential run, one chunk):
+    tracemalloc.start()
+    psf_boot(aryDeep, aryDeepNorm, aryTrgt, aryTrgtNorm,
+             aryRnd[:varNumChnk, :], vecInit, lstBnds, varPar=1,
+             varNumChnk=varNumChnk)
+    varMem02 = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    varTme03 = time.time()
+    aryPrm02 = psf_boot(aryDeep, aryDeepNorm, aryTrgt, aryTrgtNorm, aryRnd,
+                        vecInit, lstBnds, varPar=varPar,
+                        varNumChnk=varNumChnk)
+    varTme04 = time.time()
+
+    print(('---Previous:  ' + str(np.around((varTme02 - varTme01), 2))
+           + ' s, resampling peak memory '
+           + str(np.around((varMem01 / 1e6), 1)) + ' MB'))
+    print(('---psf_boot:  ' + str(np.around((varTme04 - varTme03), 2))
+           + ' s (' + str(varPar) + ' processes), peak memory per chunk '
+           + str(np.around((varMem02 / 1e6), 1)) + ' MB'))
+    print(('---Maximum absolute deviation of parameters: '
+           + str(np.max(np.absolute(np.subtract(aryPrm01, aryPrm02))))))
+# -----------------------------------------------------------------------------
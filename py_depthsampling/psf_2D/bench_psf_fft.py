@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the PSF objective in the Fourier domain.
+
+Compares the PSF objective based on `scipy.ndimage.gaussian_filter`
+(`psf_diff`) with the Fourier domain version (`psf_diff_fft`), on synthetic
+visual field projections (200 x 200 elements, as in `psf_2D_main`). Reported
+are the deviation of the filtered maps for all edge handling modes, the time
+per evaluation, run time & result of one PSF fit (with the bounds & initial
+values of `psf_2D_main`; for the Fourier domain version with padding for the
+upper bound of the width & numerical derivatives, and with padding for the
+evaluated widths & analytic derivatives as in `psf_fit` with `lgcFft=True`),
+and the run time of a batched evaluation of a vector of
+widths.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from scipy.ndimage import gaussian_filter
+from scipy.optimize import minimize
+from py_depthsampling.psf_2D.utilities import psf
+from py_depthsampling.psf_2D.utilities import psf_diff
+from py_depthsampling.psf_2D.utilities import psf_fft
+from py_depthsampling.psf_2D.utilities import psf_fft_init
+from py_depthsampling.psf_2D.utilities import psf_diff_fft
+from py_depthsampling.psf_2D.utilities import psf_fit
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Size of visual field projection:
+varSzeVsm = 200
+
+# Scaling factor from degrees of visual angle to array elements (as in
+# `psf_2D_main`):
+varScl = (float(varSzeVsm) / (2.0 * 5.19))
+
+# Initial values & bounds of PSF parameters (as in `psf_2D_main`):
+vecInit = np.array([(1.0 * varScl), 5.0])
+lstBnds = [(0.0, (2.0 * varScl)), (0.0, 10.0)]
+
+# True PSF parameters of the synthetic target map:
+varSdTrue = 0.4 * varScl
+varFctTrue = 1.5
+
+# Widths at which the filtered maps are compared:
+lstSd = [1.0, 2.0, 5.0, 10.0, 20.0, lstBnds[0][1]]
+
+# Number of widths for batched evaluation:
+varNumSd = 50
+
+# Number of repetitions for timing of the fits:
+varNumRep = 3
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Synthetic visual field projections
+
+np.random.seed(0)
+
+aryY, aryX = np.mgrid[0:varSzeVsm, 0:varSzeVsm]
+
+# Reference map (deep depth level): Gaussian blob & square, plus noise:
+aryDeep = np.add(
+    np.multiply(3.0, np.exp(np.divide(-np.add(np.square(aryX - 80.0),
+                                              np.square(aryY - 120.0)),
+                                      (2.0 * np.square(15.0))))),
+    np.multiply(2.0, np.logical_and(np.less(np.absolute(aryX - 130.0), 20.0),
+                                    np.less(np.absolute(aryY - 70.0), 30.0))))
+aryDeep = np.add(aryDeep, np.multiply(0.3, np.random.randn(varSzeVsm,
+                                                           varSzeVsm)))
+
+# Target map (superficial depth level):
+aryTrgt = np.add(psf(aryDeep, varSdTrue, varFctTrue),
+                 np.multiply(0.3, np.random.randn(varSzeVsm, varSzeVsm)))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Deviation of filtered maps
+
+print('-Maximum absolute deviation from gaussian_filter (relative to maximum)')
+
+for strMode in ['nearest', 'reflect', 'mirror', 'wrap', 'constant']:
+    dicFft = psf_fft_init(aryDeep, strMode=strMode)
+    lstDev = []
+    for varSd in lstSd:
+        aryRef = gaussian_filter(aryDeep, varSd, order=0, mode=strMode,
+                                 truncate=4.0)
+        lstDev.append(np.max(np.absolute(np.subtract(
+            aryRef, psf_fft(dicFft, varSd, 1.0)))) / np.max(aryRef))
+    print(('---' + strMode + ', widths ' + str(lstSd) + ': '
+           + str(np.around(lstDev, decimals=7))))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Time per evaluation
+
+print('-Time per evaluation of the PSF (ms)')
+
+for strMode in ['reflect', 'nearest']:
+    dicFft = psf_fft_init(aryDeep, strMode=strMode)
+    lstTme01 = []
+    lstTme02 = []
+    for varSd in lstSd:
+        varTme01 = time.time()
+        for idxRep in range(20):
+            psf(aryDeep, varSd, 1.0, strMode=strMode)
+        varTme02 = time.time()
+        for idxRep in range(20):
+            psf_fft(dicFft, varSd, 1.0)
+        varTme03 = time.time()
+        lstTme01.append((varTme02 - varTme01) * 50.0)
+        lstTme02.append((varTme03 - varTme02) * 50.0)
+    print(('---' + strMode + ', widths ' + str(np.around(lstSd, decimals=1))))
+    print(('------gaussian_filter: ' + str(np.around(lstTme01, decimals=2))))
+    print(('------FFT:             ' + str(np.around(lstTme02, decimals=2))))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** PSF fit
+
+print('-PSF fit (true width ' + str(np.around(varSdTrue, decimals=3))
+      + ', true scaling ' + str(varFctTrue) + ')')
+
+for strMode in ['reflect', 'nearest']:
+
+    varTme01 = time.time()
+    for idxRep in range(varNumRep):
+        dicOptm01 = psf_fit(aryDeep, aryTrgt, vecInit, lstBnds,
+                            strLoss='mad', strMode=strMode)
+    varTme02 = time.time()
+    for idxRep in range(varNumRep):
+        # The transform of the reference map is part of each fit (padding for
+        # the upper bound of the width, numerical derivatives):
+        dicFft = psf_fft_init(aryDeep, lstBnds[0][1], strMode=strMode,
+                              varTrnc=4.0)
+        dicOptm02 = minimize(psf_diff_fft,
+                             vecInit,
+                             args=(dicFft, aryTrgt),
+                             bounds=lstBnds)
+    varTme03 = time.time()
+    for idxRep in range(varNumRep):
+        dicOptm03 = psf_fit(aryDeep, aryTrgt, vecInit, lstBnds,
+                            strLoss='mad', strMode=strMode, lgcFft=True)
+    varTme04 = time.time()
+
+    varTmeFit01 = (varTme02 - varTme01) / float(varNumRep)
+    varTmeFit02 = (varTme03 - varTme02) / float(varNumRep)
+    varTmeFit03 = (varTme04 - varTme03) / float(varNumRep)
+
+    print('---' + strMode)
+    for strLbl, varTmeFit, dicOptm in [
+            ('gaussian_filter:              ', varTmeFit01, dicOptm01),
+            ('FFT, fixed pad, numerical:    ', varTmeFit02, dicOptm02),
+            ('FFT, adaptive pad, analytic:  ', varTmeFit03, dicOptm03)]:
+        print(('------' + strLbl + str(np.around(varTmeFit, 3))
+               + ' s per fit, ' + str(dicOptm.nfev) + ' evaluations, '
+               + 'parameters ' + str(np.around(dicOptm.x, decimals=4))
+               + ', speedup ' + str(np.around((varTmeFit01 / varTmeFit),
+                                              1))))
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Batched evaluation of widths
+
+aryPrm = np.zeros((varNumSd, 2))
+aryPrm[:, 0] = np.linspace(lstBnds[0][0], lstBnds[0][1], num=varNumSd)
+aryPrm[:, 1] = varFctTrue
+
+varTme01 = time.time()
+vecDiff01 = np.array([psf_diff(aryPrm[idxSd, :], aryDeep, aryTrgt,
+                               strMode='reflect')
+                      for idxSd in range(varNumSd)])
+varTme02 = time.time()
+dicFft = psf_fft_init(aryDeep, strMode='reflect')
+vecDiff02 = psf_diff_fft(aryPrm, dicFft, aryTrgt)
+varTme03 = time.time()
+
+print('-Objective at ' + str(varNumSd) + ' widths (reflect)')
+print(('---gaussian_filter (loop): ' + str(np.around((varTme02 - varTme01), 3))
+       + ' s'))
+print(('---FFT (batched):          ' + str(np.around((varTme03 - varTme02), 3))
+       + ' s'))
+print(('---Maximum absolute deviation of objective: '
+       + str(np.max(np.absolute(np.subtract(vecDiff01, vecDiff02))))))
+# -----------------------------------------------------------------------------
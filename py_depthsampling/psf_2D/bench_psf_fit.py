@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of PSF fitting with analytic derivatives.
+
+Compares PSF fits with the mean absolute difference (`psf_diff`, numerical
+derivatives) to fits with the mean squared difference and pseudo-Huber loss
+(`psf_diff_grad`, analytic derivatives), on synthetic visual field
+projections (200 x 200 elements, bounds & initial values as in
+`psf_2D_main`). The synthetic reference map is a smooth random pattern; the
+target map is the reference map blurred with a known PSF, with additive
+Gaussian noise, and (optionally) sparse outliers (such as single elements
+with extreme values at the edge of the projected visual field). Reported
+are the fitted parameters, the number of evaluations of the loss, and run
+time per fit.
+"""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import numpy as np
+from py_depthsampling.psf_2D.utilities import psf
+from py_depthsampling.psf_2D.utilities import psf_fit
+
+
+# -----------------------------------------------------------------------------
+# *** Define parameters
+
+# Size of visual field projections:
+varSzeVsm = 200
+
+# True PSF widths (in degrees of visual angle) & scaling factor:
+lstSdTrue = [0.2, 0.5, 1.2]
+varFctTrue = 1.5
+
+# Standard deviation of additive noise, and fraction of elements that are
+# outliers:
+lstNse = [(0.2, 0.0), (0.5, 0.0), (0.2, 0.01)]
+
+# Loss functions to compare:
+lstLoss = ['mad', 'sq', 'huber']
+
+# Scaling factor from degrees of visual angle to array dimensions, initial
+# values & bounds (as in `psf_2D_main`):
+varScl = (float(varSzeVsm) / (2.0 * 5.19))
+vecInit = np.array([(1.0 * varScl), 5.0])
+lstBnds = [(0.0, (2.0 * varScl)), (0.0, 10.0)]
+# -----------------------------------------------------------------------------
+
+
+# -----------------------------------------------------------------------------
+# *** Compare loss functions
+
+np.random.seed(0)
+
+# Smooth random reference map (percent signal change in the order of one):
+aryDeep = psf(np.random.randn(varSzeVsm, varSzeVsm), 6.0, 10.0)
+
+for varSdTrue in lstSdTrue:
+    for varNse, varOut in lstNse:
+
+        print(('-True width ' + str(varSdTrue) + ' deg, scaling '
+               + str(varFctTrue) + ', noise SD ' + str(varNse)
+               + ', outliers ' + str(varOut)))
+
+        aryTrgt = np.add(psf(aryDeep, (varSdTrue * varScl), varFctTrue),
+                         np.multiply(np.random.randn(varSzeVsm, varSzeVsm),
+                                     varNse))
+        lgcOut = np.less(np.random.rand(varSzeVsm, varSzeVsm), varOut)
+        aryTrgt[lgcOut] = np.multiply(
+            np.random.randn(np.sum(lgcOut)), 20.0)
+
+        for strLoss in lstLoss:
+            varTme01 = time.time()
+            dicOptm = psf_fit(aryDeep, aryTrgt, vecInit, lstBnds,
+                              strLoss=strLoss)
+            varTme02 = time.time()
+            print(('---' + strLoss.ljust(5) + ' width '
+                   + '{:.4f}'.format(dicOptm.x[0] / varScl)
+                   + ' deg, scaling ' + '{:.4f}'.format(dicOptm.x[1])
+                   + ', ' + str(dicOptm.nfev).rjust(3) + ' evaluations, '
+                   + '{:.3f}'.format(varTme02 - varTme01) + ' s'))
+# -----------------------------------------------------------------------------
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""Parallel bootstrapping of cortical depth point spread function."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import multiprocessing as mp
+from py_depthsampling.boot.utilities import get_cnt
+from py_depthsampling.boot.utilities import cnt_median
+from py_depthsampling.psf_2D.utilities import psf_fit
+from py_depthsampling.main.shm import shm_create
+from py_depthsampling.main.shm import shm_attach
+from py_depthsampling.main.shm import shm_free
+
+
+# Arrays in shared memory & fitting parameters of the worker process (set by
+# `init_shm`):
+dicShm = {}
+
+
+def init_shm(dicSpc, vecInit, lstBnds, strLoss='mad', lgcFft=False):
+    """
+    Initialise worker process for PSF bootstrapping in shared memory.
+
+    Parameters
+    ----------
+    dicSpc : dict
+        Specifications of the arrays in shared memory (see
+        `shm.shm_create`), with keys 'aryDeep', 'aryDeepNorm', 'aryTrgt',
+        'aryTrgtNorm' & 'aryRnd' (input), and 'aryPrm' (output).
+    vecInit : np.array
+        Initial values of PSF parameters (width & scaling factor).
+    lstBnds : list
+        Bounds of PSF parameters (see `scipy.optimize.minimize`).
+    strLoss : str
+        Loss function of the PSF fit (see `utilities.psf_fit`).
+    lgcFft : bool
+        Whether the mean absolute difference is evaluated in the Fourier
+        domain (see `utilities.psf_fit`).
+    """
+    for strKey in dicSpc.keys():
+        dicShm[strKey] = shm_attach(dicSpc[strKey])
+    dicShm['vecInit'] = vecInit
+    dicShm['lstBnds'] = lstBnds
+    dicShm['strLoss'] = strLoss
+    dicShm['lgcFft'] = lgcFft
+
+
+def close_shm():
+    """Close shared memory blocks attached by `init_shm`."""
+    lstShm = [dicShm[strKey][0] for strKey in dicShm.keys()
+              if type(dicShm[strKey]) == tuple]
+    dicShm.clear()
+    for objShm in lstShm:
+        objShm.close()
+
+
+def psf_boot_shm(tplChnk):
+    """
+    Bootstrapping of PSF parameters for a chunk of iterations.
+
+    Parameters
+    ----------
+    tplChnk : tuple
+        Indices of the first and last (exclusive) iteration of the chunk.
+
+    Returns
+    -------
+    varIdx01 : int
+        Index of the first iteration of the chunk.
+
+    Notes
+    -----
+    Worker function for `psf_boot` (to be called in a process pool
+    initialised with `init_shm`). The single subject visual field
+    projections and the randomisation array are read from shared memory.
+    The group level visual field projections of the bootstrap samples of the
+    chunk are formed from subject counts, the PSF is fitted to each of them,
+    and only the fitted parameters are written into the output array in
+    shared memory.
+    """
+    varIdx01, varIdx02 = tplChnk
+
+    aryRnd = dicShm['aryRnd'][1][varIdx01:varIdx02, :]
+    varNumSub, varSzeY, varSzeX = dicShm['aryDeep'][1].shape
+
+    # How often each subject is included in each bootstrap sample:
+    aryCnt = get_cnt(aryRnd, varNumSub)
+
+    # Median across subjects within each bootstrap sample (same as median
+    # across the resampled subject axis), of the form aryBoo*[idxIteration,
+    # y, x]:
+    dicBoo = {}
+    for strKey in ['aryDeep', 'aryDeepNorm', 'aryTrgt', 'aryTrgtNorm']:
+        dicBoo[strKey] = cnt_median(
+            aryCnt,
+            dicShm[strKey][1].reshape(varNumSub, (varSzeY * varSzeX))
+            ).reshape((varIdx02 - varIdx01), varSzeY, varSzeX)
+
+    # Normalise:
+    aryBooDeep = np.divide(dicBoo['aryDeep'], dicBoo['aryDeepNorm'])
+    aryBooTrgt = np.divide(dicBoo['aryTrgt'], dicBoo['aryTrgtNorm'])
+    del(dicBoo)
+
+    for idxIt in range(varIdx02 - varIdx01):
+
+        # Fit point spread function:
+        dicOptm = psf_fit(aryBooDeep[idxIt, :, :],
+                          aryBooTrgt[idxIt, :, :],
+                          dicShm['vecInit'],
+                          dicShm['lstBnds'],
+                          strLoss=dicShm['strLoss'],
+                          lgcFft=dicShm['lgcFft'])
+
+        dicShm['aryPrm'][1][(varIdx01 + idxIt), :] = dicOptm.x
+
+    return varIdx01
+
+
+def psf_boot(aryDeep, aryDeepNorm, aryTrgt, aryTrgtNorm, aryRnd, vecInit,
+             lstBnds, varPar=1, varNumChnk=10, strLoss='mad', lgcFft=False):
+    """
+    Bootstrap distribution of cortical depth point spread function parameters.
+
+    Parameters
+    ----------
+    aryDeep : np.array
+        Single subject visual field projections of the reference depth
+        level, of the form aryDeep[idxSub, y, x].
+    aryDeepNorm : np.array
+        Normalisation factors of the reference visual field projections (same
+        shape as `aryDeep`).
+    aryTrgt : np.array
+        Single subject visual field projections of the target depth level
+        (same shape as `aryDeep`).
+    aryTrgtNorm : np.array
+        Normalisation factors of the target visual field projections (same
+        shape as `aryDeep`).
+    aryRnd : np.array
+        Array with subject indices for bootstrapping, of the form
+        aryRnd[iteration, sample].
+    vecInit : np.array
+        Initial values of PSF parameters (width & scaling factor).
+    lstBnds : list
+        Bounds of PSF parameters (see `scipy.optimize.minimize`).
+    varPar : int
+        Number of processes to run in parallel.
+    varNumChnk : int
+        Number of bootstrap iterations per chunk (i.e. per task of the
+        process pool).
+    strLoss : str
+        Loss function of the PSF fit (see `utilities.psf_fit`).
+    lgcFft : bool
+        Whether the mean absolute difference is evaluated in the Fourier
+        domain (see `utilities.psf_fit`).
+
+    Returns
+    -------
+    aryPrm : np.array
+        Fitted PSF parameters (width in array indices & scaling factor) of
+        each bootstrap sample, of the form aryPrm[iteration, parameter]. NaN
+        for failed fits (loss not finite, see `utilities.psf_fit`).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. Same result as resampling the
+    single subject visual field projections for all iterations, taking the
+    median across subjects within each bootstrap sample, normalising, and
+    fitting the PSF one iteration after another (as in `estm_psf` before).
+    The single subject visual field projections, the randomisation array,
+    and the output array are placed in shared memory once, and only the
+    chunk indices are sent to the processes. The group level visual field
+    projections are formed chunk by chunk (see `psf_boot_shm`), so that
+    memory usage depends on the chunk size (and number of processes), but
+    not on the number of iterations.
+    """
+    varNumIt = aryRnd.shape[0]
+
+    lstChnk = [(varIdx01, min((varIdx01 + varNumChnk), varNumIt))
+               for varIdx01 in range(0, varNumIt, varNumChnk)]
+
+    # Input & output arrays in shared memory:
+    lstShm = []
+    dicAry = {}
+    dicSpc = {}
+    for strKey, objTmp in [('aryDeep', aryDeep),
+                           ('aryDeepNorm', aryDeepNorm),
+                           ('aryTrgt', aryTrgt),
+                           ('aryTrgtNorm', aryTrgtNorm),
+                           ('aryRnd', aryRnd),
+                           ('aryPrm', (varNumIt, 2))]:
+        if type(objTmp) == tuple:
+            objShm, dicAry[strKey], dicSpc[strKey] = shm_create(tplShp=objTmp)
+        else:
+            objShm, dicAry[strKey], dicSpc[strKey] = shm_create(aryIn=objTmp)
+        lstShm.append(objShm)
+
+    try:
+
+        if varPar > 1:
+            objPool = mp.Pool(processes=varPar, initializer=init_shm,
+                              initargs=(dicSpc, vecInit, lstBnds, strLoss,
+                                        lgcFft))
+            objPool.map(psf_boot_shm, lstChnk)
+            objPool.close()
+            objPool.join()
+        else:
+            init_shm(dicSpc, vecInit, lstBnds, strLoss=strLoss,
+                     lgcFft=lgcFft)
+            for tplChnk in lstChnk:
+                psf_boot_shm(tplChnk)
+            close_shm()
+
+        # Copy results out of shared memory:
+        aryPrm = np.copy(dicAry['aryPrm'])
+
+    finally:
+        del(dicAry)
+        shm_free(lstShm)
+
+    # Report failed fits (instead of keeping the initial values as fitted
+    # parameters):
+    varNumFail = np.sum(np.any(np.isnan(aryPrm), axis=1))
+    if varNumFail > 0:
+        print(('---Warning: ' + str(varNumFail) + ' of ' + str(varNumIt)
+               + ' bootstrap fits failed (loss not finite)'))
+
+    return aryPrm
@@ -22,16 +22,18 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from scipy.optimize import minimize
 from py_depthsampling.psf_2D.utilities import psf
 from py_depthsampling.psf_2D.utilities import psf_diff
+from py_depthsampling.psf_2D.utilities import psf_fit
+from py_depthsampling.psf_2D.psf_2D_boot import psf_boot
 from py_depthsampling.project.plot import plot
 
 
 def estm_psf(idxRoi, idxCon, idxDpth, objDf, lstRoi, lstCon, lstDpthLbl,
              strPthNpz, vecInit, lstBnds, strPthPltVfp, varNumIt, varSzeVsm,
              strFlTp, varNumSub, aryRnd, varScl, varConLw, varConUp,
-             aryDeep, aryGrpDeep, aryDeepNorm, idxSmpl):
+             aryDeep, aryGrpDeep, aryDeepNorm, idxSmpl, varPar=1,
+             varNumChnk=10, strLoss='mad', lgcFft=False):
     """
     Estimate cortical depth point spread function.
 
@@ -40,7 +42,11 @@ def estm_psf(idxRoi, idxCon, idxDpth, objDf, lstRoi, lstCon, lstDpthLbl,
     intervals for parameters are estimated, and (optionally) plots of the
     fitted visual field projections and residuals are created.
 
-    See `psf_2D_main.py` for details.
+    See `psf_2D_main.py` for details. The bootstrap fits are distributed
+    across `varPar` processes, in chunks of `varNumChnk` iterations (see
+    `psf_2D_boot.psf_boot`). The loss function of the PSF fits is set by
+    `strLoss`, and whether the mean absolute difference is evaluated in the
+    Fourier domain by `lgcFft` (see `utilities.psf_fit`).
     """
     print(('--ROI: '
            + lstRoi[idxRoi]
@@ -110,10 +116,12 @@ def estm_psf(idxRoi, idxCon, idxDpth, objDf, lstRoi, lstCon, lstDpthLbl,
         # visual field projection.
 
         # Fit point spread function:
-        dicOptm = minimize(psf_diff,
-                           vecInit,
-                           args=(aryGrpDeep, aryGrpTrgt),
-                           bounds=lstBnds)
+        dicOptm = psf_fit(aryGrpDeep,
+                          aryGrpTrgt,
+                          vecInit,
+                          lstBnds,
+                          strLoss=strLoss,
+                          lgcFft=lgcFft)
 
         # Calculate sum of model residuals:
         varTmpRes = psf_diff((dicOptm.x[0], dicOptm.x[1]),
@@ -232,61 +240,18 @@ def estm_psf(idxRoi, idxCon, idxDpth, objDf, lstRoi, lstCon, lstDpthLbl,
 
         print('---Bootstrap confidence intervals')
 
-        # Arrays for bootstrap samples (visual field projection and
-        # normalisation array, for reference and target depth levels):
-        aryBooDeep = np.zeros((varNumIt, varNumSub, varSzeVsm,
-                               varSzeVsm))
-        aryBooDeepNorm = np.zeros((varNumIt, varNumSub, varSzeVsm,
-                                   varSzeVsm))
-        aryBooTrgt = np.zeros((varNumIt, varNumSub, varSzeVsm,
-                               varSzeVsm))
-        aryBooTrgtNorm = np.zeros((varNumIt, varNumSub, varSzeVsm,
-                                   varSzeVsm))
-
-        # Loop through bootstrap iterations:
-        for idxIt in range(varNumIt):
-
-            # Indices of current bootstrap sample:
-            vecRnd = aryRnd[idxIt, :]
-
-            # Put current bootstrap sample into array:
-            aryBooDeep[idxIt, :, :, :] = aryDeep[vecRnd, :, :]
-            aryBooDeepNorm[idxIt, :, :, :] = aryDeepNorm[vecRnd, :, :]
-            aryBooTrgt[idxIt, :, :, :] = aryTrgt[vecRnd, :, :]
-            aryBooTrgtNorm[idxIt, :, :, :] = aryTrgtNorm[vecRnd, :, :]
-
-        # Median for each bootstrap sample (across subjects within the
-        # bootstrap sample). Afterwards, arrays have the following shape:
-        # `aryBoo*[varNumIt, varSzeVsm, varSzeVsm]`.
-        aryBooDeep = np.median(aryBooDeep, axis=1)
-        aryBooDeepNorm = np.median(aryBooDeepNorm, axis=1)
-        aryBooTrgt = np.median(aryBooTrgt, axis=1)
-        aryBooTrgtNorm = np.median(aryBooTrgtNorm, axis=1)
+        # Fit the PSF to the bootstrap samples (the group level visual field
+        # projections of the bootstrap samples are formed & fitted chunk by
+        # chunk, in parallel processes). `aryBooPrm` is of the form
+        # aryBooPrm[idxIt, idxParameter] (width & scaling factor):
+        aryBooPrm = psf_boot(aryDeep, aryDeepNorm, aryTrgt, aryTrgtNorm,
+                             aryRnd, vecInit, lstBnds, varPar=varPar,
+                             varNumChnk=varNumChnk, strLoss=strLoss,
+                             lgcFft=lgcFft)
 
-        # Normalise:
-        aryBooDeep = np.divide(aryBooDeep, aryBooDeepNorm)
-        aryBooTrgt = np.divide(aryBooTrgt, aryBooTrgtNorm)
-
-        # Vectors for bootstrapping results:
-        vecBooResSd = np.zeros(varNumIt)
-        vecBooResFct = np.zeros(varNumIt)
-
-        # The actual bootstrap PSF model fitting:
-        for idxIt in range(varNumIt):
-
-            # Fit point spread function:
-            dicOptm = minimize(psf_diff,
-                               vecInit,
-                               args=(aryBooDeep[idxIt, :, :],
-                                     aryBooTrgt[idxIt, :, :]),
-                               bounds=lstBnds)
-
-            # Convert width from array indices to degrees of visual angle:
-            varTmpSd = (dicOptm.x[0] / varScl)
-
-            # Bootstrapping results to vector:
-            vecBooResSd[idxIt] = varTmpSd
-            vecBooResFct[idxIt] = dicOptm.x[1]
+        # Convert width from array indices to degrees of visual angle:
+        vecBooResSd = np.divide(aryBooPrm[:, 0], varScl)
+        vecBooResFct = aryBooPrm[:, 1]
 
         # Percentile bootstrap confidence intervals:
         vecPrctSd = np.percentile(vecBooResSd, (varConLw, varConUp))
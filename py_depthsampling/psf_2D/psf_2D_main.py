@@ -100,6 +100,23 @@ strPthCsv = '/home/john/Dropbox/PacMan_Depth_Data/Higher_Level_Analysis/psf_2D/d
 # Number of bootstrapping iterations:
 varNumIt = 1000
 
+# Number of processes to run in parallel (for bootstrapping), and number of
+# bootstrap iterations per chunk (memory usage depends on the chunk size, not
+# on the number of iterations):
+varPar = 10
+varNumChnk = 10
+
+# Loss function of the PSF fits: mean absolute difference ('mad', numerical
+# derivatives), or mean squared difference ('sq') or pseudo-Huber loss
+# ('huber') with analytic derivatives (see `utilities.psf_fit`):
+strLoss = 'mad'
+
+# Evaluate the mean absolute difference in the Fourier domain, with analytic
+# derivatives (faster; the filtered visual field projections differ from
+# those of `gaussian_filter` by less than 1e-3 relative to their maximum, see
+# `bench_psf_fft.py`). If `False`, `gaussian_filter` is used (as before):
+lgcFft = True
+
 # Lower and upper bound of bootstrap confidence intervals:
 varConLw = 5.0
 varConUp = 95.0
@@ -223,7 +240,9 @@ else:
                         lstDpthLbl, strPthVfp, vecInit, lstBnds, strPthPltVfp,
                         varNumIt, varSzeVsm, strFlTp, varNumSub, aryRnd,
                         varScl, varConLw, varConUp, aryDeep, aryGrpDeep,
-                        aryDeepNorm, idxSmpl)
+                        aryDeepNorm, idxSmpl, varPar=varPar,
+                        varNumChnk=varNumChnk, strLoss=strLoss,
+                        lgcFft=lgcFft)
 
                     # Hard copy bootstrapping distribution:
                     aryBooResSd[idxRoi, idxCon, (idxDpth - 1), :] = np.copy(
@@ -20,9 +20,11 @@
 
 import numpy as np
 from scipy.ndimage.filters import gaussian_filter
+from scipy.optimize import minimize
+from scipy.fftpack import dct
 
 
-def psf(aryIn, varSd, varFct):
+def psf(aryIn, varSd, varFct, strMode='nearest'):
     """
     Cortical depth point spread function.
 
@@ -39,6 +41,9 @@ def psf(aryIn, varSd, varFct):
         Factor by which visual field projection is multiplied (scaling is
         necessary to account for different percent signal change levels between
         cortical depth levels).
+    strMode : str
+        Edge handling of the Gaussian filter (see
+        `scipy.ndimage.gaussian_filter`).
 
     Returns
     -------
@@ -58,13 +63,13 @@ def psf(aryIn, varSd, varFct):
     aryOut = gaussian_filter(aryOut,
                              varSd,
                              order=0,
-                             mode='nearest',
+                             mode=strMode,
                              truncate=4.0)
 
     return aryOut
 
 
-def psf_diff(vecParams, aryDeep, aryTrgt):
+def psf_diff(vecParams, aryDeep, aryTrgt, strMode='nearest'):
     """
     Calculate difference btwn. visual field projections, given PSF parameters.
 
@@ -90,6 +95,9 @@ def psf_diff(vecParams, aryDeep, aryTrgt):
         superficial cortical depth). The point spread function is applied to
         the deepest (reference) visual field projection in order to become more
         similar to the target visual field projection.
+    strMode : str
+        Edge handling of the Gaussian filter (see
+        `scipy.ndimage.gaussian_filter`).
 
     Returns
     -------
@@ -103,10 +111,580 @@ def psf_diff(vecParams, aryDeep, aryTrgt):
     varFct = vecParams[1]
 
     # Apply point spread function to reference visual field projection:
-    aryDeep_fltr = psf(aryDeep, varSd, varFct)
+    aryDeep_fltr = psf(aryDeep, varSd, varFct, strMode=strMode)
 
     # Calculate difference between filtered reference and target visual field
     # projections:
     varDiff = np.mean(np.absolute(np.subtract(aryTrgt, aryDeep_fltr)))
 
     return varDiff
+
+
+def get_fft_len(varLen):
+    """
+    Smallest efficient FFT length (product of 2, 3, and 5) >= `varLen`.
+
+    Parameters
+    ----------
+    varLen : int
+        Minimum length.
+
+    Returns
+    -------
+    varFftLen : int
+        FFT length.
+    """
+    varFftLen = int(varLen)
+    while True:
+        varTmp = varFftLen
+        for varFct in (2, 3, 5):
+            while (varTmp % varFct) == 0:
+                varTmp = varTmp // varFct
+        if varTmp == 1:
+            return varFftLen
+        varFftLen += 1
+
+
+def get_idct_bss(varLen, varIdx01, varIdx02):
+    """
+    Basis of the inverse discrete cosine transform, at some array elements.
+
+    Parameters
+    ----------
+    varLen : int
+        Length of the transform.
+    varIdx01 : int
+        First array element.
+    varIdx02 : int
+        Last array element (exclusive).
+
+    Returns
+    -------
+    aryBss : np.array
+        2D array of the form aryBss[idxElem, idxCoef], such that the matrix
+        product with the coefficients of the orthonormal DCT-II is the inverse
+        transform (same as `idct(..., type=2, norm='ortho')`) at the elements
+        `varIdx01` to `varIdx02`.
+    """
+    vecIdx = np.arange(varIdx01, varIdx02, dtype=np.float64)
+    vecCoef = np.arange(varLen, dtype=np.float64)
+    aryBss = np.multiply(np.cos(np.divide(np.multiply(
+        np.pi, np.multiply((2.0 * vecIdx[:, None] + 1.0), vecCoef[None, :])),
+        (2.0 * varLen))), np.sqrt(2.0 / varLen))
+    aryBss[:, 0] = np.divide(aryBss[:, 0], np.sqrt(2.0))
+    return aryBss
+
+
+def get_frq_num(vecFrq, varVar, varTol=1e-17):
+    """
+    Number of transform coefficients that are not suppressed by a Gaussian.
+
+    Parameters
+    ----------
+    vecFrq : np.array
+        Squared spatial frequencies of the transform coefficients (in
+        ascending order).
+    varVar : float
+        Variance (squared width) of the Gaussian.
+    varTol : float
+        Transfer function below which coefficients are ignored.
+
+    Returns
+    -------
+    varNum : int
+        Number of coefficients (from the first one) at which the transfer
+        function of the Gaussian, `exp(-2 * pi^2 * sd^2 * f^2)`, is above
+        `varTol`.
+    """
+    if not (varVar > 0.0):
+        return vecFrq.shape[0]
+    varFrqMax = -np.log(varTol) / (2.0 * np.square(np.pi) * varVar)
+    return int(np.searchsorted(vecFrq, varFrqMax, side='right'))
+
+
+def psf_fft_init(aryDeep, varSdMax=None, strMode='nearest', varTrnc=8.0):
+    """
+    Prepare visual field projection for PSF application in Fourier domain.
+
+    Parameters
+    ----------
+    aryDeep : np.array
+        2D numpy array containing visual field projection of deepest depth
+        level (reference visual field projection).
+    varSdMax : float or None
+        Maximum width (standard deviation) of the Gaussian point spread
+        function that will be applied (e.g. upper bound of the fit). If
+        given, the amount of padding is fixed (determined by `varSdMax`). If
+        `None`, the amount of padding is determined by the width at each
+        evaluation (see notes).
+    strMode : str
+        Edge handling, same as the `mode` of `scipy.ndimage.gaussian_filter`
+        ('reflect', 'nearest', 'constant', 'mirror', or 'wrap').
+    varTrnc : float
+        Extent of the Gaussian that is covered by the padding, in multiples of
+        its width (as the `truncate` of `gaussian_filter`).
+
+    Returns
+    -------
+    dicFft : dict
+        Reference visual field projection & settings of the padding. The
+        transforms of the padded visual field projection are added when
+        needed (see `psf_fft_lvl`).
+
+    Notes
+    -----
+    The discrete cosine transform (DCT-II) is the Fourier transform of the
+    symmetric extension of the array (edge handling as in 'reflect' mode of
+    `gaussian_filter`). Therefore, no padding is needed for 'reflect' mode.
+    For 'nearest' & 'constant' mode, the array is padded by half the extent
+    of the Gaussian (the symmetric extension doubles the padding). For
+    'mirror' & 'wrap' mode, the array is padded by the full extent of the
+    Gaussian. The padded size is increased to an efficient transform length.
+
+    The cost of an evaluation depends on the padded size. Padding for the
+    upper bound of the width makes every evaluation as expensive as the
+    widest one (e.g. for 'nearest' mode, 200 x 200 elements padded to
+    360 x 360 for a maximum width of 38.5, with `varTrnc=4`). Without
+    `varSdMax`, the padding only covers the widths that are evaluated. The
+    padding is increased to a power of two (and to at least 32 elements),
+    and the transform is calculated once per padded size & reused for all
+    evaluations with that size (see `psf_fft_lvl`). The padding covers the
+    Gaussian up to eight times its width, so that the filtered map does not
+    depend on the padded size (differences below 1e-14), and the loss does
+    not jump when the padded size changes during a fit. This does not hold
+    for Gaussians that are narrower than about two array elements (their
+    transfer function is not negligible at the highest frequency, and the
+    differences are of the order of 1e-5), but these are all evaluated with
+    the minimum padding.
+    """
+    dicMode = {'reflect': ('symmetric', 0.0),
+               'nearest': ('edge', 0.5),
+               'constant': ('constant', 0.5),
+               'mirror': ('reflect', 1.0),
+               'wrap': ('wrap', 1.0)}
+    if strMode not in dicMode:
+        raise ValueError('Unknown edge handling mode: ' + str(strMode))
+
+    strModePad, varPadRel = dicMode[strMode]
+
+    dicFft = {'aryDeep': aryDeep.astype(np.float64),
+              'strModePad': strModePad,
+              'varPadRel': (varPadRel * varTrnc),
+              'varSdMax': varSdMax,
+              'dicLvl': {}}
+
+    if varSdMax is not None:
+        psf_fft_lvl(dicFft, varSdMax)
+
+    return dicFft
+
+
+def psf_fft_lvl(dicFft, varSd):
+    """
+    Transform of the padded visual field projection for a width of the PSF.
+
+    Parameters
+    ----------
+    dicFft : dict
+        Reference visual field projection & settings of the padding (see
+        `psf_fft_init`).
+    varSd : float
+        Maximum width (standard deviation) of the Gaussian point spread
+        function at this evaluation.
+
+    Returns
+    -------
+    dicLvl : dict
+        Discrete cosine transform of the padded visual field projection
+        ('aryDct'), squared spatial frequencies of the transform coefficients
+        along both axes ('vecFrqY', 'vecFrqX'), and basis of the inverse
+        transform at the elements of the original array along both axes
+        ('aryBssY', 'aryBssX', see `get_idct_bss`).
+
+    Notes
+    -----
+    The transform is stored in `dicFft` (by padded size), and only
+    calculated if no transform of the same size has been calculated before.
+    If `dicFft` has a fixed maximum width, `varSd` is ignored.
+    """
+    if dicFft['varSdMax'] is not None:
+        varSd = dicFft['varSdMax']
+    # The filtered map is not finite for a width that is not finite (e.g. if
+    # the optimiser steps along a gradient that is not finite), no padding:
+    if not np.isfinite(varSd):
+        varSd = 0.0
+    varPad = int(np.ceil(dicFft['varPadRel'] * abs(float(varSd))))
+    # Padding is increased to a power of two, and to at least 32 elements, so
+    # that there are few different padded sizes (see `psf_fft_init`):
+    if dicFft['varPadRel'] > 0.0:
+        varPad = max(32, int(2 ** np.ceil(np.log2(max(varPad, 1)))))
+
+    aryDeep = dicFft['aryDeep']
+    tplShp = tuple([get_fft_len(varLen + 2 * varPad)
+                    for varLen in aryDeep.shape])
+
+    if tplShp not in dicFft['dicLvl']:
+
+        # Padding before & after the array along both axes (extended to an
+        # efficient transform length):
+        lstPad = [(((varLenPad - varLen) // 2),
+                   ((varLenPad - varLen) - (varLenPad - varLen) // 2))
+                  for varLen, varLenPad in zip(aryDeep.shape, tplShp)]
+        aryPad = np.pad(aryDeep, lstPad, mode=dicFft['strModePad'])
+
+        # Frequency of the DCT coefficients (cycles per array element):
+        vecFrqY = np.divide(np.arange(tplShp[0]), (2.0 * tplShp[0]))
+        vecFrqX = np.divide(np.arange(tplShp[1]), (2.0 * tplShp[1]))
+
+        dicFft['dicLvl'][tplShp] = {
+            'aryDct': dct(dct(aryPad, type=2, norm='ortho', axis=0),
+                          type=2, norm='ortho', axis=1),
+            'vecFrqY': np.square(vecFrqY),
+            'vecFrqX': np.square(vecFrqX),
+            'aryBssY': get_idct_bss(tplShp[0], lstPad[0][0],
+                                    (lstPad[0][0] + aryDeep.shape[0])),
+            'aryBssX': get_idct_bss(tplShp[1], lstPad[1][0],
+                                    (lstPad[1][0] + aryDeep.shape[1]))}
+
+    return dicFft['dicLvl'][tplShp]
+
+
+def psf_fft(dicFft, varSd, varFct):
+    """
+    Cortical depth point spread function, applied in Fourier domain.
+
+    Parameters
+    ----------
+    dicFft : dict
+        Transform of the reference visual field projection (see
+        `psf_fft_init`).
+    varSd : float or np.array
+        Width (standard deviation) of Gaussian function used for point spread
+        function, or 1D array with several widths (evaluated at once).
+    varFct : float or np.array
+        Factor by which visual field projection is multiplied (same shape as
+        `varSd`).
+
+    Returns
+    -------
+    aryOut : np.array
+        Visual field projection after application of point spread function,
+        2D array of the same shape as the reference visual field projection,
+        or 3D array (aryOut[idxSd, x, y]) if several widths are given.
+
+    Notes
+    -----
+    Same as `psf`, but the Gaussian filter is applied by multiplication of
+    the transform with the analytic transfer function of the Gaussian,
+    `exp(-2 * pi^2 * sd^2 * f^2)`, and one inverse transform. The inverse
+    transform is calculated by matrix multiplication with its basis (see
+    `get_idct_bss`), only at the elements of the original array, and only
+    for coefficients at which the transfer function is not negligible (see
+    `get_frq_num`). The wider the Gaussian, the fewer coefficients are
+    needed (e.g. 38 of 512 per axis at a width of 38.5 array elements in
+    'nearest' mode), so that the cost of wide Gaussians does not grow with
+    the padding. The result differs from that of `gaussian_filter` (which
+    uses a sampled and truncated kernel) by less than 1e-3 relative to the
+    maximum of the filtered map for widths of at least one array element
+    (see `bench_psf_fft.py`).
+    """
+    vecSd = np.atleast_1d(np.asarray(varSd, dtype=np.float64))
+    vecFct = np.atleast_1d(np.asarray(varFct, dtype=np.float64))
+
+    # Transform with padding for the widest Gaussian:
+    dicLvl = psf_fft_lvl(dicFft, np.max(np.absolute(vecSd)))
+
+    # Coefficients that are not suppressed by the narrowest Gaussian:
+    varNumY = get_frq_num(dicLvl['vecFrqY'], np.min(np.square(vecSd)))
+    varNumX = get_frq_num(dicLvl['vecFrqX'], np.min(np.square(vecSd)))
+
+    # Separable transfer function, of the form aryTrns[idxSd, y, x]:
+    vecTmp = np.multiply((-2.0 * np.square(np.pi)), np.square(vecSd))
+    aryTrnsY = np.exp(np.multiply(vecTmp[:, None],
+                                  dicLvl['vecFrqY'][None, :varNumY]))
+    aryTrnsX = np.exp(np.multiply(vecTmp[:, None],
+                                  dicLvl['vecFrqX'][None, :varNumX]))
+
+    # Scaling is applied together with the transfer function:
+    aryTrnsY = np.multiply(aryTrnsY, vecFct[:, None])
+
+    aryOut = np.multiply(np.multiply(dicLvl['aryDct'][None, :varNumY,
+                                                      :varNumX],
+                                     aryTrnsY[:, :, None]),
+                         aryTrnsX[:, None, :])
+    # Inverse transform, only at the elements of the original array:
+    aryOut = np.matmul(np.matmul(dicLvl['aryBssY'][:, :varNumY], aryOut),
+                       dicLvl['aryBssX'][:, :varNumX].T)
+
+    if np.ndim(varSd) == 0:
+        aryOut = aryOut[0, :, :]
+
+    return aryOut
+
+
+def psf_diff_fft(vecParams, dicFft, aryTrgt):
+    """
+    Difference btwn. visual field projections, PSF in Fourier domain.
+
+    Parameters
+    ----------
+    vecParams : np.array
+        1D numpy array containing the two parameters of the point spread
+        function (width & scaling factor, see `psf_diff`), or 2D array with
+        several parameter pairs, of the form vecParams[idxPair, 2] (evaluated
+        at once).
+    dicFft : dict
+        Transform of the reference visual field projection (see
+        `psf_fft_init`).
+    aryTrgt : np.array
+        2D numpy array containing target visual field projection.
+
+    Returns
+    -------
+    varDiff : float or np.array
+        Mean absolute difference between filtered reference and target visual
+        field projections (1D array if several parameter pairs are given).
+
+    Notes
+    -----
+    Same objective as `psf_diff`, for use with `scipy.optimize.minimize`
+    (with `args=(dicFft, aryTrgt)`).
+    """
+    vecParams = np.asarray(vecParams, dtype=np.float64)
+
+    # Apply point spread function to reference visual field projection:
+    aryDeep_fltr = psf_fft(dicFft, vecParams[..., 0], vecParams[..., 1])
+
+    # Calculate difference between filtered reference and target visual field
+    # projections:
+    varDiff = np.mean(np.absolute(np.subtract(aryTrgt, aryDeep_fltr)),
+                      axis=(-2, -1))
+
+    return varDiff
+
+
+def psf_diff_grad(vecParams, dicFft, aryTrgt, strLoss='sq', varDlt=1.0,
+                  lgcVar=False):
+    """
+    Smooth difference btwn. visual field projections, and its gradient.
+
+    Parameters
+    ----------
+    vecParams : np.array
+        1D numpy array containing the two parameters of the point spread
+        function (width & scaling factor, see `psf_diff`).
+    dicFft : dict
+        Transform of the reference visual field projection (see
+        `psf_fft_init`).
+    aryTrgt : np.array
+        2D numpy array containing target visual field projection.
+    strLoss : str
+        Loss function, 'sq' (mean squared difference), 'huber' (mean
+        pseudo-Huber loss, `varDlt^2 * (sqrt(1 + (r / varDlt)^2) - 1)`, which
+        is quadratic for small and linear for large differences r), or 'mad'
+        (mean absolute difference, as `psf_diff_fft`; the gradient is a
+        subgradient, using the sign of the differences).
+    varDlt : float
+        Transition between quadratic and linear part of the pseudo-Huber loss
+        (in units of the visual field projections; only used if
+        `strLoss='huber'`).
+    lgcVar : bool
+        If `True`, the first parameter is the variance (squared width) of the
+        Gaussian instead of its width, and the gradient is with respect to
+        the variance.
+
+    Returns
+    -------
+    varLoss : float
+        Loss between filtered reference and target visual field projections.
+    vecGrd : np.array
+        Gradient of the loss with respect to width (or variance) & scaling
+        factor.
+
+    Notes
+    -----
+    For use with `scipy.optimize.minimize` (with `jac=True`). The derivative
+    of the transfer function of the Gaussian with respect to its width is
+    `-4 * pi^2 * sd * f^2 * exp(-2 * pi^2 * sd^2 * f^2)`, where f^2 is the
+    sum of the squared frequencies along both axes (with respect to the
+    variance: `-2 * pi^2 * f^2 * exp(-2 * pi^2 * sd^2 * f^2)`). The
+    derivative of the filtered map is obtained with a second inverse
+    transform (of the transform of the reference map multiplied with this
+    derivative), and the derivative with respect to the scaling factor is the
+    filtered map divided by the scaling factor.
+    """
+    if lgcVar:
+        varVar = max(float(vecParams[0]), 0.0)
+        varDrvFct = -2.0 * np.square(np.pi)
+    else:
+        varSd = float(vecParams[0])
+        varVar = np.square(varSd)
+        varDrvFct = -4.0 * np.square(np.pi) * varSd
+    varFct = float(vecParams[1])
+
+    # Transform with padding for the width, and coefficients that are not
+    # suppressed by the Gaussian:
+    dicLvl = psf_fft_lvl(dicFft, np.sqrt(varVar))
+    varNumY = get_frq_num(dicLvl['vecFrqY'], varVar)
+    varNumX = get_frq_num(dicLvl['vecFrqX'], varVar)
+    vecFrqY = dicLvl['vecFrqY'][:varNumY]
+    vecFrqX = dicLvl['vecFrqX'][:varNumX]
+
+    # Separable transfer function (without scaling), and its derivative with
+    # respect to the width (or variance):
+    varTmp = -2.0 * np.square(np.pi) * varVar
+    vecTrnsY = np.exp(np.multiply(varTmp, vecFrqY))
+    vecTrnsX = np.exp(np.multiply(varTmp, vecFrqX))
+    aryTrns = np.multiply(vecTrnsY[:, None], vecTrnsX[None, :])
+    aryDrv = np.multiply(aryTrns,
+                         np.multiply(varDrvFct,
+                                     np.add(vecFrqY[:, None],
+                                            vecFrqX[None, :])))
+
+    # Filtered reference map (without scaling) & its derivative with respect
+    # to the width, of the form aryOut[idx, y, x] (inverse transform as in
+    # `psf_fft`):
+    aryOut = np.multiply(dicLvl['aryDct'][None, :varNumY, :varNumX],
+                         np.stack((aryTrns, aryDrv), axis=0))
+    aryOut = np.matmul(np.matmul(dicLvl['aryBssY'][:, :varNumY], aryOut),
+                       dicLvl['aryBssX'][:, :varNumX].T)
+
+    # Residuals:
+    aryRes = np.subtract(np.multiply(aryOut[0, :, :], varFct), aryTrgt)
+
+    # Loss & its derivative with respect to the residuals:
+    if strLoss == 'mad':
+        varLoss = np.mean(np.absolute(aryRes))
+        aryDrvRes = np.sign(aryRes)
+    elif strLoss == 'sq':
+        varLoss = np.mean(np.square(aryRes))
+        aryDrvRes = np.multiply(aryRes, 2.0)
+    elif strLoss == 'huber':
+        aryTmp = np.sqrt(np.add(np.square(np.divide(aryRes, varDlt)), 1.0))
+        varLoss = np.square(varDlt) * np.mean(np.subtract(aryTmp, 1.0))
+        aryDrvRes = np.divide(aryRes, aryTmp)
+    else:
+        raise ValueError('Unknown loss function: ' + str(strLoss))
+
+    # Chain rule:
+    vecGrd = np.array([(varFct * np.mean(np.multiply(aryDrvRes,
+                                                     aryOut[1, :, :]))),
+                       np.mean(np.multiply(aryDrvRes, aryOut[0, :, :]))])
+
+    return varLoss, vecGrd
+
+
+def psf_fit(aryDeep, aryTrgt, vecInit, lstBnds, strLoss='mad',
+            strMode='nearest', varDlt=None, lgcFft=False):
+    """
+    Fit cortical depth point spread function.
+
+    Parameters
+    ----------
+    aryDeep : np.array
+        2D numpy array containing visual field projection of deepest depth
+        level (reference visual field projection).
+    aryTrgt : np.array
+        2D numpy array containing target visual field projection.
+    vecInit : np.array
+        Initial values of PSF parameters (width & scaling factor).
+    lstBnds : list
+        Bounds of PSF parameters (see `scipy.optimize.minimize`).
+    strLoss : str
+        Loss function. If 'mad', the mean absolute difference (`psf_diff`) is
+        minimised with numerical derivatives. If 'sq' or 'huber', the mean
+        squared difference or pseudo-Huber loss is minimised with analytic
+        derivatives (see `psf_diff_grad`).
+    strMode : str
+        Edge handling of the Gaussian filter (see
+        `scipy.ndimage.gaussian_filter`).
+    varDlt : float or None
+        Transition between quadratic and linear part of the pseudo-Huber
+        loss (has to be positive). If `None`, the median absolute deviation
+        of the target visual field projection is used, or its standard
+        deviation if the median absolute deviation is zero (e.g. if more than
+        half of the target visual field projection is constant background).
+    lgcFft : bool
+        If `True`, the mean absolute difference ('mad') is evaluated in the
+        Fourier domain (same loss as `psf_diff_fft`), and minimised with its
+        analytic derivatives (see `psf_diff_grad`), instead of with
+        `gaussian_filter` (`psf_diff`) and numerical derivatives. The
+        filtered maps differ by less than 1e-3 relative to their maximum (see
+        `psf_fft`). 'sq' & 'huber' are always evaluated in the Fourier
+        domain.
+
+    Returns
+    -------
+    dicOptm : scipy.optimize.OptimizeResult
+        Result of the optimisation (fitted parameters in `dicOptm.x`, number
+        of evaluations of the loss in `dicOptm.nfev`). If the loss at the
+        solution is not finite, the fit is marked as failed
+        (`dicOptm.success` is `False`), and the parameters are NaN (instead
+        of the initial values, at which the optimiser stops).
+
+    Raises
+    ------
+    ValueError
+        If the scale of the pseudo-Huber loss is not positive (e.g. constant
+        target visual field projection).
+
+    Notes
+    -----
+    Function of the depth sampling pipeline. For 'sq' & 'huber' (and 'mad'
+    if `lgcFft` is `True`), the loss and its gradient are evaluated in the
+    Fourier domain (see `psf_fft_init`), and minimised with L-BFGS-B, so
+    that each iteration of the optimiser needs one evaluation (two inverse
+    transforms) instead of three filter evaluations for the numerical
+    derivatives. The loss depends on the width only through its square, so
+    that its derivative with respect to the width is zero at zero width, and
+    an optimiser that steps onto the lower bound would stall there.
+    Therefore, the variance is fitted instead of the width, relative to the
+    squared upper bound of the width (so that both parameters are of similar
+    magnitude). The fitted width is returned. The padding of the Fourier
+    domain version only covers the widths that are evaluated (see
+    `psf_fft_init`).
+    """
+    if (strLoss == 'mad') and not lgcFft:
+        dicOptm = minimize(psf_diff,
+                           vecInit,
+                           args=(aryDeep, aryTrgt, strMode),
+                           bounds=lstBnds)
+    else:
+        if (strLoss == 'huber') and (varDlt is None):
+            varDlt = np.median(np.absolute(np.subtract(aryTrgt,
+                                                       np.median(aryTrgt))))
+            if not (varDlt > 0.0):
+                varDlt = np.std(aryTrgt)
+        if (strLoss == 'huber') and not (varDlt > 0.0):
+            raise ValueError(('Scale of pseudo-Huber loss is not positive: '
+                              + str(varDlt)))
+        dicFft = psf_fft_init(aryDeep, strMode=strMode)
+        # The width is fitted as variance, relative to the squared upper
+        # bound of the width (see notes):
+        vecScl = np.array([np.square(lstBnds[0][1]), 1.0])
+
+        def funcLoss(vecPrm):
+            """Loss & gradient with respect to relative variance & scaling."""
+            varLoss, vecGrd = psf_diff_grad(np.multiply(vecPrm, vecScl),
+                                            dicFft, aryTrgt, strLoss=strLoss,
+                                            varDlt=varDlt, lgcVar=True)
+            return varLoss, np.multiply(vecGrd, vecScl)
+
+        dicOptm = minimize(funcLoss,
+                           np.divide(np.array([np.square(vecInit[0]),
+                                               vecInit[1]]), vecScl),
+                           jac=True,
+                           method='L-BFGS-B',
+                           bounds=[(np.square(lstBnds[0][0]) / vecScl[0],
+                                    1.0),
+                                   lstBnds[1]])
+        dicOptm.x[0] = np.sqrt(dicOptm.x[0] * vecScl[0])
+
+    # The optimiser does not move from the initial values if the loss is not
+    # finite, and may still report success:
+    if not np.isfinite(dicOptm.fun):
+        dicOptm.success = False
+        dicOptm.message = 'Loss is not finite.'
+        dicOptm.x = np.full(np.shape(dicOptm.x), np.nan)
+
+    return dicOptm
@@ -0,0 +1,82 @@
+# Reference values of weighted quantiles & weighted medians from spatstat.
+#
+# Writes the fixture for `test_wght_quantile.py`: the input data & weights of
+# each case (spatstat_wght_input.csv), and the results of `weighted.quantile`
+# and `weighted.median` (spatstat_wght_quantile.csv), in the directory of this
+# script. `wght_quantile` reproduces spatstat version 1 (as used via rpy2 in
+# `diff_sem.py` before), therefore a version 1 installation is required (the
+# algorithm was changed in later versions).
+#
+# Usage (from the directory of this script):
+#     Rscript spatstat_wght_quantile.r
+#
+# Requires: spatstat library (version 1).
+
+library(spatstat)
+
+if (packageVersion('spatstat') >= '2.0') {
+  stop('spatstat version 1 is required.')
+}
+
+# Probabilities of the quantiles:
+vecPrb <- c(0.0, 0.025, 0.1, 0.2, 0.25, 0.35, 0.4, 0.5, 0.55, 0.75, 0.8,
+            0.9, 0.975, 1.0)
+
+# Cases (data & weights):
+lstCse <- list(
+  # Unequal weights:
+  list(x = c(3, 1, 2, 4), w = c(1, 2, 3, 4)),
+  # Ties (not merged):
+  list(x = c(1, 1, 2), w = c(1, 1, 2)),
+  list(x = c(2, 1, 2, 2, 0.5), w = c(3, 1, 0.5, 2, 1)),
+  # Zero weights:
+  list(x = c(1, 2, 3), w = c(1, 0, 1)),
+  list(x = c(4, 0, 1, 3, 2), w = c(0, 1, 2, 0, 1)),
+  # Equal weights:
+  list(x = c(5, 2, 9, 1), w = c(1, 1, 1, 1)),
+  list(x = c(5, 2, 9, 1, 7), w = c(2, 2, 2, 2, 2)),
+  # Single value:
+  list(x = c(1.5), w = c(2)))
+
+# Random cases (number of vertices as weights, as in `diff_sem.py`), with
+# ties & zero weights:
+set.seed(0)
+for (idxCse in 1:6) {
+  varNumSmp <- sample(2:12, 1)
+  vecX <- round(rnorm(varNumSmp), digits = 1)
+  vecW <- sample(0:1000, varNumSmp, replace = TRUE)
+  vecW[sample(1:varNumSmp, 1)] <- 0
+  vecW[sample(1:varNumSmp, 1)] <- 500
+  lstCse[[length(lstCse) + 1]] <- list(x = vecX, w = vecW)
+}
+
+# Full precision output:
+funcFmt <- function(vecIn) {
+  sprintf('%.17g', vecIn)
+}
+
+dfIn <- data.frame()
+dfOut <- data.frame()
+for (idxCse in seq_along(lstCse)) {
+  vecX <- lstCse[[idxCse]]$x
+  vecW <- lstCse[[idxCse]]$w
+  dfIn <- rbind(dfIn, data.frame(case = idxCse,
+                                 x = funcFmt(vecX),
+                                 w = funcFmt(vecW)))
+  vecQnt <- weighted.quantile(vecX, vecW, probs = vecPrb)
+  dfOut <- rbind(dfOut, data.frame(case = idxCse,
+                                   func = 'quantile',
+                                   prob = funcFmt(vecPrb),
+                                   value = funcFmt(unname(vecQnt))))
+  dfOut <- rbind(dfOut, data.frame(case = idxCse,
+                                   func = 'median',
+                                   prob = funcFmt(0.5),
+                                   value = funcFmt(weighted.median(vecX,
+                                                                   vecW))))
+}
+
+write.csv(dfIn, 'spatstat_wght_input.csv', row.names = FALSE, quote = FALSE)
+write.csv(dfOut, 'spatstat_wght_quantile.csv', row.names = FALSE,
+          quote = FALSE)
+
+print(paste('spatstat version', packageVersion('spatstat')))
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Test bootstrap confidence intervals."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+from py_depthsampling.boot.utilities import get_cnt
+from py_depthsampling.boot.utilities import cnt_median
+from py_depthsampling.boot.boot_ci import boot_ci
+from py_depthsampling.boot.boot_ci import jack_cnt
+from py_depthsampling.boot.boot_ci import stat_mean
+from py_depthsampling.boot.boot_ci import stat_median
+
+
+def jack_loop(vecSmp, funcStat):
+    """Jackknife standard error & deviations, one sample, explicit loop."""
+    varNumSmp = vecSmp.shape[0]
+    vecJck = np.array([funcStat(np.delete(vecSmp, idxSmp))
+                       for idxSmp in range(varNumSmp)])
+    vecDev = np.subtract(vecJck, np.mean(vecJck))
+    if np.all(np.equal(vecJck, vecJck[0])):
+        vecDev = np.zeros(varNumSmp)
+    varSe = np.sqrt((varNumSmp - 1.0) / varNumSmp * np.sum(np.square(vecDev)))
+    return varSe, vecDev
+
+
+def boot_ci_loop(aryDat, funcStat, aryRnd, varConLw, varConUp, strCi):
+    """Reference bootstrap interval with explicitly resampled data."""
+    varNumIt, varNumSub = aryRnd.shape
+    varNumVar = aryDat.shape[1]
+    aryCnf = np.zeros((2, varNumVar))
+    for idxVar in range(varNumVar):
+        vecDat = aryDat[:, idxVar]
+        varEmp = funcStat(vecDat)
+        vecBoo = np.array([funcStat(vecDat[aryRnd[idxIt, :]])
+                           for idxIt in range(varNumIt)])
+        varSe, vecDev = jack_loop(vecDat, funcStat)
+        if strCi == 'bca':
+            varPrp = ((np.sum(vecBoo < varEmp)
+                       + 0.5 * np.sum(vecBoo == varEmp)) / float(varNumIt))
+            varPrp = np.clip(varPrp, (0.5 / varNumIt), (1.0 - 0.5 / varNumIt))
+            varZ0 = norm.ppf(varPrp)
+            varDen = 6.0 * np.power(np.sum(np.square(vecDev)), 1.5)
+            varAcc = 0.0
+            if varDen > 0.0:
+                varAcc = np.sum(np.power(-vecDev, 3)) / varDen
+            for idxBnd, varCon in enumerate([varConLw, varConUp]):
+                varZ = varZ0 + norm.ppf(varCon / 100.0)
+                varPrc = 100.0 * norm.cdf(varZ0 + varZ / (1.0 - varAcc * varZ))
+                aryCnf[idxBnd, idxVar] = np.percentile(vecBoo, varPrc)
+        elif strCi == 'student':
+            vecBooSe = np.array([jack_loop(vecDat[aryRnd[idxIt, :]],
+                                           funcStat)[0]
+                                 for idxIt in range(varNumIt)])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                vecT = np.divide(np.subtract(vecBoo, varEmp), vecBooSe)
+            vecT = vecT[np.isfinite(vecT)]
+            vecTPrc = np.percentile(vecT, (varConLw, varConUp))
+            aryCnf[0, idxVar] = varEmp - vecTPrc[1] * varSe
+            aryCnf[1, idxVar] = varEmp - vecTPrc[0] * varSe
+    return aryCnf
+
+
+def test_cnt_median_unequal_size():
+    """Median from counts with samples of different size."""
+    np.random.seed(0)
+    aryDat = np.random.randn(7, 5)
+    aryDat[:, 0] = np.around(aryDat[:, 0])
+    aryRnd = np.random.randint(0, high=7, size=(20, 7))
+    aryCntJck = jack_cnt(get_cnt(aryRnd, 7))
+    aryMed = cnt_median(aryCntJck, aryDat)
+    for idxRow in range(aryCntJck.shape[0]):
+        vecIdx = np.repeat(np.arange(7),
+                           aryCntJck[idxRow, :].astype(np.int64))
+        assert np.array_equal(aryMed[idxRow, :],
+                              np.median(aryDat[vecIdx, :], axis=0))
+
+
+@pytest.mark.parametrize('strCi', ['bca', 'student'])
+@pytest.mark.parametrize('strStat', ['median', 'mean'])
+def test_boot_ci_jackknife(strCi, strStat):
+    """BCa & studentized intervals match an explicit jackknife loop."""
+    dicStat = {'median': (stat_median, np.median),
+               'mean': (stat_mean, np.mean)}
+    funcStat, funcStatLoop = dicStat[strStat]
+
+    varNumSub = 9
+    varNumIt = 300
+    aryDat = np.random.RandomState(1).randn(varNumSub, 2, 3)
+
+    # Same random draws as `boot_ci` (several chunks):
+    np.random.seed(2)
+    aryRnd = np.concatenate(
+        [np.random.randint(0, high=varNumSub,
+                           size=(min(70, (varNumIt - varIdx)), varNumSub))
+         for varIdx in range(0, varNumIt, 70)], axis=0)
+
+    np.random.seed(2)
+    aryCnf, aryEmp = boot_ci(aryDat, funcStat=funcStat, varNumIt=varNumIt,
+                             varConLw=5.0, varConUp=95.0, strCi=strCi,
+                             varNumChnk=70)
+
+    aryRef = boot_ci_loop(aryDat.reshape(varNumSub, -1), funcStatLoop,
+                          aryRnd, 5.0, 95.0, strCi)
+
+    assert np.allclose(aryCnf.reshape(2, -1), aryRef, rtol=1e-10,
+                       atol=1e-12)
+    assert np.allclose(aryEmp, funcStatLoop(aryDat, axis=0))
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Test interrupted & resumed runs with checkpoints."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import multiprocessing as mp
+import numpy as np
+import pytest
+from py_depthsampling.crf import crf_par_boot_01
+from py_depthsampling.crf import crf_boot_batch
+from py_depthsampling.crf import crf_par_perm_01
+from py_depthsampling.crf.crf_func import crf_hyper
+from py_depthsampling.main import chkpnt
+
+
+# Stimulus contrast levels:
+vecEmpX = np.array([0.025, 0.061, 0.163, 0.72])
+
+# Number of iterations & chunk size (four chunks), and number of chunks after
+# which the run is interrupted:
+varNumIt = 10
+varNumChnk = 3
+varNumStop = 2
+
+
+class Interrupt(Exception):
+    """Interruption of a run (e.g. job killed)."""
+
+
+def get_dpth(varNumSub=6, varNumDpt=3):
+    """Synthetic depth profiles, aryDpth[idxRoi, idxSub, idxCon, idxDpt]."""
+    np.random.seed(0)
+    vecA = np.linspace(1.0, 2.0, num=varNumDpt)
+    vecResp = crf_hyper(vecEmpX, 1.5, 0.1, 1.5)
+    aryDpth = np.multiply(vecA[None, None, None, :],
+                          vecResp[None, None, :, None])
+    aryDpth = np.add(aryDpth,
+                     np.multiply(0.1, np.random.randn(2, varNumSub,
+                                                      vecEmpX.shape[0],
+                                                      varNumDpt)))
+    return aryDpth
+
+
+def cnt_save(monkeypatch, objMdl, varStop=None):
+    """
+    Count checkpoints saved by a module, and interrupt the run.
+
+    The checkpoint is saved before the run is interrupted, i.e. after
+    `varStop` checkpoints, the run stops with `Interrupt`.
+    """
+    lstIdx = []
+
+    def chk_save_cnt(strPthRun, idxChnk, dicRng, **dicAry):
+        chkpnt.chk_save(strPthRun, idxChnk, dicRng, **dicAry)
+        lstIdx.append(idxChnk)
+        if (varStop is not None) and (len(lstIdx) == varStop):
+            raise Interrupt()
+
+    monkeypatch.setattr(objMdl, 'chk_save', chk_save_cnt)
+    return lstIdx
+
+
+def rng_equal(tplRng01, tplRng02):
+    """Whether two states of the random number generator are the same."""
+    return ((tplRng01[0] == tplRng02[0])
+            and np.array_equal(tplRng01[1], tplRng02[1])
+            and all([(tplRng01[idx] == tplRng02[idx]) for idx in [2, 3, 4]]))
+
+
+def run_resume(monkeypatch, tmp_path, objMdl, funcRun):
+    """
+    Compare uninterrupted run with interrupted & resumed run.
+
+    Parameters
+    ----------
+    objMdl : module
+        Module of the function (its `chk_save` is replaced).
+    funcRun : function
+        Called as `funcRun(strPthRun)`, runs the function with the run
+        directory `strPthRun` (or without checkpoints if `None`).
+    """
+    strPthRun = os.path.join(str(tmp_path), 'run')
+    varNumChk = int(np.ceil(float(varNumIt) / float(varNumChnk)))
+
+    # Uninterrupted run, without checkpoints:
+    np.random.seed(1)
+    lstRef = funcRun(None)
+    tplRngRef = np.random.get_state()
+
+    # Run that is interrupted after some chunks:
+    np.random.seed(1)
+    lstIdx = cnt_save(monkeypatch, objMdl, varStop=varNumStop)
+    with pytest.raises(Interrupt):
+        funcRun(strPthRun)
+    assert len(lstIdx) == varNumStop
+
+    # Worker processes are stopped:
+    assert len(mp.active_children()) == 0
+    assert sorted(os.listdir(strPthRun)) == (
+        ['chunk_{:06d}.npz'.format(idx) for idx in sorted(lstIdx)]
+        + ['run.npz'])
+
+    # Resumed run (in a new session, with a different state of the random
+    # number generator). Completed chunks are loaded, not fitted again:
+    np.random.seed(2)
+    lstIdxRsm = cnt_save(monkeypatch, objMdl)
+    lstRsm = funcRun(strPthRun)
+    assert len(lstIdxRsm) == (varNumChk - varNumStop)
+    assert sorted(lstIdx + lstIdxRsm) == list(range(varNumChk))
+
+    # Same results & state of the random number generator as the
+    # uninterrupted run:
+    assert len(lstRsm) == len(lstRef)
+    for aryRef, aryRsm in zip(lstRef, lstRsm):
+        assert np.array_equal(aryRef, aryRsm)
+    assert rng_equal(np.random.get_state(), tplRngRef)
+
+    # Calling again with a completed run directory loads all chunks:
+    np.random.seed(3)
+    lstIdxRsm = cnt_save(monkeypatch, objMdl)
+    lstRsm = funcRun(strPthRun)
+    assert len(lstIdxRsm) == 0
+    for aryRef, aryRsm in zip(lstRef, lstRsm):
+        assert np.array_equal(aryRef, aryRsm)
+    assert rng_equal(np.random.get_state(), tplRngRef)
+
+
+def test_rng():
+    """State of the random number generator, saved to npz & restored."""
+    np.random.seed(4)
+    np.random.randn(3)
+    dicRng = chkpnt.rng_get()
+    vecRef = np.random.randn(5)
+    np.random.seed(5)
+    chkpnt.rng_set(dicRng)
+    assert np.array_equal(np.random.randn(5), vecRef)
+
+
+def test_chk_init(tmp_path):
+    """Run directory with different settings."""
+    strPthRun = os.path.join(str(tmp_path), 'run')
+    np.random.seed(6)
+    chkpnt.chk_init(strPthRun, vecEmpX=vecEmpX, varNumIt=10)
+    vecRef = np.random.randn(5)
+
+    # Resumed run starts from the saved state of the random number
+    # generator:
+    chkpnt.chk_init(strPthRun, vecEmpX=vecEmpX, varNumIt=10)
+    assert np.array_equal(np.random.randn(5), vecRef)
+
+    with pytest.raises(ValueError):
+        chkpnt.chk_init(strPthRun, vecEmpX=vecEmpX, varNumIt=20)
+    with pytest.raises(ValueError):
+        chkpnt.chk_init(strPthRun, vecEmpX=vecEmpX, varNumIt=10,
+                        strFunc='power')
+
+    # Chunks are loaded as saved, missing chunks are `None`:
+    chkpnt.chk_save(strPthRun, 0, chkpnt.rng_get(), aryRnd=np.arange(4))
+    assert np.array_equal(chkpnt.chk_load(strPthRun, 0)['aryRnd'],
+                          np.arange(4))
+    assert chkpnt.chk_load(strPthRun, 1) is None
+
+
+@pytest.mark.parametrize('varPar', [1, 2])
+def test_crf_par_01(monkeypatch, tmp_path, varPar):
+    """Interrupted & resumed `crf_par_01`."""
+    aryDpth = get_dpth()
+
+    def funcRun(strPthRun):
+        return crf_par_boot_01.crf_par_01(aryDpth, vecEmpX, strFunc='power',
+                                          varNumIt=varNumIt, varPar=varPar,
+                                          varNumChnk=varNumChnk,
+                                          strPthRun=strPthRun)
+
+    run_resume(monkeypatch, tmp_path, crf_par_boot_01, funcRun)
+
+
+@pytest.mark.parametrize('strFunc', ['power', 'hyper'])
+def test_crf_boot_batch(monkeypatch, tmp_path, strFunc):
+    """Interrupted & resumed `crf_boot_batch`."""
+    aryDpth = get_dpth()
+
+    def funcRun(strPthRun):
+        return crf_boot_batch.crf_boot_batch(aryDpth, vecEmpX,
+                                             strFunc=strFunc,
+                                             varNumIt=varNumIt,
+                                             varNumChnk=varNumChnk,
+                                             strPthRun=strPthRun)
+
+    run_resume(monkeypatch, tmp_path, crf_boot_batch, funcRun)
+
+
+@pytest.mark.parametrize('varPar', [1, 2])
+def test_crf_par_perm_01(monkeypatch, tmp_path, varPar):
+    """Interrupted & resumed `crf_par_perm_01`."""
+    aryDpth = get_dpth()
+
+    def funcRun(strPthRun):
+        return crf_par_perm_01.crf_par_perm_01(aryDpth[0, ...],
+                                               aryDpth[1, ...],
+                                               vecEmpX, strFunc='power',
+                                               varNumIt=varNumIt,
+                                               varPar=varPar,
+                                               varNumX=5,
+                                               varNumChnk=varNumChnk,
+                                               strPthRun=strPthRun)
+
+    run_resume(monkeypatch, tmp_path, crf_par_perm_01, funcRun)
+
+
+def test_chk_mismatch(monkeypatch, tmp_path):
+    """Checkpoint that does not match the randomisation of the run."""
+    aryDpth = get_dpth()
+    strPthRun = os.path.join(str(tmp_path), 'run')
+
+    np.random.seed(1)
+    cnt_save(monkeypatch, crf_boot_batch, varStop=varNumStop)
+    with pytest.raises(Interrupt):
+        crf_boot_batch.crf_boot_batch(aryDpth, vecEmpX, varNumIt=varNumIt,
+                                      varNumChnk=varNumChnk,
+                                      strPthRun=strPthRun)
+
+    # Modified randomisation array in checkpoint:
+    dicChk = chkpnt.chk_load(strPthRun, 1)
+    dicRng = {strKey: dicChk.pop(strKey) for strKey in chkpnt.rng_get()}
+    dicChk['aryRnd'] = np.flip(dicChk['aryRnd'], axis=0)
+    chkpnt.chk_save(strPthRun, 1, dicRng, **dicChk)
+
+    with pytest.raises(ValueError, match='does not match randomisation'):
+        crf_boot_batch.crf_boot_batch(aryDpth, vecEmpX, varNumIt=varNumIt,
+                                      varNumChnk=varNumChnk,
+                                      strPthRun=strPthRun)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Test parallelised bootstrapping of contrast response function."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+from py_depthsampling.crf import crf_par_boot_01
+from py_depthsampling.crf import crf_par_boot_02
+from py_depthsampling.crf.crf_par_boot_01 import crf_par_01
+from py_depthsampling.crf.crf_func import crf_hyper
+from py_depthsampling.main.shm import shm_create
+from py_depthsampling.main.shm import shm_attach
+from py_depthsampling.main.shm import shm_free
+
+
+# Stimulus contrast levels:
+vecEmpX = np.array([0.025, 0.061, 0.163, 0.72])
+
+
+def get_dpth(varNumSub=6, varNumDpt=3):
+    """Synthetic depth profiles, aryDpth[idxRoi, idxSub, idxCon, idxDpt]."""
+    np.random.seed(0)
+    vecA = np.linspace(1.0, 2.0, num=varNumDpt)
+    vecResp = crf_hyper(vecEmpX, 1.5, 0.1, 1.5)
+    aryDpth = np.multiply(vecA[None, None, None, :],
+                          vecResp[None, None, :, None])
+    aryDpth = np.add(aryDpth,
+                     np.multiply(0.1, np.random.randn(2, varNumSub,
+                                                      vecEmpX.shape[0],
+                                                      varNumDpt)))
+    return aryDpth
+
+
+def rec_shm(monkeypatch):
+    """Record names of shared memory blocks created by `crf_par_01`."""
+    lstName = []
+
+    def shm_create_rec(*args, **kwargs):
+        tplOut = shm_create(*args, **kwargs)
+        lstName.append(tplOut[0].name)
+        return tplOut
+
+    monkeypatch.setattr(crf_par_boot_01, 'shm_create', shm_create_rec)
+    return lstName
+
+
+def chk_shm_free(lstName):
+    """Assert that shared memory blocks do not exist anymore."""
+    assert len(lstName) > 0
+    for strName in lstName:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=strName)
+
+
+def test_shm():
+    """Array in shared memory, accessed by name."""
+    aryIn = np.arange(12.0).reshape(3, 4)
+    objShm01, aryShm01, tplSpc01 = shm_create(aryIn=aryIn)
+    objShm02, aryShm02, tplSpc02 = shm_create(tplShp=(2, 5),
+                                              strDtype='int64')
+    try:
+        assert np.array_equal(aryShm01, aryIn)
+        assert np.array_equal(aryShm02, np.zeros((2, 5), dtype=np.int64))
+        objShm03, aryShm03 = shm_attach(tplSpc01)
+        aryShm03[1, 2] = -1.0
+        assert aryShm01[1, 2] == -1.0
+        assert aryIn[1, 2] == 6.0
+        del(aryShm03)
+        objShm03.close()
+    finally:
+        del(aryShm01, aryShm02)
+        shm_free([objShm01, objShm02])
+    chk_shm_free([tplSpc01[0], tplSpc02[0]])
+
+
+@pytest.mark.parametrize('strFunc', ['power', 'hyper'])
+def test_crf_par_01(monkeypatch, strFunc):
+    """Same results for 1, 2 & 4 processes, shared memory is released."""
+    aryDpth = get_dpth()
+    lstName = rec_shm(monkeypatch)
+
+    lstRes = []
+    for varPar in [1, 2, 4]:
+        np.random.seed(1)
+        lstRes.append(crf_par_01(aryDpth, vecEmpX, strFunc=strFunc,
+                                 varNumIt=10, varPar=varPar, varNumChnk=3))
+
+    # Input & output arrays of each run:
+    assert len(lstName) == 18
+    chk_shm_free(lstName)
+
+    for tplRes in lstRes[1:]:
+        for aryRef, aryRes in zip(lstRes[0], tplRes):
+            assert aryRes.shape == aryRef.shape
+            assert np.array_equal(aryRes, aryRef)
+
+    # Shapes of parameters, response at half maximum contrast,
+    # semisaturation contrast, and residuals:
+    varNumPar = {'power': 2, 'hyper': 3}[strFunc]
+    assert lstRes[0][0].shape == (2, 10, 3, varNumPar)
+    assert lstRes[0][1].shape == (2, 10, 3)
+    assert lstRes[0][2].shape == (2, 10, 3)
+    assert lstRes[0][3].shape == (2, 10, 4, 3)
+    assert np.all(np.isfinite(lstRes[0][0]))
+
+
+@pytest.mark.parametrize('varPar', [1, 2])
+def test_crf_par_01_fail(monkeypatch, varPar):
+    """Shared memory is released if the fitting fails."""
+    aryDpth = get_dpth()
+    # The fits fail on data that are not finite:
+    aryDpth[1, :, 2, 1] = np.nan
+    lstName = rec_shm(monkeypatch)
+
+    with pytest.raises(ValueError):
+        crf_par_01(aryDpth, vecEmpX, strFunc='power', varNumIt=10,
+                   varPar=varPar, varNumChnk=3, lgcWrm=False)
+
+    assert len(lstName) == 6
+    chk_shm_free(lstName)
+
+    # No blocks are attached in this process anymore:
+    assert len(crf_par_boot_02.dicShm) == 0
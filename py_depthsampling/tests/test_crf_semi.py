@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Test semisaturation contrast of contrast response functions."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import pytest
+from scipy.optimize import brentq
+from py_depthsampling.crf.crf_func import crf_power
+from py_depthsampling.crf.crf_func import crf_hyper
+from py_depthsampling.crf.crf_fit import crf_semi
+from py_depthsampling.crf.crf_fit import semi_bracket
+
+
+dicFunc = {'power': crf_power, 'hyper': crf_hyper}
+
+
+def get_par(strFunc, varNumFit):
+    """Random parameters within plausible range (as in `bench_crf_semi`)."""
+    if strFunc == 'power':
+        aryPar = np.array([np.random.uniform(0.01, 2.0, varNumFit),
+                           np.random.uniform(0.1, 1.0, varNumFit)]).T
+    else:
+        aryPar = np.array([np.random.uniform(0.01, 2.0, varNumFit),
+                           np.random.uniform(0.01, 0.5, varNumFit),
+                           np.random.uniform(0.3, 3.0, varNumFit)]).T
+    return aryPar
+
+
+def semi_root(funcCrf, vecMdlPar):
+    """Semisaturation contrast of one fit by numerical root finding."""
+    varResp50 = np.multiply(0.5, funcCrf(1.0, *vecMdlPar))
+    return brentq(lambda varC: funcCrf(varC, *vecMdlPar) - varResp50,
+                  0.0, 1.0, xtol=1e-15, rtol=1e-15, maxiter=1000)
+
+
+@pytest.mark.parametrize('strFunc', ['power', 'hyper'])
+def test_crf_semi(strFunc):
+    """Closed form & bracketed solution, same as numerical root."""
+    np.random.seed(0)
+    varNumFit = 200
+    funcCrf = dicFunc[strFunc]
+    aryPar = get_par(strFunc, varNumFit)
+
+    vecRef = np.array([semi_root(funcCrf, aryPar[idxFit, :])
+                       for idxFit in range(varNumFit)])
+
+    vecSemi = crf_semi(aryPar, strFunc=strFunc)
+    assert np.allclose(vecSemi, vecRef, rtol=1e-10, atol=1e-12)
+
+    # The bracketed solution is the upper end of the final bracket (width
+    # below the tolerance):
+    vecBrkt = semi_bracket(funcCrf, aryPar, varTol=1e-9)
+    assert np.all(np.greater_equal(vecBrkt, (vecRef - 1e-12)))
+    assert np.all(np.less_equal(vecBrkt, (vecRef + 1e-9)))
+
+
+@pytest.mark.parametrize('strFunc', ['power', 'hyper'])
+def test_crf_semi_special(strFunc):
+    """Flat & very small responses."""
+    funcCrf = dicFunc[strFunc]
+    if strFunc == 'power':
+        # Flat response (exponent of zero), response below threshold:
+        aryPar = np.array([[1.0, 0.0],
+                           [0.00005, 0.5]])
+    else:
+        # Flat response (exponent of zero), response below threshold:
+        aryPar = np.array([[1.0, 0.2, 0.0],
+                           [0.00005, 0.2, 1.0]])
+
+    vecExp = np.array([0.000001, 0.0])
+    assert np.array_equal(crf_semi(aryPar, strFunc=strFunc), vecExp)
+    assert np.array_equal(semi_bracket(funcCrf, aryPar), vecExp)
+
+
+def crf_dcr(varC, varA, varB):
+    """Decreasing response (negative at full contrast)."""
+    return varA * (1.0 - 2.0 * np.power(varC, varB))
+
+
+def crf_gap(varC, varA, varB):
+    """Power function, not defined at contrasts below 0.3."""
+    return np.where(np.greater(varC, 0.3), crf_power(varC, varA, varB),
+                    np.nan)
+
+
+def test_semi_bracket_fail():
+    """Solution not bracketed: NaN, unless the response is very small."""
+    # Response at full contrast below the target:
+    vecSemi = semi_bracket(crf_dcr, np.array([[1.0, 1.0],
+                                              [0.00005, 1.0]]))
+    assert np.isnan(vecSemi[0])
+    assert vecSemi[1] == 0.0
+
+    # Response at full contrast not finite (negative semisaturation constant
+    # with non-integer exponent):
+    vecSemi = semi_bracket(crf_hyper, np.array([[1.0, -0.5, 0.5],
+                                                [1.0, 0.2, 1.0]]))
+    assert np.isnan(vecSemi[0])
+    assert np.isclose(vecSemi[1], semi_root(crf_hyper, [1.0, 0.2, 1.0]),
+                      rtol=0.0, atol=1e-9)
+
+    # Response not finite within the bracket (the solution, 0.5, is defined,
+    # but the second step of the bisection is not):
+    vecSemi = semi_bracket(crf_gap, np.array([[1.0, 1.0]]))
+    assert np.isnan(vecSemi[0])
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""Test deconvolution of depth profiles (draining model)."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import pytest
+from py_depthsampling.drain_model.drain_model_op import drain_prm
+from py_depthsampling.drain_model.drain_model_op import drain_edg
+from py_depthsampling.drain_model.drain_model_op import drain_pos
+from py_depthsampling.drain_model.drain_model_decon_01 import deconv_01
+from py_depthsampling.drain_model.drain_model_decon_02 import deconv_02
+from py_depthsampling.drain_model.drain_model_decon_03 import deconv_03
+from py_depthsampling.drain_model.drain_model_decon_04 import deconv_04
+from py_depthsampling.drain_model.drain_model_decon_05 import deconv_05
+from py_depthsampling.drain_model.drain_model_decon_06 import deconv_06
+from py_depthsampling.drain_model.drain_model_decon_07 import deconv_07
+from py_depthsampling.drain_model.drain_model_decon_ntv import deconv_ntv
+from py_depthsampling.commute.commute_deconv import deconv
+from py_depthsampling.commute.commute_deconv import deconv_batch
+from py_depthsampling.main.resmpl import resmpl
+
+
+# Number of subjects & conditions:
+varNumSub = 3
+varNumCon = 4
+
+
+def get_emp(varNumDpth=5):
+    """Depth profiles, aryEmp[idxSub, idxCon, idxDpth]."""
+    np.random.seed(0)
+    return np.add(np.linspace(1.0, 3.0, num=varNumDpth)[None, None, :],
+                  np.random.randn(varNumSub, varNumCon, varNumDpth))
+
+
+# -----------------------------------------------------------------------------
+# *** Reference implementations
+
+# The references are the explicit recurrences of the original implementation
+# of the draining models (Markuerkiaga et al., 2016), with the weights written
+# out (independent of `drain_prm` & `drain_fwd`), for depth profiles of the
+# form aryEmp5[idxCondition, idxDepth].
+
+# Local signal of each layer (layer VI, V, IV, II/III, I):
+vecLclRef = np.array([1.9, 1.5, 2.2, 1.7, 1.6])
+
+# CBV fractions after Weber et al. (2008), model 3:
+dicCbvRef = {'v1': np.array([2.3,
+                             2.1,
+                             ((2.15 * 0.058 / 0.332)
+                              + (2.2 * 0.108 / 0.332)
+                              + (2.6 * 0.083 / 0.332)
+                              + (2.7 * 0.083 / 0.332)),
+                             ((1.9 + 2.0) * 0.5),
+                             2.05]),
+             'v2': np.array([2.0, 2.1, 2.2, 2.1, 2.0])}
+
+
+def rec_drain(aryEmp5, aryNse=1.0, varFctr=0.0):
+    """
+    Removal of draining effect by explicit recurrence.
+
+    The draining weights into each layer are multiplied by the error of that
+    layer (aryNse[..., idxDepth], models 4 & 5), and the deep GM signal is
+    multiplied by `1 + varFctr` (model 6).
+    """
+    aryNse = np.multiply(np.ones(aryEmp5.shape), aryNse)
+    aryNrn = np.zeros(aryEmp5.shape)
+    aryNrn[..., 0] = aryEmp5[..., 0] * (varFctr + 1.0)
+    aryNrn[..., 1] = (aryEmp5[..., 1]
+                      - (0.6 / 1.9) * aryNrn[..., 0] * aryNse[..., 1])
+    aryNrn[..., 2] = (aryEmp5[..., 2]
+                      - (0.3 / 1.5) * aryNrn[..., 1] * aryNse[..., 2]
+                      - (0.6 / 1.9) * aryNrn[..., 0] * aryNse[..., 2])
+    aryNrn[..., 3] = (aryEmp5[..., 3]
+                      - (1.3 / 2.2) * aryNrn[..., 2] * aryNse[..., 3]
+                      - (0.3 / 1.5) * aryNrn[..., 1] * aryNse[..., 3]
+                      - (0.5 / 1.9) * aryNrn[..., 0] * aryNse[..., 3])
+    aryNrn[..., 4] = (aryEmp5[..., 4]
+                      - (0.7 / 1.7) * aryNrn[..., 3] * aryNse[..., 4]
+                      - (1.3 / 2.2) * aryNrn[..., 2] * aryNse[..., 4]
+                      - (0.3 / 1.5) * aryNrn[..., 1] * aryNse[..., 4]
+                      - (0.5 / 1.9) * aryNrn[..., 0] * aryNse[..., 4])
+    return aryNrn
+
+
+def inv_07(aryEmp5):
+    """Model 7, inverse of the PSF matrix, condition by condition."""
+    aryPsf = np.ones((5, 5))
+    aryPsf[0, :] = [1.9, 0.6, 0.6, 0.5, 0.5]
+    aryPsf[1, :] = [1.0, 1.5, 0.3, 0.3, 0.3]
+    aryPsf[2, :] = [1.0, 1.0, 2.2, 1.3, 1.3]
+    aryPsf[3, :] = [1.0, 1.0, 1.0, 1.7, 0.7]
+    aryPsf[4, :] = [1.0, 1.0, 1.0, 1.0, 1.6]
+    return np.array([np.linalg.solve(aryPsf, aryEmp5[idxCon, :])
+                     for idxCon in range(aryEmp5.shape[0])])
+
+
+def chk_sub(aryNrn, funcRef, aryEmp):
+    """
+    Results with & without leading (subject) dimension, same as reference.
+
+    `aryNrn` is the result for aryEmp[idxSub, idxCon, idxDpth], `funcRef` is
+    called with the depth profiles of one subject.
+    """
+    for idxSub in range(aryEmp.shape[0]):
+        aryRef = funcRef(aryEmp[idxSub, :, :])
+        assert aryNrn[idxSub, ...].shape == aryRef.shape
+        assert np.allclose(aryNrn[idxSub, ...], aryRef, rtol=1e-12,
+                           atol=1e-12)
+# -----------------------------------------------------------------------------
+
+
+def test_deconv_01_02():
+    """Models 1 & 2, explicit recurrence."""
+    aryEmp = get_emp()
+
+    def funcRef01(aryEmp5):
+        return rec_drain(aryEmp5)
+
+    def funcRef02(aryEmp5):
+        return np.divide(rec_drain(aryEmp5), vecLclRef[None, :])
+
+    for funcDcn, funcRef in [(deconv_01, funcRef01), (deconv_02, funcRef02)]:
+        chk_sub(funcDcn(varNumCon, aryEmp), funcRef, aryEmp)
+        assert np.allclose(funcDcn(varNumCon, aryEmp[0, :, :]),
+                           funcRef(aryEmp[0, :, :]), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('strRoi', ['v1', 'v2'])
+def test_deconv_03(strRoi):
+    """Model 3 (CBV fractions of V1 & V2), explicit recurrence."""
+    aryEmp = get_emp()
+    vecCbv = np.divide(dicCbvRef[strRoi], np.max(dicCbvRef[strRoi]))
+
+    def funcRef(aryEmp5):
+        return np.divide(rec_drain(aryEmp5), vecCbv[None, :])
+
+    chk_sub(deconv_03(varNumCon, aryEmp, strRoi=strRoi), funcRef, aryEmp)
+    assert np.allclose(deconv_03(varNumCon, aryEmp[0, :, :], strRoi=strRoi),
+                       funcRef(aryEmp[0, :, :]), rtol=1e-12, atol=1e-12)
+
+
+def test_deconv_04_05():
+    """Models 4 & 5 (random & systematic error), explicit recurrence."""
+    aryEmp = get_emp()
+    varNumIt = 6
+    varNseSys = 0.3
+    np.random.seed(1)
+    # Random noise, defined at more depth levels than the model (only the
+    # first five are used):
+    aryNseRnd = np.random.normal(1.0, 0.2, size=(varNumIt, varNumCon, 7))
+
+    def funcRefRnd(aryEmp5):
+        return np.array([rec_drain(aryEmp5, aryNse=aryNseRnd[idxIt, :, :5])
+                         for idxIt in range(varNumIt)])
+
+    def funcRefSys(aryEmp5):
+        return np.array([rec_drain(aryEmp5, aryNse=(1.0 - varNseSys)),
+                         rec_drain(aryEmp5, aryNse=(1.0 + varNseSys))])
+
+    chk_sub(deconv_04(varNumCon, aryEmp, aryNseRnd), funcRefRnd, aryEmp)
+    assert np.allclose(deconv_04(varNumCon, aryEmp[0, :, :], aryNseRnd),
+                       funcRefRnd(aryEmp[0, :, :]), rtol=1e-12, atol=1e-12)
+
+    aryNrnRnd, aryNrnSys = deconv_05(varNumCon, aryEmp, aryNseRnd,
+                                     varNseSys=varNseSys)
+    chk_sub(aryNrnRnd, funcRefRnd, aryEmp)
+    chk_sub(aryNrnSys, funcRefSys, aryEmp)
+
+    # Without random noise (only the systematic error):
+    aryNrnRnd, aryNrnSys = deconv_05(varNumCon, aryEmp[0, :, :], None,
+                                     varNseSys=varNseSys)
+    assert aryNrnRnd is None
+    assert np.allclose(aryNrnSys, funcRefSys(aryEmp[0, :, :]), rtol=1e-12,
+                       atol=1e-12)
+
+
+def test_deconv_06():
+    """Model 6 (underestimation of deep GM signal), explicit recurrence."""
+    aryEmp = get_emp()
+    lstFctr = [0.0, 0.1, 0.25, 0.5]
+
+    def funcRef(aryEmp5):
+        return np.array([rec_drain(aryEmp5, varFctr=varFctr)
+                         for varFctr in lstFctr])
+
+    chk_sub(deconv_06(varNumCon, aryEmp, lstFctr), funcRef, aryEmp)
+    assert np.allclose(deconv_06(varNumCon, aryEmp[0, :, :], lstFctr),
+                       funcRef(aryEmp[0, :, :]), rtol=1e-12, atol=1e-12)
+
+
+def test_deconv_07():
+    """Model 7, inverse of the PSF matrix."""
+    aryEmp = get_emp()
+    chk_sub(deconv_07(varNumCon, aryEmp), inv_07, aryEmp)
+    assert np.allclose(deconv_07(varNumCon, aryEmp[0, :, :]),
+                       inv_07(aryEmp[0, :, :]), rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('strRoi', ['v1', 'v2'])
+def test_deconv_ntv_layer(strRoi):
+    """Depth levels equal to the layers, same as five-layer model."""
+    aryEmp5 = get_emp()
+    vecEdgLyr = drain_prm(strRoi=strRoi)[0]
+
+    for varMdl, funcDcn in [(1, deconv_01), (2, deconv_02)]:
+        aryRef = funcDcn(varNumCon, aryEmp5)
+        aryNrn = deconv_ntv(aryEmp5, varMdl=varMdl, strRoi=strRoi,
+                            vecEdgDpth=vecEdgLyr)
+        assert np.allclose(aryNrn, aryRef, rtol=1e-12, atol=1e-12)
+
+        # Single depth profile (no leading dimensions):
+        assert np.allclose(deconv_ntv(aryEmp5[0, 0, :], varMdl=varMdl,
+                                      strRoi=strRoi, vecEdgDpth=vecEdgLyr),
+                           aryRef[0, 0, :], rtol=1e-12, atol=1e-12)
+
+
+def test_drain_edg():
+    """Boundaries half way between depth levels, cover entire depth."""
+    vecPos = np.linspace(0.1, 0.95, num=11)
+    vecEdg = drain_edg(vecPos)
+    assert vecEdg.shape == (12,)
+    assert (vecEdg[0] == 0.0) and (vecEdg[-1] == 1.0)
+    assert np.allclose(vecEdg[1:-1], np.add(vecPos[1:], vecPos[:-1]) / 2.0)
+    assert np.all(np.greater(vecPos, vecEdg[:-1]))
+    assert np.all(np.less(vecPos, vecEdg[1:]))
+
+    # V2/V3 layer boundaries are half way between the layer positions:
+    vecPosMdl = np.divide(np.array([160.0, 590.0, 1110.0, 1400.0, 1620.0]),
+                          1700.0)
+    assert np.array_equal(drain_pos(strRoi='v2'), vecPosMdl)
+    assert np.allclose(drain_prm(strRoi='v2')[0],
+                       np.divide(np.array([0.0, 375.0, 850.0, 1255.0, 1510.0,
+                                           1700.0]), 1700.0),
+                       rtol=0.0, atol=1e-15)
+
+    # V1 layer positions are the centres of the layers:
+    assert np.allclose(drain_pos(strRoi='v1'),
+                       np.array([0.1, 0.25, 0.5, 0.8, 0.95]), rtol=0.0,
+                       atol=1e-15)
+
+
+@pytest.mark.parametrize('strRoi', ['v1', 'v2'])
+def test_deconv_ntv_pos(strRoi):
+    """Depth levels placed as in `drain_model_main`."""
+    varNumDpth = 11
+    aryEmp = get_emp(varNumDpth)
+    vecPosMdl = drain_pos(strRoi=strRoi)
+
+    # Positions of the depth levels, from the deepest to the most superficial
+    # layer:
+    vecEdgDpth = drain_edg(np.linspace(vecPosMdl[0], vecPosMdl[-1],
+                                       num=varNumDpth))
+
+    for varMdl in [1, 2]:
+        aryNrn = deconv_ntv(aryEmp, varMdl=varMdl, strRoi=strRoi,
+                            vecEdgDpth=vecEdgDpth)
+        assert aryNrn.shape == aryEmp.shape
+        assert np.all(np.isfinite(aryNrn))
+        # Not the same as the default (equi-volume depth levels that cover
+        # the entire depth at equal spacing):
+        assert not np.allclose(aryNrn, deconv_ntv(aryEmp, varMdl=varMdl,
+                                                  strRoi=strRoi))
+
+    # The deepest depth level is not affected by draining:
+    assert np.allclose(deconv_ntv(aryEmp, varMdl=1, strRoi=strRoi,
+                                  vecEdgDpth=vecEdgDpth)[..., 0],
+                       aryEmp[..., 0])
+
+
+@pytest.mark.parametrize('strRoi', ['v1', 'v2'])
+def test_deconv_batch(strRoi):
+    """Combined operators, same as downsampling & deconvolution."""
+    varNumDpth = 11
+    aryEmp = get_emp(varNumDpth)
+    vecPosMdl = drain_pos(strRoi=strRoi)
+    vecPosEmp = np.linspace(vecPosMdl[0], vecPosMdl[-1], num=varNumDpth)
+
+    lstVar = [1, 2, 3, 7, (6, 0.25)]
+    aryDecon = deconv_batch(aryEmp, strRoi, lstVar=lstVar)
+    assert aryDecon.shape == ((len(lstVar),) + aryEmp.shape)
+
+    aryEmp5 = resmpl(aryEmp, vecPosEmp, vecPosMdl)
+    lstRef = [deconv_01(varNumCon, aryEmp5),
+              deconv_02(varNumCon, aryEmp5),
+              deconv_03(varNumCon, aryEmp5, strRoi=strRoi),
+              deconv_07(varNumCon, aryEmp5),
+              deconv_06(varNumCon, aryEmp5, [0.25])[:, 0, ...]]
+    for idxVar, aryRef in enumerate(lstRef):
+        assert np.allclose(aryDecon[idxVar, ...],
+                           resmpl(aryRef, vecPosMdl, vecPosEmp), rtol=0.0,
+                           atol=1e-12)
+
+    # Single model variant:
+    assert np.array_equal(deconv(aryEmp, strRoi, varMdl=2), aryDecon[1, ...])
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""Test fitting of cortical depth point spread function."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter
+from py_depthsampling.psf_2D.utilities import psf
+from py_depthsampling.psf_2D.utilities import psf_fit
+from py_depthsampling.psf_2D.utilities import psf_fft_init
+from py_depthsampling.psf_2D.utilities import psf_fft
+from py_depthsampling.psf_2D.utilities import psf_diff_fft
+from py_depthsampling.psf_2D.utilities import psf_diff_grad
+from py_depthsampling.psf_2D.psf_2D_boot import psf_boot
+
+
+# Initial values & bounds of PSF parameters (width in array elements &
+# scaling factor):
+vecInit = np.array([1.0, 1.0])
+lstBnds = [(0.0, 10.0), (0.0, 10.0)]
+
+# True PSF parameters:
+vecTrue = np.array([3.0, 1.5])
+
+
+def get_sqr():
+    """Square on constant background, and the square blurred by the PSF."""
+    aryDeep = np.zeros((100, 100))
+    aryDeep[30:70, 30:70] = 1.0
+    aryTrgt = psf(aryDeep, vecTrue[0], vecTrue[1])
+    return aryDeep, aryTrgt
+
+
+def get_noise():
+    """Square & blob with noise, and target map with noise."""
+    np.random.seed(0)
+    aryY, aryX = np.mgrid[0:100, 0:100]
+    aryDeep = np.exp(np.divide(-np.add(np.square(aryX - 40.0),
+                                       np.square(aryY - 60.0)), 50.0))
+    aryDeep[10:30, 55:90] = 1.0
+    aryDeep = np.add(aryDeep, np.multiply(0.1, np.random.randn(100, 100)))
+    aryTrgt = np.add(psf(aryDeep, vecTrue[0], vecTrue[1]),
+                     np.multiply(0.1, np.random.randn(100, 100)))
+    return aryDeep, aryTrgt
+
+
+@pytest.mark.parametrize('strMode', ['nearest', 'reflect', 'constant',
+                                     'mirror', 'wrap'])
+def test_psf_fft(strMode):
+    """PSF in Fourier domain, same as `gaussian_filter`."""
+    aryDeep, _ = get_noise()
+    vecSd = np.array([1.0, 3.0, 10.0, 25.0])
+    dicFft = psf_fft_init(aryDeep, strMode=strMode)
+    for varSd in vecSd:
+        aryRef = gaussian_filter(aryDeep, varSd, mode=strMode)
+        assert np.max(np.absolute(np.subtract(
+            psf_fft(dicFft, varSd, 1.0), aryRef))) < (1e-3 * np.max(aryRef))
+
+    # Batched evaluation & fixed padding (for the upper bound), same as
+    # evaluation one by one with padding for each width (except for narrow
+    # Gaussians, see `psf_fft_init`):
+    vecFct = np.array([1.0, 2.0, 0.5, 1.0])
+    aryOut = psf_fft(dicFft, vecSd, vecFct)
+    dicFftMax = psf_fft_init(aryDeep, vecSd[-1], strMode=strMode)
+    for idxSd in range(vecSd.shape[0]):
+        aryRef = psf_fft(dicFft, vecSd[idxSd], vecFct[idxSd])
+        varTol = {True: 1e-4, False: 1e-12}[vecSd[idxSd] < 2.0]
+        assert np.allclose(aryOut[idxSd, :, :], aryRef, rtol=0.0,
+                           atol=varTol)
+        assert np.allclose(psf_fft(dicFftMax, vecSd[idxSd], vecFct[idxSd]),
+                           aryRef, rtol=0.0, atol=varTol)
+
+    # Narrow Gaussians are evaluated with the same (minimum) padding:
+    for varSd in [0.0, 0.5, 1.0, 2.0]:
+        assert np.array_equal(psf_fft(dicFft, varSd, 1.0),
+                              psf_fft(dicFft, np.array([varSd, 0.5]),
+                                      1.0)[0, :, :])
+
+
+@pytest.mark.parametrize('strLoss', ['mad', 'sq', 'huber'])
+def test_psf_diff_grad(strLoss):
+    """Loss & gradient in Fourier domain, finite differences."""
+    aryDeep, aryTrgt = get_noise()
+    dicFft = psf_fft_init(aryDeep)
+    vecPrm = np.array([2.0, 1.2])
+
+    varLoss, vecGrd = psf_diff_grad(vecPrm, dicFft, aryTrgt,
+                                    strLoss=strLoss, varDlt=0.1)
+    if strLoss == 'mad':
+        assert np.isclose(varLoss, psf_diff_fft(vecPrm, dicFft, aryTrgt),
+                          rtol=1e-12, atol=0.0)
+
+    for idxPrm in range(2):
+        vecStp = np.zeros(2)
+        vecStp[idxPrm] = 1e-6
+        varLoss01 = psf_diff_grad(np.add(vecPrm, vecStp), dicFft, aryTrgt,
+                                  strLoss=strLoss, varDlt=0.1)[0]
+        varLoss02 = psf_diff_grad(np.subtract(vecPrm, vecStp), dicFft,
+                                  aryTrgt, strLoss=strLoss, varDlt=0.1)[0]
+        assert np.isclose(vecGrd[idxPrm], ((varLoss01 - varLoss02) / 2e-6),
+                          rtol=1e-4, atol=1e-8)
+
+
+@pytest.mark.parametrize('strLoss, lgcFft', [('mad', False), ('mad', True),
+                                             ('sq', False),
+                                             ('huber', False)])
+def test_psf_fit_background(strLoss, lgcFft):
+    """Target map with mostly constant background (zero MAD)."""
+    aryDeep, aryTrgt = get_sqr()
+    # More than half of the target map is background:
+    assert np.median(np.absolute(np.subtract(aryTrgt,
+                                             np.median(aryTrgt)))) == 0.0
+
+    dicOptm = psf_fit(aryDeep, aryTrgt, vecInit, lstBnds, strLoss=strLoss,
+                      lgcFft=lgcFft)
+
+    assert dicOptm.success
+    assert np.isfinite(dicOptm.fun)
+    assert np.allclose(dicOptm.x, vecTrue, rtol=0.0, atol=1e-3)
+
+
+def test_psf_fit_scale():
+    """Scale of the pseudo-Huber loss has to be positive."""
+    aryDeep, aryTrgt = get_sqr()
+
+    with pytest.raises(ValueError):
+        psf_fit(aryDeep, aryTrgt, vecInit, lstBnds, strLoss='huber',
+                varDlt=0.0)
+
+    # Constant target map (no fallback):
+    with pytest.raises(ValueError):
+        psf_fit(aryDeep, np.ones(aryTrgt.shape), vecInit, lstBnds,
+                strLoss='huber')
+
+    # The scale is only used for the pseudo-Huber loss:
+    dicOptm = psf_fit(aryDeep, aryTrgt, vecInit, lstBnds, strLoss='sq',
+                      varDlt=0.0)
+    assert dicOptm.success
+
+
+@pytest.mark.parametrize('strMode', ['nearest', 'reflect'])
+def test_psf_fit_fft(strMode):
+    """Mean absolute difference in Fourier domain, same fit."""
+    aryDeep, aryTrgt = get_noise()
+    dicOptm01 = psf_fit(aryDeep, aryTrgt, vecInit, lstBnds, strLoss='mad',
+                        strMode=strMode)
+    dicOptm02 = psf_fit(aryDeep, aryTrgt, vecInit, lstBnds, strLoss='mad',
+                        strMode=strMode, lgcFft=True)
+    assert dicOptm02.success
+    assert np.allclose(dicOptm02.x, dicOptm01.x, rtol=0.0, atol=1e-2)
+    assert np.isclose(dicOptm02.fun, dicOptm01.fun, rtol=1e-4, atol=0.0)
+
+
+@pytest.mark.parametrize('strLoss, lgcFft', [('mad', False), ('mad', True),
+                                             ('sq', False),
+                                             ('huber', False)])
+def test_psf_fit_non_finite(strLoss, lgcFft):
+    """Loss that is not finite: failed fit, instead of initial values."""
+    aryDeep, aryTrgt = get_sqr()
+    aryTrgt[50, 50] = np.nan
+
+    with np.errstate(invalid='ignore'):
+        dicOptm = psf_fit(aryDeep, aryTrgt, vecInit, lstBnds,
+                          strLoss=strLoss, varDlt=0.1, lgcFft=lgcFft)
+
+    assert not dicOptm.success
+    assert np.all(np.isnan(dicOptm.x))
+
+
+@pytest.mark.parametrize('lgcFft', [False, True])
+def test_psf_boot(lgcFft):
+    """Bootstrap fits, same for 1 & 2 processes."""
+    aryDeep, aryTrgt = get_noise()
+    np.random.seed(1)
+    varNumSub = 4
+    aryDeep = np.add(aryDeep[None, :, :],
+                     np.multiply(0.05, np.random.randn(varNumSub, 100, 100)))
+    aryTrgt = np.add(aryTrgt[None, :, :],
+                     np.multiply(0.05, np.random.randn(varNumSub, 100, 100)))
+    aryNorm = np.ones(aryDeep.shape)
+    aryRnd = np.random.randint(0, varNumSub, size=(5, varNumSub))
+
+    lstPrm = [psf_boot(aryDeep, aryNorm, aryTrgt, aryNorm, aryRnd, vecInit,
+                       lstBnds, varPar=varPar, varNumChnk=2, lgcFft=lgcFft)
+              for varPar in [1, 2]]
+
+    assert lstPrm[0].shape == (5, 2)
+    assert np.array_equal(lstPrm[0], lstPrm[1])
+    assert np.allclose(lstPrm[0], vecTrue, rtol=0.0, atol=0.1)
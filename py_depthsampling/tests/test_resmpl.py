@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Test resampling of depth profiles."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+import pytest
+from scipy.interpolate import griddata
+from py_depthsampling.main.resmpl import resmpl
+
+
+# Layer positions of the draining model (V1, and V2 after Weber et al., 2008):
+dicPosMdl = {'v1': np.array([0.1, 0.25, 0.5, 0.8, 0.95]),
+             'v2': np.divide(np.array([160.0, 590.0, 1110.0, 1400.0, 1620.0]),
+                             1700.0)}
+
+
+@pytest.mark.parametrize('strRoi', ['v1', 'v2'])
+@pytest.mark.parametrize('varNumDpth', [5, 11, 50])
+def test_resmpl(strRoi, varNumDpth):
+    """Downsampling & upsampling, same as `griddata` for each profile."""
+    np.random.seed(0)
+    varNumPrf = 200
+
+    vecPosMdl = dicPosMdl[strRoi]
+    vecPosEmp = np.linspace(np.min(vecPosMdl), np.max(vecPosMdl),
+                            num=varNumDpth, endpoint=True)
+
+    # Depth profiles, of the form aryDpth[subject, condition, depth]:
+    aryDpth = np.add(np.random.randn(varNumPrf, 2, varNumDpth),
+                     np.linspace(1.0, 3.0, num=varNumDpth)[None, None, :])
+
+    # Downsampling & upsampling with griddata (one call per profile):
+    aryDwn01 = np.zeros((varNumPrf, 2, vecPosMdl.shape[0]))
+    aryUp01 = np.zeros((varNumPrf, 2, varNumDpth))
+    for idxPrf in range(varNumPrf):
+        for idxCon in range(2):
+            aryDwn01[idxPrf, idxCon, :] = griddata(
+                vecPosEmp, aryDpth[idxPrf, idxCon, :], vecPosMdl,
+                method='cubic')
+            aryUp01[idxPrf, idxCon, :] = griddata(
+                vecPosMdl, aryDwn01[idxPrf, idxCon, :], vecPosEmp,
+                method='cubic')
+
+    # Downsampling & upsampling with cached interpolation matrices:
+    aryDwn02 = resmpl(aryDpth, vecPosEmp, vecPosMdl)
+    aryUp02 = resmpl(aryDwn02, vecPosMdl, vecPosEmp)
+
+    assert aryDwn02.shape == aryDwn01.shape
+    assert aryUp02.shape == aryUp01.shape
+    assert np.all(np.isfinite(aryDwn02))
+    assert np.all(np.isfinite(aryUp02))
+    assert np.allclose(aryDwn01, aryDwn02, rtol=1e-10, atol=1e-12)
+    assert np.allclose(aryUp01, aryUp02, rtol=1e-10, atol=1e-12)
+
+
+def test_resmpl_unsorted():
+    """Unsorted source positions (sorted by `griddata`)."""
+    np.random.seed(1)
+    vecPosSrc = np.random.permutation(np.linspace(0.0, 1.0, num=11))
+    vecPosTrg = dicPosMdl['v2']
+    aryDpth = np.random.randn(20, 11)
+
+    aryRef = np.array([griddata(vecPosSrc, aryDpth[idxPrf, :], vecPosTrg,
+                                method='cubic')
+                       for idxPrf in range(20)])
+    aryRes = resmpl(aryDpth, vecPosSrc, vecPosTrg)
+
+    assert np.allclose(aryRef, aryRes, rtol=1e-10, atol=1e-12)
+
+
+def test_resmpl_out_of_range():
+    """Target positions outside of the source range are NaN."""
+    np.random.seed(2)
+    vecPosTrg = np.array([-0.1, 0.0, 0.5, 1.0, 1.1])
+    vecPosSrc = np.linspace(0.0, 1.0, num=11)
+    aryDpth = np.random.randn(3, 11)
+
+    aryRef = np.array([griddata(vecPosSrc, aryDpth[idxPrf, :], vecPosTrg,
+                                method='cubic')
+                       for idxPrf in range(3)])
+    aryRes = resmpl(aryDpth, vecPosSrc, vecPosTrg)
+
+    lgcNan = np.array([True, False, False, False, True])
+    assert np.array_equal(np.isnan(aryRef), np.tile(lgcNan, (3, 1)))
+    assert np.array_equal(np.isnan(aryRes), np.isnan(aryRef))
+    assert np.allclose(aryRef, aryRes, rtol=1e-10, atol=1e-12,
+                       equal_nan=True)
+
+    # Single depth profile:
+    vecRes = resmpl(aryDpth[0, :], vecPosSrc, vecPosTrg)
+    assert np.array_equal(np.isnan(vecRes), lgcNan)
+    assert np.allclose(aryRef[0, :], vecRes, rtol=1e-10, atol=1e-12,
+                       equal_nan=True)
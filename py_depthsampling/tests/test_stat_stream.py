@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Test streaming mean & percentiles."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy as np
+from py_depthsampling.main.stat_stream import stream_stats
+
+
+def get_gen(aryAll, varNumChnk):
+    """Function that yields chunks of iterations of an array."""
+    def funcGen():
+        for varIdx01 in range(0, aryAll.shape[0], varNumChnk):
+            yield aryAll[varIdx01:(varIdx01 + varNumChnk), ...]
+    return funcGen
+
+
+def test_stream_stats():
+    """Streaming statistics are the same as for all iterations at once."""
+    np.random.seed(0)
+    aryAll = np.random.randn(3001, 3, 4)
+    # Ties:
+    aryAll[:, 1, 2] = np.around(aryAll[:, 1, 2], decimals=1)
+    vecPrct = [2.5, 5.0, 50.0, 95.0, 97.5]
+
+    aryMne, aryPrct = stream_stats(get_gen(aryAll, 700), vecPrct,
+                                   varNumBin=16, varNumMax=50)
+
+    assert np.allclose(aryMne, np.mean(aryAll, axis=0))
+    assert np.array_equal(aryPrct, np.percentile(aryAll, vecPrct, axis=0))
+
+
+def test_stream_stats_non_finite():
+    """Elements with NaN or infinite values are NaN, others unaffected."""
+    np.random.seed(1)
+    aryAll = np.random.randn(2000, 3, 4)
+    aryAll[5, 0, 1] = np.nan
+    aryAll[1999, 2, 3] = np.inf
+    aryAll[0, 1, 0] = -np.inf
+    vecPrct = [2.5, 50.0, 97.5]
+
+    aryMne, aryPrct = stream_stats(get_gen(aryAll, 300), vecPrct,
+                                   varNumBin=16, varNumMax=50)
+
+    lgcFin = np.all(np.isfinite(aryAll), axis=0)
+    assert np.all(np.isnan(aryMne[np.logical_not(lgcFin)]))
+    assert np.all(np.isnan(aryPrct[:, np.logical_not(lgcFin)]))
+    assert np.allclose(aryMne[lgcFin], np.mean(aryAll, axis=0)[lgcFin])
+    assert np.array_equal(aryPrct[:, lgcFin],
+                          np.percentile(aryAll, vecPrct, axis=0)[:, lgcFin])
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""Test weighted quantiles & weighted median."""
+
+# Part of py_depthsampling library
+# Copyright (C) 2018  Ingo Marquardt
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import csv
+import numpy as np
+import pytest
+from py_depthsampling.boot.utilities import wght_quantile
+from py_depthsampling.boot.utilities import wght_median
+
+
+# Fixture with results of spatstat (created with
+# `data/spatstat_wght_quantile.r`):
+strPthDat = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+strPthIn = os.path.join(strPthDat, 'spatstat_wght_input.csv')
+strPthOut = os.path.join(strPthDat, 'spatstat_wght_quantile.csv')
+
+
+def read_csv(strPth):
+    """Read csv file into list of dictionaries (one per row)."""
+    with open(strPth, 'r') as objFle:
+        return list(csv.DictReader(objFle))
+
+
+# Expected values worked out by hand with the algorithm of `weighted.quantile`
+# (spatstat, version 1): sort, Fx = cumsum(w) / sum(w), take the largest
+# value with Fx <= p (smallest value if there is none), and interpolate
+# linearly to the next value if Fx < p.
+#
+# x = [3, 1, 2, 4], w = [1, 2, 3, 4]:
+#     sorted x = [1, 2, 3, 4], Fx = [0.2, 0.5, 0.6, 1.0]
+#     p = 0.1:  no Fx <= p                      -> 1
+#     p = 0.2:  Fx = p at x = 1                 -> 1
+#     p = 0.35: 1 + (2 - 1) * 0.15 / 0.3        -> 1.5
+#     p = 0.5:  Fx = p at x = 2                 -> 2
+#     p = 0.55: 2 + (3 - 2) * 0.05 / 0.1        -> 2.5
+#     p = 0.8:  3 + (4 - 3) * 0.2 / 0.4         -> 3.5
+#     p = 1.0:  Fx = p at x = 4                 -> 4
+# x = [1, 1, 2], w = [1, 1, 2] (ties are not merged):
+#     Fx = [0.25, 0.5, 1.0]
+#     p = 0.4:  1 + (1 - 1) * 0.15 / 0.25       -> 1
+#     p = 0.75: 1 + (2 - 1) * 0.25 / 0.5        -> 1.5
+# x = [1, 2, 3], w = [1, 0, 1] (zero weight):
+#     Fx = [0.5, 0.5, 1.0]
+#     p = 0.5:  largest value with Fx <= p      -> 2
+#     p = 0.75: 2 + (3 - 2) * 0.25 / 0.5        -> 2.5
+lstCse = [([3.0, 1.0, 2.0, 4.0], [1.0, 2.0, 3.0, 4.0],
+           [0.1, 0.2, 0.35, 0.5, 0.55, 0.8, 1.0],
+           [1.0, 1.0, 1.5, 2.0, 2.5, 3.5, 4.0]),
+          ([1.0, 1.0, 2.0], [1.0, 1.0, 2.0],
+           [0.4, 0.75],
+           [1.0, 1.5]),
+          ([1.0, 2.0, 3.0], [1.0, 0.0, 1.0],
+           [0.5, 0.75],
+           [2.0, 2.5])]
+
+
+@pytest.mark.parametrize('vecDat, vecWght, vecPrb, vecExp', lstCse)
+def test_wght_quantile(vecDat, vecWght, vecPrb, vecExp):
+    """Weighted quantiles are the same as in spatstat."""
+    vecQnt = wght_quantile(np.array(vecDat), np.array(vecWght), vecPrb)
+    assert np.allclose(vecQnt, vecExp, rtol=0.0, atol=1e-12)
+
+    # Single probability:
+    for varPrb, varExp in zip(vecPrb, vecExp):
+        varQnt = wght_quantile(np.array(vecDat), np.array(vecWght), varPrb)
+        assert np.ndim(varQnt) == 0
+        assert np.isclose(varQnt, varExp, rtol=0.0, atol=1e-12)
+
+
+def test_wght_median():
+    """Weighted median, along different axes & with broadcast weights."""
+    # First case from above, weighted median is 2:
+    vecDat = np.array([3.0, 1.0, 2.0, 4.0])
+    vecWght = np.array([1.0, 2.0, 3.0, 4.0])
+    assert np.isclose(wght_median(vecDat, vecWght), 2.0, rtol=0.0,
+                      atol=1e-12)
+
+    # Data along first axis, weights broadcast across the second axis:
+    aryDat = np.stack((vecDat,
+                       np.add(vecDat, 10.0),
+                       np.multiply(vecDat, -1.0)),
+                      axis=1)
+    aryMed = wght_median(aryDat, vecWght[:, None], varAxs=0)
+    assert aryMed.shape == (3,)
+    # For the sign flipped data, sorted x = [-4, -3, -2, -1] and
+    # Fx = [0.4, 0.5, 0.8, 1.0], i.e. the weighted median is -3.
+    assert np.allclose(aryMed, [2.0, 12.0, -3.0], rtol=0.0, atol=1e-12)
+
+
+def test_wght_quantile_equal():
+    """Equal weights, comparison with numpy."""
+    np.random.seed(0)
+    vecPrb = np.array([0.0, 0.025, 0.1, 0.5, 0.9, 0.975, 1.0])
+
+    for varNumSmp in [1, 2, 5, 8, 13]:
+
+        aryDat = np.random.randn(4, 3, varNumSmp)
+        # Ties:
+        aryDat[0, 0, :] = np.around(aryDat[0, 0, :])
+        aryWght = np.ones(varNumSmp)
+
+        # With equal weights, Fx = k / n, i.e. the quantile is at (1-based)
+        # position n * p, which is numpy's 'interpolated_inverted_cdf' (type
+        # 4 of Hyndman & Fan, 1996).
+        aryQnt = wght_quantile(aryDat, aryWght, vecPrb)
+        aryRef = np.percentile(aryDat, np.multiply(vecPrb, 100.0), axis=-1,
+                               method='interpolated_inverted_cdf')
+        assert np.allclose(aryQnt, aryRef, rtol=0.0, atol=1e-12)
+
+        # Same along another axis:
+        aryQnt = wght_quantile(np.moveaxis(aryDat, -1, 1), aryWght[:, None],
+                               vecPrb, varAxs=1)
+        assert np.allclose(aryQnt, aryRef, rtol=0.0, atol=1e-12)
+
+        # The median is at position n / 2, i.e. the lower of the two middle
+        # values for even n, and the mean of the middle value and the one
+        # below it for odd n (n > 1). This differs from `np.median`, which
+        # is only matched where these values are tied.
+        arySrt = np.sort(aryDat, axis=-1)
+        aryMed = wght_median(aryDat, aryWght)
+        if varNumSmp == 1:
+            aryRef = arySrt[..., 0]
+        elif (varNumSmp % 2) == 0:
+            aryRef = arySrt[..., ((varNumSmp // 2) - 1)]
+        else:
+            aryRef = np.divide(np.add(arySrt[..., ((varNumSmp // 2) - 1)],
+                                      arySrt[..., (varNumSmp // 2)]),
+                               2.0)
+        assert np.allclose(aryMed, aryRef, rtol=0.0, atol=1e-12)
+        assert np.allclose(
+            aryMed,
+            np.percentile(aryDat, 50.0, axis=-1,
+                          method='interpolated_inverted_cdf'),
+            rtol=0.0, atol=1e-12)
+
+    # Where the two values next to position n / 2 are tied, the weighted
+    # median is the same as `np.median`:
+    aryDat = np.array([[1.0, 2.0, 2.0, 5.0],
+                       [7.0, 3.0, 3.0, 1.0],
+                       [0.0, 4.0, 4.0, 4.0]])
+    assert np.allclose(wght_median(aryDat, np.ones(4)),
+                       np.median(aryDat, axis=-1), rtol=0.0, atol=1e-12)
+
+
+@pytest.mark.skipif(not (os.path.isfile(strPthIn)
+                         and os.path.isfile(strPthOut)),
+                    reason=('spatstat fixture not available (run '
+                            + 'data/spatstat_wght_quantile.r with R & '
+                            + 'spatstat version 1)'))
+def test_wght_quantile_spatstat():
+    """Weighted quantiles & medians, same as recorded spatstat output."""
+    # Data & weights of each case:
+    dicDat = {}
+    dicWght = {}
+    for dicRow in read_csv(strPthIn):
+        dicDat.setdefault(int(dicRow['case']), []).append(float(dicRow['x']))
+        dicWght.setdefault(int(dicRow['case']), []).append(float(dicRow['w']))
+
+    # Probabilities & spatstat results of each case & function:
+    dicRef = {}
+    for dicRow in read_csv(strPthOut):
+        tplKey = (int(dicRow['case']), dicRow['func'])
+        dicRef.setdefault(tplKey, ([], []))
+        dicRef[tplKey][0].append(float(dicRow['prob']))
+        dicRef[tplKey][1].append(float(dicRow['value']))
+
+    assert len(dicRef) == (2 * len(dicDat))
+
+    for (idxCse, strFunc), (lstPrb, lstRef) in dicRef.items():
+        vecDat = np.array(dicDat[idxCse])
+        vecWght = np.array(dicWght[idxCse])
+        if strFunc == 'quantile':
+            vecRes = wght_quantile(vecDat, vecWght, np.array(lstPrb))
+        else:
+            vecRes = np.atleast_1d(wght_median(vecDat, vecWght))
+        assert np.allclose(vecRes, lstRef, rtol=1e-12, atol=1e-12), (
+            'Case ' + str(idxCse) + ', ' + strFunc)